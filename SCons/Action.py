@@ -102,14 +102,17 @@ way for wrapping up the functions.
 
 from __future__ import annotations
 
+import concurrent.futures
 import inspect
+import multiprocessing
 import os
 import pickle
 import re
 import subprocess
 import sys
+import threading
 from abc import ABC, abstractmethod
-from collections import OrderedDict
+from collections import OrderedDict, UserList
 from subprocess import DEVNULL, PIPE
 from typing import TYPE_CHECKING
 
@@ -133,6 +136,10 @@ print_actions = True
 execute_actions = True
 print_actions_presub = False
 
+# A FunctionActionPool when Python function actions should be run in
+# worker processes (the process_pool experimental feature), else None.
+function_action_pool = None
+
 # Use pickle protocol 4 when pickling functions for signature.
 # This is the common format since Python 3.4
 # TODO: use is commented out as not stable since 2017: e0bc3a04d5. Drop?
@@ -1354,6 +1361,159 @@ class LazyAction(CommandGeneratorAction, CommandAction):
         return c.get_varlist(self, target, source, env, executor)
 
 
+class _NodeSnapshot:
+    """Picklable stand-in for a Node passed to a function in a worker process.
+
+    Only the parts of the Node interface that make sense away from the
+    Node graph are provided: the paths and the contents.  File system
+    Nodes are read from disk on demand, the contents of other Nodes
+    (Values, Aliases) are captured when the snapshot is taken.
+    """
+
+    __slots__ = ('path', 'abspath', 'contents')
+
+    def __init__(self, node) -> None:
+        import SCons.Node.FS
+
+        self.path = str(node)
+        self.abspath = node.get_abspath()
+        if isinstance(node, SCons.Node.FS.Base):
+            self.contents = None
+        else:
+            self.contents = node.get_contents()
+
+    def __str__(self) -> str:
+        return self.path
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.path)
+
+    def get_path(self) -> str:
+        return self.path
+
+    def get_abspath(self) -> str:
+        return self.abspath
+
+    def exists(self) -> bool:
+        return self.contents is not None or os.path.exists(self.abspath)
+
+    def get_contents(self):
+        if self.contents is not None:
+            return self.contents
+        with open(self.abspath, 'rb') as f:
+            return f.read()
+
+    def get_text_contents(self) -> str:
+        contents = self.get_contents()
+        if isinstance(contents, str):
+            return contents
+        return SCons.Util.to_Text(contents)
+
+
+def _is_plain_value(value) -> bool:
+    """Tell if a construction variable value can go into an env snapshot."""
+    if value is None or isinstance(value, (str, int, float)):
+        return True
+    if isinstance(value, (list, tuple, UserList)):
+        return all(_is_plain_value(v) for v in value)
+    if isinstance(value, dict):
+        return all(_is_plain_value(k) and _is_plain_value(v)
+                   for k, v in value.items())
+    return False
+
+
+def _env_snapshot(env) -> dict:
+    """Return the plain data construction variables of *env*.
+
+    Builders, scanners, Nodes and callables stay behind, so a function
+    run in a worker process sees strings, numbers and lists thereof.
+    """
+    return {k: v for k, v in env.Dictionary().items() if _is_plain_value(v)}
+
+
+def _run_in_process(payload: bytes):
+    """Worker process side of :meth:`FunctionActionPool.run`."""
+    import SCons.Environment
+
+    execfunction, target, source, env_dict, cwd = pickle.loads(payload)
+    os.chdir(cwd)
+    env = SCons.Environment.SubstitutionEnvironment(**env_dict)
+    return execfunction(target=target, source=source, env=env)
+
+
+class FunctionActionPool:
+    """Run the functions of :class:`FunctionAction` in worker processes.
+
+    Python function actions normally run in the job threads, where
+    they hold the GIL and so are executed one at a time no matter
+    what ``-j`` says.  With a pool, the function of an action created
+    with ``process_pool=True`` is sent to another process together
+    with snapshots of its target and source Nodes and the plain data
+    part of its environment.  Only the call itself happens there: the
+    caller gets the return value back and all Node state is updated
+    in this process as usual.
+
+    Anything that cannot be shipped (lambdas, functions defined in an
+    SConscript file, callable objects, environments or Nodes that do
+    not pickle) makes :meth:`run` decline, and the caller runs the
+    function in its own thread instead.  Once sent, the function is not
+    run again: an exception raised in the worker process, say one from
+    a function wanting more of a Node than the snapshot has, fails the
+    build like one raised in the job thread would.
+    """
+
+    def __init__(self, num_workers: int) -> None:
+        # More processes than CPUs do not make functions run any faster.
+        self.num_workers = min(num_workers, os.cpu_count() or 1)
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def get_executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        # Started lazily, so builds without any eligible function
+        # action never spawn a process.
+        with self.lock:
+            if self.executor is None:
+                # Forking from a multi-threaded process is not safe,
+                # use a fork server where the platform has one.
+                if 'forkserver' in multiprocessing.get_all_start_methods():
+                    context = multiprocessing.get_context('forkserver')
+                    # Have the server import SCons once, rather than
+                    # every worker it forks.
+                    context.set_forkserver_preload(['SCons.Environment'])
+                else:
+                    context = None
+                self.executor = concurrent.futures.ProcessPoolExecutor(
+                    self.num_workers, mp_context=context)
+            return self.executor
+
+    def run(self, execfunction, target, source, env):
+        """Call *execfunction* in a worker process and return its result.
+
+        Returns ``_null`` without calling anything if the call cannot
+        be shipped to another process.
+        """
+        if not inspect.isfunction(execfunction):
+            return _null
+        try:
+            payload = pickle.dumps(
+                (execfunction,
+                 [_NodeSnapshot(t) for t in target],
+                 [_NodeSnapshot(s) for s in source],
+                 _env_snapshot(env),
+                 os.getcwd()),
+                pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, AttributeError, TypeError):
+            return _null
+        return self.get_executor().submit(_run_in_process, payload).result()
+
+    def shutdown(self) -> None:
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+
+
 class FunctionAction(_ActionAction):
     """Class for Python function actions."""
 
@@ -1361,6 +1521,7 @@ class FunctionAction(_ActionAction):
         if SCons.Debug.track_instances: logInstanceCreation(self, 'Action.FunctionAction')
 
         self.execfunction = execfunction
+        self.process_pool = kw.get('process_pool', False)
         try:
             self.funccontents = _callable_contents(execfunction)
         except AttributeError:
@@ -1431,7 +1592,12 @@ class FunctionAction(_ActionAction):
                 source = executor.get_all_sources()
             rsources = list(map(rfile, source))
             try:
-                result = self.execfunction(target=target, source=rsources, env=env)
+                result = _null
+                if function_action_pool is not None and self.process_pool:
+                    result = function_action_pool.run(
+                        self.execfunction, target, rsources, env)
+                if result is _null:
+                    result = self.execfunction(target=target, source=rsources, env=env)
             except (KeyboardInterrupt, SystemExit):
                 raise
             except Exception as e:
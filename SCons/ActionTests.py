@@ -1719,6 +1719,78 @@ class FunctionActionTestCase(unittest.TestCase):
         assert self.build_it
         assert self.string_it
 
+    def test_process_pool(self) -> None:
+        """Test executing a function Action in a FunctionActionPool."""
+        import SCons.Node.FS
+        import SCons.Node.Python
+        import SCons.Tool.filesystem
+        import SCons.Tool.textfile
+
+        fs = SCons.Node.FS.FS(test.workpath(''))
+        target = [fs.File('pool.out')]
+        source = [SCons.Node.Python.Value('hello'),
+                  SCons.Node.Python.Value('@WHO@')]
+        env = Environment(LINESEPARATOR='|',
+                          SUBST_DICT={'@WHO@': 'pool'},
+                          unpicklable=lambda: None)
+
+        pool = SCons.Action.FunctionActionPool(2)
+        save_pool = SCons.Action.function_action_pool
+        SCons.Action.function_action_pool = pool
+        save_cwd = os.getcwd()
+        # Node paths are relative to the top of the FS, like in a build.
+        os.chdir(test.workpath(''))
+        try:
+            # Only actions that ask for it use the pool.
+            act = SCons.Action.FunctionAction(SCons.Tool.textfile._action, {})
+            r = act(target, source, env)
+            assert not r, r
+            assert pool.executor is None
+
+            act = SCons.Action.FunctionAction(SCons.Tool.textfile._action,
+                                              {'process_pool': True})
+            r = act(target, source, env)
+            assert not r, r
+            # The function ran in a worker process.
+            assert pool.executor is not None
+            c = test.read('pool.out', 'r')
+            assert c == "hello|pool", c
+
+            # Functions that can't be pickled are declined...
+            r = pool.run(lambda target, source, env: 0, target, source, env)
+            assert r is SCons.Action._null, r
+
+            # A function that wants more than the snapshots have fails,
+            # it isn't run a second time here: a Node method...
+            with self.assertRaises(AttributeError):
+                pool.run(SCons.Tool.filesystem.copyto_emitter, target, source, env)
+            # ...or a construction variable that isn't plain data.
+            with self.assertRaises(KeyError):
+                pool.run(SCons.Tool.filesystem.copy_action_str, target, source, env)
+
+            # ...and run in this process by the action instead.
+            def local(target, source, env) -> int:
+                self.local_pid = os.getpid()
+                return 0
+
+            act = SCons.Action.FunctionAction(local, {'process_pool': True})
+            r = act(target, source, env)
+            assert r == 0, r
+            assert self.local_pid == os.getpid(), self.local_pid
+        finally:
+            os.chdir(save_cwd)
+            SCons.Action.function_action_pool = save_pool
+            pool.shutdown()
+        assert pool.executor is None
+
+        snapshot = SCons.Action._env_snapshot(env)
+        assert 'unpicklable' not in snapshot, snapshot
+        assert snapshot['SUBST_DICT'] == {'@WHO@': 'pool'}, snapshot
+
+        node = SCons.Action._NodeSnapshot(source[0])
+        assert str(node) == 'hello', str(node)
+        assert node.get_text_contents() == 'hello', node.get_text_contents()
+
     def test_get_contents(self) -> None:
         """Test fetching the contents of a function Action."""
 
@@ -24,19 +24,45 @@
 """CacheDir support
 """
 
+from __future__ import annotations
+
 import atexit
+import concurrent.futures
+import errno
+import functools
 import json
 import os
+import queue
 import shutil
 import stat
 import sys
+import tarfile
 import tempfile
+import threading
+import time
 import uuid
+import zlib
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import bz2
+except ImportError:
+    bz2 = None
+
+try:
+    import lzma
+except ImportError:
+    lzma = None
 
 import SCons.Action
 import SCons.Errors
 import SCons.Warnings
 import SCons.Util
+from SCons.Util.stats import cache_stats
 
 CACHE_PREFIX_LEN = 2  # first two characters used as subdirectory name
 CACHE_TAG = (
@@ -51,28 +77,443 @@ cache_show = False
 cache_readonly = False
 cache_tmp_uuid = uuid.uuid4().hex
 
-def CacheRetrieveFunc(target, source, env) -> int:
+# The PushQueue pushing to caches in the background, if any.
+push_queue = None
+# The one pushing in the background without --cache-push-jobs, for the
+# pushes that always are; see push_in_background().
+_background_queue = None
+_background_lock = threading.Lock()
+
+# Ways of putting a file retrieved from cache in place; see CacheDir().
+LINK_MODES = ('copy', 'reflink', 'hardlink')
+
+# Linux ioctl request making a file share the data blocks of another:
+# _IOW(0x94, 9, int).
+FICLONE = 0x40049409
+
+WRITE_BITS = stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH
+
+# Compressors and decompressors for the compression config setting.
+COMPRESSIONS = ('none', 'zlib', 'lzma', 'bz2')
+CODECS = {'zlib': (zlib.compressobj, zlib.decompressobj)}
+if lzma is not None:
+    CODECS['lzma'] = (lzma.LZMACompressor, lzma.LZMADecompressor)
+if bz2 is not None:
+    CODECS['bz2'] = (bz2.BZ2Compressor, bz2.BZ2Decompressor)
+
+# A compressed entry starts with this, then the codec's name and a newline.
+COMPRESSED_MAGIC = b"\x89SCons cache\r\n\x1a\n"
+COMPRESSED_HEADER_MAX = len(COMPRESSED_MAGIC) + 16
+# Compressed and decompressed data are streamed in pieces of this size.
+COMPRESS_CHUNK = 1024 * 1024
+
+# How files are stored, set by the layout config setting: under their
+# build signature, or with the dedup layout as a manifest naming their
+# content signature, with one copy of each content stored under that,
+# or with the bundle layout, the targets of a builder with several in
+# one archive, under the signature of all of them.
+LAYOUTS = ('plain', 'dedup', 'bundle')
+# The tarfile compression of bundles for the compression setting.
+BUNDLE_COMPRESSIONS = {'zlib': 'gz', 'bz2': 'bz2', 'lzma': 'xz'}
+# A manifest starts with this, then the content signature and the mode
+# of the file, and a newline.
+MANIFEST_MAGIC = b"\x89SCons manifest\r\n\x1a\n"
+MANIFEST_MAX = len(MANIFEST_MAGIC) + 128
+
+# Eviction empties a cache over its max_size down to this fraction of
+# it, so it isn't done again after every build.
+GC_TARGET = 0.9
+# Temporary files of pushes older than this were left by killed builds.
+GC_TMP_AGE = 24 * 3600
+# A garbage collection lock older than this was left by a killed pass.
+GC_LOCK_AGE = 3600
+
+# The caches pushed to in this build, checked by gc_caches().
+_pushed_to = set()
+
+
+def clone_file(src, dst) -> None:
+    """Copy *src* to *dst* without reading the data in.
+
+    Tries the Linux ``FICLONE`` ioctl, which makes *dst* share the data
+    blocks of *src* on file systems that support it (Btrfs, XFS, ...),
+    then :func:`os.copy_file_range`, which leaves the copy to the kernel
+    (or to an NFS server, or a file system that clones with it).
+
+    Raises:
+        OSError: if neither works for these files; *dst* is removed.
+    """
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        try:
+            try:
+                if fcntl is None or not sys.platform.startswith('linux'):
+                    raise OSError(errno.EOPNOTSUPP, "FICLONE not supported", dst)
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            except OSError:
+                if not hasattr(os, 'copy_file_range'):
+                    raise
+                size = os.fstat(fsrc.fileno()).st_size
+                copied = 0
+                while copied < size:
+                    n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), size - copied)
+                    if n == 0:
+                        raise OSError(errno.EIO, "Short copy", dst)
+                    copied += n
+        except OSError:
+            fdst.close()
+            os.unlink(dst)
+            raise
+
+
+def compressed_codec(path) -> str | None:
+    """Return the codec the cache entry *path* is compressed with.
+
+    Returns ``None`` if it isn't compressed.
+    """
+    with open(path, 'rb') as f:
+        header = f.read(COMPRESSED_HEADER_MAX)
+    if not header.startswith(COMPRESSED_MAGIC):
+        return None
+    end = header.find(b'\n', len(COMPRESSED_MAGIC))
+    return header[len(COMPRESSED_MAGIC):end].decode('ascii', 'replace')
+
+
+def compress_file(src, dst, codec) -> int:
+    """Write *src* compressed with *codec* to *dst*.
+
+    The file is read and written :data:`COMPRESS_CHUNK` bytes at a time.
+    Returns the size of *dst*.
+    """
+    compressor = CODECS[codec][0]()
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        fdst.write(COMPRESSED_MAGIC + codec.encode('ascii') + b'\n')
+        for chunk in iter(functools.partial(fsrc.read, COMPRESS_CHUNK), b''):
+            fdst.write(compressor.compress(chunk))
+        fdst.write(compressor.flush())
+        return fdst.tell()
+
+
+def _decompress(decompressor, data):
+    """Yield what *data* decompresses to, :data:`COMPRESS_CHUNK` at a time."""
+    try:
+        if hasattr(decompressor, 'unconsumed_tail'):
+            # zlib keeps what it didn't get to for the caller.
+            while data:
+                yield decompressor.decompress(data, COMPRESS_CHUNK)
+                data = decompressor.unconsumed_tail
+        else:
+            yield decompressor.decompress(data, COMPRESS_CHUNK)
+            while not decompressor.eof and not decompressor.needs_input:
+                yield decompressor.decompress(b'', COMPRESS_CHUNK)
+    except Exception as e:
+        raise ValueError("Corrupt compressed data: %s" % e) from e
+
+
+def decompress_file(src, dst) -> str:
+    """Write the compressed cache entry *src* decompressed to *dst*.
+
+    The file is read and written :data:`COMPRESS_CHUNK` bytes at a time.
+    Returns the codec it was compressed with.
+
+    Raises:
+        ValueError: if *src* isn't compressed, with a codec this
+            Python has, or its data is corrupt or truncated.
+    """
+    codec = compressed_codec(src)
+    if codec not in CODECS:
+        raise ValueError("Unsupported cache compression %r" % codec)
+    decompressor = CODECS[codec][1]()
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        fsrc.seek(len(COMPRESSED_MAGIC) + len(codec) + 1)
+        for chunk in iter(functools.partial(fsrc.read, COMPRESS_CHUNK), b''):
+            for data in _decompress(decompressor, chunk):
+                fdst.write(data)
+        if hasattr(decompressor, 'flush'):
+            fdst.write(decompressor.flush())
+        if not decompressor.eof:
+            raise ValueError("Truncated compressed data")
+    return codec
+
+
+def read_manifest(path) -> tuple | None:
+    """Return the content signature and mode in the manifest *path*.
+
+    Returns ``None`` if the cache entry *path* is a file, not a manifest.
+
+    Raises:
+        OSError: if *path* can't be read.
+        ValueError: if the manifest is corrupt.
+    """
+    if os.path.islink(path):
+        return None
+    with open(path, 'rb') as f:
+        data = f.read(MANIFEST_MAX)
+    if not data.startswith(MANIFEST_MAGIC):
+        return None
+    try:
+        csig, mode = data[len(MANIFEST_MAGIC):].decode('ascii').split()
+        return csig, int(mode, 8)
+    except (UnicodeDecodeError, ValueError):
+        raise ValueError("Corrupt cache manifest %s" % path) from None
+
+
+def write_manifest(path, csig, mode) -> None:
+    """Write a manifest for the content signature *csig* to *path*."""
+    with open(path, 'wb') as f:
+        f.write(MANIFEST_MAGIC + ('%s %o\n' % (csig, mode)).encode('ascii'))
+
+
+def bundle_sig(targets) -> str:
+    """Return the signature of the bundle of *targets*, a builder's targets.
+
+    It combines their build signatures, which include their paths, so
+    it changes whenever one of the files the builder makes would.
+    """
+    return SCons.Util.hash_collect([t.get_cachedir_bsig() for t in targets])
+
+
+def _anonymous(tarinfo):
+    # Bundles in a shared cache shouldn't say who built them.
+    tarinfo.uid = tarinfo.gid = 0
+    tarinfo.uname = tarinfo.gname = ''
+    return tarinfo
+
+
+def write_bundle(paths, dst, codec) -> int:
+    """Write the files *paths* to the archive *dst*, compressed with *codec*.
+
+    The members are named by their index in *paths*, so the archive
+    doesn't depend on where the files are.  Returns the size of *dst*.
+    """
+    mode = 'w:' + BUNDLE_COMPRESSIONS.get(codec, '')
+    with tarfile.open(dst, mode) as tar:
+        for i, path in enumerate(paths):
+            tar.add(path, arcname=str(i), recursive=False, filter=_anonymous)
+    return os.path.getsize(dst)
+
+
+def extract_bundle(src, dsts, keep_mtime: bool = True) -> list:
+    """Put the files in the archive *src* in place as *dsts*, all or none.
+
+    Each is extracted to a temporary file first, and they are all
+    moved in place once they all are.  The files get the mode they
+    were archived with, and the modification time too if *keep_mtime*.
+    Returns their sizes.
+
+    Raises:
+        OSError: if *src* can't be read or the files written.
+        ValueError: if the archive is corrupt, or not one of *dsts*.
+    """
+    temps = []
+    sizes = []
+    try:
+        try:
+            with tarfile.open(src, 'r:*') as tar:
+                members = tar.getmembers()
+                if [m.name for m in members] != [str(i) for i in range(len(dsts))]:
+                    raise ValueError("Cache bundle %s doesn't hold %d files" % (src, len(dsts)))
+                for m, dst in zip(members, dsts):
+                    tmp = "%s.tmp%s" % (dst, cache_tmp_uuid)
+                    temps.append(tmp)
+                    if m.issym():
+                        os.symlink(m.linkname, tmp)
+                        sizes.append(0)
+                        continue
+                    if not m.isfile():
+                        raise ValueError("Cache bundle %s holds a %r" % (src, m.type))
+                    with tar.extractfile(m) as fsrc, open(tmp, 'wb') as fdst:
+                        shutil.copyfileobj(fsrc, fdst, COMPRESS_CHUNK)
+                    os.chmod(tmp, stat.S_IMODE(m.mode) | stat.S_IWRITE)
+                    if keep_mtime:
+                        os.utime(tmp, (m.mtime, m.mtime))
+                    sizes.append(m.size)
+        except (tarfile.TarError, EOFError, zlib.error) as e:
+            raise ValueError("Corrupt cache bundle %s: %s" % (src, e)) from e
+        for tmp, dst in zip(temps, dsts):
+            os.replace(tmp, dst)
+    except BaseException:
+        for tmp in temps:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+        raise
+    return sizes
+
+
+def mark_used(cachefile) -> None:
+    """Record that the cache entry *cachefile* was used now.
+
+    Eviction removes the entries with the oldest access time first.
+    File systems mounted ``noatime`` (or ``relatime``) don't keep it up
+    to date on reads, so it is set explicitly; the modification time,
+    which hard linked targets share, is left alone.
+    """
+    try:
+        st = os.stat(cachefile)
+        os.utime(cachefile, ns=(time.time_ns(), st.st_mtime_ns))
+    except OSError:
+        pass
+
+
+def collect_garbage(path, max_size, fraction=GC_TARGET) -> tuple | None:
+    """Evict the least recently used entries of the cache in *path*.
+
+    If the entries take more than *max_size* bytes, the ones with the
+    oldest access time (see :func:`mark_used`) are removed until they
+    take no more than *fraction* of it.  Temporary files left by pushes
+    that were killed are removed too.
+
+    This is safe while other builds use the cache: an entry is removed
+    with a single unlink, so a build copying it either has it or finds
+    it missing and builds the target; one pushed is renamed in place
+    complete; an entry used since the cache was scanned is kept.
+    Only one pass runs on a cache at a time: if another holds the lock,
+    nothing is done and ``None`` is returned.
+
+    Returns:
+        the number of files and bytes removed, and the bytes left.
+    """
+    lock = SCons.Util.FileLock(os.path.join(path, 'gc'), writer=True)
+    try:
+        lock.acquire_lock()
+    except SCons.Util.SConsLockFailure:
+        try:
+            if time.time() - os.stat(lock.lockfile).st_mtime < GC_LOCK_AGE:
+                return None
+            os.unlink(lock.lockfile)
+            lock.acquire_lock()
+        except (OSError, SCons.Util.SConsLockFailure):
+            return None
+    try:
+        now = time.time()
+        entries = []
+        total = removed = removed_bytes = 0
+        with os.scandir(path) as subdirs:
+            for subdir in subdirs:
+                if not subdir.is_dir(follow_symlinks=False):
+                    continue
+                with os.scandir(subdir.path) as files:
+                    for entry in files:
+                        try:
+                            st = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        if '.tmp' in entry.name:
+                            if now - st.st_mtime > GC_TMP_AGE:
+                                try:
+                                    os.unlink(entry.path)
+                                    removed += 1
+                                    removed_bytes += st.st_size
+                                except OSError:
+                                    pass
+                            continue
+                        entries.append((st.st_atime_ns, st.st_size, entry.path))
+                        total += st.st_size
+
+        if total > max_size:
+            entries.sort()
+            limit = max_size * fraction
+            for atime, size, entry in entries:
+                if total <= limit:
+                    break
+                try:
+                    if os.lstat(entry).st_atime_ns > atime:
+                        continue
+                    os.unlink(entry)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+                removed_bytes += size
+        return removed, removed_bytes, total
+    finally:
+        lock.release_lock()
+
+
+def gc_caches() -> None:
+    """Evict entries from the caches pushed to in this build.
+
+    Called at the end of the build; see :meth:`CacheDir.gc`.
+    """
+    while _pushed_to:
+        _pushed_to.pop().gc()
+
+
+def CacheRetrieveFunc(target, source, env, dst=None, cd=None, count=None) -> int:
     t = target[0]
     fs = t.fs
-    cd = env.get_CacheDir()
-    cd.requests += 1
+    if dst is None:
+        dst = t.get_internal_path()
+    if cd is None:
+        cd = env.get_CacheDir()
+    if count is None:
+        count = cd.count
     cachedir, cachefile = cd.cachepath(t)
     if not fs.exists(cachefile):
         cd.CacheDebug('CacheRetrieve(%s):  %s not in cache\n', t, cachefile)
+        count(t, False, 'not in cache')
         return 1
-    cd.hits += 1
     cd.CacheDebug('CacheRetrieve(%s):  retrieving from %s\n', t, cachefile)
-    if SCons.Action.execute_actions:
+    if not SCons.Action.execute_actions:
+        count(t, True, None)
+    else:
         if fs.islink(cachefile):
-            fs.symlink(fs.readlink(cachefile), t.get_internal_path())
+            fs.symlink(fs.readlink(cachefile), dst)
+            count(t, True, 'symlink')
         else:
-            cd.copy_from_cache(env, cachefile, t.get_internal_path())
+            start = time.perf_counter()
+            # The file, or with the dedup layout the one it names.
+            src, mode = cachefile, None
             try:
-                os.utime(cachefile, None)
-            except OSError:
-                pass
-        st = fs.stat(cachefile)
-        fs.chmod(t.get_internal_path(), stat.S_IMODE(st.st_mode) | stat.S_IWRITE)
+                manifest = read_manifest(cachefile)
+                if manifest is not None:
+                    csig, mode = manifest
+                    src = cd.sigpath(csig)[1]
+                    cd.CacheDebug('CacheRetrieve(%s):  %s stored as %s\n', t, cachefile, csig)
+                how = cd.retrieve_file(env, src, dst)
+            except FileNotFoundError:
+                if fs.exists(src):
+                    raise
+                # Evicted since we looked: build it instead.
+                cd.CacheDebug('CacheRetrieve(%s):  %s evicted from cache\n', t, cachefile)
+                count(t, False, 'evicted')
+                return 1
+            except ValueError as e:
+                # A compressed entry this build can't read, or a corrupt manifest.
+                cd.CacheDebug('CacheRetrieve(%s):  %s not retrieved: %s\n', t, cachefile, e)
+                count(t, False, 'unreadable')
+                try:
+                    fs.unlink(dst)
+                except OSError:
+                    pass
+                return 1
+            elapsed = time.perf_counter() - start
+            if src != cachefile:
+                mark_used(cachefile)
+            if how == 'hardlink':
+                # The target is the cache entry: leave it read-only, and
+                # don't touch its modification time, which would change
+                # the target's timestamp in the other builds that linked it.
+                mark_used(src)
+                size = fs.stat(dst).st_size
+            else:
+                try:
+                    os.utime(src, None)
+                except OSError:
+                    pass
+                st = fs.stat(dst)
+                if mode is None:
+                    mode = stat.S_IMODE(st.st_mode)
+                fs.chmod(dst, mode | stat.S_IWRITE)
+                size = st.st_size
+            count(t, True, how, size, elapsed)
+            cd.CacheDebug('CacheRetrieve(%s):  %s retrieved by %s: %d bytes in %.3f ms, %.2f MB/s overall\n',
+                          t, cachefile, how, size, elapsed * 1000, cd.retrieve_rate)
+            if how in CODECS:
+                stored = fs.getsize(src)
+                cd.CacheDebug('CacheRetrieve(%s):  %s decompressed from %d bytes, ratio %.2f\n',
+                              t, cachefile, stored, size / stored)
     return 0
 
 def CacheRetrieveString(target, source, env) -> str:
@@ -87,6 +528,15 @@ CacheRetrieve = SCons.Action.Action(CacheRetrieveFunc, CacheRetrieveString)
 
 CacheRetrieveSilent = SCons.Action.Action(CacheRetrieveFunc, None)
 
+def CacheInPlaceFunc(target, source, env) -> int:
+    # Already retrieved by CacheDir.prefetch(), or kept by CacheDir.in_place().
+    return 0
+
+def CacheInPlaceString(target, source, env) -> str:
+    return "Retrieved `%s' from cache" % target[0].get_internal_path()
+
+CacheInPlace = SCons.Action.Action(CacheInPlaceFunc, CacheInPlaceString)
+
 def CachePushFunc(target, source, env) -> None:
     if cache_readonly:
         return
@@ -109,8 +559,19 @@ def CachePushFunc(target, source, env) -> None:
         return
 
     cd.CacheDebug('CachePush(%s):  pushing to %s\n', t, cachefile)
+    if push_queue is not None:
+        push_queue.put(_push_file, target, env, cachedir, cachefile)
+    else:
+        _push_file(target, env, cachedir, cachefile)
 
-    tempfile = "%s.tmp%s"%(cachefile,cache_tmp_uuid)
+def _push_file(target, env, cachedir, cachefile, cd=None) -> None:
+    """Copy the target to *cachefile*, by way of a temporary file."""
+    t = target[0]
+    fs = t.fs
+    if cd is None:
+        cd = env.get_CacheDir()
+    # Unique to the thread too, as two targets can have the same entry.
+    tempfile = "%s.tmp%s-%d" % (cachefile, cache_tmp_uuid, threading.get_ident())
     errfmt = "Unable to copy %s to cache. Cache file is %s"
 
     try:
@@ -121,9 +582,17 @@ def CachePushFunc(target, source, env) -> None:
     try:
         if fs.islink(t.get_internal_path()):
             fs.symlink(fs.readlink(t.get_internal_path()), tempfile)
+        elif cd.layout == 'dedup':
+            csig = _push_content(t, env, cd, cachefile)
+            mode = stat.S_IMODE(fs.stat(t.get_internal_path()).st_mode)
+            write_manifest(tempfile, csig, mode)
         else:
-            cd.copy_to_cache(env, t.get_internal_path(), tempfile)
+            _store_file(t, env, cd, cachefile, tempfile)
         fs.rename(tempfile, cachefile)
+        if not fs.islink(cachefile):
+            # The copy has the target's access time.
+            mark_used(cachefile)
+        _pushed_to.add(cd)
 
     except OSError:
         # It's possible someone else tried writing the file at the
@@ -135,9 +604,256 @@ def CachePushFunc(target, source, env) -> None:
         cd.CacheDebug(errfmt + '\n', str(t), cachefile)
         SCons.Warnings.warn(SCons.Warnings.CacheWriteErrorWarning, msg)
 
+def _store_file(t, env, cd, cachefile, tempfile) -> None:
+    """Copy the target to *tempfile*, compressed if the cache says so."""
+    if cd.compression in CODECS:
+        start = time.perf_counter()
+        stored = cd.compress_to_cache(env, t.get_internal_path(), tempfile)
+        elapsed = time.perf_counter() - start
+        size = t.fs.getsize(t.get_internal_path())
+        cd.CacheDebug('CachePush(%s):  %s compressed with %s: %d to %d bytes, ratio %.2f, in %.3f ms\n',
+                      t, cachefile, cd.compression, size, stored,
+                      size / stored, elapsed * 1000)
+    else:
+        cd.copy_to_cache(env, t.get_internal_path(), tempfile)
+
+def _push_content(t, env, cd, cachefile) -> str:
+    """Store the content of the target under its content signature.
+
+    For the dedup layout: the file is copied only if no other target
+    with the same content was.  The signature is computed from the
+    file, as the node's own may not be yet when pushing in the
+    background.  Returns it.
+    """
+    fs = t.fs
+    csig = SCons.Util.hash_file_signature(t.get_internal_path(), SCons.Node.FS.File.hash_chunksize)
+    blobdir, blob = cd.sigpath(csig)
+    if fs.exists(blob):
+        cd.CacheDebug('CachePush(%s):  %s stored as %s, already in cache\n', t, cachefile, csig)
+    else:
+        cd.CacheDebug('CachePush(%s):  %s stored as %s\n', t, cachefile, csig)
+        fs.makedirs(blobdir, exist_ok=True)
+        tempfile = "%s.tmp%s-%d" % (blob, cache_tmp_uuid, threading.get_ident())
+        _store_file(t, env, cd, cachefile, tempfile)
+        fs.rename(tempfile, blob)
+    mark_used(blob)
+    return csig
+
+def _push_bundle(targets, env, cachedir, cachefile, cd) -> None:
+    """Archive the files of *targets* to *cachefile*, by way of a temporary file."""
+    t = targets[0]
+    tempfile = "%s.tmp%s-%d" % (cachefile, cache_tmp_uuid, threading.get_ident())
+    try:
+        os.makedirs(cachedir, exist_ok=True)
+        start = time.perf_counter()
+        stored = write_bundle([n.get_internal_path() for n in targets], tempfile, cd.compression)
+        elapsed = time.perf_counter() - start
+        os.replace(tempfile, cachefile)
+        mark_used(cachefile)
+        _pushed_to.add(cd)
+        cd.CacheDebug('CachePush(%s):  %s bundles %d files: %d bytes in %.3f ms\n',
+                      t, cachefile, len(targets), stored, elapsed * 1000)
+    except OSError:
+        try:
+            os.unlink(tempfile)
+        except OSError:
+            pass
+        errfmt = "Unable to copy %s to cache. Cache file is %s"
+        cd.CacheDebug(errfmt + '\n', str(targets), cachefile)
+        SCons.Warnings.warn(SCons.Warnings.CacheWriteErrorWarning,
+                            errfmt % (str(targets), cachefile))
+
 CachePush = SCons.Action.Action(CachePushFunc, None)
 
 
+class PushQueue:
+    """Push files to caches from a pool of background threads.
+
+    A build then doesn't wait for the copy to a (slow, shared) cache
+    before going on with the targets that depend on the one pushed.
+    At most *size* pushes wait in the queue: a build producing targets
+    faster than they can be pushed blocks in :meth:`put` until there is
+    room.  Each push still goes through a temporary file renamed into
+    place, so a reader never sees part of a file.
+
+    Errors (a cache that can't be written) are kept and reported as
+    warnings by :meth:`shutdown`, in the main thread.
+    """
+
+    def __init__(self, jobs: int, size: int | None = None) -> None:
+        self.queue = queue.Queue(size or 4 * jobs)
+        self.cancelled = False
+        self.errors = []
+        self.threads = []
+        for _ in range(jobs):
+            thread = threading.Thread(target=self._run, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def put(self, func, *args) -> None:
+        """Queue the push ``func(*args)``, waiting while the queue is full."""
+        self.queue.put((func, args))
+
+    def _run(self) -> None:
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                func, args = item
+                if not self.cancelled:
+                    func(*args)
+            except Exception as e:
+                self.errors.append(e)
+            finally:
+                self.queue.task_done()
+
+    def shutdown(self, cancel: bool = False) -> None:
+        """Stop the threads, after finishing the queued pushes.
+
+        If *cancel* is true, the pushes that haven't started are
+        dropped instead; those under way are finished, so no temporary
+        files are left behind.
+        """
+        if cancel:
+            self.cancelled = True
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        errors, self.errors = self.errors, []
+        for e in errors:
+            SCons.Warnings.warn(SCons.Warnings.CacheWriteErrorWarning, str(e))
+
+
+def push_in_background(func, *args) -> None:
+    """Queue the push ``func(*args)`` to run in the background.
+
+    For the pushes made from a background thread even without
+    ``--cache-push-jobs``: they go to :data:`push_queue` if there is
+    one, else to a queue with a thread of its own, started when first
+    needed.
+    """
+    global _background_queue
+    pq = push_queue
+    if pq is None:
+        with _background_lock:
+            if _background_queue is None:
+                _background_queue = PushQueue(1)
+            pq = _background_queue
+    pq.put(func, *args)
+
+
+def shutdown_push_queues(cancel: bool = False) -> None:
+    """Shut down the queues pushing in the background; see :meth:`PushQueue.shutdown`."""
+    global push_queue, _background_queue
+    for pq in (push_queue, _background_queue):
+        if pq is not None:
+            pq.shutdown(cancel=cancel)
+    push_queue = _background_queue = None
+
+
+def _prefetchable(targets) -> bool:
+    """Tell if the targets of a builder can be retrieved before the build.
+
+    They must be files that don't exist yet, built only from files that
+    aren't built themselves, so their build signatures are final.
+    """
+    for t in targets:
+        if not isinstance(t, SCons.Node.FS.File) or t.nocache or t.exists():
+            return False
+    # Rule out most of the others before scanning.
+    for t in targets:
+        if any(child.is_derived() for child in t.known_children()):
+            return False
+    for t in targets:
+        if any(child.is_derived() or not child.exists() for child in t.children()):
+            return False
+    return True
+
+
+def prefetch_candidates(top) -> list:
+    """Return the targets under *top* that can be retrieved right away.
+
+    Walks the dependencies known without scanning, and scans only the
+    targets that look like candidates.  Returns lists of the targets of
+    a builder, as they are retrieved all or none.  Called before the
+    build, in the main thread.
+    """
+    groups = []
+    seen = set()
+    stack = list(top)
+    while stack:
+        node = stack.pop()
+        if node in seen:
+            continue
+        seen.add(node)
+        # As the taskmaster does when it gets there.
+        node = node.disambiguate()
+        stack.extend(node.known_children())
+        if not node.has_builder():
+            continue
+        executor = node.get_executor()
+        if executor is None or executor in seen:
+            continue
+        seen.add(executor)
+        try:
+            targets = [t.disambiguate() for t in executor.get_all_targets()]
+            if _prefetchable(targets):
+                groups.append(targets)
+        except Exception:
+            # The taskmaster runs into it again, and reports it.
+            pass
+    return groups
+
+
+class CachePrefetcher:
+    """Retrieve targets from their caches before the taskmaster asks.
+
+    Otherwise a build that finds everything in the cache retrieves the
+    files one at a time, as the taskmaster reaches them.  :meth:`start`
+    picks the targets built only from source files, whose build
+    signatures can be computed at once, has each cache check which of
+    them it holds (:meth:`CacheDir.prefetch`), and retrieves those on
+    *jobs* threads while the build goes on.  When the taskmaster gets
+    to such a target, :meth:`CacheDir.retrieve` moves it in place,
+    waiting for it if needed.
+    """
+
+    def __init__(self, jobs: int) -> None:
+        self.executor = concurrent.futures.ThreadPoolExecutor(jobs)
+        self.caches = []
+
+    def start(self, top) -> int:
+        """Start retrieving the targets under *top*.
+
+        Returns the number of builders whose targets are looked for.
+        """
+        groups = {}
+        for group in prefetch_candidates(top):
+            cd = group[0].get_build_env().get_CacheDir()
+            if cd.is_enabled():
+                groups.setdefault(cd, []).append(group)
+        for cd, cd_groups in groups.items():
+            cd.prefetch(cd_groups, self.executor)
+            self.caches.append(cd)
+        return sum(len(cd_groups) for cd_groups in groups.values())
+
+    def shutdown(self) -> None:
+        """Drop the retrievals that haven't started, and wait for the others."""
+        for cd in self.caches:
+            cd.cancel_prefetch()
+        self.caches = []
+        self.executor.shutdown(wait=True)
+
+
+def _listdir(path) -> set:
+    try:
+        return set(os.listdir(path))
+    except OSError:
+        return set()
+
+
 class CacheDir:
 
     def __init__(self, path) -> None:
@@ -150,6 +866,12 @@ class CacheDir:
         """
         self.requests = 0
         self.hits = 0
+        self.retrieved_bytes = 0
+        self.retrieve_time = 0.0
+        self.link_mode = 'copy'
+        self.prefetched = {}
+        self.kept = {}
+        self.bundled = {}
         self.path = path
         self.current_cache_debug = None
         self.debugFP = None
@@ -268,7 +990,8 @@ class CacheDir:
             msg = "Failed to read cache configuration for " + path
             raise SCons.Errors.SConsEnvironmentError(msg)
 
-    def CacheDebug(self, fmt, target, cachefile) -> None:
+    def _debug_file(self):
+        """Return the file to write --cache-debug output to, if any."""
         if cache_debug != self.current_cache_debug:
             if cache_debug == '-':
                 self.debugFP = sys.stdout
@@ -281,8 +1004,11 @@ class CacheDir:
             else:
                 self.debugFP = None
             self.current_cache_debug = cache_debug
-        if self.debugFP:
-            self.debugFP.write(fmt % (target, os.path.split(cachefile)[1]))
+        return self.debugFP
+
+    def CacheDebug(self, fmt, target, cachefile, *args) -> None:
+        if self._debug_file():
+            self.debugFP.write(fmt % (target, os.path.split(cachefile)[1], *args))
             self.debugFP.write("requests: %d, hits: %d, misses: %d, hit rate: %.2f%%\n" %
                                (self.requests, self.hits, self.misses, self.hit_ratio))
 
@@ -294,6 +1020,101 @@ class CacheDir:
         else:
             return env.fs.copy2(src, dst)
 
+    @classmethod
+    def link_from_cache(cls, env, src, dst) -> bool:
+        """Hard link a file from cache.
+
+        The target and the cache entry are then the same file, so
+        modifying the target in place would corrupt the entry: the file
+        is made read-only.  Returns ``False`` if the file can't be
+        linked (say, the cache is on another file system), or can't be
+        made read-only because another user owns it.  Not done on
+        Windows, where a read-only file can't be removed for a rebuild.
+        """
+        if sys.platform == 'win32':
+            return False
+        try:
+            env.fs.link(src, dst)
+        except OSError:
+            return False
+        try:
+            st = env.fs.stat(dst)
+            env.fs.chmod(dst, stat.S_IMODE(st.st_mode) & ~WRITE_BITS)
+        except OSError:
+            try:
+                env.fs.unlink(dst)
+            except OSError:
+                pass
+            return False
+        return True
+
+    @classmethod
+    def reflink_from_cache(cls, env, src, dst) -> bool:
+        """Clone a file from cache with :func:`clone_file`.
+
+        The metadata is copied as :meth:`copy_from_cache` would.
+        Returns ``False`` if the file can't be cloned.
+        """
+        try:
+            clone_file(src, dst)
+        except OSError:
+            return False
+        if env.cache_timestamp_newer:
+            shutil.copymode(src, dst)
+        else:
+            shutil.copystat(src, dst)
+        return True
+
+    def compress_to_cache(self, env, src, dst) -> int:
+        """Compress a file to cache, with the cache's :attr:`compression`.
+
+        The metadata is copied as :meth:`copy_to_cache` would.  Returns
+        the compressed size.
+        """
+        size = compress_file(src, dst, self.compression)
+        shutil.copystat(src, dst)
+        st = stat.S_IMODE(os.stat(dst).st_mode)
+        if not st & stat.S_IWRITE:
+            os.chmod(dst, st | stat.S_IWRITE)
+        return size
+
+    @classmethod
+    def decompress_from_cache(cls, env, src, dst) -> str:
+        """Decompress a file from cache.
+
+        The metadata is copied as :meth:`copy_from_cache` would.
+        Returns the codec it was compressed with.
+        """
+        codec = decompress_file(src, dst)
+        if env.cache_timestamp_newer:
+            shutil.copymode(src, dst)
+        else:
+            shutil.copystat(src, dst)
+        return codec
+
+    def retrieve_file(self, env, src, dst) -> str:
+        """Put the cached file *src* in place as the target *dst*.
+
+        A compressed entry is decompressed with
+        :meth:`decompress_from_cache`.  Otherwise it is linked or cloned
+        as :attr:`link_mode` says, and copied with :meth:`copy_from_cache`
+        if that isn't set or doesn't work.  Returns how it was done:
+        ``'hardlink'``, ``'reflink'``, ``'copy'``, or the codec.
+
+        Raises:
+            ValueError: if a compressed entry can't be decompressed.
+        """
+        if compressed_codec(src) is not None:
+            return self.decompress_from_cache(env, src, dst)
+        if self.link_mode == 'hardlink':
+            if self.link_from_cache(env, src, dst):
+                return 'hardlink'
+        elif self.link_mode == 'reflink':
+            if self.reflink_from_cache(env, src, dst):
+                return 'reflink'
+        self.copy_from_cache(env, src, dst)
+        return 'copy'
+
     @classmethod
     def copy_to_cache(cls, env, src, dst) -> str:
         """Copy a file to cache.
@@ -315,10 +1136,78 @@ class CacheDir:
     def hit_ratio(self) -> float:
         return (100.0 * self.hits / self.requests if self.requests > 0 else 100)
 
+    @property
+    def compression(self) -> str:
+        """The codec entries pushed to the cache are compressed with."""
+        return self.config.get('compression', 'none')
+
+    @property
+    def layout(self) -> str:
+        """How files pushed to the cache are stored; see :data:`LAYOUTS`."""
+        return self.config.get('layout', 'plain')
+
+    @property
+    def max_size(self) -> int:
+        """The size the cache is kept within, in bytes; 0 if unbounded."""
+        return self.config.get('max_size', 0)
+
+    def gc(self):
+        """Evict the least recently used entries if over :attr:`max_size`.
+
+        Uses :func:`collect_garbage`; returns what it does.
+        """
+        if not self.max_size or self.is_readonly() or not self.is_enabled():
+            return None
+        result = collect_garbage(self.path, self.max_size)
+        if result and result[0] and self.debugFP:
+            self.debugFP.write("CacheGC:  removed %d files, %d bytes; %d bytes left\n" % result)
+        return result
+
+    @property
+    def retrieve_rate(self) -> float:
+        """Bytes retrieved from cache per second, in MB/s."""
+        if self.retrieve_time <= 0:
+            return 0.0
+        return self.retrieved_bytes / self.retrieve_time / 1e6
+
     @property
     def misses(self) -> int:
         return self.requests - self.hits
 
+    def count(self, node, hit: bool, how, size: int = 0, seconds: float = 0.0) -> None:
+        """Count a request for *node*, and :meth:`record` it.
+
+        *size* bytes were retrieved in *seconds* for a hit.
+        """
+        self.requests += 1
+        if hit:
+            self.hits += 1
+            self.retrieved_bytes += size
+            self.retrieve_time += seconds
+        self.record(node, hit, how, size, seconds)
+
+    def record(self, node, hit: bool, how, size: int = 0, seconds: float = 0.0) -> None:
+        """Add a request for *node* to the ``--debug=json`` statistics.
+
+        *how* is how the file was retrieved, or for a miss, why it
+        wasn't; ``None`` if it wasn't because of ``-n``.  The build
+        time of the target - saved by a hit, spent by a miss - is looked
+        up by :meth:`CacheStats.resolve` once the build is done: this is
+        called from the job threads, which mustn't read in the signature
+        database.
+        """
+        if cache_stats.enabled:
+            cache_stats.append({
+                'target': str(node),
+                'bsig': node.get_cachedir_bsig(),
+                'cache': self.path,
+                'hit': hit,
+                'how': how,
+                'bytes': size,
+                'seconds': seconds,
+                'node': node,
+            })
+
     def is_enabled(self) -> bool:
         return cache_enabled and self.path is not None
 
@@ -328,7 +1217,18 @@ class CacheDir:
     def get_cachedir_csig(self, node) -> str:
         cachedir, cachefile = self.cachepath(node)
         if cachefile and os.path.exists(cachefile):
-            return SCons.Util.hash_file_signature(cachefile, SCons.Node.FS.File.hash_chunksize)
+            manifest = read_manifest(cachefile)
+            if manifest is not None:
+                return manifest[0]
+            if compressed_codec(cachefile) is None:
+                return SCons.Util.hash_file_signature(cachefile, SCons.Node.FS.File.hash_chunksize)
+            fd, path = tempfile.mkstemp()
+            os.close(fd)
+            try:
+                decompress_file(cachefile, path)
+                return SCons.Util.hash_file_signature(path, SCons.Node.FS.File.hash_chunksize)
+            finally:
+                os.unlink(path)
 
     def cachepath(self, node) -> tuple:
         """Return where to cache a file.
@@ -341,11 +1241,204 @@ class CacheDir:
         if not self.is_enabled():
             return None, None
 
-        sig = node.get_cachedir_bsig()
+        return self.sigpath(node.get_cachedir_bsig())
+
+    def sigpath(self, sig) -> tuple:
+        """Return the directory and path of the cache entry named *sig*.
+
+        That is a build signature, with the dedup layout also the
+        content signature a manifest names, or that of a bundle.
+        """
         subdir = sig[:self.config['prefix_len']].upper()
         cachedir = os.path.join(self.path, subdir)
         return cachedir, os.path.join(cachedir, sig)
 
+    def prefetch(self, groups, executor) -> None:
+        """Start retrieving *groups* of targets on the threads of *executor*.
+
+        Called by :class:`CachePrefetcher`.  Which of the targets are in
+        the cache is found by listing each cache subdirectory they would
+        be in once, rather than with a ``stat`` for each.  The targets
+        of a group are retrieved only if all of them are there.
+        """
+        if not self.is_enabled():
+            return
+        paths = {}
+        bundles = {}
+        for group in groups:
+            for t in group:
+                paths.setdefault(self.cachepath(t)[0], None)
+            if self.bundle_targets(group[0]) is not None:
+                bundles[id(group)] = self.sigpath(bundle_sig(group))
+                paths.setdefault(bundles[id(group)][0], None)
+        listings = dict(zip(paths, executor.map(_listdir, paths)))
+        found = []
+        for group in groups:
+            bundle = bundles.get(id(group))
+            if bundle is not None and os.path.basename(bundle[1]) in listings[bundle[0]]:
+                found.append((group, bundle[1]))
+                continue
+            for t in group:
+                cachedir, cachefile = self.cachepath(t)
+                if os.path.basename(cachefile) not in listings[cachedir]:
+                    break
+            else:
+                found.append((group, None))
+        if self._debug_file():
+            self.debugFP.write("CachePrefetch:  targets of %d of %d builders in cache, "
+                               "%d directories listed\n" % (len(found), len(groups), len(paths)))
+        for group, bundle in found:
+            if bundle is not None:
+                self._submit_prefetch(executor, group, self._prefetch_bundle, group, bundle)
+            else:
+                self._submit_prefetch(executor, group, self._retrieve_group, group, CacheRetrieveFunc)
+
+    def _submit_prefetch(self, executor, group, func, *args) -> None:
+        future = executor.submit(func, *args)
+        for t in group:
+            self.prefetched[t] = future
+
+    @staticmethod
+    def prefetch_path(node) -> str:
+        """Return where *node* is retrieved to by :meth:`prefetch`.
+
+        It is moved in place only when the taskmaster gets to it, so
+        that the taskmaster never sees a target being retrieved, or one
+        it hasn't decided to build.
+        """
+        return "%s.prefetch%s" % (node.get_internal_path(), cache_tmp_uuid)
+
+    @classmethod
+    def _retrieve_group(cls, group, func) -> dict | None:
+        """Retrieve all of *group* with the action function *func*, or none.
+
+        Returns how to :meth:`count` the retrieval of each target, which
+        :meth:`retrieved_ahead` does if the taskmaster gets to it.
+        """
+        counts = {}
+
+        def count(node, *args) -> None:
+            counts[node] = args
+
+        for t in group:
+            dst = cls.prefetch_path(t)
+            os.makedirs(os.path.dirname(dst) or os.curdir, exist_ok=True)
+            if func([t], [], t.get_build_env(), dst=dst, count=count) != 0:
+                cls._discard_prefetched(counts)
+                return None
+        return counts
+
+    def _prefetch_bundle(self, group, cachefile) -> dict | None:
+        """Retrieve all of *group* from the bundle *cachefile*, or none.
+
+        Returns the counts, as :meth:`_retrieve_group` does.
+        """
+        dsts = [self.prefetch_path(t) for t in group]
+        for dst in dsts:
+            os.makedirs(os.path.dirname(dst) or os.curdir, exist_ok=True)
+        return self._extract_bundle(group[0], group, cachefile, dsts)
+
+    @classmethod
+    def _discard_prefetched(cls, nodes) -> None:
+        for t in nodes:
+            try:
+                os.unlink(cls.prefetch_path(t))
+            except OSError:
+                pass
+
+    @staticmethod
+    def _prefetch_result(future) -> dict | None:
+        if future.cancelled():
+            return None
+        try:
+            return future.result()
+        except Exception:
+            # Retrieved again, or built, when the taskmaster gets there.
+            return None
+
+    def cancel_prefetch(self) -> None:
+        """Drop the retrievals :meth:`prefetch` started that weren't asked for.
+
+        Waits for the ones under way, and removes what they retrieved.
+        """
+        prefetched, self.prefetched = self.prefetched, {}
+        for future in prefetched.values():
+            future.cancel()
+        for t, future in prefetched.items():
+            if self._prefetch_result(future):
+                self._discard_prefetched([t])
+
+    def retrieved_ahead(self, node) -> bool:
+        """Tell if *node* was retrieved by :meth:`prefetch`.
+
+        Waits for the retrieval if it's under way, and moves the file in
+        place.  The retrieval is then counted and shown, as it would
+        have been by :meth:`retrieve`: one that isn't used isn't a hit.
+        """
+        future = self.prefetched.pop(node, None)
+        if future is None:
+            return False
+        counts = self._prefetch_result(future)
+        if not counts:
+            return False
+        try:
+            os.replace(self.prefetch_path(node), node.get_internal_path())
+        except OSError:
+            self._discard_prefetched([node])
+            return False
+        self.count(node, *counts[node])
+        self.CacheDebug('CacheRetrieve(%s):  %s retrieved ahead\n', node, self.cachepath(node)[1])
+        self._show_in_place(node)
+        return True
+
+    @staticmethod
+    def _show_in_place(node) -> None:
+        """Show a target found in place as retrieved."""
+        if cache_show:
+            node.build(presub=0, execute=0)
+        else:
+            CacheInPlace(node, [], node.get_build_env(), execute=1)
+
+    def in_place(self, node) -> bool:
+        """Tell if the file of *node* is already what the cache has for it.
+
+        Asked by :meth:`SCons.Node.FS.File.prepare` before it removes an
+        out of date target.  With the dedup layout the cache knows the
+        content signature of the file it has, which is compared with
+        the one of the file in place, taken from the ``.sconsign`` if
+        the file hasn't changed since.  If they are the same, the file
+        is kept, and :meth:`retrieve` then leaves it alone.  So is it
+        only if the other targets of its builder are in the cache, as
+        the file isn't removed if they end up being built.
+        """
+        if (self.layout != 'dedup' or not self.is_enabled()
+                or not SCons.Action.execute_actions):
+            return False
+        try:
+            cachefile = self.cachepath(node)[1]
+            manifest = read_manifest(cachefile)
+            if manifest is None:
+                return False
+            for t in node.get_executor().get_all_targets():
+                if t is not node and (t.nocache or not os.path.exists(self.cachepath(t)[1])):
+                    return False
+            path = node.get_internal_path()
+            st = os.stat(path)
+            ninfo = node.get_stored_info().ninfo
+            if (getattr(ninfo, 'timestamp', None) == st[stat.ST_MTIME]
+                    and getattr(ninfo, 'size', None) == st.st_size
+                    and getattr(ninfo, 'csig', None)):
+                # As the MD5-timestamp decider trusts it.
+                csig = ninfo.csig
+            else:
+                csig = SCons.Util.hash_file_signature(path, SCons.Node.FS.File.hash_chunksize)
+        except (OSError, ValueError):
+            return False
+        if csig != manifest[0]:
+            return False
+        self.kept[node] = cachefile
+        return True
+
     def retrieve(self, node) -> bool:
         """Retrieve a node from cache.
 
@@ -376,6 +1469,24 @@ class CacheDir:
         """
         if not self.is_enabled():
             return False
+        if self.prefetched and self.retrieved_ahead(node):
+            return True
+        cachefile = self.kept.pop(node, None)
+        if cachefile is not None:
+            mark_used(cachefile)
+            self.CacheDebug('CacheRetrieve(%s):  %s already in place\n', node, cachefile)
+            self.count(node, True, 'in place')
+            self._show_in_place(node)
+            return True
+        cachefile, counts = self.bundled.pop(node, (None, None))
+        if cachefile is not None:
+            self.count(node, *counts)
+            self.CacheDebug('CacheRetrieve(%s):  retrieved with bundle %s\n', node, cachefile)
+            self._show_in_place(node)
+            return True
+        targets = self.bundle_targets(node)
+        if targets is not None and self.retrieve_bundle(node, targets):
+            return True
 
         env = node.get_build_env()
         if cache_show:
@@ -391,8 +1502,103 @@ class CacheDir:
     def push(self, node):
         if self.is_readonly() or not self.is_enabled():
             return
+        if self.layout == 'bundle':
+            targets = self.bundle_targets(node)
+            if targets is not None:
+                return self.push_bundle(node, targets)
         return CachePush(node, [], node.get_build_env())
 
+    def bundle_targets(self, node) -> list | None:
+        """Return the targets of the builder of *node*, if they go in a bundle.
+
+        They do if there are several, all files to be cached.
+        Otherwise returns ``None``: they are cached one at a time.
+        """
+        executor = node.get_executor()
+        if executor is None:
+            return None
+        targets = executor.get_all_targets()
+        if len(targets) < 2:
+            return None
+        for t in targets:
+            if not isinstance(t, SCons.Node.FS.File) or t.nocache:
+                return None
+        return targets
+
+    def retrieve_bundle(self, node, targets) -> bool:
+        """Retrieve *targets*, those of the builder of *node*, from their bundle.
+
+        Whatever the layout, as the cache may have been switched from
+        the bundle one.  The others are shown as retrieved when the
+        taskmaster asks for them.  Returns False if the cache has no
+        bundle for them, or it can't be read: they are then looked
+        for one at a time.
+        """
+        cachefile = self.sigpath(bundle_sig(targets))[1]
+        if not os.path.exists(cachefile):
+            return False
+        dsts = [t.get_internal_path() for t in targets]
+        counts = self._extract_bundle(node, targets, cachefile, dsts)
+        if counts is None:
+            return False
+        for t in targets:
+            if t is not node:
+                self.bundled[t] = (cachefile, counts[t])
+        self.count(node, *counts[node])
+        self._show_in_place(node)
+        return True
+
+    def _extract_bundle(self, node, targets, cachefile, dsts) -> dict | None:
+        """Extract the bundle *cachefile* of *targets* to *dsts*.
+
+        Returns how to :meth:`count` the retrieval of each target, which
+        is done when the taskmaster asks for it, or None if the bundle
+        can't be extracted.  With ``-n``, only tells that it would be.
+        """
+        if not SCons.Action.execute_actions:
+            return {t: (True, None) for t in targets}
+        self.CacheDebug('CacheRetrieve(%s):  retrieving from bundle %s, %d files\n',
+                        node, cachefile, len(targets))
+        env = node.get_build_env()
+        start = time.perf_counter()
+        try:
+            sizes = extract_bundle(cachefile, dsts, not env.cache_timestamp_newer)
+        except (OSError, ValueError) as e:
+            # Evicted since we looked, or corrupt.
+            self.CacheDebug('CacheRetrieve(%s):  %s not retrieved: %s\n', node, cachefile, e)
+            return None
+        elapsed = time.perf_counter() - start
+        mark_used(cachefile)
+        self.CacheDebug('CacheRetrieve(%s):  %s retrieved by bundle: %d bytes in %.3f ms, %.2f MB/s overall\n',
+                        node, cachefile, sum(sizes), elapsed * 1000, self.retrieve_rate)
+        return {t: (True, 'bundle', size, elapsed / len(targets))
+                for t, size in zip(targets, sizes)}
+
+    def push_bundle(self, node, targets) -> None:
+        """Push *targets*, those of the builder of *node*, as one bundle.
+
+        That is done when the first of them is pushed, once they are
+        all built, and the others then are already in the bundle.
+        """
+        if node is not targets[0]:
+            return
+        cachedir, cachefile = self.sigpath(bundle_sig(targets))
+        if os.path.exists(cachefile):
+            self.CacheDebug('CachePush(%s):  %s already exists in cache\n', node, cachefile)
+            return
+        for t in targets:
+            if not os.path.lexists(t.get_internal_path()):
+                self.CacheDebug('CachePush(%s):  not all targets of the builder exist, '
+                                '%s not pushed\n', node, cachefile)
+                return
+        self.CacheDebug('CachePush(%s):  pushing to bundle %s, %d files\n',
+                        node, cachefile, len(targets))
+        env = node.get_build_env()
+        if push_queue is not None:
+            push_queue.put(_push_bundle, targets, env, cachedir, cachefile, self)
+        else:
+            _push_bundle(targets, env, cachedir, cachefile, self)
+
     def push_if_forced(self, node):
         if cache_force:
             return self.push(node)
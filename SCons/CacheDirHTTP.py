@@ -0,0 +1,449 @@
+# MIT License
+#
+# Copyright The SCons Foundation
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""CacheDir support for a cache on an HTTP server.
+
+Selected with ``CacheDir('http://host:port', custom_class=HTTPCacheDir)``.
+A file is fetched with ``GET`` on ``<url>/<build signature>`` (``HEAD``
+with ``-n``) and stored with ``PUT`` on it.  The server answers 404 if
+it doesn't have the file.  The mode of a file is sent along in the
+:data:`MODE_HEADER` header, so programs stay executable.
+:mod:`SCons.Utilities.CacheServer` is a server for this protocol.
+"""
+
+from __future__ import annotations
+
+import atexit
+import concurrent.futures
+import functools
+import http.client
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import time
+import urllib.parse
+
+import SCons.Action
+import SCons.CacheDir
+import SCons.Errors
+import SCons.Node.FS
+import SCons.Warnings
+
+# Seconds to wait for the server to accept a connection or answer.
+HTTP_TIMEOUT = 10
+# Connections kept open to the server, which is also the number of
+# files fetched at the same time.
+HTTP_CONNECTIONS = 8
+# The permission bits of a file, in octal.
+MODE_HEADER = 'X-SCons-Mode'
+CHUNK = 1024 * 1024
+
+
+class ConnectionPool:
+    """Share connections to an HTTP server between threads.
+
+    At most *size* connections are open; a thread needing one more
+    waits until another thread is done with its own.  Connections are
+    kept open between requests, which saves a round trip (two with
+    ``https``) per file.
+    """
+
+    def __init__(self, scheme, netloc, size: int = HTTP_CONNECTIONS,
+                 timeout: float = HTTP_TIMEOUT) -> None:
+        if scheme == 'https':
+            factory = http.client.HTTPSConnection
+        else:
+            factory = http.client.HTTPConnection
+        self.factory = functools.partial(factory, netloc, timeout=timeout)
+        self.idle = []
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(size)
+
+    def request(self, method, url, body=None, headers=None, dst=None) -> tuple:
+        """Send a request, and return the response and its body.
+
+        With *dst*, the body of a 200 response is written to that file
+        instead of being returned.  A kept open connection that the
+        server has closed since is replaced by a new one.
+
+        Raises:
+            OSError, http.client.HTTPException: if the server can't be
+                reached, or closed the connection.
+        """
+        with self.slots:
+            with self.lock:
+                conn = self.idle.pop() if self.idle else None
+            reused = conn is not None
+            if conn is None:
+                conn = self.factory()
+            while True:
+                try:
+                    conn.request(method, url, body=body, headers=headers or {})
+                    response = conn.getresponse()
+                    if dst is not None and response.status == 200:
+                        with open(dst, 'wb') as f:
+                            shutil.copyfileobj(response, f, CHUNK)
+                        data = b''
+                    else:
+                        data = response.read()
+                except (ConnectionError, http.client.BadStatusLine):
+                    conn.close()
+                    if not reused:
+                        raise
+                    reused = False
+                    conn = self.factory()
+                    if body is not None and hasattr(body, 'seek'):
+                        body.seek(0)
+                    continue
+                except BaseException:
+                    conn.close()
+                    raise
+                break
+            if response.will_close:
+                conn.close()
+            else:
+                with self.lock:
+                    self.idle.append(conn)
+            return response, data
+
+    def close(self) -> None:
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for conn in idle:
+            conn.close()
+
+
+def HTTPRetrieveFunc(target, source, env, dst=None, count=None) -> int:
+    t = target[0]
+    if dst is None:
+        dst = t.get_internal_path()
+    cd = env.get_CacheDir()
+    if count is None:
+        count = cd.count
+    sig = t.get_cachedir_bsig()
+    url = cd.url(sig)
+    if not SCons.Action.execute_actions:
+        if not cd.exists(sig):
+            cd.CacheDebug('CacheRetrieve(%s):  %s not in cache\n', t, url)
+            count(t, False, 'not in cache')
+            return 1
+        cd.CacheDebug('CacheRetrieve(%s):  retrieving from %s\n', t, url)
+        count(t, True, None)
+        return 0
+
+    start = time.perf_counter()
+    spoolfile = cd.fetch(sig)
+    if spoolfile is None:
+        cd.release(sig)
+        cd.CacheDebug('CacheRetrieve(%s):  %s not in cache\n', t, url)
+        count(t, False, 'not in cache')
+        return 1
+    cd.CacheDebug('CacheRetrieve(%s):  retrieving from %s\n', t, url)
+    stored = os.path.getsize(spoolfile)
+    try:
+        how = cd.retrieve_file(env, spoolfile, dst)
+    except ValueError as e:
+        # A compressed entry this build can't read.
+        cd.CacheDebug('CacheRetrieve(%s):  %s not retrieved: %s\n', t, url, e)
+        count(t, False, 'unreadable')
+        try:
+            t.fs.unlink(dst)
+        except OSError:
+            pass
+        return 1
+    finally:
+        cd.release(sig)
+    elapsed = time.perf_counter() - start
+    st = t.fs.stat(dst)
+    t.fs.chmod(dst, stat.S_IMODE(st.st_mode) | stat.S_IWRITE)
+    count(t, True, how, st.st_size, elapsed)
+    cd.CacheDebug('CacheRetrieve(%s):  %s retrieved by %s: %d bytes in %.3f ms, %.2f MB/s overall\n',
+                  t, url, how, st.st_size, elapsed * 1000, cd.retrieve_rate)
+    if how in SCons.CacheDir.CODECS:
+        cd.CacheDebug('CacheRetrieve(%s):  %s decompressed from %d bytes, ratio %.2f\n',
+                      t, url, stored, st.st_size / stored)
+    return 0
+
+def HTTPRetrieveString(target, source, env) -> str:
+    t = target[0]
+    cd = env.get_CacheDir()
+    sig = t.get_cachedir_bsig()
+    if SCons.Action.execute_actions:
+        found = cd.fetch(sig) is not None
+    else:
+        found = cd.exists(sig)
+    if found:
+        return "Retrieved `%s' from cache" % t.get_internal_path()
+    return ""
+
+HTTPRetrieve = SCons.Action.Action(HTTPRetrieveFunc, HTTPRetrieveString)
+
+HTTPRetrieveSilent = SCons.Action.Action(HTTPRetrieveFunc, None)
+
+def HTTPPushFunc(target, source, env) -> None:
+    if SCons.CacheDir.cache_readonly:
+        return
+
+    t = target[0]
+    if t.nocache:
+        return
+    cd = env.get_CacheDir()
+    url = cd.url(t.get_cachedir_bsig())
+    if t.fs.islink(t.get_internal_path()):
+        cd.CacheDebug('CachePush(%s):  %s not pushed: a symbolic link\n', t, url)
+        return
+    cd.CacheDebug('CachePush(%s):  pushing to %s\n', t, url)
+    if SCons.CacheDir.push_queue is not None:
+        SCons.CacheDir.push_queue.put(cd.upload, t, url)
+    else:
+        cd.upload(t, url)
+
+HTTPPush = SCons.Action.Action(HTTPPushFunc, None)
+
+
+class HTTPCacheDir(SCons.CacheDir.CacheDir):
+    """A derived-file cache on an HTTP server.
+
+    *path* is the URL of the cache.  Files are fetched into a local
+    spool directory first, from where they are moved into place, or
+    decompressed if the server keeps a compressed cache directory.
+    When one target of a builder is retrieved, the builder's other
+    targets are fetched at the same time.
+
+    A failure to reach the server is reported once, with a
+    :class:`SCons.Warnings.CacheConnectionWarning`, and the server isn't
+    asked again during the build: the targets are built instead.
+    """
+
+    def __init__(self, path) -> None:
+        super().__init__(None)
+        self.pool = None
+        self.offline = False
+        self.fetches = {}
+        self.lock = threading.Lock()
+        self.executor = None
+        self.spool = None
+        if path is None:
+            return
+        parts = urllib.parse.urlsplit(path)
+        if parts.scheme not in ('http', 'https') or not parts.netloc:
+            raise SCons.Errors.UserError("Invalid HTTP cache URL %r" % path)
+        self.path = path
+        self.urlpath = parts.path.rstrip('/')
+        self.pool = ConnectionPool(parts.scheme, parts.netloc)
+
+    def url(self, sig) -> str:
+        """Return the path on the server of the file with signature *sig*."""
+        return '%s/%s' % (self.urlpath, sig)
+
+    def disconnect(self, error) -> None:
+        """Stop using a server that can't be reached."""
+        with self.lock:
+            if self.offline:
+                return
+            self.offline = True
+        msg = "Cannot reach cache server %s, building without it: %s" % (self.path, error)
+        SCons.Warnings.warn(SCons.Warnings.CacheConnectionWarning, msg)
+
+    def spoolpath(self, sig) -> str:
+        with self.lock:
+            if self.spool is None:
+                self.spool = tempfile.mkdtemp(prefix='scons-cache-')
+                atexit.register(shutil.rmtree, self.spool, True)
+        return os.path.join(self.spool, sig)
+
+    def _get(self, sig) -> str | None:
+        """Fetch the file with signature *sig*, returning its spool path."""
+        if self.offline:
+            return None
+        path = self.spoolpath(sig)
+        part = path + '.part'
+        try:
+            response, _ = self.pool.request('GET', self.url(sig), dst=part)
+        except (OSError, http.client.HTTPException) as e:
+            self.disconnect(e)
+            return None
+        if response.status != 200:
+            return None
+        mode = response.getheader(MODE_HEADER)
+        if mode:
+            os.chmod(part, int(mode, 8) & 0o777 | stat.S_IWUSR)
+        os.replace(part, path)
+        return path
+
+    def fetch_ahead(self, sigs) -> None:
+        """Start fetching the files with signatures *sigs* in the background."""
+        with self.lock:
+            if self.executor is None:
+                self.executor = concurrent.futures.ThreadPoolExecutor(HTTP_CONNECTIONS)
+            for sig in sigs:
+                if sig not in self.fetches:
+                    self.fetches[sig] = self.executor.submit(self._get, sig)
+
+    def fetch(self, sig) -> str | None:
+        """Fetch the file with signature *sig*, or wait for :meth:`fetch_ahead` to.
+
+        Returns the path of the local copy, or ``None`` if the server
+        doesn't have it.
+        """
+        self.fetch_ahead([sig])
+        return self.fetches[sig].result()
+
+    def release(self, sig) -> None:
+        """Forget the local copy of the file with signature *sig*."""
+        with self.lock:
+            future = self.fetches.pop(sig, None)
+        if future is not None and future.result() is not None:
+            try:
+                os.unlink(future.result())
+            except OSError:
+                pass
+
+    def exists(self, sig) -> bool:
+        """Return whether the server has the file with signature *sig*."""
+        if self.offline:
+            return False
+        try:
+            response, _ = self.pool.request('HEAD', self.url(sig))
+        except (OSError, http.client.HTTPException) as e:
+            self.disconnect(e)
+            return False
+        return response.status == 200
+
+    def upload(self, t, url) -> None:
+        """Store the file of node *t* on the server at *url*."""
+        if self.offline:
+            return
+        errfmt = "Unable to copy %s to cache. Cache file is %s"
+        try:
+            f = open(t.get_internal_path(), 'rb')
+        except OSError:
+            self.CacheDebug(errfmt + '\n', str(t), url)
+            SCons.Warnings.warn(SCons.Warnings.CacheWriteErrorWarning, errfmt % (str(t), url))
+            return
+        with f:
+            st = os.fstat(f.fileno())
+            headers = {
+                'Content-Length': str(st.st_size),
+                'Content-Type': 'application/octet-stream',
+                MODE_HEADER: '%o' % stat.S_IMODE(st.st_mode),
+            }
+            try:
+                response, _ = self.pool.request('PUT', url, body=f, headers=headers)
+            except (OSError, http.client.HTTPException) as e:
+                self.disconnect(e)
+                return
+        if response.status == 200:
+            self.CacheDebug('CachePush(%s):  %s already exists in cache\n', t, url)
+        elif response.status != 201:
+            msg = errfmt % (str(t), url) + ": %d %s" % (response.status, response.reason)
+            self.CacheDebug(errfmt + ": %d %s\n", str(t), url, response.status, response.reason)
+            SCons.Warnings.warn(SCons.Warnings.CacheWriteErrorWarning, msg)
+
+    def retrieve_file(self, env, src, dst) -> str:
+        """Put the fetched file *src* in place as the target *dst*.
+
+        The local copy isn't needed afterwards, so it is moved if it
+        isn't compressed and is on the same file system; otherwise it
+        is handled as by :meth:`CacheDir.retrieve_file`.  Returns
+        ``'move'``, or what that returns.
+        """
+        if SCons.CacheDir.compressed_codec(src) is None:
+            try:
+                os.replace(src, dst)
+                return 'move'
+            except OSError:
+                pass
+        return super().retrieve_file(env, src, dst)
+
+    def prefetch(self, groups, executor) -> None:
+        """Start retrieving *groups* of targets on the threads of *executor*.
+
+        See :meth:`CacheDir.prefetch`.  The files are all fetched at once,
+        which is also how the server is asked which it has.
+        """
+        if not self.is_enabled():
+            return
+        if self._debug_file():
+            self.debugFP.write("CachePrefetch:  fetching targets of %d builders\n" % len(groups))
+        self.fetch_ahead(t.get_cachedir_bsig() for group in groups for t in group)
+        for group in groups:
+            self._submit_prefetch(executor, group, self._retrieve_fetched, group)
+
+    def _retrieve_fetched(self, group) -> dict | None:
+        # Counted when the taskmaster gets to them: see retrieved_ahead().
+        if any(self.fetch(t.get_cachedir_bsig()) is None for t in group):
+            return None
+        return self._retrieve_group(group, HTTPRetrieveFunc)
+
+    def is_enabled(self) -> bool:
+        return (SCons.CacheDir.cache_enabled and self.path is not None
+                and not self.offline)
+
+    def cachepath(self, node) -> tuple:
+        """Return where a file fetched from the server is kept locally."""
+        if not self.is_enabled():
+            return None, None
+        path = self.spoolpath(node.get_cachedir_bsig())
+        return self.spool, path
+
+    def retrieve(self, node) -> bool:
+        """Retrieve a node from the server.
+
+        See :meth:`CacheDir.retrieve`.
+        """
+        if not self.is_enabled():
+            return False
+
+        if self.prefetched and self.retrieved_ahead(node):
+            return True
+
+        env = node.get_build_env()
+        executor = node.get_executor()
+        if SCons.Action.execute_actions and executor is not None:
+            # The other targets are retrieved next, if this one is.
+            self.fetch_ahead(t.get_cachedir_bsig() for t in executor.get_all_targets()
+                          if t is not node and not t.nocache
+                          and isinstance(t, SCons.Node.FS.File))
+        if SCons.CacheDir.cache_show:
+            if HTTPRetrieveSilent(node, [], env, execute=1) == 0:
+                node.build(presub=0, execute=0)
+                return True
+        else:
+            if HTTPRetrieve(node, [], env, execute=1) == 0:
+                return True
+
+        return False
+
+    def push(self, node):
+        if self.is_readonly() or not self.is_enabled():
+            return
+        return HTTPPush(node, [], node.get_build_env())
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
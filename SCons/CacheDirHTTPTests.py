@@ -0,0 +1,291 @@
+# MIT License
+#
+# Copyright The SCons Foundation
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+import socket
+import stat
+import threading
+import unittest
+import unittest.mock
+
+from TestCmd import TestCmd, IS_WINDOWS
+
+import SCons.CacheDir
+import SCons.CacheDirHTTP
+import SCons.Errors
+import SCons.Node.FS
+import SCons.Warnings
+from SCons.CacheDirHTTP import ConnectionPool, HTTPCacheDir
+from SCons.Utilities.CacheServer import CacheServer
+
+
+class Action:
+    def __call__(self, targets, sources, env, **kw) -> int:
+        return 0
+    def genstring(self, target, source, env):
+        return str(self)
+    def get_contents(self, target, source, env):
+        return bytearray('','utf-8')
+
+class Builder:
+    def __init__(self, environment) -> None:
+        self.env = environment
+        self.action = Action()
+        self.overrides = {}
+        self.source_scanner = None
+        self.target_scanner = None
+
+class Environment:
+    def __init__(self, cachedir) -> None:
+        self.cachedir = cachedir
+    def Override(self, overrides):
+        return self
+    def get_CacheDir(self):
+        return self.cachedir
+
+
+class ServerTestCase(unittest.TestCase):
+    """Base fixtures: a cache server on a free local port."""
+
+    readonly = False
+
+    def setUp(self) -> None:
+        self.test = TestCmd(workdir='')
+        self.server = CacheServer(self.test.workpath('cache'), ('127.0.0.1', 0),
+                                  readonly=self.readonly)
+        thread = threading.Thread(target=self.server.serve_forever,
+                                  args=(0.05,), daemon=True)
+        thread.start()
+        self.pool = ConnectionPool('http', '%s:%d' % self.server.server_address)
+
+    def tearDown(self) -> None:
+        self.pool.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class CacheServerTestCase(ServerTestCase):
+
+    def test_protocol(self) -> None:
+        """Test storing and fetching files"""
+        response, _ = self.pool.request('HEAD', '/abcd')
+        assert response.status == 404, response.status
+        response, _ = self.pool.request('GET', '/abcd')
+        assert response.status == 404, response.status
+
+        headers = {'Content-Length': '5', SCons.CacheDirHTTP.MODE_HEADER: '755'}
+        response, _ = self.pool.request('PUT', '/abcd', b'hello', headers)
+        assert response.status == 201, response.status
+        path = self.server.cachepath('abcd')
+        assert path == self.test.workpath('cache', 'AB', 'abcd'), path
+        assert self.test.read(path) == b'hello'
+
+        response, _ = self.pool.request('HEAD', '/abcd')
+        assert response.status == 200, response.status
+        assert response.getheader('Content-Length') == '5'
+        response, data = self.pool.request('GET', '/abcd')
+        assert response.status == 200, response.status
+        assert data == b'hello', data
+        if not IS_WINDOWS:
+            assert response.getheader(SCons.CacheDirHTTP.MODE_HEADER) == '755'
+
+        # Already there: the file isn't replaced.
+        response, _ = self.pool.request('PUT', '/abcd', b'other', {'Content-Length': '5'})
+        assert response.status == 200, response.status
+        assert self.test.read(path) == b'hello'
+
+        dst = self.test.workpath('fetched')
+        response, data = self.pool.request('GET', '/abcd', dst=dst)
+        assert data == b''
+        assert self.test.read(dst) == b'hello'
+
+        # All of this over one connection.
+        assert len(self.pool.idle) == 1, self.pool.idle
+
+    def test_bad_requests(self) -> None:
+        """Test requests for paths that aren't signatures"""
+        for path in ('/', '/../config', '/a/abcd', '/ab%2e'):
+            response, _ = self.pool.request('GET', path)
+            assert response.status == 400, (path, response.status)
+        response, _ = self.pool.request('PUT', '/../x', b'x', {'Content-Length': '1'})
+        assert response.status == 400, response.status
+        assert not os.path.exists(self.test.workpath('x'))
+
+    def test_manifest(self) -> None:
+        """Test fetching a file stored with the dedup layout"""
+        blob = self.server.cachepath('ffff')
+        os.makedirs(os.path.dirname(blob))
+        self.test.write(blob, "content\n")
+        manifest = self.server.cachepath('abcd')
+        os.makedirs(os.path.dirname(manifest))
+        SCons.CacheDir.write_manifest(manifest, 'ffff', 0o755)
+        response, data = self.pool.request('GET', '/abcd')
+        assert response.status == 200, response.status
+        assert data == b"content\n", data
+        if not IS_WINDOWS:
+            assert response.getheader(SCons.CacheDirHTTP.MODE_HEADER) == '755'
+        os.unlink(blob)
+        response, _ = self.pool.request('GET', '/abcd')
+        assert response.status == 404, response.status
+
+    def test_reconnect(self) -> None:
+        """Test replacing a connection the server closed"""
+        response, _ = self.pool.request('GET', '/abcd')
+        assert len(self.pool.idle) == 1
+        stale = self.pool.idle[0]
+        stale.sock.shutdown(socket.SHUT_RDWR)
+        response, _ = self.pool.request('GET', '/abcd')
+        assert response.status == 404, response.status
+        assert self.pool.idle and self.pool.idle[0] is not stale
+
+
+class ReadonlyServerTestCase(ServerTestCase):
+
+    readonly = True
+
+    def test_readonly(self) -> None:
+        """Test a server refusing to store files"""
+        response, _ = self.pool.request('PUT', '/abcd', b'hello', {'Content-Length': '5'})
+        assert response.status == 403, response.status
+        assert not os.path.exists(self.server.cachepath('abcd'))
+        # The connection is still usable.
+        response, _ = self.pool.request('HEAD', '/abcd')
+        assert response.status == 404, response.status
+
+
+class HTTPCacheDirTestCase(ServerTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.cwd = os.getcwd()
+        os.chdir(self.test.workpath())
+        self.fs = SCons.Node.FS.FS()
+        self.cd = HTTPCacheDir(self.server.url + '/')
+
+    def tearDown(self) -> None:
+        os.chdir(self.cwd)
+        super().tearDown()
+
+    def File(self, name, bsig):
+        node = self.fs.File(name)
+        node.builder_set(Builder(Environment(self.cd)))
+        node.cachesig = bsig
+        return node
+
+    def test_init(self) -> None:
+        """Test the cache URL"""
+        assert self.cd.is_enabled()
+        assert self.cd.url('abcd') == '/abcd'
+        assert HTTPCacheDir('http://host/cache/').url('abcd') == '/cache/abcd'
+        assert not HTTPCacheDir(None).is_enabled()
+        with self.assertRaises(SCons.Errors.UserError):
+            HTTPCacheDir('cache')
+
+    def test_push_retrieve(self) -> None:
+        """Test pushing a file and retrieving it"""
+        f1 = self.File('f1', 'f1bsig')
+        self.test.write('f1', "f1\n")
+        os.chmod(self.test.workpath('f1'), 0o755)
+        SCons.CacheDirHTTP.HTTPPushFunc([f1], [], f1.get_build_env())
+        assert self.test.read(self.server.cachepath('f1bsig')) == b"f1\n"
+
+        os.unlink(self.test.workpath('f1'))
+        f1.clear_memoized_values()
+        assert f1.retrieve_from_cache()
+        assert self.test.read('f1') == b"f1\n"
+        if not IS_WINDOWS:
+            assert os.stat(self.test.workpath('f1')).st_mode & stat.S_IXUSR
+        assert (self.cd.requests, self.cd.hits) == (1, 1)
+        assert self.cd.fetches == {}, self.cd.fetches
+
+        f2 = self.File('f2', 'f2bsig')
+        assert not f2.retrieve_from_cache()
+        assert (self.cd.requests, self.cd.hits) == (2, 1)
+        assert not os.path.exists(self.test.workpath('f2'))
+
+    def test_fetch_ahead(self) -> None:
+        """Test fetching files in parallel"""
+        for sig in ('aa', 'bb', 'cc'):
+            self.pool.request('PUT', '/' + sig, sig.encode(), {'Content-Length': '2'})
+        self.cd.fetch_ahead(['aa', 'bb', 'dd'])
+        assert sorted(self.cd.fetches) == ['aa', 'bb', 'dd'], self.cd.fetches
+        path = self.cd.fetch('bb')
+        assert self.test.read(path) == b'bb'
+        assert self.cd.fetch('dd') is None
+        assert self.test.read(self.cd.fetch('cc')) == b'cc'
+        for sig in ('aa', 'bb', 'cc', 'dd'):
+            self.cd.release(sig)
+        assert self.cd.fetches == {}
+        assert os.listdir(self.cd.spool) == []
+
+    def test_offline(self) -> None:
+        """Test a server that can't be reached"""
+        # A port nothing listens on.
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        self.cd = HTTPCacheDir('http://127.0.0.1:%d' % port)
+        f1 = self.File('f1', 'f1bsig')
+        warnings = []
+        with unittest.mock.patch('SCons.Warnings.warn',
+                                 lambda cls, msg: warnings.append(cls)):
+            assert not f1.retrieve_from_cache()
+            assert not self.cd.is_enabled()
+            # Not asked again.
+            assert not self.File('f2', 'f2bsig').retrieve_from_cache()
+        assert warnings == [SCons.Warnings.CacheConnectionWarning], warnings
+
+    def test_write_error(self) -> None:
+        """Test the server refusing a file"""
+        f1 = self.File('f1', 'f1bsig')
+        self.test.write('f1', "f1\n")
+        self.server.readonly = True
+        warnings = []
+        with unittest.mock.patch('SCons.Warnings.warn',
+                                 lambda cls, msg: warnings.append(cls)):
+            self.cd.upload(f1, self.cd.url('f1bsig'))
+        assert warnings == [SCons.Warnings.CacheWriteErrorWarning], warnings
+        assert self.cd.is_enabled()
+
+    def test_compressed(self) -> None:
+        """Test retrieving a file the server keeps compressed"""
+        src = self.test.workpath('src')
+        self.test.write(src, "compressed\n" * 100)
+        path = self.server.cachepath('zzbsig')
+        os.makedirs(os.path.dirname(path))
+        SCons.CacheDir.compress_file(src, path, 'zlib')
+        f3 = self.File('f3', 'zzbsig')
+        env = unittest.mock.Mock(cache_timestamp_newer=False, fs=self.fs)
+        env.get_CacheDir.return_value = self.cd
+        assert SCons.CacheDirHTTP.HTTPRetrieveFunc([f3], [], env) == 0
+        assert self.test.read('f3', mode='r') == "compressed\n" * 100
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
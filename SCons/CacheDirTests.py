@@ -21,17 +21,23 @@
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
+import concurrent.futures
 import os.path
 import shutil
 import sys
 import unittest
+import unittest.mock
 import tempfile
+import threading
+import time
 import stat
 
 from TestCmd import TestCmd, IS_WINDOWS, IS_ROOT
 
 import SCons.CacheDir
+import SCons.Environment
 import SCons.Node.FS
+import SCons.Util.stats
 
 built_it = None
 
@@ -107,6 +113,496 @@ class CacheDirTestCase(BaseTestCase):
         finally:
             SCons.Util.hash_collect = save_collect
 
+    def test_retrieve_file(self) -> None:
+        """Test the retrieve_file() method in each link mode"""
+        env = SCons.Environment.Environment(tools=[])
+        src = self.test.workpath('cached')
+        self.test.write(src, "cached\n")
+        os.chmod(src, 0o644)
+        cd = self._CacheDir
+
+        for link_mode in SCons.CacheDir.LINK_MODES:
+            dst = self.test.workpath('target.' + link_mode)
+            cd.link_mode = link_mode
+            how = cd.retrieve_file(env, src, dst)
+            assert self.test.read(dst, mode='r') == "cached\n"
+            if how == 'hardlink':
+                assert os.path.samefile(src, dst)
+                assert not os.stat(dst).st_mode & stat.S_IWUSR
+                os.chmod(src, 0o644)
+            else:
+                assert not os.path.samefile(src, dst)
+                assert how in (link_mode, 'copy'), (link_mode, how)
+        assert how == 'hardlink' or IS_WINDOWS, how
+
+        # Falls back to a copy when the file can't be linked.
+        dst = self.test.workpath('target.nolink')
+        with unittest.mock.patch.object(env.fs, 'link', side_effect=OSError):
+            assert cd.retrieve_file(env, src, dst) == 'copy'
+        assert not os.path.samefile(src, dst)
+
+    def test_clone_file(self) -> None:
+        """Test the clone_file() function"""
+        src = self.test.workpath('big')
+        self.test.write(src, b"0123456789" * 100000)
+        dst = self.test.workpath('clone')
+        try:
+            SCons.CacheDir.clone_file(src, dst)
+        except OSError:
+            assert not os.path.exists(dst)
+        else:
+            assert self.test.read(dst) == b"0123456789" * 100000
+
+        dst = self.test.workpath('failed')
+        with unittest.mock.patch('SCons.CacheDir.fcntl', None), \
+                unittest.mock.patch('os.copy_file_range', create=True,
+                                    side_effect=OSError(18, 'EXDEV')):
+            with self.assertRaises(OSError):
+                SCons.CacheDir.clone_file(src, dst)
+        assert not os.path.exists(dst)
+
+class GCTestCase(unittest.TestCase):
+    """Test evicting the least recently used entries."""
+
+    def setUp(self) -> None:
+        self.test = TestCmd(workdir='')
+        self.cache = self.test.workpath('cache')
+        self._CacheDir = SCons.CacheDir.CacheDir(self.cache)
+
+    def entry(self, name, size, used):
+        path = os.path.join(self.cache, name[:2].upper(), name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.test.write(path, b"x" * size)
+        os.utime(path, (used, 1000))
+        return path
+
+    def test_collect_garbage(self) -> None:
+        """Test the collect_garbage() function"""
+        old = self.entry('aa01', 100, 1000)
+        oldest = self.entry('bb01', 100, 500)
+        newer = self.entry('aa02', 100, 2000)
+        newest = self.entry('cc01', 100, 3000)
+        tmp = self.entry('cc02.tmp1234', 100, 0)
+        new_tmp = self.entry('cc03.tmp5678', 100, 0)
+        os.utime(new_tmp)
+
+        # Under the limit, only the abandoned temporary file goes.
+        assert SCons.CacheDir.collect_garbage(self.cache, 1000) == (1, 100, 400)
+        assert not os.path.exists(tmp)
+        assert os.path.exists(new_tmp)
+
+        # Down to 90% of the limit, oldest first.
+        assert SCons.CacheDir.collect_garbage(self.cache, 300) == (2, 200, 200)
+        assert not os.path.exists(oldest)
+        assert not os.path.exists(old)
+        assert os.path.exists(newer)
+        assert os.path.exists(newest)
+
+        # Nothing is done while another pass holds the lock.
+        with SCons.Util.FileLock(os.path.join(self.cache, 'gc'), writer=True):
+            assert SCons.CacheDir.collect_garbage(self.cache, 0) is None
+        assert os.path.exists(newer)
+
+        # An entry used after it was scanned is kept.
+        save_lstat = os.lstat
+        def lstat(path):
+            if path == newer:
+                SCons.CacheDir.mark_used(newer)
+            return save_lstat(path)
+        with unittest.mock.patch('os.lstat', side_effect=lstat):
+            assert SCons.CacheDir.collect_garbage(self.cache, 100) == (1, 100, 100)
+        assert os.path.exists(newer)
+        assert not os.path.exists(newest)
+
+    def test_gc(self) -> None:
+        """Test the CacheDir gc() method"""
+        cd = self._CacheDir
+        self.entry('aa01', 100, 1000)
+        assert cd.max_size == 0
+        assert cd.gc() is None
+        cd.config['max_size'] = 50
+        assert cd.gc() == (1, 100, 0)
+
+    def test_mark_used(self) -> None:
+        """Test the mark_used() function"""
+        path = self.entry('aa01', 100, 1000)
+        SCons.CacheDir.mark_used(path)
+        st = os.stat(path)
+        assert st.st_atime > 1000, st.st_atime
+        assert st.st_mtime == 1000, st.st_mtime
+        SCons.CacheDir.mark_used(path + 'missing')
+
+class CompressionTestCase(unittest.TestCase):
+    """Test compressed cache entries."""
+
+    def setUp(self) -> None:
+        self.test = TestCmd(workdir='')
+        self.src = self.test.workpath('src')
+        # Several chunks, compressible but not all alike.
+        data = b"".join(b"line %d of the file\n" % i for i in range(60000))
+        self.test.write(self.src, data)
+        self.data = data
+
+    def test_roundtrip(self) -> None:
+        """Test compressing and decompressing with each codec"""
+        packed = self.test.workpath('packed')
+        unpacked = self.test.workpath('unpacked')
+        assert SCons.CacheDir.compressed_codec(self.src) is None
+        for codec in SCons.CacheDir.CODECS:
+            size = SCons.CacheDir.compress_file(self.src, packed, codec)
+            assert size == os.path.getsize(packed)
+            assert size * 4 < len(self.data), (codec, size)
+            assert SCons.CacheDir.compressed_codec(packed) == codec
+            assert SCons.CacheDir.decompress_file(packed, unpacked) == codec
+            assert self.test.read(unpacked) == self.data, codec
+
+        empty = self.test.workpath('empty')
+        self.test.write(empty, b"")
+        SCons.CacheDir.compress_file(empty, packed, 'zlib')
+        SCons.CacheDir.decompress_file(packed, unpacked)
+        assert self.test.read(unpacked) == b""
+
+    def test_bounded(self) -> None:
+        """Test that decompressed data is written a chunk at a time"""
+        packed = self.test.workpath('packed')
+        self.test.write(self.src, b"\0" * (4 * SCons.CacheDir.COMPRESS_CHUNK))
+        for codec in SCons.CacheDir.CODECS:
+            SCons.CacheDir.compress_file(self.src, packed, codec)
+            decompressor = SCons.CacheDir.CODECS[codec][1]()
+            with open(packed, 'rb') as f:
+                f.seek(len(SCons.CacheDir.COMPRESSED_MAGIC) + len(codec) + 1)
+                pieces = list(SCons.CacheDir._decompress(decompressor, f.read()))
+            assert max(map(len, pieces)) <= SCons.CacheDir.COMPRESS_CHUNK, codec
+            assert sum(map(len, pieces)) == 4 * SCons.CacheDir.COMPRESS_CHUNK, codec
+
+    def test_errors(self) -> None:
+        """Test entries that can't be decompressed"""
+        packed = self.test.workpath('packed')
+        unpacked = self.test.workpath('unpacked')
+        with self.assertRaises(ValueError):
+            SCons.CacheDir.decompress_file(self.src, unpacked)
+
+        SCons.CacheDir.compress_file(self.src, packed, 'zlib')
+        data = self.test.read(packed)
+        self.test.write(packed, data[:len(data) // 2])
+        with self.assertRaises(ValueError):
+            SCons.CacheDir.decompress_file(packed, unpacked)
+        self.test.write(packed, data[:40] + b"garbage" + data[47:])
+        with self.assertRaises(ValueError):
+            SCons.CacheDir.decompress_file(packed, unpacked)
+        self.test.write(packed, SCons.CacheDir.COMPRESSED_MAGIC + b"zstd\n" + data[40:])
+        with self.assertRaises(ValueError):
+            SCons.CacheDir.decompress_file(packed, unpacked)
+
+    def test_retrieve_file(self) -> None:
+        """Test retrieving compressed and plain entries"""
+        env = SCons.Environment.Environment(tools=[])
+        cd = SCons.CacheDir.CacheDir(self.test.workpath('cache'))
+        cd.config['compression'] = 'zlib'
+        cd.link_mode = 'hardlink'
+        packed = self.test.workpath('packed')
+        assert cd.compress_to_cache(env, self.src, packed) == os.path.getsize(packed)
+        assert os.stat(packed).st_mtime == os.stat(self.src).st_mtime
+        dst = self.test.workpath('dst')
+        assert cd.retrieve_file(env, packed, dst) == 'zlib'
+        assert self.test.read(dst) == self.data
+        assert os.stat(dst).st_mtime == os.stat(self.src).st_mtime
+
+class PushQueueTestCase(unittest.TestCase):
+    """Test pushing from background threads."""
+
+    def test_push(self) -> None:
+        """Test that queued pushes run and are waited for"""
+        done = []
+        def push(n) -> None:
+            time.sleep(0.01)
+            done.append(n)
+        pq = SCons.CacheDir.PushQueue(2)
+        for n in range(10):
+            pq.put(push, n)
+        pq.shutdown()
+        assert sorted(done) == list(range(10)), done
+        assert not any(t.is_alive() for t in pq.threads)
+
+    def test_backpressure(self) -> None:
+        """Test that putting waits while the queue is full"""
+        release = threading.Event()
+        done = []
+        pq = SCons.CacheDir.PushQueue(1, size=1)
+        pq.put(release.wait)
+        pq.put(done.append, 1)
+        # The thread is busy and the queue full: this one has to wait.
+        putter = threading.Thread(target=pq.put, args=(done.append, 2))
+        putter.start()
+        putter.join(0.2)
+        assert putter.is_alive()
+        release.set()
+        putter.join()
+        pq.shutdown()
+        assert done == [1, 2], done
+
+    def test_cancel(self) -> None:
+        """Test dropping the pushes that haven't started"""
+        release = threading.Event()
+        started = threading.Event()
+        done = []
+        def push() -> None:
+            started.set()
+            release.wait()
+            done.append('running')
+        pq = SCons.CacheDir.PushQueue(1)
+        pq.put(push)
+        pq.put(done.append, 'queued')
+        started.wait()
+        threading.Timer(0.1, release.set).start()
+        pq.shutdown(cancel=True)
+        assert done == ['running'], done
+
+    def test_errors(self) -> None:
+        """Test that errors of pushes are reported as warnings"""
+        def push() -> None:
+            raise SCons.Errors.SConsEnvironmentError("Unable to copy")
+        pq = SCons.CacheDir.PushQueue(1)
+        pq.put(push)
+        old_warn_exceptions = SCons.Warnings.warningAsException(1)
+        SCons.Warnings.enableWarningClass(SCons.Warnings.CacheWriteErrorWarning)
+        try:
+            with self.assertRaises(SCons.Warnings.CacheWriteErrorWarning):
+                pq.shutdown()
+        finally:
+            SCons.Warnings.warningAsException(old_warn_exceptions)
+            SCons.Warnings.suppressWarningClass(SCons.Warnings.CacheWriteErrorWarning)
+
+class WorkdirTestCase(BaseTestCase):
+    """Fixtures for files and a cache in the test's directory."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        shutil.rmtree(self._CacheDir.path)
+        self._CacheDir = SCons.CacheDir.CacheDir(self.test.workpath('cache'))
+
+    def File(self, name, bsig=None, action=Action()):
+        node = super().File(self.test.workpath(name), bsig, action)
+        env = node.get_build_env()
+        env.cache_timestamp_newer = False
+        env.fs = self.fs
+        return node
+
+    def cache(self, node, contents) -> None:
+        cachedir, cachefile = self._CacheDir.cachepath(node)
+        os.makedirs(cachedir, exist_ok=True)
+        with open(cachefile, 'w') as f:
+            f.write(contents)
+
+class PrefetchTestCase(WorkdirTestCase):
+    """Test retrieving targets ahead of the build."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.shown = []
+        self.save_CacheInPlace = SCons.CacheDir.CacheInPlace
+        self.save_cache_show = SCons.CacheDir.cache_show
+        SCons.CacheDir.CacheInPlace = lambda t, s, env, execute=1: self.shown.append(t)
+        SCons.CacheDir.cache_show = 0
+
+    def tearDown(self) -> None:
+        SCons.CacheDir.CacheInPlace = self.save_CacheInPlace
+        SCons.CacheDir.cache_show = self.save_cache_show
+        super().tearDown()
+
+    def test_candidates(self) -> None:
+        """Test picking the targets built from source files only"""
+        self.test.write('src', "src\n")
+        src = self.fs.File(self.test.workpath('src'))
+        f1 = self.File('f1')
+        f1.add_source([src])
+        f2 = self.File('f2')
+        f2.add_source([f1])
+        f3 = self.File('f3')
+        f3.add_source([self.fs.File(self.test.workpath('missing'))])
+        self.test.write('f4', "f4\n")
+        f4 = self.File('f4')
+        f4.add_source([src])
+        groups = SCons.CacheDir.prefetch_candidates([f2, f3, f4])
+        assert groups == [[f1]], groups
+
+    def test_prefetch(self) -> None:
+        """Test retrieving targets and moving them in place when asked"""
+        f1 = self.File('f1', 'f1_bsig')
+        f2 = self.File('f2', 'f2_bsig')
+        f3 = self.File('f3', 'f3_bsig')
+        self.cache(f1, "f1\n")
+        self.cache(f3, "f3\n")
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            self._CacheDir.prefetch([[f1], [f2], [f3]], executor)
+            assert sorted(self._CacheDir.prefetched, key=str) == [f1, f3]
+            for future in self._CacheDir.prefetched.values():
+                future.result()
+            # Counted when used, not when retrieved ahead.
+            assert (self._CacheDir.requests, self._CacheDir.hits) == (0, 0)
+            assert self._CacheDir.retrieve(f1)
+            assert self.test.read('f1', mode='r') == "f1\n"
+            assert not os.path.exists(SCons.CacheDir.CacheDir.prefetch_path(f1))
+            assert self.shown == [f1], self.shown
+            assert (self._CacheDir.requests, self._CacheDir.hits) == (1, 1)
+            assert self._CacheDir.retrieved_bytes == 3, self._CacheDir.retrieved_bytes
+            # Not asked for: what was retrieved is removed, and not a hit.
+            self._CacheDir.cancel_prefetch()
+        assert self._CacheDir.prefetched == {}
+        assert (self._CacheDir.requests, self._CacheDir.hits) == (1, 1)
+        assert not os.path.exists(self.test.workpath('f3'))
+        assert sorted(os.listdir(self.test.workpath())) == ['cache', 'f1']
+
+    def test_group(self) -> None:
+        """Test that the targets of a builder are retrieved all or none"""
+        f1 = self.File('f1', 'f1_bsig')
+        f2 = self.File('f2', 'f2_bsig')
+        self.cache(f1, "f1\n")
+        assert not SCons.CacheDir.CacheDir._retrieve_group([f1, f2], SCons.CacheDir.CacheRetrieveFunc)
+        assert sorted(os.listdir(self.test.workpath())) == ['cache']
+        assert (self._CacheDir.requests, self._CacheDir.hits) == (0, 0)
+
+class DedupTestCase(WorkdirTestCase):
+    """Test the dedup layout."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._CacheDir.config['layout'] = 'dedup'
+
+    def test_manifest(self) -> None:
+        """Test reading and writing manifests"""
+        path = self.test.workpath('manifest')
+        SCons.CacheDir.write_manifest(path, 'abcd', 0o755)
+        assert SCons.CacheDir.read_manifest(path) == ('abcd', 0o755)
+        self.test.write('file', "file\n")
+        assert SCons.CacheDir.read_manifest(self.test.workpath('file')) is None
+        self.test.write('bad', SCons.CacheDir.MANIFEST_MAGIC + b"abcd\n")
+        with self.assertRaises(ValueError):
+            SCons.CacheDir.read_manifest(self.test.workpath('bad'))
+
+    def test_push_retrieve(self) -> None:
+        """Test that the same content is stored once"""
+        f1 = self.File('f1', 'f1_bsig')
+        f2 = self.File('f2', 'f2_bsig')
+        self.test.write('f1', "same\n")
+        self.test.write('f2', "same\n")
+        if not IS_WINDOWS:
+            os.chmod(self.test.workpath('f2'), 0o755)
+        for f in (f1, f2):
+            SCons.CacheDir.CachePushFunc([f], [], f.get_build_env())
+        csig = SCons.Util.hash_signature(b"same\n")
+        assert SCons.CacheDir.read_manifest(self._CacheDir.cachepath(f1)[1])[0] == csig
+        blob = self._CacheDir.sigpath(csig)[1]
+        assert self.test.read(blob) == b"same\n"
+        assert self._CacheDir.get_cachedir_csig(f2) == csig
+
+        for f in (f1, f2):
+            os.unlink(f.get_internal_path())
+            assert SCons.CacheDir.CacheRetrieveFunc([f], [], f.get_build_env()) == 0
+            assert self.test.read(f.get_internal_path()) == b"same\n"
+        if not IS_WINDOWS:
+            assert os.stat(f2.get_internal_path()).st_mode & stat.S_IXUSR
+            assert not os.stat(f1.get_internal_path()).st_mode & stat.S_IXUSR
+
+        # Evicted: a miss.
+        os.unlink(blob)
+        os.unlink(f1.get_internal_path())
+        assert SCons.CacheDir.CacheRetrieveFunc([f1], [], f1.get_build_env()) == 1
+
+    def test_in_place(self) -> None:
+        """Test keeping a file that has the content the cache has"""
+        f1 = self.File('f1', 'f1_bsig')
+        self.test.write('f1', "f1\n")
+        SCons.CacheDir.CachePushFunc([f1], [], f1.get_build_env())
+        assert self._CacheDir.in_place(f1)
+        assert f1 in self._CacheDir.kept
+        self._CacheDir.kept.clear()
+
+        self.test.write('f1', "other\n")
+        assert not self._CacheDir.in_place(f1)
+        os.unlink(self.test.workpath('f1'))
+        assert not self._CacheDir.in_place(f1)
+        assert not self.File('f2', 'f2_bsig').in_cache_in_place()
+
+        self._CacheDir.config['layout'] = 'plain'
+        self.test.write('f1', "f1\n")
+        assert not self._CacheDir.in_place(f1)
+
+class BundleTestCase(WorkdirTestCase):
+    """Test the bundle layout."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._CacheDir.config['layout'] = 'bundle'
+
+    def test_archive(self) -> None:
+        """Test writing and extracting bundles"""
+        self.test.write('a', "a\n")
+        self.test.write('b', "b\n" * 1000)
+        if not IS_WINDOWS:
+            os.chmod(self.test.workpath('b'), 0o755)
+        os.utime(self.test.workpath('a'), (1000000000, 1000000000))
+        paths = [self.test.workpath('a'), self.test.workpath('b')]
+        dsts = [self.test.workpath('x'), self.test.workpath('y')]
+        for codec in ['none'] + sorted(SCons.CacheDir.BUNDLE_COMPRESSIONS):
+            bundle = self.test.workpath('bundle.' + codec)
+            SCons.CacheDir.write_bundle(paths, bundle, codec)
+            assert SCons.CacheDir.extract_bundle(bundle, dsts) == [2, 2000], codec
+            assert self.test.read('x') == b"a\n"
+            assert self.test.read('y') == b"b\n" * 1000
+            assert os.path.getmtime(self.test.workpath('x')) == 1000000000
+            if not IS_WINDOWS:
+                assert os.stat(self.test.workpath('y')).st_mode & stat.S_IXUSR
+        SCons.CacheDir.extract_bundle(bundle, dsts, keep_mtime=False)
+        assert os.path.getmtime(self.test.workpath('x')) != 1000000000
+
+        # All or none.
+        os.unlink(dsts[0])
+        with self.assertRaises(ValueError):
+            SCons.CacheDir.extract_bundle(bundle, dsts[:1])
+        self.test.write('bad', "not a bundle")
+        with self.assertRaises(ValueError):
+            SCons.CacheDir.extract_bundle(self.test.workpath('bad'), dsts)
+        with self.assertRaises(OSError):
+            SCons.CacheDir.extract_bundle(bundle, [dsts[0], self.test.workpath('no', 'dir')])
+        assert not os.path.exists(dsts[0])
+        assert [f for f in os.listdir(self.test.workpath()) if '.tmp' in f] == []
+
+    def test_push_retrieve(self) -> None:
+        """Test pushing and retrieving the targets of a builder as one"""
+        f1 = self.File('f1', 'f1_bsig')
+        f2 = self.File('f2', 'f2_bsig')
+        targets = [f1, f2]
+        self.test.write('f1', "f1\n")
+        cachefile = self._CacheDir.sigpath(SCons.CacheDir.bundle_sig(targets))[1]
+        # Not all built: not pushed.
+        self._CacheDir.push_bundle(f1, targets)
+        assert not os.path.exists(cachefile)
+        self.test.write('f2', "f2\n")
+        self._CacheDir.push_bundle(f2, targets)
+        assert not os.path.exists(cachefile)
+        self._CacheDir.push_bundle(f1, targets)
+        assert os.path.exists(cachefile)
+        assert not os.path.exists(self._CacheDir.cachepath(f1)[1])
+
+        shown = []
+        for f in targets:
+            os.unlink(f.get_internal_path())
+        with unittest.mock.patch('SCons.CacheDir.CacheInPlace',
+                                 lambda t, s, env, execute=1: shown.append(t)):
+            assert self._CacheDir.retrieve_bundle(f1, targets)
+            assert list(self._CacheDir.bundled) == [f2], self._CacheDir.bundled
+            assert self._CacheDir.bundled[f2][0] == cachefile
+            assert self._CacheDir.retrieve(f2)
+        assert shown == [f1, f2], shown
+        assert (self._CacheDir.requests, self._CacheDir.hits) == (2, 2)
+        assert self.test.read('f1') == b"f1\n"
+        assert self.test.read('f2') == b"f2\n"
+
+        # Gone: looked for one at a time.
+        os.unlink(cachefile)
+        assert not self._CacheDir.retrieve_bundle(f1, targets)
+
 class CacheDirExistsTestCase(unittest.TestCase):
     """Test passing an existing but not setup cache directory."""
 
@@ -255,6 +751,85 @@ class FileTestCase(BaseTestCase):
         finally:
             SCons.CacheDir.CacheRetrieve = save_CacheRetrieve
 
+    def test_CacheRetrieve_evicted(self) -> None:
+        """Test retrieving a file evicted from the cache meanwhile"""
+        f9 = self.File(self.test.workpath("cd.f9"), 'f9_bsig')
+        cachedir, cachefile = self._CacheDir.cachepath(f9)
+        os.makedirs(cachedir, exist_ok=True)
+        with open(cachefile, 'w') as f:
+            f.write("cd.f9\n")
+
+        def copy_from_cache(env, src, dst):
+            os.unlink(src)
+            raise FileNotFoundError(src)
+
+        hits = self._CacheDir.hits
+        with unittest.mock.patch.object(self._CacheDir, 'copy_from_cache', copy_from_cache):
+            r = SCons.CacheDir.CacheRetrieveFunc([f9], [], f9.get_build_env())
+        assert r == 1, r
+        assert self._CacheDir.hits == hits, self._CacheDir.hits
+
+    def test_CacheRetrieve_corrupt(self) -> None:
+        """Test retrieving a compressed file that can't be decompressed"""
+        f10 = self.File(self.test.workpath("cd.f10"), 'f10_bsig')
+        cachedir, cachefile = self._CacheDir.cachepath(f10)
+        os.makedirs(cachedir, exist_ok=True)
+        with open(cachefile, 'wb') as f:
+            f.write(SCons.CacheDir.COMPRESSED_MAGIC + b"zlib\ngarbage")
+
+        hits = self._CacheDir.hits
+        r = SCons.CacheDir.CacheRetrieveFunc([f10], [], f10.get_build_env())
+        assert r == 1, r
+        assert self._CacheDir.hits == hits, self._CacheDir.hits
+        assert not os.path.exists(f10.get_internal_path())
+        os.unlink(cachefile)
+
+    def test_CacheRetrieve_stats(self) -> None:
+        """Test the records of the requests for --debug=json"""
+        stats = SCons.Util.stats.CacheStats()
+        stats.enable(sys.stdout)
+        f11 = self.File(self.test.workpath("cd.f11"), 'f11_bsig')
+        f12 = self.File(self.test.workpath("cd.f12"), 'f12_bsig')
+        cachedir, cachefile = self._CacheDir.cachepath(f11)
+        os.makedirs(cachedir, exist_ok=True)
+        with open(cachefile, 'w') as f:
+            f.write("cd.f11\n")
+        env = f11.get_build_env()
+        env.cache_timestamp_newer = False
+        env.fs = self.fs
+        durations = {f11: 2.5, f12: 4.0}
+
+        with unittest.mock.patch('SCons.CacheDir.cache_stats', stats), \
+             unittest.mock.patch.object(SCons.Node.FS.File, 'get_build_duration',
+                                        lambda node: durations[node]):
+            assert SCons.CacheDir.CacheRetrieveFunc([f11], [], f11.get_build_env()) == 0
+            assert SCons.CacheDir.CacheRetrieveFunc([f12], [], f12.get_build_env()) == 1
+            # Build times are looked up at the end, not when recorded.
+            assert [r['node'] for r in stats.stats] == [f11, f12], stats.stats
+            stats.resolve()
+        hit, miss = stats.stats
+        assert 'node' not in hit, hit
+        assert hit['target'] == f11.get_internal_path(), hit
+        assert (hit['bsig'], hit['hit'], hit['how'], hit['bytes']) == ('f11_bsig', True, 'copy', 7), hit
+        assert hit['seconds'] > 0 and hit['build_time'] == 2.5, hit
+        assert hit['cache'] == 'cache', hit
+        assert (miss['hit'], miss['how'], miss['bytes']) == (False, 'not in cache', 0), miss
+
+        summary = stats.summary()
+        assert (summary['requests'], summary['hits'], summary['misses']) == (2, 1, 1), summary
+        assert summary['bytes'] == 7 and summary['time_saved'] == 2.5, summary
+        assert summary['miss_reasons'] == {'not in cache': 1}, summary
+        assert [e['target'] for e in stats.ranked(True)] == [hit['target']]
+        assert stats.ranked(False) == [{'target': miss['target'], 'bsig': 'f12_bsig',
+                                        'build_time': 4.0, 'count': 1}], stats.ranked(False)
+        os.unlink(cachefile)
+
+        # Not recorded unless enabled.
+        stats = SCons.Util.stats.CacheStats()
+        with unittest.mock.patch('SCons.CacheDir.cache_stats', stats):
+            SCons.CacheDir.CacheRetrieveFunc([f12], [], f12.get_build_env())
+        assert stats.stats == [], stats.stats
+
     def test_CacheRetrieveSilent(self) -> None:
         """Test the CacheRetrieveSilent() function"""
 
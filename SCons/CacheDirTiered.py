@@ -0,0 +1,193 @@
+# MIT License
+#
+# Copyright The SCons Foundation
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""CacheDir support for a local cache in front of a shared one.
+
+Selected with ``CacheDir(local_path, custom_class=cls)``, where *cls*
+is :class:`TieredCacheDir` with the shared cache set, by
+:meth:`TieredCacheDir.with_shared` or in a subclass.  Say, a cache on
+the machine's own disk in front of a team's cache on a network file
+system: files are retrieved from the local cache if it has them, else
+from the shared one, and then copied to the local one.
+"""
+
+from __future__ import annotations
+
+import os
+
+import SCons.Action
+import SCons.CacheDir
+import SCons.Errors
+import SCons.Warnings
+from SCons.CacheDir import CacheRetrieveFunc, _push_file
+
+
+class SharedTier(SCons.CacheDir.CacheDir):
+    """The shared cache of a :class:`TieredCacheDir`.
+
+    Its ``--cache-debug`` output goes through the tiered cache, which
+    reports the counts of both.
+    """
+
+    def __init__(self, path, front) -> None:
+        self.front = front
+        super().__init__(path)
+
+    def CacheDebug(self, fmt, target, cachefile, *args) -> None:
+        self.front.CacheDebug(fmt, target, cachefile, *args)
+
+
+class TieredCacheDir(SCons.CacheDir.CacheDir):
+    """A local derived-file cache in front of a shared one.
+
+    The object itself is the local cache, at *path*; :attr:`shared` is
+    the shared one, at :attr:`shared_path`.  A file the local cache
+    doesn't have is looked for in the shared cache, and when found
+    there, copied to the local cache too.  A file built is pushed to
+    the local cache right away, and to the shared cache from a
+    background thread (see :func:`SCons.CacheDir.push_in_background`),
+    so the build doesn't wait for the slower one.
+
+    Each cache is configured on its own, in its config file: the
+    local cache can be kept smaller than the shared one with
+    ``scons-configure-cache --max-size``.  Either can be read-only,
+    with :attr:`local_readonly` and :attr:`shared_readonly`;
+    ``--cache-readonly`` makes both.  :attr:`requests` and
+    :attr:`hits` count the local cache, as for any cache, and those of
+    :attr:`shared` the requests that got to it.
+    """
+
+    #: Path of the shared cache; ``None`` for none.
+    shared_path = None
+    #: Don't push files to the shared cache.
+    shared_readonly = False
+    #: Don't push files, or files retrieved from the shared cache, to
+    #: the local cache.
+    local_readonly = False
+
+    def __init__(self, path) -> None:
+        super().__init__(path)
+        self.shared = None
+        if path is not None and self.shared_path is not None:
+            self.shared = SharedTier(self.shared_path, self)
+
+    @classmethod
+    def with_shared(cls, path, readonly: bool = False, local_readonly: bool = False) -> type:
+        """Return a class for the *custom_class* argument of :func:`CacheDir`.
+
+        Its instances have the shared cache at *path*, which is
+        read-only if *readonly* is true; the local one is if
+        *local_readonly* is.
+        """
+        return type(cls.__name__, (cls,), {
+            'shared_path': path,
+            'shared_readonly': readonly,
+            'local_readonly': local_readonly,
+        })
+
+    def tiers(self) -> list:
+        """Return the names and caches of the tiers, local first."""
+        tiers = [('local', self)]
+        if self.shared is not None:
+            tiers.append(('shared', self.shared))
+        return tiers
+
+    def CacheDebug(self, fmt, target, cachefile, *args) -> None:
+        if self._debug_file():
+            self.debugFP.write(fmt % (target, os.path.split(cachefile)[1], *args))
+            for name, tier in self.tiers():
+                self.debugFP.write("%s requests: %d, hits: %d, misses: %d, hit rate: %.2f%%\n" %
+                                   (name, tier.requests, tier.hits, tier.misses, tier.hit_ratio))
+
+    def get_cachedir_csig(self, node) -> str:
+        csig = super().get_cachedir_csig(node)
+        if csig is None and self.shared is not None:
+            csig = self.shared.get_cachedir_csig(node)
+        return csig
+
+    def retrieve(self, node) -> bool:
+        """Retrieve a node from the local cache, or else the shared one.
+
+        See :meth:`CacheDir.retrieve`.
+        """
+        if super().retrieve(node):
+            return True
+        shared = self.shared
+        if shared is None or not self.is_enabled() or not shared.is_enabled():
+            return False
+
+        env = node.get_build_env()
+        shared.link_mode = self.link_mode
+        self.CacheDebug('CacheRetrieve(%s):  looking in the shared cache for %s\n',
+                        node, shared.cachepath(node)[1])
+        if CacheRetrieveFunc([node], [], env, cd=shared) != 0:
+            return False
+        self._show_in_place(node)
+        if SCons.Action.execute_actions:
+            self.promote(node)
+        return True
+
+    def promote(self, node) -> None:
+        """Copy *node*, retrieved from the shared cache, to the local one."""
+        if self.local_readonly or self.is_readonly():
+            return
+        cachedir, cachefile = self.cachepath(node)
+        self.CacheDebug('CacheRetrieve(%s):  copying to the local cache as %s\n', node, cachefile)
+        try:
+            _push_file([node], node.get_build_env(), cachedir, cachefile, self)
+        except SCons.Errors.SConsEnvironmentError as e:
+            SCons.Warnings.warn(SCons.Warnings.CacheWriteErrorWarning, str(e))
+
+    def push(self, node):
+        """Push *node* to the local cache, and in the background to the shared one.
+
+        With the bundle layout, the local cache gets the targets of
+        the builder of *node* as one bundle, as :meth:`CacheDir.push`
+        does; the shared cache keeps them one at a time.
+        """
+        if self.is_readonly() or not self.is_enabled():
+            return
+        env = node.get_build_env()
+        for cd, readonly in ((self, self.local_readonly), (self.shared, self.shared_readonly)):
+            if cd is None or readonly or not cd.is_enabled():
+                continue
+            if cd is self and self.layout == 'bundle':
+                targets = self.bundle_targets(node)
+                if targets is not None:
+                    self.push_bundle(node, targets)
+                    continue
+            cachedir, cachefile = cd.cachepath(node)
+            if node.fs.exists(cachefile):
+                cd.CacheDebug('CachePush(%s):  %s already exists in cache\n', node, cachefile)
+                continue
+            cd.CacheDebug('CachePush(%s):  pushing to %s\n', node, cachefile)
+            if cd is self:
+                _push_file([node], env, cachedir, cachefile, cd)
+            else:
+                SCons.CacheDir.push_in_background(_push_file, [node], env, cachedir, cachefile, cd)
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
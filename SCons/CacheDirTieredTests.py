@@ -0,0 +1,178 @@
+# MIT License
+#
+# Copyright The SCons Foundation
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+import unittest
+
+from TestCmd import TestCmd
+
+import SCons.CacheDir
+import SCons.Executor
+import SCons.Node.FS
+from SCons.CacheDirTiered import TieredCacheDir
+
+
+class Action:
+    def __call__(self, targets, sources, env, **kw) -> int:
+        return 0
+    def genstring(self, target, source, env):
+        return str(self)
+    def get_contents(self, target, source, env):
+        return bytearray('','utf-8')
+
+class Builder:
+    def __init__(self, environment) -> None:
+        self.env = environment
+        self.action = Action()
+        self.overrides = {}
+        self.source_scanner = None
+        self.target_scanner = None
+
+class Environment:
+    def __init__(self, cachedir, fs) -> None:
+        self.cachedir = cachedir
+        self.fs = fs
+        self.cache_timestamp_newer = False
+    def Override(self, overrides):
+        return self
+    def get_CacheDir(self):
+        return self.cachedir
+
+
+class TieredCacheDirTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.test = TestCmd(workdir='')
+        self.fs = SCons.Node.FS.FS()
+        self.cls = TieredCacheDir.with_shared(self.test.workpath('shared'))
+        self.cd = self.cls(self.test.workpath('local'))
+        self.shown = []
+        self.save_CacheInPlace = SCons.CacheDir.CacheInPlace
+        SCons.CacheDir.CacheInPlace = lambda t, s, env, execute=1: self.shown.append(t)
+
+    def tearDown(self) -> None:
+        SCons.CacheDir.CacheInPlace = self.save_CacheInPlace
+        SCons.CacheDir.shutdown_push_queues()
+
+    def File(self, name, bsig):
+        node = self.fs.File(self.test.workpath(name))
+        node.builder_set(Builder(Environment(self.cd, self.fs)))
+        node.cachesig = bsig
+        return node
+
+    def test_with_shared(self) -> None:
+        """Test the class the shared cache is set in"""
+        assert issubclass(self.cls, TieredCacheDir)
+        assert self.cls.shared_path == self.test.workpath('shared')
+        assert TieredCacheDir.shared_path is None
+        assert [name for name, tier in self.cd.tiers()] == ['local', 'shared']
+        assert self.cd.shared.path == self.test.workpath('shared')
+        assert os.path.isfile(self.test.workpath('shared', 'config'))
+        # Without a shared cache, it's an ordinary one.
+        plain = TieredCacheDir(self.test.workpath('other'))
+        assert plain.shared is None
+        assert [name for name, tier in plain.tiers()] == ['local']
+
+    def test_push_retrieve(self) -> None:
+        """Test pushing to both tiers and retrieving from the shared one"""
+        f1 = self.File('f1', 'f1_bsig')
+        self.test.write(f1.get_internal_path(), "f1\n")
+        self.cd.push(f1)
+        local = self.cd.cachepath(f1)[1]
+        shared = self.cd.shared.cachepath(f1)[1]
+        assert os.path.exists(local)
+        SCons.CacheDir.shutdown_push_queues()
+        assert self.test.read(shared) == b"f1\n"
+
+        os.unlink(local)
+        os.unlink(f1.get_internal_path())
+        assert self.cd.retrieve(f1)
+        assert self.test.read(f1.get_internal_path()) == b"f1\n"
+        assert self.shown == [f1], self.shown
+        # Copied to the local cache.
+        assert self.test.read(local) == b"f1\n"
+        assert (self.cd.requests, self.cd.hits) == (1, 0)
+        assert (self.cd.shared.requests, self.cd.shared.hits) == (1, 1)
+
+        f2 = self.File('f2', 'f2_bsig')
+        assert not self.cd.retrieve(f2)
+        assert (self.cd.shared.requests, self.cd.shared.hits) == (2, 1)
+
+    def test_readonly(self) -> None:
+        """Test read-only tiers"""
+        cls = TieredCacheDir.with_shared(self.test.workpath('shared'),
+                                         readonly=True, local_readonly=True)
+        self.cd = cls(self.test.workpath('local'))
+        f1 = self.File('f1', 'f1_bsig')
+        self.test.write(f1.get_internal_path(), "f1\n")
+        self.cd.push(f1)
+        SCons.CacheDir.shutdown_push_queues()
+        assert not os.path.exists(self.cd.cachepath(f1)[1])
+        assert not os.path.exists(self.cd.shared.cachepath(f1)[1])
+
+        # Retrieved, but not copied to the local cache.
+        shared = self.cd.shared.cachepath(f1)[1]
+        os.makedirs(os.path.dirname(shared))
+        self.test.write(shared, "f1\n")
+        os.unlink(f1.get_internal_path())
+        assert self.cd.retrieve(f1)
+        assert not os.path.exists(self.cd.cachepath(f1)[1])
+
+    def test_bundle(self) -> None:
+        """Test a local cache with the bundle layout"""
+        self.cd.config['layout'] = 'bundle'
+        f1 = self.File('f1', 'f1_bsig')
+        f2 = self.File('f2', 'f2_bsig')
+        targets = [f1, f2]
+        executor = SCons.Executor.Executor(Action(), f1.get_build_env(), [{}], targets, [])
+        for f in targets:
+            f.set_executor(executor)
+            self.test.write(f.get_internal_path(), "%s\n" % f.name)
+        for f in targets:
+            self.cd.push(f)
+        SCons.CacheDir.shutdown_push_queues()
+        bundle = self.cd.sigpath(SCons.CacheDir.bundle_sig(targets))[1]
+        assert os.path.exists(bundle)
+        assert not os.path.exists(self.cd.cachepath(f1)[1])
+        # The shared cache keeps them one at a time.
+        for f in targets:
+            assert self.test.read(self.cd.shared.cachepath(f)[1]) == b"%s\n" % f.name.encode()
+
+        for f in targets:
+            os.unlink(f.get_internal_path())
+        assert self.cd.retrieve(f1)
+        assert self.cd.retrieve(f2)
+        assert self.shown == targets, self.shown
+        assert self.test.read(f2.get_internal_path()) == b"f2\n"
+        assert (self.cd.requests, self.cd.hits) == (2, 2)
+        assert self.cd.shared.requests == 0
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
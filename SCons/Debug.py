@@ -32,6 +32,7 @@ Shouldn't be needed by most users. Quick shortcuts::
 import atexit
 import os
 import sys
+import threading
 import time
 import weakref
 import inspect
@@ -44,6 +45,17 @@ tracked_classes = {}
 # Global variable that gets set to 'True' by the Main script
 # when SConscript call tracing should be enabled.
 sconscript_trace = False
+# Counts of the file system calls made for Nodes, by name, kept when
+# track_instances is set, for --debug=count.
+syscall_counts = {}
+_syscall_lock = threading.Lock()
+
+def count_syscall(name, n: int=1) -> None:
+    with _syscall_lock:
+        syscall_counts[name] = syscall_counts.get(name, 0) + n
+
+def fetchSyscallCounts():
+    return sorted(syscall_counts.items())
 
 def logInstanceCreation(instance, name=None) -> None:
     if name is None:
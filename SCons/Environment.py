@@ -1322,8 +1322,11 @@ class Base(SubstitutionEnvironment):
     def get_CacheDir(self):
         try:
             path = self._CacheDir_path
+            link_mode = getattr(self, '_CacheDir_link_mode', 'copy')
         except AttributeError:
-            path = SCons.Defaults.DefaultEnvironment()._CacheDir_path
+            default_env = SCons.Defaults.DefaultEnvironment()
+            path = default_env._CacheDir_path
+            link_mode = getattr(default_env, '_CacheDir_link_mode', 'copy')
 
         cachedir_class = self.validate_CacheDir_class()
         try:
@@ -1332,12 +1335,14 @@ class Base(SubstitutionEnvironment):
                     # instantiated cache dir type is. If the are exactly the same we
                     # can just keep using the existing one, otherwise the user is requesting
                     # something new, so we will re-instantiate below.
-                    and type(self._last_CacheDir) is cachedir_class):
+                    and type(self._last_CacheDir) is cachedir_class
+                    and self._last_CacheDir.link_mode == link_mode):
                 return self._last_CacheDir
         except AttributeError:
             pass
 
         cd = cachedir_class(path)
+        cd.link_mode = link_mode
         self._last_CacheDir_path = path
         self._last_CacheDir = cd
         return cd
@@ -2232,10 +2237,16 @@ class Base(SubstitutionEnvironment):
         nkw = self.subst_kw(kw)
         return SCons.Builder.Builder(**nkw)
 
-    def CacheDir(self, path, custom_class=None) -> None:
+    def CacheDir(self, path, custom_class=None, link_mode=None) -> None:
         if path is not None:
             path = self.subst(path)
+        if link_mode is None:
+            link_mode = 'copy'
+        elif link_mode not in SCons.CacheDir.LINK_MODES:
+            raise UserError("Invalid CacheDir link_mode %s; must be one of %s"
+                            % (repr(link_mode), ", ".join(SCons.CacheDir.LINK_MODES)))
         self._CacheDir_path = path
+        self._CacheDir_link_mode = link_mode
 
         if custom_class:
             self['CACHEDIR_CLASS'] = self.validate_CacheDir_class(custom_class)
@@ -2487,7 +2498,8 @@ class Base(SubstitutionEnvironment):
         nkw = self.subst_kw(kw)
         return SCons.Scanner.ScannerBase(*nargs, **nkw)
 
-    def SConsignFile(self, name=SCons.SConsign.current_sconsign_filename(), dbm_module=None) -> None:
+    def SConsignFile(self, name=SCons.SConsign.current_sconsign_filename(), dbm_module=None,
+                     compact: bool=False) -> None:
         if name is not None:
             name = self.subst(name)
             if not os.path.isabs(name):
@@ -2497,7 +2509,7 @@ class Base(SubstitutionEnvironment):
             sconsign_dir = os.path.dirname(name)
             if sconsign_dir and not os.path.exists(sconsign_dir):
                 self.Execute(SCons.Defaults.Mkdir(sconsign_dir))
-        SCons.SConsign.File(name, dbm_module)
+        SCons.SConsign.File(name, dbm_module, compact=compact)
 
     def SideEffect(self, side_effect, target):
         """Tell scons that side_effects are built as side
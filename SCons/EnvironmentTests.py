@@ -3012,6 +3012,10 @@ def generate(env):
         env.CacheDir('$CD')
         assert env._CacheDir_path == test_cachedir, env._CacheDir_path
         assert os.path.isfile(test_cachedir_config), "No file %s"%test_cachedir_config
+        assert env.get_CacheDir().link_mode == 'copy'
+
+        env.CacheDir('$CD', link_mode='hardlink')
+        assert env.get_CacheDir().link_mode == 'hardlink'
 
         # Now verify that -n/-no_exec wil prevent the CacheDir/config from being created
         import SCons.Action
@@ -3020,6 +3024,9 @@ def generate(env):
         assert env._CacheDir_path == test_foo1, env._CacheDir_path
         assert not os.path.isfile(test_foo1_config), "No file %s"%test_foo1_config
 
+        with self.assertRaises(SCons.Errors.UserError):
+            env.CacheDir('$CD', link_mode='symlink')
+
 
     def test_Clean(self) -> None:
         """Test the Clean() method"""
@@ -3492,9 +3499,11 @@ def generate(env):
         try:
             fnames = []
             dbms = []
-            def capture(name, dbm_module, fnames=fnames, dbms=dbms) -> None:
+            compacts = []
+            def capture(name, dbm_module, compact, fnames=fnames, dbms=dbms) -> None:
                 fnames.append(name)
                 dbms.append(dbm_module)
+                compacts.append(compact)
 
             save_SConsign_File = SCons.SConsign.File
             SCons.SConsign.File = capture
@@ -3530,6 +3539,10 @@ def generate(env):
             env.SConsignFile(None)
             assert fnames[-1] is None, fnames
             assert dbms[-1] is None, dbms
+            assert compacts == [False] * 8, compacts
+
+            env.SConsignFile(compact=True)
+            assert compacts[-1] is True, compacts
         finally:
             SCons.SConsign.File = save_SConsign_File
 
@@ -1169,12 +1169,15 @@ class LocalFS:
         return os.link(src, dst)
 
     def lstat(self, path):
+        if SCons.Debug.track_instances: SCons.Debug.count_syscall('lstat')
         return os.lstat(path)
 
     def listdir(self, path):
+        if SCons.Debug.track_instances: SCons.Debug.count_syscall('listdir')
         return os.listdir(path)
 
     def scandir(self, path):
+        if SCons.Debug.track_instances: SCons.Debug.count_syscall('scandir')
         return os.scandir(path)
 
     def makedirs(self, path, mode: int=0o777, exist_ok: bool=False):
@@ -1187,6 +1190,7 @@ class LocalFS:
         return os.rename(old, new)
 
     def stat(self, path):
+        if SCons.Debug.track_instances: SCons.Debug.count_syscall('stat')
         return os.stat(path)
 
     def symlink(self, src, dst):
@@ -1971,6 +1975,13 @@ class Dir(Base):
             return self.srcdir
         return Base.srcnode(self)
 
+    def known_children(self) -> list:
+        # A directory's entries only become its children when it's scanned.
+        children = super().known_children()
+        children.extend(node for name, node in self.entries.items()
+                        if name not in ('.', '..'))
+        return children
+
     def get_timestamp(self) -> int:
         """Return the latest timestamp from among our children"""
         stamp = 0
@@ -2019,14 +2030,22 @@ class Dir(Base):
             d = self.on_disk_entries
         except AttributeError:
             d = {}
+            stats = {}
             try:
-                entries = os.listdir(self._abspath)
+                with self.fs.scandir(self._abspath) as it:
+                    for entry in it:
+                        key = _my_normcase(entry.name)
+                        d[key] = True
+                        # On Windows the stat of an entry comes with the
+                        # listing, except for links; elsewhere it takes a
+                        # system call, so is left to be made if needed.
+                        if sys.platform == 'win32' and not entry.is_symlink():
+                            stats[key] = entry.stat()
             except OSError:
                 pass
-            else:
-                for entry in map(_my_normcase, entries):
-                    d[entry] = True
             self.on_disk_entries = d
+            if Save_Strings:
+                self._seed_stats(d, stats)
         if sys.platform == 'win32' or sys.platform == 'cygwin':
             name = _my_normcase(name)
             result = d.get(name)
@@ -2039,6 +2058,32 @@ class Dir(Base):
         else:
             return name in d
 
+    def _seed_stats(self, entries, stats) -> None:
+        """Memoize the stat of the children the directory listing tells.
+
+        That is ``None`` for those not in the listing *entries*, and the
+        ones the listing came with, *stats*.  They are as the children's
+        own stat() would have been now, and are dropped with their other
+        memoized values when they are built.  Only done once the
+        SConscript files are read, as with the string values: until then
+        their Python code might still create files.  Not on Windows for
+        the missing ones, which may be there under their 8.3 names.
+        """
+        seed_missing = sys.platform not in ('win32', 'cygwin')
+        seeded = 0
+        for name, node in self.entries.items():
+            if name in ('.', '..') or 'stat' in node._memo:
+                continue
+            if name in stats:
+                node._memo['stat'] = stats[name]
+            elif seed_missing and name not in entries:
+                node._memo['stat'] = None
+            else:
+                continue
+            seeded += 1
+        if SCons.Debug.track_instances and seeded:
+            SCons.Debug.count_syscall('stat (from scandir)', seeded)
+
     def rentry_exists_on_disk(self, name):
         """ Searches through the file/dir entries of the current
             *and* all its remote directories (repos), and returns
@@ -3002,6 +3047,18 @@ class File(Base):
             return False
         return self.get_build_env().get_CacheDir().retrieve(self)
 
+    def in_cache_in_place(self) -> bool:
+        """Tell if the file is already what a cache would retrieve for it.
+
+        It is then kept rather than removed before the build, and
+        retrieving it from the cache leaves it alone.
+        """
+        if self.nocache:
+            return False
+        if not self.is_derived():
+            return False
+        return self.get_build_env().get_CacheDir().in_place(self)
+
     def visited(self) -> None:
         if self.exists() and self.executor is not None:
             self.get_build_env().get_CacheDir().push_if_forced(self)
@@ -3141,7 +3198,7 @@ class File(Base):
             # exists or is a link (which would mean it's a dangling
             # link) then we should remove it as appropriate.
             if self.exists() or self.islink():
-                if self.is_derived() and not self.precious:
+                if self.is_derived() and not self.precious and not self.in_cache_in_place():
                     self._rmv_existing()
             else:
                 try:
@@ -3219,6 +3276,65 @@ class File(Base):
 
         return None
 
+    def get_stat_cache(self):
+        """Return the stat-keyed csig cache, or None if it's not to be used.
+
+        A negative --max-drift asks for files to be hashed every time.
+        """
+        if self.fs.max_drift < 0:
+            return None
+        import SCons.SConsign
+        return SCons.SConsign.Get_StatCache(self.fs.Top)
+
+    def prefetch_csig(self):
+        """Return the hashing of a source file for a helper thread.
+
+        Only files without a builder whose stored signature will not
+        be reused (see get_max_drift_csig()) are hashed.  The file is
+        looked up here, on the Taskmaster's thread, since finding it
+        in a Repository may add Nodes to the tree: the helper thread
+        hashes the file get_csig() would read, and only stat()s it.
+        The result is kept with the timestamp and size it was computed
+        for, and get_csig() only takes it if those still match.
+        """
+        if self.has_builder() or hasattr(self.ninfo, 'csig'):
+            return None
+        if self.fs.max_drift == 0:
+            return None
+        fname = self.rfile().get_abspath()
+        return lambda: self._prefetch_csig(fname)
+
+    def _prefetch_csig(self, fname) -> None:
+        max_drift = self.fs.max_drift
+        try:
+            st = os.stat(fname)
+            if not stat.S_ISREG(st.st_mode):
+                return
+            # Same granularity as getmtime(), for get_prefetched_csig().
+            mtime = st[stat.ST_MTIME]
+            if max_drift > 0 and (time.time() - mtime) > max_drift:
+                return
+            cache = self.get_stat_cache()
+            csig = cache.get(st) if cache else None
+            if csig is None:
+                hashed = time.time()
+                csig = hash_file_signature(fname, chunksize=File.hash_chunksize)
+                if cache:
+                    cache.set(st, csig, hashed)
+        except OSError:
+            return
+        self._memo['prefetch_csig'] = (mtime, st.st_size, csig)
+
+    def get_prefetched_csig(self) -> str | None:
+        """Return the signature left by prefetch_csig(), if still valid."""
+        try:
+            mtime, size, csig = self._memo['prefetch_csig']
+        except KeyError:
+            return None
+        if mtime != self.get_timestamp() or size != self.get_size():
+            return None
+        return csig
+
     def get_csig(self) -> str:
         """Generate a node's content signature."""
         ninfo = self.get_ninfo()
@@ -3229,12 +3345,31 @@ class File(Base):
 
         csig = self.get_max_drift_csig()
         if csig is None:
+            csig = self.get_prefetched_csig()
+        if csig is None:
+            # Look the file up in the stat cache, by the stat of the
+            # file that would be read: this may be a Repository file.
+            cache = self.get_stat_cache()
+            st = self.rfile().stat() if cache else None
+            if st is not None and stat.S_ISREG(st.st_mode):
+                csig = cache.get(st)
+            else:
+                st = None
+        if csig is None:
+            hashed = time.time()
             try:
                 size = self.get_size()
                 if size == -1:
                     contents = SCons.Util.NOFILE
-                elif size < File.hash_chunksize:
+                elif (size < File.hash_chunksize
+                      and not SCons.Util.is_tree_hashed(size)):
+                    # A single read is the cheapest way to hash a small
+                    # file; larger ones go through hash_file_signature().
+                    start = time.perf_counter()
                     contents = self.get_contents()
+                    csig = SCons.Util.hash_signature(contents)
+                    SCons.Util.hash_stats.add(len(contents),
+                                              time.perf_counter() - start)
                 else:
                     csig = self.get_content_hash()
             except OSError:
@@ -3246,6 +3381,8 @@ class File(Base):
             else:
                 if not csig:
                     csig = SCons.Util.hash_signature(contents)
+                if st is not None:
+                    cache.set(st, csig, hashed)
 
         ninfo.csig = csig
 
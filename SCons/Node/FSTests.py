@@ -35,6 +35,7 @@ from typing import TYPE_CHECKING
 
 from TestCmd import TestCmd, IS_WINDOWS, IS_ROOT
 
+import SCons.CacheDir
 import SCons.Errors
 import SCons.Node.FS
 import SCons.Util
@@ -90,6 +91,9 @@ class Environment:
     def _update(self, dict) -> None:
         pass
 
+    def get_CacheDir(self):
+        return SCons.CacheDir.CacheDir(None)
+
 
 class Action:
     def __call__(self, targets, sources, env, **kw) -> int:
@@ -2125,6 +2129,47 @@ class DirTestCase(_tempdirTestCase):
         assert self.actual_get_contents_calls == len(expected_get_contents_calls), \
             self.actual_get_contents_calls
 
+    def test_prefetch_csig(self) -> None:
+        """Test File.prefetch_csig() and its use by get_csig()"""
+        test = self.test
+        test.subdir('prefetch_dir')
+        test.write(['prefetch_dir', 'f1'], 'f1\n')
+        test.write(['prefetch_dir', 'f2'], 'f2\n')
+        test.write(['prefetch_dir', 'f3'], 'f3\n')
+
+        dir = self.fs.Dir('prefetch_dir')
+        f1 = dir.File('f1')
+        f1.prefetch_csig()()
+        prefetched = f1._memo['prefetch_csig']
+        assert prefetched[2] == SCons.Util.hash_signature('f1\n'), prefetched
+        assert f1.get_prefetched_csig() == prefetched[2]
+        assert f1.get_csig() == SCons.Util.hash_signature('f1\n')
+
+        # A prefetched signature for a file that changed since is not used.
+        f2 = dir.File('f2')
+        f2._memo['prefetch_csig'] = (f2.get_timestamp() - 1, 3, 'stale')
+        assert f2.get_prefetched_csig() is None
+        assert f2.get_csig() == SCons.Util.hash_signature('f2\n'), f2.get_csig()
+
+        # Files with a builder are not hashed ahead of the build...
+        f3 = dir.File('f3')
+        f3.builder_set(Builder(self.fs.File))
+        assert f3.prefetch_csig() is None
+
+        # ...nor are files whose stored signature will be reused.
+        f4 = dir.File('f4')
+        test.write(['prefetch_dir', 'f4'], 'f4\n')
+        max_drift = self.fs.max_drift
+        try:
+            self.fs.max_drift = 0
+            assert f4.prefetch_csig() is None
+        finally:
+            self.fs.max_drift = max_drift
+
+        missing = dir.File('missing')
+        missing.prefetch_csig()()
+        assert 'prefetch_csig' not in missing._memo, missing._memo
+
     def test_implicit_re_scans(self) -> None:
         """Test that adding entries causes a directory to be re-scanned
         """
@@ -2144,6 +2189,18 @@ class DirTestCase(_tempdirTestCase):
         assert kids == [os.path.join('ddd', 'f1'),
                         os.path.join('ddd', 'f2')], kids
 
+    def test_known_children(self) -> None:
+        """Test the children a directory has before it's scanned"""
+        d = self.fs.Dir('known')
+        f1 = self.fs.File('known/f1')
+        sub = self.fs.Dir('known/sub')
+        f2 = self.fs.File('known/sub/f2')
+        d.add_dependency([f2])
+        kids = d.known_children()
+        assert kids[0] == f2, kids
+        assert set(kids) == {f1, sub, f2}, kids
+        assert sub.known_children() == [f2], sub.known_children()
+
     def test_entry_exists_on_disk(self) -> None:
         """Test the Dir.entry_exists_on_disk() method
         """
@@ -2163,6 +2220,37 @@ class DirTestCase(_tempdirTestCase):
         if os.path.normcase("TeSt") != os.path.normpath("TeSt") or sys.platform == "cygwin":
             assert d.entry_exists_on_disk('case-insensitive')
 
+    def test_entry_exists_on_disk_stats(self) -> None:
+        """Test the stats Dir.entry_exists_on_disk() memoizes"""
+        test = self.test
+        test.subdir('s')
+        test.write(['s', 'exists'], "s/exists\n")
+        d = self.fs.Dir('s')
+        exists = self.fs.File('s/exists')
+        missing = self.fs.File('s/missing')
+
+        # Not while the SConscript files are read.
+        assert not d.entry_exists_on_disk('missing')
+        assert 'stat' not in missing._memo
+        del d.on_disk_entries
+
+        save_Save_Strings = SCons.Node.FS.Save_Strings
+        SCons.Node.FS.save_strings(1)
+        try:
+            assert not d.entry_exists_on_disk('missing')
+        finally:
+            SCons.Node.FS.save_strings(save_Save_Strings)
+        if sys.platform == 'win32':
+            assert exists._memo['stat'].st_size == exists.stat().st_size
+        if sys.platform not in ('win32', 'cygwin'):
+            assert 'stat' in missing._memo and missing._memo['stat'] is None
+        assert not missing.exists()
+
+        # Built since: stat()ed again once its memoized values are dropped.
+        test.write(['s', 'missing'], "s/missing\n")
+        missing.clear_memoized_values()
+        assert missing.exists()
+
     def test_rentry_exists_on_disk(self) -> None:
         """Test the Dir.rentry_exists_on_disk() method
         """
@@ -3357,6 +3445,21 @@ class RepositoryTestCase(_tempdirTestCase):
         finally:
             test.unlink(["rep2", "tstamp"])
 
+    def test_prefetch_csig(self) -> None:
+        """Ensure prefetch_csig() hashes the file found in a Repository"""
+        fs = self.fs
+        test = self.test
+
+        test.write(["rep2", "prefetched"], "prefetched\n")
+        try:
+            f = fs.File("prefetched")
+            f.prefetch_csig()()
+            csig = SCons.Util.hash_signature("prefetched\n")
+            assert f.get_prefetched_csig() == csig, f._memo
+            assert f.get_csig() == csig
+        finally:
+            test.unlink(["rep2", "prefetched"])
+
     def test_get_contents(self) -> None:
         """Ensure get_contents() returns binary contents from Repositories"""
         fs = self.fs
@@ -705,6 +705,30 @@ class NodeTestCase(unittest.TestCase):
         result = node.get_stored_info()
         assert result is None, result
 
+    def test_build_duration(self) -> None:
+        """Test recording and fetching the build duration
+        """
+        node = SCons.Node.Node()
+        # Without build info there is nowhere to record it.
+        node.set_build_duration(1.0)
+        assert not hasattr(node, 'binfo')
+        node.get_binfo()
+        node.set_build_duration(1.5)
+        assert node.get_binfo().bduration == 1.5, node.get_binfo().bduration
+        # The plain Node has no stored info to read back from.
+        assert node.get_build_duration() is None
+
+        class MyEntry:
+            binfo = SCons.Node.BuildInfoBase()
+        entry = MyEntry()
+        entry.binfo.bduration = 2.5
+
+        class MyNode(SCons.Node.Node):
+            def get_stored_info(self):
+                return entry
+        node = MyNode()
+        assert node.get_build_duration() == 2.5, node.get_build_duration()
+
     def test_set_always_build(self) -> None:
         """Test setting a Node's always_build value
         """
@@ -1136,6 +1160,26 @@ class NodeTestCase(unittest.TestCase):
         for kid in [n1, n2, n3, n4, n5, n6, n7, n8, n9, n10, n11, n12]:
             assert kid in kids, kid
 
+    def test_known_children(self) -> None:
+        """Test fetching the children of a Node known without scanning.
+        """
+        class MyNode(SCons.Node.Node):
+            def scan(self) -> None:
+                raise AssertionError("scanned")
+
+        node = MyNode()
+        n1 = SCons.Node.Node()
+        n2 = SCons.Node.Node()
+        n3 = SCons.Node.Node()
+
+        assert node.known_children() == [], node.known_children()
+        node.add_source([n1])
+        node.add_dependency([n2])
+        node.add_prerequisite([n3])
+        kids = node.known_children()
+        assert kids == [n1, n2, n3], kids
+        assert node.sources == [n1], node.sources
+
     def test_state(self) -> None:
         """Test setting and getting the state of a node
         """
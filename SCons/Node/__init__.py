@@ -456,10 +456,13 @@ class BuildInfoBase:
     It contains a NodeInfo instance for this node (signature information
     that's specific to the type of Node) and direct attributes for the
     generic build stuff we have to track:  sources, explicit dependencies,
-    implicit dependencies, and action information.
+    implicit dependencies, and action information.  When the node was
+    actually built, the wall time of the build is kept in *bduration* so
+    the scheduler can favour long chains on the next run.
     """
     __slots__ = ("bsourcesigs", "bdependsigs", "bimplicitsigs", "bactsig",
-                 "bsources", "bdepends", "bact", "bimplicit", "__weakref__")
+                 "bsources", "bdepends", "bact", "bimplicit", "bduration",
+                 "__weakref__")
     current_version_id = 2
 
     def __init__(self) -> None:
@@ -1230,12 +1233,42 @@ class Node(metaclass=NoSlotsPyPy):
             ninfo.csig = hash_signature(self.get_contents())
             return self.ninfo.csig
 
+    def prefetch_csig(self):
+        """Return the I/O-bound part of get_csig(), to run ahead of time.
+
+        Called on the Taskmaster's thread; the callable returned, if
+        any, runs on a helper thread while the Taskmaster is busy with
+        other nodes, so it must not touch the graph or the .sconsign
+        data.  The base class has nothing it can do safely.
+        """
+        return None
+
     def get_cachedir_csig(self) -> str:
         return self.get_csig()
 
     def get_stored_info(self) -> SConsignEntry | None:
         return None
 
+    def set_build_duration(self, duration: float) -> None:
+        """Record how long (in seconds) the last build of this node took.
+
+        The value travels with the build info into the .sconsign file.
+        """
+        try:
+            binfo = self.binfo
+        except AttributeError:
+            # Like visited(): a node with no build info has nothing
+            # stored, so there is nowhere to record the duration.
+            return
+        binfo.bduration = duration
+
+    def get_build_duration(self) -> float | None:
+        """Return the build time recorded in the .sconsign file, if any."""
+        try:
+            return self.get_stored_info().binfo.bduration
+        except AttributeError:
+            return None
+
     def get_stored_implicit(self) -> list[Node] | None:
         """Fetch the stored implicit dependencies"""
         return None
@@ -1419,6 +1452,17 @@ class Node(metaclass=NoSlotsPyPy):
         # internally anyway...)
         return list(chain.from_iterable([_f for _f in [self.sources, self.depends, self.implicit] if _f]))
 
+    def known_children(self) -> list[Node]:
+        """Return the children known without scanning this node.
+
+        Used to look ahead at the build before the Taskmaster gets to
+        the node, so nothing is scanned and nothing is cached.
+        """
+        children = self.all_children(scan=False)
+        if self.prerequisites:
+            children.extend(self.prerequisites)
+        return children
+
     def children(self, scan: bool = True) -> list[Node]:
         """Return a list of the node's direct children, minus those
         that are ignored by this node."""
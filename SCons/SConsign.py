@@ -25,11 +25,15 @@
 
 import SCons.compat  # pylint: disable=wrong-import-order
 
+import contextlib
+import functools
 import os
 import pickle
+import threading
 import time
 
 import SCons.dblite
+import SCons.SConsignCompact
 import SCons.Warnings
 from SCons.compat import PICKLE_PROTOCOL
 from SCons.Util import print_time
@@ -41,8 +45,22 @@ def corrupt_dblite_warning(filename) -> None:
         "Ignoring corrupt .sconsign file: %s" % filename,
     )
 
+def stale_lock_warning(filename) -> None:
+    SCons.Warnings.warn(
+        SCons.Warnings.CorruptSConsignWarning,
+        "Removing stale .sconsign lock file: %s" % filename,
+    )
+
+def busy_lock_warning(filename) -> None:
+    SCons.Warnings.warn(
+        SCons.Warnings.CorruptSConsignWarning,
+        "Could not lock .sconsign file, changes not written: %s" % filename,
+    )
+
 SCons.dblite.IGNORE_CORRUPT_DBFILES = True
 SCons.dblite.corruption_warning = corrupt_dblite_warning
+SCons.dblite.lock_warning = stale_lock_warning
+SCons.dblite.busy_lock_warning = busy_lock_warning
 
 # XXX Get rid of the global array so this becomes re-entrant.
 sig_files = []
@@ -57,6 +75,14 @@ DataBase = {}
 DB_Module = SCons.dblite
 DB_Name = None
 DB_sync_list = []
+# Whether DB entries are written in the SCons.SConsignCompact encoding.
+Compact = False
+# The SCons.SConsignCompact.PathTable of each database handle, by id.
+PathTables = {}
+path_table_lock = threading.Lock()
+# Held while the database handles are used, as a Checkpointer writes
+# to them from its own thread.
+db_lock = threading.Lock()
 
 def current_sconsign_filename():
     hash_format = SCons.Util.get_hash_format()
@@ -65,11 +91,11 @@ def current_sconsign_filename():
     # SCons is md5, then set the database name to be the special default name
     #
     # otherwise, if it defaults to something like 'sha1' or the user explicitly
-    # set 'md5' as the hash format, set the database name to .sconsign_<algorithm>
-    # eg .sconsign_sha1, etc.
+    # set 'md5' as the hash format, set the database name to .sconsign_<format>
+    # eg .sconsign_sha1, .sconsign_blake2b-tree, etc.
     if hash_format is None and current_hash_algorithm == 'md5':
         return ".sconsign"
-    return ".sconsign_" + current_hash_algorithm
+    return ".sconsign_" + SCons.Util.get_current_hash_format_used()
 
 def Get_DataBase(dir):
     global DB_Name
@@ -91,26 +117,410 @@ def Get_DataBase(dir):
                         pass
                     else:
                         if mode != "r":
-                            DB_sync_list.append(db)
+                            add_sync(db)
                         return db, mode
             mode = "r"
     try:
         return DataBase[top], "c"
     except KeyError:
         db = DataBase[top] = DB_Module.open(DB_Name, "c")
-        DB_sync_list.append(db)
+        add_sync(db)
         return db, "c"
     except TypeError:
         print("DataBase =", DataBase)
         raise
 
 
+def add_sync(db) -> None:
+    """Arrange for the writable database *db* to be synced at the end."""
+    if hasattr(db, 'merge'):
+        # Shared with other processes (see SCons.dblite): merge entries.
+        db.merge = functools.partial(merge_database, id(db))
+    DB_sync_list.append(db)
+
+
+def Get_PathTable(db):
+    """Return the path table of the database *db*, reading it on first use."""
+    try:
+        return PathTables[id(db)]
+    except KeyError:
+        pass
+    # Not read while holding path_table_lock: a Checkpointer thread
+    # takes that lock while it holds db_lock.
+    with db_lock:
+        try:
+            value = db[SCons.SConsignCompact.TABLE_KEY]
+        except KeyError:
+            value = None
+    with path_table_lock:
+        try:
+            return PathTables[id(db)]
+        except KeyError:
+            pass
+        try:
+            if value is None:
+                table = SCons.SConsignCompact.PathTable()
+            else:
+                table = SCons.SConsignCompact.PathTable.decode(value)
+        except ValueError:
+            # The entries using it will be ignored as corrupt too.
+            SCons.Warnings.warn(SCons.Warnings.CorruptSConsignWarning,
+                                "Ignoring corrupt sconsign path table")
+            table = SCons.SConsignCompact.PathTable()
+        PathTables[id(db)] = table
+        return table
+
+
+def write_path_table(db) -> None:
+    """Store the path table of *db* if paths were added to it."""
+    table = PathTables.get(id(db))
+    if table is not None and table.dirty:
+        db[SCons.SConsignCompact.TABLE_KEY] = table.encode()
+        table.dirty = False
+
+
+def merge_database(db_id, stored, ours, original) -> dict:
+    """Merge what another SCons process stored in a database with ours.
+
+    The merge function of the database handle with id *db_id*, called
+    by :meth:`SCons.dblite._Dblite.sync` when another process wrote the
+    file since it was read (see :func:`SCons.dblite.merge_keys` for the
+    arguments).  Builds of different parts of a tree sharing one
+    database then keep each other's entries.  A directory only changed
+    here is taken as it is; in one both processes changed, the entries
+    that were changed here replace the stored ones.  If the path tables
+    of the compact encoding went their separate ways, the directories
+    changed here are encoded again for the merged table.
+    """
+    TABLE_KEY = SCons.SConsignCompact.TABLE_KEY
+    table = PathTables.get(db_id)
+    stored_table = None
+    result = dict(stored)
+    with path_table_lock:
+        if TABLE_KEY in stored:
+            try:
+                stored_table = SCons.SConsignCompact.PathTable.decode(stored[TABLE_KEY])
+            except ValueError:
+                pass
+        old_table = table
+        if table is not None and stored_table is not None:
+            old_table = table.merge(stored_table) or table
+        elif stored_table is not None and Compact:
+            table = PathTables[db_id] = stored_table
+
+        def decode(value, table):
+            if SCons.SConsignCompact.is_compact(value):
+                return SCons.SConsignCompact.loads(value, table)
+            return pickle.loads(value)
+
+        def encode(entries):
+            if Compact:
+                return SCons.SConsignCompact.dumps(entries, table)
+            return pickle.dumps(entries, PICKLE_PROTOCOL)
+
+        for key, value in original.items():
+            if key == TABLE_KEY:
+                continue
+            if key not in ours:
+                result.pop(key, None)
+                continue
+            try:
+                if key not in stored or stored[key] == value:
+                    # Nobody else changed it.
+                    if old_table is table or not SCons.SConsignCompact.is_compact(ours[key]):
+                        result[key] = ours[key]
+                    else:
+                        result[key] = encode(decode(ours[key], old_table))
+                    continue
+                entries = decode(stored[key], stored_table or table)
+                before = decode(value, old_table) if value is not None else {}
+                for name, entry in decode(ours[key], old_table).items():
+                    if (name not in before
+                            or pickle.dumps(entry, PICKLE_PROTOCOL)
+                            != pickle.dumps(before[name], PICKLE_PROTOCOL)):
+                        entries[name] = entry
+                result[key] = encode(entries)
+            except Exception:
+                # Can't be decoded: ours is as good as the stored one,
+                # unless it refers to paths that moved.
+                if old_table is table or not SCons.SConsignCompact.is_compact(ours[key]):
+                    result[key] = ours[key]
+        if table is not None:
+            result[TABLE_KEY] = table.encode()
+            table.dirty = False
+    return result
+
+
+class StatCache:
+    """Content signatures of files, keyed by what stat() says about them.
+
+    An entry maps a file's device and inode to the modification time
+    (in nanoseconds), size and content signature it had when it was
+    hashed.  A signature is only handed out again for a file whose
+    device, inode, mtime and size all still match, so any ordinary
+    write to the file, or replacing it, invalidates its entry.
+
+    A file hashed less than :attr:`racy_window` seconds after it was
+    last modified isn't recorded: it might be modified again within the
+    same timestamp tick, which would leave its mtime unchanged.  That
+    relies on the file system clock agreeing with the local one, like
+    ``--max-drift`` does.  Changes made by tools which put back the old
+    mtime and keep the size go unnoticed, as they do for the timestamp
+    deciders.
+
+    Rebuilt or replaced files get new inodes, so entries go stale.
+    Each entry records the last run (a build that wrote the cache) it
+    was used in, and the entries not used in :attr:`max_unused` runs
+    in a row are dropped when the cache is written.  Entries of files
+    a partial build didn't look at survive a few such builds.
+
+    The cache is discarded if it was made with another hash algorithm.
+    It can be deleted at any time, it is just a cache.
+    """
+
+    racy_window = 2
+    max_unused = 5
+    version = 2
+
+    def __init__(self, path) -> None:
+        self.path = path
+        self.hash_format = SCons.Util.get_current_hash_format_used()
+        self.entries = {}
+        self.run = 0
+        self.used = set()
+        self.dirty = False
+        try:
+            with open(path, 'rb') as f:
+                data = pickle.load(f)
+        except OSError:
+            return
+        except Exception:
+            SCons.Warnings.warn(SCons.Warnings.CorruptSConsignWarning,
+                                "Ignoring corrupt csig cache file: %s" % path)
+            return
+        if (isinstance(data, dict)
+                and data.get('version') == self.version
+                and data.get('hash_format') == self.hash_format):
+            self.entries = data['entries']
+            self.run = data['run'] + 1
+
+    def get(self, st):
+        """Return the csig recorded for the file *st* is the stat of, or None."""
+        if not st.st_ino:
+            # Not a file's identity: a stat from os.scandir() on Windows.
+            return None
+        key = (st.st_dev, st.st_ino)
+        try:
+            mtime_ns, size, csig, _ = self.entries[key]
+        except KeyError:
+            return None
+        if mtime_ns != st.st_mtime_ns or size != st.st_size:
+            return None
+        self.used.add(key)
+        return csig
+
+    def set(self, st, csig, hashed) -> None:
+        """Record *csig* for the file *st* is the stat of.
+
+        *hashed* is the time the file started to be read.
+        """
+        if hashed - st.st_mtime < self.racy_window or not st.st_ino:
+            return
+        self.entries[(st.st_dev, st.st_ino)] = (st.st_mtime_ns, st.st_size, csig, self.run)
+        self.dirty = True
+
+    def prune(self) -> None:
+        """Mark the entries used in this run, and drop the long unused ones."""
+        for key in self.used:
+            entry = self.entries.get(key)
+            if entry is not None and entry[3] != self.run:
+                self.entries[key] = entry[:3] + (self.run,)
+                self.dirty = True
+        self.used.clear()
+        oldest = self.run - self.max_unused
+        stale = [key for key, entry in self.entries.items() if entry[3] <= oldest]
+        for key in stale:
+            del self.entries[key]
+        if stale:
+            self.dirty = True
+
+    def write(self) -> None:
+        self.prune()
+        if not self.dirty:
+            return
+        data = {
+            'version': self.version,
+            'hash_format': self.hash_format,
+            'run': self.run,
+            'entries': self.entries,
+        }
+        temp = '%s.%d' % (self.path, os.getpid())
+        try:
+            with open(temp, 'wb') as f:
+                pickle.dump(data, f, PICKLE_PROTOCOL)
+            os.replace(temp, self.path)
+        except OSError:
+            # Failing to save a cache is no reason to fail the build.
+            try:
+                os.unlink(temp)
+            except OSError:
+                pass
+        self.dirty = False
+
+
+# The StatCache of the build, stored next to the signature database.
+stat_cache = None
+stat_cache_lock = threading.Lock()
+
+
+def Get_StatCache(top):
+    """Return the stat-keyed csig cache, reading it in on first use.
+
+    *top* is the top-level directory Node.  May be called from any thread.
+    """
+    global stat_cache
+    if stat_cache is None:
+        with stat_cache_lock:
+            if stat_cache is None:
+                name = DB_Name
+                if name is None:
+                    name = current_sconsign_filename()
+                if not os.path.isabs(name):
+                    name = top.entry_abspath(name)
+                stat_cache = StatCache(name + '.csig')
+    return stat_cache
+
+
+class Checkpointer:
+    """Writes the signatures gathered so far while the build runs.
+
+    A build that is interrupted, or killed, then loses only what was
+    gathered since the last checkpoint, not everything.  A checkpoint
+    is due once *interval* seconds have passed, or *nodes* nodes have
+    been evaluated, since the last one; zero turns either off.
+
+    :meth:`update` is called from the taskmaster thread as nodes are
+    evaluated.  When a checkpoint is due, it encodes the entries that
+    changed since the last one, which is all that is done in that
+    thread, and hands them to a background thread that stores them and
+    syncs the databases.  Every database module syncs atomically, and
+    per-directory files are written to a temporary file and renamed.
+    With a module that sets ``THREADSAFE`` (:mod:`SCons.dblite`,
+    :mod:`SCons.dbsqlite`), the background thread doesn't take
+    :data:`db_lock`, so the taskmaster thread reading in the signatures
+    of more directories doesn't wait for a sync, which for a shared
+    dblite file may have to wait for another process.  Other modules
+    are only used under the lock.
+    If the previous checkpoint is still being written, the next one
+    waits for a later update rather than for the writer.
+    """
+
+    def __init__(self, interval: float=0, nodes: int=0) -> None:
+        self.interval = interval
+        self.nodes = nodes
+        self.count = 0
+        self.last = time.monotonic()
+        self.thread = None
+        self.written = []
+        self.tables = []
+        self.error = None
+        self.checkpoints = 0
+
+    def due(self) -> bool:
+        if self.nodes and self.count >= self.nodes:
+            return True
+        return bool(self.interval) and time.monotonic() - self.last >= self.interval
+
+    def update(self, nodes: int=1) -> None:
+        """Note that *nodes* more nodes were evaluated, and start a
+        checkpoint if one is due."""
+        self.count += nodes
+        if self.thread is not None:
+            if self.thread.is_alive():
+                return
+            self.wait()
+        if self.error is not None or not self.due():
+            return
+        self.count = 0
+        self.last = time.monotonic()
+
+        writes = []
+        self.written = []
+        for sig_file in sig_files:
+            write = sig_file.checkpoint()
+            if write is not None:
+                writes.append(write)
+                self.written.append(sig_file)
+        self.tables = []
+        for db in DB_sync_list:
+            table = PathTables.get(id(db))
+            if table is not None and table.dirty:
+                writes.append(functools.partial(
+                    db.__setitem__, SCons.SConsignCompact.TABLE_KEY, table.encode()
+                ))
+                table.dirty = False
+                self.tables.append(table)
+        if not writes:
+            return
+        self.thread = threading.Thread(
+            target=self.write, args=(writes, list(DB_sync_list)), daemon=True
+        )
+        self.thread.start()
+
+    def write(self, writes, dbs) -> None:
+        if getattr(DB_Module, 'THREADSAFE', False):
+            lock = contextlib.nullcontext()
+        else:
+            lock = db_lock
+        try:
+            with lock:
+                for write in writes:
+                    write()
+                for db in dbs:
+                    try:
+                        syncmethod = db.sync
+                    except AttributeError:
+                        pass # Not all dbm modules have sync() methods.
+                    else:
+                        syncmethod()
+        except Exception as e:
+            self.error = e
+        else:
+            self.checkpoints += 1
+
+    def wait(self) -> None:
+        """Wait for the checkpoint being written, if any.
+
+        If it failed, the entries it took are marked as changed again
+        so the final write stores them, and there are no further
+        checkpoints.
+        """
+        if self.thread is None:
+            return
+        self.thread.join()
+        self.thread = None
+        if self.error is not None:
+            for sig_file in self.written:
+                sig_file.checkpoint_failed()
+            for table in self.tables:
+                table.dirty = True
+        self.written = []
+        self.tables = []
+
+
+# The Checkpointer of the build, if checkpoints were asked for.
+checkpointer = None
+
+
 def Reset() -> None:
     """Reset global state.  Used by unit tests that end up using
     SConsign multiple times to get a clean slate for each test."""
-    global sig_files, DB_sync_list
+    global sig_files, DB_sync_list, stat_cache, checkpointer
     sig_files = []
     DB_sync_list = []
+    stat_cache = None
+    checkpointer = None
+    PathTables.clear()
 
 
 normcase = os.path.normcase
@@ -120,9 +530,12 @@ def write() -> None:
     if print_time():
         start_time = time.perf_counter()
 
+    if checkpointer is not None:
+        checkpointer.wait()
     for sig_file in sig_files:
         sig_file.write(sync=0)
     for db in DB_sync_list:
+        write_path_table(db)
         try:
             syncmethod = db.sync
         except AttributeError:
@@ -135,6 +548,8 @@ def write() -> None:
             pass # Not all dbm modules have close() methods.
         else:
             closemethod()
+    if stat_cache is not None:
+        stat_cache.write()
 
     if print_time():
         elapsed = time.perf_counter() - start_time
@@ -238,6 +653,19 @@ class Base:
             self.entries[key] = entry
         self.to_be_merged = {}
 
+    def checkpoint(self):
+        """Encode the entries changed since the last checkpoint.
+
+        Returns a function that stores them, for a :class:`Checkpointer`
+        to call from its own thread, or None if there's nothing to store.
+        The entries count as written from then on.
+        """
+        return None
+
+    def checkpoint_failed(self) -> None:
+        """Mark the entries taken by a failed checkpoint as changed."""
+        self.dirty = True
+
 
 class DB(Base):
     """
@@ -257,12 +685,18 @@ class DB(Base):
         # information.
         path = normcase(dir.get_tpath())
         try:
-            rawentries = db[path]
+            with db_lock:
+                rawentries = db[path]
         except KeyError:
             pass
         else:
             try:
-                self.entries = pickle.loads(rawentries)
+                if SCons.SConsignCompact.is_compact(rawentries):
+                    table = Get_PathTable(db)
+                    with path_table_lock:
+                        self.entries = SCons.SConsignCompact.loads(rawentries, table)
+                else:
+                    self.entries = pickle.loads(rawentries)
                 if not isinstance(self.entries, dict):
                     self.entries = {}
                     raise TypeError
@@ -297,11 +731,10 @@ class DB(Base):
         # the Repository; we only write to our own .sconsign file,
         # not to .sconsign files in Repositories.
         path = normcase(self.dir.get_internal_path())
-        for key, entry in self.entries.items():
-            entry.convert_to_sconsign()
-        db[path] = pickle.dumps(self.entries, PICKLE_PROTOCOL)
+        db[path] = self.encode(db)
 
         if sync:
+            write_path_table(db)
             try:
                 syncmethod = db.sync
             except AttributeError:
@@ -310,6 +743,130 @@ class DB(Base):
             else:
                 syncmethod()
 
+    def encode(self, db) -> bytes:
+        for key, entry in self.entries.items():
+            entry.convert_to_sconsign()
+        if Compact:
+            table = Get_PathTable(db)
+            with path_table_lock:
+                return SCons.SConsignCompact.dumps(self.entries, table)
+        return pickle.dumps(self.entries, PICKLE_PROTOCOL)
+
+    def checkpoint(self):
+        if not self.dirty:
+            return None
+
+        self.merge()
+
+        db, mode = Get_DataBase(self.dir)
+        path = normcase(self.dir.get_internal_path())
+        value = self.encode(db)
+        self.dirty = False
+        return functools.partial(db.__setitem__, path, value)
+
+
+class EntryDB(Base):
+    """
+    A Base subclass for databases that store each entry separately.
+
+    Used when the database module sets ``PER_ENTRY`` (see
+    :mod:`SCons.dbsqlite`).  Entries are fetched from the database
+    one at a time, when first asked for, and only the entries that
+    were changed are written back.
+    """
+    def __init__(self, dir) -> None:
+        super().__init__()
+
+        self.dir = dir
+        self.changed = set()
+
+        self.db, mode = Get_DataBase(dir)
+        # Read using the path relative to the top of the Repository
+        # (self.dir.tpath) from which we're fetching the signature
+        # information, like DB does.
+        self.path = normcase(dir.get_tpath())
+
+        if mode == "r":
+            self.set_entry = self.do_not_set_entry
+            self.store_info = self.do_not_store_info
+
+        sig_files.append(self)
+
+    def get_entry(self, filename):
+        try:
+            return self.entries[filename]
+        except KeyError:
+            pass
+        with db_lock:
+            rawentry = self.db.get_entry(self.path, filename)
+        try:
+            entry = pickle.loads(rawentry)
+        except KeyboardInterrupt:
+            raise
+        except Exception as e:
+            SCons.Warnings.warn(SCons.Warnings.CorruptSConsignWarning,
+                                "Ignoring corrupt sconsign entry : %s (%s)\n"
+                                % (os.path.join(self.path, filename), e))
+            raise KeyError(filename)
+        entry.convert_from_sconsign(self.dir, filename)
+        self.entries[filename] = entry
+        return entry
+
+    def set_entry(self, filename, obj) -> None:
+        super().set_entry(filename, obj)
+        self.changed.add(filename)
+
+    def merge(self) -> None:
+        self.changed.update(self.to_be_merged)
+        super().merge()
+
+    def write(self, sync: int=1) -> None:
+        if not self.dirty:
+            return
+
+        self.merge()
+
+        # Write using the path relative to the top of the SConstruct
+        # directory, we only write to our own database.
+        db, mode = Get_DataBase(self.dir)
+        path = normcase(self.dir.get_internal_path())
+        for filename, value in self.encode():
+            db.set_entry(path, filename, value)
+
+        if sync:
+            db.sync()
+
+    def encode(self):
+        """Return the changed entries, pickled, and forget the changes."""
+        values = []
+        for filename in self.changed:
+            entry = self.entries[filename]
+            entry.convert_to_sconsign()
+            values.append((filename, pickle.dumps(entry, PICKLE_PROTOCOL)))
+        self.changed = set()
+        self.dirty = False
+        return values
+
+    def checkpoint(self):
+        if not self.dirty:
+            return None
+
+        self.merge()
+
+        db, mode = Get_DataBase(self.dir)
+        path = normcase(self.dir.get_internal_path())
+        values = self.encode()
+
+        def write() -> None:
+            for filename, value in values:
+                db.set_entry(path, filename, value)
+        return write
+
+    def checkpoint_failed(self) -> None:
+        # What was changed isn't known anymore, store everything.
+        super().checkpoint_failed()
+        self.changed.update(self.entries)
+
 
 class Dir(Base):
     def __init__(self, fp=None, dir=None) -> None:
@@ -417,23 +974,56 @@ class DirFile(Dir):
         except OSError:
             pass
 
+    def checkpoint(self):
+        if not self.dirty:
+            return None
+
+        self.merge()
+
+        for key, entry in self.entries.items():
+            entry.convert_to_sconsign()
+        data = pickle.dumps(self.entries, PICKLE_PROTOCOL)
+        self.dirty = False
+        temp = os.path.join(self.dir.get_internal_path(), '.scons%d' % os.getpid())
+
+        def write() -> None:
+            # Unlike write(), don't fall back to writing the file in
+            # place: if this fails, the entries are written at the end.
+            with open(temp, 'wb') as f:
+                f.write(data)
+            os.replace(temp, self.sconsign)
+        return write
+
 ForDirectory = DB
 
 
-def File(name, dbm_module=None) -> None:
+def File(name, dbm_module=None, compact: bool=False) -> None:
     """
     Arrange for all signatures to be stored in a global .sconsign.db*
     file.
+
+    If *compact* is true, directories are written to the database in the
+    :mod:`SCons.SConsignCompact` encoding.  It doesn't apply to databases
+    that store entries one at a time, nor to per-directory files.
     """
-    global ForDirectory, DB_Name, DB_Module
+    global ForDirectory, DB_Name, DB_Module, Compact
+    Compact = compact
     if name is None:
         ForDirectory = DirFile
         DB_Module = None
     else:
-        ForDirectory = DB
         DB_Name = name
         if dbm_module is not None:
             DB_Module = dbm_module
+            if hasattr(dbm_module, 'corruption_warning'):
+                # One of our own modules (SCons.dblog, SCons.dbsqlite):
+                # have it warn like dblite does.
+                dbm_module.IGNORE_CORRUPT_DBFILES = True
+                dbm_module.corruption_warning = corrupt_dblite_warning
+        if getattr(DB_Module, 'PER_ENTRY', False):
+            ForDirectory = EntryDB
+        else:
+            ForDirectory = DB
 
 # Local Variables:
 # tab-width:4
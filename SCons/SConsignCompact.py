@@ -0,0 +1,425 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright The SCons Foundation
+
+"""
+A compact encoding of the entries of a signature database.
+
+Selected with ``SConsignFile(compact=True)``.  The usual pickle of a
+directory's entries repeats every dependency path in each directory
+that uses it and stores each content signature as a hex string in a
+small pickled object.  In the compact encoding:
+
+* The paths of the dependencies are kept once per database, in a
+  :class:`PathTable` stored under the :data:`TABLE_KEY` key.
+* The dependencies of a directory's targets are kept once per
+  directory, as fixed size records (the index of the path, flags,
+  timestamp, size and the raw bytes of the digest) packed with
+  :mod:`struct`.
+* The dependency lists of a target are arrays of runs of consecutive
+  record indices, which are short, because the targets of a directory
+  mostly depend on the same files in the same order.
+
+Only entries of the usual :class:`SCons.Node.FS.FileBuildInfo` kind are
+encoded like this.  Other entries, and signatures that don't fit in a
+record, are pickled as they are.  Encoded values start with
+:data:`MAGIC` and a version byte, so they can be told apart from
+pickles, which the database may still hold.
+"""
+
+from __future__ import annotations
+
+import os
+import pickle
+import struct
+import sys
+from array import array
+
+import SCons.Node.FS
+import SCons.SConsign
+from SCons.compat import PICKLE_PROTOCOL
+
+MAGIC = b"\x00SCc"
+VERSION = 1
+
+# The database key of the path table: not a valid directory path.
+TABLE_KEY = "\x00paths"
+TABLE_ID_SIZE = 8
+
+# A signature: flags, timestamp, size, then the digest bytes.  A
+# dependency record has the index of its path in front.
+NODEINFO_FORMAT = "<Bqq%ds"
+DEPENDENCY_FORMAT = "<I" + NODEINFO_FORMAT[1:]
+HAS_CSIG = 0x1
+HAS_TIMESTAMP = 0x2
+HAS_SIZE = 0x4
+
+# The BuildInfo attributes stored as dependency records.
+DEPENDENCY_ATTRS = (
+    ('bsources', 'bsourcesigs'),
+    ('bdepends', 'bdependsigs'),
+    ('bimplicit', 'bimplicitsigs'),
+)
+
+_header = MAGIC + bytes([VERSION])
+
+
+def is_compact(value) -> bool:
+    """Tell whether the database *value* is in the compact encoding."""
+    return value[:len(MAGIC)] == MAGIC
+
+
+class PathTable:
+    """The paths of a database, each stored once and referred to by index.
+
+    Paths are only ever added, so the indices held by values already in
+    the database stay valid.  :attr:`dirty` is set while the table needs
+    storing: when it is new, or a path was added.  Each table has a
+    random :attr:`id`, which is stored in the values that use it, so a
+    value is never decoded with another table (say, after a corrupt
+    table was replaced).
+
+    The table also holds the NodeInfos decoded from the database's
+    dependency records, by their packed bytes: a header used all over
+    the tree is decoded once, not once per directory.
+    """
+
+    def __init__(self, paths=None, id=None) -> None:  # pylint: disable=redefined-builtin
+        self.paths = list(paths or ())
+        self.index = {path: i for i, path in enumerate(self.paths)}
+        self.dirty = id is None
+        self.id = id or os.urandom(TABLE_ID_SIZE)
+        self.nodeinfos = {}
+
+    def add(self, path) -> int:
+        """Return the index of *path*, adding it if it isn't there."""
+        try:
+            return self.index[path]
+        except KeyError:
+            i = self.index[path] = len(self.paths)
+            self.paths.append(path)
+            self.dirty = True
+            return i
+
+    def merge(self, stored) -> PathTable | None:
+        """Take in the paths of *stored*, the table as another process
+        stored it.
+
+        If one of the two only added paths to the other, the table ends
+        up with the paths of both at the same indices.  Otherwise they
+        were both extended from the same table, or aren't related at
+        all: the table becomes *stored* followed by the paths only this
+        table had.  Values encoded with it then have to be encoded
+        again, so a copy of the table as it was is returned to decode
+        them with; None is returned if they are still valid.
+        """
+        if stored.id == self.id and (
+            self.paths[:len(stored.paths)] == stored.paths[:len(self.paths)]
+        ):
+            for path in stored.paths[len(self.paths):]:
+                self.add(path)
+            return None
+        old = PathTable(self.paths, self.id)
+        self.paths = list(stored.paths)
+        self.index = {path: i for i, path in enumerate(self.paths)}
+        self.id = stored.id
+        for path in old.paths:
+            self.add(path)
+        self.dirty = True
+        return old
+
+    def encode(self) -> bytes:
+        data = "\0".join(self.paths).encode("utf-8", "surrogateescape")
+        return _header + self.id + data
+
+    @classmethod
+    def decode(cls, value) -> PathTable:
+        start = len(_header) + TABLE_ID_SIZE
+        if value[:len(_header)] != _header or len(value) < start:
+            raise ValueError("not a version %d path table" % VERSION)
+        data = value[start:].decode("utf-8", "surrogateescape")
+        return cls(data.split("\0") if data else (), value[len(_header):start])
+
+    @classmethod
+    def read(cls, db) -> PathTable:
+        """Return the path table of *db*, a new one if it has none."""
+        try:
+            value = db[TABLE_KEY]
+        except KeyError:
+            return cls()
+        return cls.decode(value)
+
+
+def _to_little_endian(a) -> array:
+    if sys.byteorder == "big":
+        a.byteswap()
+    return a
+
+
+def _pack_nodeinfo(ninfo, digest_size):
+    """Return the fields of a record for *ninfo*, or None if it can't be one.
+
+    *digest_size* is a one-item list holding the digest size of the
+    records packed so far, or None before the first.
+    """
+    if type(ninfo) is not SCons.Node.FS.FileNodeInfo:
+        return None
+    flags = 0
+    digest = b""
+    timestamp = size = 0
+    csig = getattr(ninfo, "csig", None)
+    if csig is not None:
+        if not isinstance(csig, str):
+            return None
+        try:
+            digest = bytes.fromhex(csig)
+        except ValueError:
+            return None
+        if digest.hex() != csig:
+            # Upper case or otherwise not our own hex digest.
+            return None
+        if digest_size[0] is None:
+            digest_size[0] = len(digest)
+        elif len(digest) != digest_size[0]:
+            return None
+        flags |= HAS_CSIG
+    if hasattr(ninfo, "timestamp"):
+        timestamp = ninfo.timestamp
+        if type(timestamp) is not int:
+            return None
+        flags |= HAS_TIMESTAMP
+    if hasattr(ninfo, "size"):
+        size = ninfo.size
+        if type(size) is not int:
+            return None
+        flags |= HAS_SIZE
+    if not (-2**63 <= timestamp < 2**63 and -2**63 <= size < 2**63):
+        return None
+    return flags, timestamp, size, digest
+
+
+def _unpack_nodeinfo(flags, timestamp, size, digest):
+    ninfo = SCons.Node.FS.FileNodeInfo()
+    if flags & HAS_CSIG:
+        ninfo.csig = digest.hex()
+    if flags & HAS_TIMESTAMP:
+        ninfo.timestamp = timestamp
+    if flags & HAS_SIZE:
+        ninfo.size = size
+    return ninfo
+
+
+def _compact_binfo(entry):
+    """Return the BuildInfo state of *entry* if it can be encoded, or None."""
+    if type(entry) is not SCons.SConsign.SConsignEntry:
+        return None
+    if not hasattr(entry, "ninfo"):
+        return None
+    binfo = getattr(entry, "binfo", None)
+    if type(binfo) is not SCons.Node.FS.FileBuildInfo:
+        return None
+    state = binfo.__getstate__()
+    del state["_version_id"]
+    state.pop("dependency_map", None)
+    if isinstance(state.get("bactsig"), bytes):
+        return None
+    for nattr, sattr in DEPENDENCY_ATTRS:
+        paths = state.get(nattr)
+        sigs = state.get(sattr)
+        if not isinstance(paths, list) or not isinstance(sigs, list):
+            return None
+        if len(paths) != len(sigs):
+            return None
+        if not all(type(p) is str for p in paths):
+            return None
+    return state
+
+
+def _runs(indices) -> list:
+    """Return *indices* as a flat list of (start, count) runs."""
+    runs = []
+    start = count = None
+    for i in indices:
+        if count is not None and i == start + count:
+            count += 1
+        else:
+            if count is not None:
+                runs += (start, count)
+            start, count = i, 1
+    if count is not None:
+        runs += (start, count)
+    return runs
+
+
+def dumps(entries, table: PathTable) -> bytes:
+    """Encode the *entries* of a directory, adding their paths to *table*.
+
+    The entries must already have been converted for storing.
+    """
+    digest_size = [None]
+    records = []
+    record_index = {}
+    objects = []
+    object_index = {}
+
+    def dependency_index(path, ninfo) -> int:
+        path = table.add(path)
+        fields = _pack_nodeinfo(ninfo, digest_size)
+        if fields is not None:
+            fields = (path,) + fields
+            try:
+                return record_index[fields]
+            except KeyError:
+                i = record_index[fields] = len(records)
+                records.append(fields)
+                return i
+        # Kept by identity, like pickle would, and numbered after the
+        # records once we know how many of those there are.
+        key = (path, id(ninfo))
+        try:
+            return ~object_index[key]
+        except KeyError:
+            i = object_index[key] = len(objects)
+            objects.append((path, ninfo))
+            return ~i
+
+    encoded = []
+    for name, entry in entries.items():
+        state = _compact_binfo(entry)
+        if state is None:
+            encoded.append((name, entry))
+            continue
+        ninfo = entry.ninfo
+        fields = _pack_nodeinfo(ninfo, digest_size)
+        if fields is not None:
+            ninfo = fields
+        lists = [
+            [dependency_index(p, s) for p, s in zip(state.pop(nattr), state.pop(sattr))]
+            for nattr, sattr in DEPENDENCY_ATTRS
+        ]
+        bactsig = state.get("bactsig")
+        if isinstance(bactsig, str):
+            try:
+                raw = bytes.fromhex(bactsig)
+            except ValueError:
+                pass
+            else:
+                if raw.hex() == bactsig:
+                    state["bactsig"] = raw
+        encoded.append((name, (ninfo, state, lists)))
+
+    size = digest_size[0] or 0
+    nodeinfo = struct.Struct(NODEINFO_FORMAT % size)
+    dependency = struct.Struct(DEPENDENCY_FORMAT % size)
+    packed = b"".join(dependency.pack(*fields) for fields in records)
+    nrecords = len(records)
+    typecode = "H" if nrecords + len(objects) < 0x10000 else "I"
+
+    # Targets built the same way often have the same dependency lists:
+    # use one bytes object for each, so it is only pickled once.
+    arrays = {}
+
+    def runs_array(indices) -> bytes:
+        indices = [nrecords + ~i if i < 0 else i for i in indices]
+        b = _to_little_endian(array(typecode, _runs(indices))).tobytes()
+        return arrays.setdefault(b, b)
+
+    result = []
+    for name, data in encoded:
+        if isinstance(data, tuple):
+            ninfo, state, lists = data
+            if isinstance(ninfo, tuple):
+                ninfo = nodeinfo.pack(*ninfo)
+            data = (ninfo, state, tuple(runs_array(l) for l in lists))
+        result.append((name, data))
+
+    return _header + pickle.dumps(
+        (table.id, typecode, size, packed, objects, result), PICKLE_PROTOCOL
+    )
+
+
+def loads(value, table: PathTable) -> dict:
+    """Decode a directory's entries from *value*.
+
+    *table* is the :class:`PathTable` of the database.
+    """
+    if value[:len(_header)] != _header:
+        raise ValueError("not a version %d compact entry" % VERSION)
+    table_id, typecode, size, packed, objects, encoded = pickle.loads(
+        value[len(_header):]
+    )
+    if table_id != table.id:
+        raise ValueError("entry written with another path table")
+    nodeinfo = struct.Struct(NODEINFO_FORMAT % size)
+    dependency = struct.Struct("<I%ds" % nodeinfo.size)
+    paths = table.paths
+    nodeinfos = table.nodeinfos
+    dep_paths = []
+    dep_sigs = []
+    for path, packed_nodeinfo in dependency.iter_unpack(packed):
+        dep_paths.append(paths[path])
+        try:
+            dep_sigs.append(nodeinfos[packed_nodeinfo])
+        except KeyError:
+            ninfo = _unpack_nodeinfo(*nodeinfo.unpack(packed_nodeinfo))
+            nodeinfos[packed_nodeinfo] = ninfo
+            dep_sigs.append(ninfo)
+    for path, ninfo in objects:
+        dep_paths.append(paths[path])
+        dep_sigs.append(ninfo)
+
+    # Like the NodeInfos, the lists for the same runs are shared: they
+    # are replaced, not modified, once read.
+    decoded = {}
+
+    def dependencies(runs):
+        try:
+            found_paths, found_sigs = decoded[runs]
+        except KeyError:
+            found_paths = []
+            found_sigs = []
+            a = _to_little_endian(array(typecode, runs))
+            for i in range(0, len(a), 2):
+                start = a[i]
+                end = start + a[i + 1]
+                if end > len(dep_paths):
+                    raise IndexError("dependency index out of range")
+                found_paths += dep_paths[start:end]
+                found_sigs += dep_sigs[start:end]
+            decoded[runs] = found_paths, found_sigs
+        return found_paths, found_sigs
+
+    FileBuildInfo = SCons.Node.FS.FileBuildInfo
+    set_attr = object.__setattr__
+    SConsignEntry = SCons.SConsign.SConsignEntry
+    entries = {}
+    for name, data in encoded:
+        if not isinstance(data, tuple):
+            entries[name] = data
+            continue
+        ninfo, state, lists = data
+        entry = SConsignEntry()
+        if isinstance(ninfo, bytes):
+            # Each target gets its own NodeInfo, it gets updated.
+            ninfo = _unpack_nodeinfo(*nodeinfo.unpack(ninfo))
+        entry.ninfo = ninfo
+        # A new FileBuildInfo has no dependency_map to invalidate, so
+        # skip its __setattr__.
+        binfo = entry.binfo = FileBuildInfo.__new__(FileBuildInfo)
+        set_attr(binfo, "bactsig", None)
+        for key, val in state.items():
+            if key == "bactsig" and isinstance(val, bytes):
+                val = val.hex()
+            set_attr(binfo, key, val)
+        for (nattr, sattr), runs in zip(DEPENDENCY_ATTRS, lists):
+            found_paths, found_sigs = dependencies(runs)
+            set_attr(binfo, nattr, found_paths)
+            set_attr(binfo, sattr, found_sigs)
+        entries[name] = entry
+    return entries
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
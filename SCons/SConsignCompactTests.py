@@ -0,0 +1,211 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright The SCons Foundation
+
+import pickle
+import unittest
+
+import SCons.Node.FS
+import SCons.Node.Python
+import SCons.SConsign
+import SCons.SConsignCompact
+from SCons.SConsignCompact import PathTable, dumps, loads, is_compact
+from SCons.compat import PICKLE_PROTOCOL
+
+
+def ninfo(csig=None, timestamp=None, size=None):
+    ni = SCons.Node.FS.FileNodeInfo()
+    if csig is not None:
+        ni.csig = csig
+    if timestamp is not None:
+        ni.timestamp = timestamp
+    if size is not None:
+        ni.size = size
+    return ni
+
+
+def entry(sources, implicit, depends=()):
+    e = SCons.SConsign.SConsignEntry()
+    e.ninfo = ninfo('ff' * 16, 1700000000, 1000)
+    binfo = e.binfo = SCons.Node.FS.FileBuildInfo()
+    binfo.bsources = [p for p, _ in sources]
+    binfo.bsourcesigs = [s for _, s in sources]
+    binfo.bdepends = [p for p, _ in depends]
+    binfo.bdependsigs = [s for _, s in depends]
+    binfo.bimplicit = [p for p, _ in implicit]
+    binfo.bimplicitsigs = [s for _, s in implicit]
+    binfo.bact = 'cc -o $TARGET $SOURCES'
+    binfo.bactsig = '0123456789abcdef' * 2
+    binfo.bduration = 0.5
+    return e
+
+
+def state(e):
+    """Everything about an entry that gets stored, for comparing."""
+    def fields(obj):
+        s = obj.__getstate__()
+        for key, value in s.items():
+            if isinstance(value, list):
+                s[key] = [v.__getstate__() if hasattr(v, '__getstate__') else v
+                          for v in value]
+        return s
+    return (type(e.ninfo), fields(e.ninfo), type(e.binfo), fields(e.binfo))
+
+
+class PathTableTestCase(unittest.TestCase):
+
+    def test_PathTable(self) -> None:
+        """Test adding paths and storing the table"""
+        table = PathTable()
+        assert table.dirty
+        table.dirty = False
+        assert table.add('a.h') == 0
+        assert table.add('include/b.h') == 1
+        assert table.add('a.h') == 0
+        assert table.dirty
+
+        decoded = PathTable.decode(table.encode())
+        assert decoded.paths == ['a.h', 'include/b.h'], decoded.paths
+        assert decoded.id == table.id
+        assert decoded.id != PathTable().id
+        table = decoded
+        assert not table.dirty
+        assert table.add('include/b.h') == 1
+        assert not table.dirty
+
+        assert PathTable.decode(PathTable().encode()).paths == []
+        assert PathTable.read({}).paths == []
+        with self.assertRaises(ValueError):
+            PathTable.decode(b'garbage')
+
+    def test_merge(self) -> None:
+        """Test taking in the paths another process stored"""
+        table = PathTable(['a.h'])
+        stored = PathTable.decode(table.encode())
+        stored.add('b.h')
+        table.dirty = False
+        assert table.merge(stored) is None
+        assert table.paths == ['a.h', 'b.h'], table.paths
+        assert table.dirty
+
+        # Both added a path: the stored indices win.
+        stored = PathTable.decode(table.encode())
+        stored.add('c.h')
+        table.add('d.h')
+        old = table.merge(stored)
+        assert old.paths == ['a.h', 'b.h', 'd.h'], old.paths
+        assert table.paths == ['a.h', 'b.h', 'c.h', 'd.h'], table.paths
+        assert table.add('d.h') == 3
+        assert table.id == stored.id
+
+        # An unrelated table.
+        other = PathTable(['x.h'])
+        old = table.merge(other)
+        assert old.id == stored.id
+        assert table.paths == ['x.h', 'a.h', 'b.h', 'c.h', 'd.h'], table.paths
+        assert table.id == other.id
+
+
+class CompactTestCase(unittest.TestCase):
+
+    def test_roundtrip(self) -> None:
+        """Test encoding and decoding the entries of a directory"""
+        header = ninfo('aa' * 16, 1600000000, 50)
+        entries = {
+            'a.o': entry([('a.c', ninfo('01' * 16, 1600000001, 10))],
+                         [('a.h', header), ('/usr/include/stdio.h', ninfo('02' * 16, 5, 2000))],
+                         [('dep', ninfo(timestamp=7))]),
+            'b.o': entry([('b.c', ninfo('03' * 16, 1600000002, 20))],
+                         [('a.h', ninfo('aa' * 16, 1600000000, 50))]),
+        }
+        expect = {name: state(e) for name, e in entries.items()}
+
+        table = PathTable()
+        value = dumps(entries, table)
+        assert is_compact(value)
+        assert not is_compact(pickle.dumps(entries, PICKLE_PROTOCOL))
+        assert table.paths.count('a.h') == 1, table.paths
+        assert table.dirty
+
+        result = loads(value, table)
+        assert sorted(result) == ['a.o', 'b.o'], result
+        for name, e in result.items():
+            assert type(e) is SCons.SConsign.SConsignEntry, e
+            assert state(e) == expect[name], (state(e), expect[name])
+        # The same signature record is shared, but not the targets' own.
+        assert result['a.o'].binfo.bimplicitsigs[0] is result['b.o'].binfo.bimplicitsigs[0]
+        assert result['a.o'].ninfo is not result['b.o'].ninfo
+
+        # Encoding again adds nothing to the table.
+        table.dirty = False
+        assert dumps(result, table) == value
+        assert not table.dirty
+
+        # Dependencies decoded before are shared between directories.
+        other = loads(dumps({'c.o': entries['b.o']}, table), table)
+        assert other['c.o'].binfo.bimplicitsigs[0] is result['b.o'].binfo.bimplicitsigs[0]
+
+    def test_size(self) -> None:
+        """Test that shared paths and signatures take less room than a pickle"""
+        headers = [('include/header%d.h' % i, ninfo('%032x' % i, 1600000000 + i, 1000 + i))
+                   for i in range(100)]
+        entries = {'f%d.o' % i: entry([('f%d.c' % i, ninfo('%032x' % (1000 + i), 1, 2))], headers)
+                   for i in range(50)}
+        for e in entries.values():
+            e.convert_to_sconsign()
+        pickled = pickle.dumps(entries, PICKLE_PROTOCOL)
+        table = PathTable()
+        compact = dumps(entries, table)
+        assert len(compact) * 4 < len(pickled), (len(compact), len(pickled))
+
+    def test_fallback(self) -> None:
+        """Test entries and signatures that are stored as they are"""
+        odd = entry([('upper', ninfo('AB' * 16, 1, 2)),
+                     ('short', ninfo('abcd', 1, 2)),
+                     ('float', ninfo('cd' * 16, 1.5, 2)),
+                     ('value', SCons.Node.Python.ValueNodeInfo())],
+                    [])
+        odd.binfo.bsourcesigs[3].csig = 'some value'
+        conf = SCons.SConsign.SConsignEntry()
+        conf.binfo = SCons.Node.FS.FileBuildInfo()
+        no_sigs = entry([('a', ninfo('01' * 16))], [])
+        no_sigs.binfo.bimplicitsigs = None
+        entries = {'odd': odd, 'conf': conf, 'no_sigs': no_sigs}
+        expect = {name: state(e) for name, e in entries.items() if name != 'conf'}
+
+        table = PathTable()
+        result = loads(dumps(entries, table), table)
+        for name in expect:
+            assert state(result[name]) == expect[name], name
+        assert not hasattr(result['conf'], 'ninfo')
+        assert type(result['conf'].binfo) is SCons.Node.FS.FileBuildInfo
+        assert 'upper' in table.paths
+        assert 'a' not in table.paths
+
+    def test_version(self) -> None:
+        """Test that another version isn't decoded"""
+        table = PathTable()
+        value = dumps({}, table)
+        assert loads(value, table) == {}
+        bad = value[:len(SCons.SConsignCompact.MAGIC)] + b'\x7f' + value[len(SCons.SConsignCompact.MAGIC) + 1:]
+        assert is_compact(bad)
+        with self.assertRaises(ValueError):
+            loads(bad, table)
+
+    def test_table_id(self) -> None:
+        """Test that entries aren't decoded with another path table"""
+        table = PathTable()
+        value = dumps({'a.o': entry([('a.c', ninfo('01' * 16))], [])}, table)
+        assert loads(value, PathTable.decode(table.encode()))['a.o'].binfo.bsources == ['a.c']
+        with self.assertRaises(ValueError):
+            loads(value, PathTable(table.paths))
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
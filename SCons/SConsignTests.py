@@ -22,12 +22,18 @@
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 import os
+import pickle
+import threading
+import time
 import unittest
+import unittest.mock
 
 import TestCmd
 
 import SCons.dblite
 import SCons.SConsign
+import SCons.Util.filelock
+from SCons.compat import PICKLE_PROTOCOL
 from SCons.Util import get_hash_format, get_current_hash_algorithm_used
 
 class BuildInfo:
@@ -379,6 +385,485 @@ class writeTestCase(SConsignTestCase):
         assert fake_dbm.sync_count == 1, fake_dbm.sync_count
 
 
+class EntryDBTestCase(SConsignTestCase):
+
+    def test_EntryDB(self) -> None:
+        """Test storing entries one by one with SCons.dbsqlite"""
+        try:
+            import SCons.dbsqlite
+        except ImportError:
+            self.skipTest("no sqlite3 module")
+
+        save = (SCons.SConsign.DataBase, SCons.SConsign.DB_Name,
+                SCons.SConsign.DB_Module, SCons.SConsign.ForDirectory)
+        try:
+            SCons.SConsign.DataBase = {}
+            SCons.SConsign.File('db', SCons.dbsqlite)
+            assert SCons.SConsign.ForDirectory is SCons.SConsign.EntryDB
+
+            d1 = SCons.SConsign.ForDirectory(DummyNode('dir1'))
+            d1.set_entry('aaa', DummySConsignEntry('aaa name'))
+            d1.store_info('bbb', DummyNode('bbb', DummySConsignEntry('bbb name')))
+            d2 = SCons.SConsign.ForDirectory(DummyNode('dir2'))
+            d2.set_entry('ccc', DummySConsignEntry('ccc name'))
+            SCons.SConsign.write()
+            assert os.path.exists(self.test.workpath('db.sqlite'))
+
+            SCons.SConsign.Reset()
+            SCons.SConsign.DataBase = {}
+            d1 = SCons.SConsign.ForDirectory(DummyNode('dir1'))
+            fetched = []
+            real_get_entry = d1.db.get_entry
+            def get_entry(dir, name):
+                fetched.append((dir, name))
+                return real_get_entry(dir, name)
+            d1.db.get_entry = get_entry
+
+            bbb = d1.get_entry('bbb')
+            assert bbb.name == 'bbb name', bbb.name
+            assert bbb.c_from_s
+            assert fetched == [('dir1', 'bbb')], fetched
+            with self.assertRaises(KeyError):
+                d1.get_entry('ccc')
+
+            # Only the changed entry is written back.
+            stored = []
+            d1.db.set_entry = lambda dir, name, value: stored.append((dir, name))
+            d1.set_entry('bbb', DummySConsignEntry('new bbb'))
+            d1.write()
+            assert stored == [('dir1', 'bbb')], stored
+        finally:
+            (SCons.SConsign.DataBase, SCons.SConsign.DB_Name,
+             SCons.SConsign.DB_Module, SCons.SConsign.ForDirectory) = save
+
+
+class CompactDBTestCase(SConsignTestCase):
+
+    def test_compact(self) -> None:
+        """Test writing and reading a database in the compact encoding"""
+        import SCons.Node.FS
+        import SCons.SConsignCompact
+
+        def entry(csig):
+            e = SCons.SConsign.SConsignEntry()
+            e.ninfo = SCons.Node.FS.FileNodeInfo()
+            e.ninfo.csig = csig
+            e.binfo = SCons.Node.FS.FileBuildInfo()
+            e.binfo.bsources = ['src/a.c']
+            e.binfo.bsourcesigs = [SCons.Node.FS.FileNodeInfo()]
+            e.binfo.bsourcesigs[0].csig = csig
+            for attr in ('bdepends', 'bdependsigs', 'bimplicit', 'bimplicitsigs'):
+                setattr(e.binfo, attr, [])
+            return e
+
+        fs = DummyNode().fs
+
+        def dir_node(path):
+            node = DummyNode(path)
+            node.fs = fs
+            return node
+
+        save = (SCons.SConsign.DataBase, SCons.SConsign.DB_Name,
+                SCons.SConsign.DB_Module, SCons.SConsign.ForDirectory)
+        try:
+            SCons.SConsign.DataBase = {}
+            SCons.SConsign.File('db', SCons.dblite, compact=True)
+            d1 = SCons.SConsign.ForDirectory(dir_node('dir1'))
+            d1.set_entry('a.o', entry('01' * 16))
+            d2 = SCons.SConsign.ForDirectory(dir_node('dir2'))
+            d2.set_entry('b.o', entry('02' * 16))
+            SCons.SConsign.write()
+
+            db = SCons.dblite.open('db')
+            assert SCons.SConsignCompact.is_compact(db['dir1'])
+            table = SCons.SConsignCompact.PathTable.read(db)
+            assert table.paths == ['src/a.c'], table.paths
+
+            # Written as pickles again, and read either way.
+            SCons.SConsign.Reset()
+            SCons.SConsign.DataBase = {}
+            SCons.SConsign.File('db', SCons.dblite)
+            d1 = SCons.SConsign.ForDirectory(dir_node('dir1'))
+            a = d1.get_entry('a.o')
+            assert a.ninfo.csig == '01' * 16, a.ninfo.csig
+            assert a.binfo.bsources == ['src/a.c'], a.binfo.bsources
+            d1.set_entry('a.o', a)
+            SCons.SConsign.write()
+
+            SCons.SConsign.Reset()
+            SCons.SConsign.DataBase = {}
+            db = SCons.dblite.open('db')
+            assert not SCons.SConsignCompact.is_compact(db['dir1'])
+            d1 = SCons.SConsign.ForDirectory(dir_node('dir1'))
+            d2 = SCons.SConsign.ForDirectory(dir_node('dir2'))
+            assert d1.get_entry('a.o').binfo.bsourcesigs[0].csig == '01' * 16
+            assert d2.get_entry('b.o').binfo.bsourcesigs[0].csig == '02' * 16
+            SCons.SConsign.write()
+
+            # Without their path table, compact entries are ignored.
+            db = SCons.dblite.open('db', 'w')
+            db[SCons.SConsignCompact.TABLE_KEY] = b'garbage'
+            db.close()
+            SCons.SConsign.Reset()
+            SCons.SConsign.DataBase = {}
+            d1 = SCons.SConsign.ForDirectory(dir_node('dir1'))
+            d2 = SCons.SConsign.ForDirectory(dir_node('dir2'))
+            assert d1.get_entry('a.o').ninfo.csig == '01' * 16
+            assert d2.entries == {}, d2.entries
+        finally:
+            (SCons.SConsign.DataBase, SCons.SConsign.DB_Name,
+             SCons.SConsign.DB_Module, SCons.SConsign.ForDirectory) = save
+            SCons.SConsign.Compact = False
+
+
+class CheckpointerTestCase(SConsignTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.save = (SCons.SConsign.DataBase, SCons.SConsign.DB_Name,
+                     SCons.SConsign.DB_Module, SCons.SConsign.ForDirectory)
+        SCons.SConsign.DataBase = {}
+        self.fs = DummyNode().fs
+
+    def tearDown(self) -> None:
+        (SCons.SConsign.DataBase, SCons.SConsign.DB_Name,
+         SCons.SConsign.DB_Module, SCons.SConsign.ForDirectory) = self.save
+        super().tearDown()
+
+    def dir_node(self, path):
+        node = DummyNode(path)
+        node.fs = self.fs
+        return node
+
+    def stored(self, name):
+        """Return the entry names per directory in the database on disk."""
+        db = SCons.dblite.open(name, "r")
+        return {key: sorted(pickle.loads(db[key])) for key in db.keys()}
+
+    def test_DB(self) -> None:
+        """Test checkpoints of a signature database"""
+        SCons.SConsign.File('db', SCons.dblite)
+        d1 = SCons.SConsign.DB(self.dir_node('dir1'))
+        d2 = SCons.SConsign.DB(self.dir_node('dir2'))
+        d1.set_entry('aaa', DummySConsignEntry('aaa'))
+
+        checkpointer = SCons.SConsign.Checkpointer(nodes=2)
+        checkpointer.update()
+        assert checkpointer.thread is None
+        checkpointer.update()
+        checkpointer.wait()
+        assert checkpointer.checkpoints == 1
+        assert self.stored('db') == {'dir1': ['aaa']}, self.stored('db')
+        assert not d1.dirty
+
+        # Only the directories changed since are encoded.
+        d2.store_info('bbb', DummyNode('bbb', DummySConsignEntry('bbb')))
+        assert d1.checkpoint() is None
+        checkpointer.update(5)
+        checkpointer.wait()
+        assert checkpointer.checkpoints == 2
+        assert self.stored('db') == {'dir1': ['aaa'], 'dir2': ['bbb']}
+
+        # Nothing changed, nothing to write.
+        checkpointer.update(5)
+        assert checkpointer.thread is None
+
+        # The final write still stores everything.
+        d1.set_entry('ccc', DummySConsignEntry('ccc'))
+        SCons.SConsign.write()
+        assert self.stored('db') == {'dir1': ['aaa', 'ccc'], 'dir2': ['bbb']}
+
+    def test_interval(self) -> None:
+        """Test checkpoints after a number of seconds"""
+        SCons.SConsign.File('db', SCons.dblite)
+        d1 = SCons.SConsign.DB(self.dir_node('dir1'))
+        d1.set_entry('aaa', DummySConsignEntry('aaa'))
+
+        checkpointer = SCons.SConsign.Checkpointer(interval=60)
+        checkpointer.update(1000)
+        assert checkpointer.thread is None
+        checkpointer.last -= 60
+        checkpointer.update(0)
+        checkpointer.wait()
+        assert self.stored('db') == {'dir1': ['aaa']}, self.stored('db')
+
+    def test_DirFile(self) -> None:
+        """Test checkpoints of per-directory .sconsign files"""
+        self.test.subdir('dir1')
+        SCons.SConsign.File(None)
+        d1 = SCons.SConsign.DirFile(self.dir_node('dir1'))
+        d1.set_entry('aaa', DummySConsignEntry('aaa'))
+
+        checkpointer = SCons.SConsign.Checkpointer(nodes=1)
+        checkpointer.update()
+        checkpointer.wait()
+        with open(d1.sconsign, 'rb') as f:
+            assert sorted(pickle.load(f)) == ['aaa']
+        assert os.listdir('dir1') == [os.path.basename(d1.sconsign)]
+
+    def test_no_stall(self) -> None:
+        """Test that reading signatures doesn't wait for a checkpoint's sync"""
+        waiting = threading.Event()
+        go_on = threading.Event()
+
+        class SlowLock(SCons.Util.filelock.FileLock):
+            # Another process writing the database.
+            def acquire_lock(self) -> None:
+                waiting.set()
+                go_on.wait(10)
+                super().acquire_lock()
+
+        SCons.SConsign.File('db', SCons.dblite)
+        d1 = SCons.SConsign.DB(self.dir_node('dir1'))
+        d1.set_entry('aaa', DummySConsignEntry('aaa'))
+        checkpointer = SCons.SConsign.Checkpointer(nodes=1)
+        with unittest.mock.patch.object(SCons.dblite._Dblite, '_file_lock', SlowLock):
+            checkpointer.update()
+            try:
+                assert waiting.wait(10)
+                assert SCons.SConsign.db_lock.acquire(timeout=5)
+                SCons.SConsign.db_lock.release()
+                SCons.SConsign.DB(self.dir_node('dir2'))
+                assert checkpointer.thread.is_alive()
+            finally:
+                go_on.set()
+                checkpointer.wait()
+        assert checkpointer.checkpoints == 1
+        assert self.stored('db') == {'dir1': ['aaa']}, self.stored('db')
+
+    def test_failure(self) -> None:
+        """Test that entries a failed checkpoint took are written at the end"""
+        class Fake_DBM:
+            fail = True
+            def open(self, name, mode):
+                self.data = {}
+                return self
+            def __getitem__(self, key):
+                return self.data[key]
+            def __setitem__(self, key, value) -> None:
+                if self.fail:
+                    raise OSError("no space left")
+                self.data[key] = value
+
+        fake_dbm = Fake_DBM()
+        SCons.SConsign.File('db', fake_dbm)
+        d1 = SCons.SConsign.DB(self.dir_node('dir1'))
+        d1.set_entry('aaa', DummySConsignEntry('aaa'))
+
+        checkpointer = SCons.SConsign.Checkpointer(nodes=1)
+        checkpointer.update()
+        checkpointer.wait()
+        assert isinstance(checkpointer.error, OSError), checkpointer.error
+        assert checkpointer.checkpoints == 0
+        assert d1.dirty
+
+        # No more checkpoints are tried.
+        checkpointer.update()
+        assert checkpointer.thread is None
+
+        fake_dbm.fail = False
+        SCons.SConsign.write()
+        assert sorted(pickle.loads(fake_dbm.data['dir1'])) == ['aaa']
+
+
+class MergeDatabaseTestCase(SConsignTestCase):
+
+    def tearDown(self) -> None:
+        SCons.SConsign.Compact = False
+        super().tearDown()
+
+    def entry(self, csig, sources=()):
+        import SCons.Node.FS
+        e = SCons.SConsign.SConsignEntry()
+        e.ninfo = SCons.Node.FS.FileNodeInfo()
+        e.ninfo.csig = csig
+        e.binfo = SCons.Node.FS.FileBuildInfo()
+        e.binfo.bsources = list(sources)
+        e.binfo.bsourcesigs = []
+        for source in sources:
+            ninfo = SCons.Node.FS.FileNodeInfo()
+            ninfo.csig = '%032x' % len(source)
+            e.binfo.bsourcesigs.append(ninfo)
+        for attr in ('bdepends', 'bdependsigs', 'bimplicit', 'bimplicitsigs'):
+            setattr(e.binfo, attr, [])
+        return e
+
+    def csigs(self, value, table=None):
+        import SCons.SConsignCompact
+        if SCons.SConsignCompact.is_compact(value):
+            entries = SCons.SConsignCompact.loads(value, table)
+        else:
+            entries = pickle.loads(value)
+        return {name: e.ninfo.csig for name, e in entries.items()}
+
+    def test_pickled(self) -> None:
+        """Test merging directories another process changed"""
+        def dumps(entries):
+            return pickle.dumps(entries, PICKLE_PROTOCOL)
+
+        before = dumps({'a.o': self.entry('01'), 'b.o': self.entry('02')})
+        stored = {
+            'both': dumps({'a.o': self.entry('01'), 'b.o': self.entry('b2')}),
+            'theirs': dumps({'t.o': self.entry('t1')}),
+            'ours': before,
+            'deleted': before,
+        }
+        ours = {
+            'both': dumps({'a.o': self.entry('a2'), 'b.o': self.entry('02'),
+                           'c.o': self.entry('c1')}),
+            'ours': dumps({'o.o': self.entry('o1')}),
+        }
+        original = {'both': before, 'ours': before, 'deleted': before}
+
+        result = SCons.SConsign.merge_database(0, stored, ours, original)
+        assert sorted(result) == ['both', 'ours', 'theirs'], sorted(result)
+        assert result['ours'] == ours['ours']
+        assert result['theirs'] == stored['theirs']
+        # Both changed entries in the directory: each keeps its own.
+        assert self.csigs(result['both']) == {'a.o': 'a2', 'b.o': 'b2', 'c.o': 'c1'}, \
+            self.csigs(result['both'])
+
+    def test_compact(self) -> None:
+        """Test merging directories encoded with path tables that diverged"""
+        import SCons.SConsignCompact
+        from SCons.SConsignCompact import PathTable, TABLE_KEY, dumps
+        SCons.SConsign.Compact = True
+
+        table = PathTable()
+        before = dumps({'a.o': self.entry('%032x' % 1, ['a.c'])}, table)
+        loaded = table.encode()
+
+        # The other process adds another path to the table...
+        theirs = PathTable.decode(loaded)
+        theirs_value = dumps({'b.o': self.entry('%032x' % 2, ['b.c'])}, theirs)
+        both_value = dumps({'a.o': self.entry('%032x' % 1, ['a.c']),
+                            'c.o': self.entry('%032x' % 3, ['c.c'])}, theirs)
+        stored = {TABLE_KEY: theirs.encode(), 'dir1': both_value, 'dir2': theirs_value}
+
+        # ... and so does this one, at the same index.
+        ours_value = dumps({'a.o': self.entry('%032x' % 4, ['a.c', 'd.c'])}, table)
+        SCons.SConsign.PathTables[1] = table
+        ours = {TABLE_KEY: table.encode(), 'dir1': ours_value}
+        original = {TABLE_KEY: loaded, 'dir1': before}
+
+        result = SCons.SConsign.merge_database(1, stored, ours, original)
+        assert table.paths[:3] == theirs.paths, table.paths
+        assert 'd.c' in table.paths
+        assert PathTable.decode(result[TABLE_KEY]).paths == table.paths
+        entries = SCons.SConsignCompact.loads(result['dir1'], table)
+        assert entries['a.o'].binfo.bsources == ['a.c', 'd.c'], entries['a.o'].binfo.bsources
+        assert entries['c.o'].binfo.bsources == ['c.c']
+        assert self.csigs(result['dir2'], table) == {'b.o': '%032x' % 2}
+
+
+class StatCacheTestCase(SConsignTestCase):
+
+    def test_StatCache(self) -> None:
+        """Test the stat-keyed csig cache"""
+        test = self.test
+        test.write('f1', "f1\n")
+        test.write('f2', "f2\n")
+        an_hour_ago = time.time() - 3600
+        os.utime(test.workpath('f1'), (an_hour_ago, an_hour_ago))
+        st1 = os.stat(test.workpath('f1'))
+        st2 = os.stat(test.workpath('f2'))
+        path = test.workpath('cache.csig')
+
+        cache = SCons.SConsign.StatCache(path)
+        assert cache.get(st1) is None
+        cache.set(st1, 'csig1', time.time())
+        assert cache.get(st1) == 'csig1', cache.get(st1)
+        # f2 was just written, too recently to be recorded.
+        cache.set(st2, 'csig2', time.time())
+        assert cache.get(st2) is None
+        cache.write()
+
+        cache = SCons.SConsign.StatCache(path)
+        assert cache.get(st1) == 'csig1', cache.entries
+        assert not cache.dirty
+
+        # Any change of mtime or size misses.
+        test.write('f1', "f1 again\n")
+        os.utime(test.workpath('f1'), (an_hour_ago, an_hour_ago))
+        assert cache.get(os.stat(test.workpath('f1'))) is None
+        os.utime(test.workpath('f1'), (an_hour_ago + 1, an_hour_ago + 1))
+        assert cache.get(os.stat(test.workpath('f1'))) is None
+
+        # A cache made with another hash algorithm is not used.
+        cache.hash_format = 'other'
+        cache.dirty = True
+        cache.write()
+        cache = SCons.SConsign.StatCache(path)
+        assert cache.entries == {}, cache.entries
+
+        test.write('cache.csig', "not a pickle")
+        cache = SCons.SConsign.StatCache(path)
+        assert cache.entries == {}, cache.entries
+
+    def test_prune(self) -> None:
+        """Test that entries of files no longer looked up are dropped"""
+        test = self.test
+        an_hour_ago = time.time() - 3600
+        path = test.workpath('cache.csig')
+        test.write('kept', "kept\n")
+        os.utime(test.workpath('kept'), (an_hour_ago, an_hour_ago))
+        kept = os.stat(test.workpath('kept'))
+
+        cache = SCons.SConsign.StatCache(path)
+        cache.set(kept, 'kept', time.time())
+        # Stand-ins for files rebuilt since: their inodes are gone.
+        for ino in range(1, 4):
+            cache.set(os.stat_result((0o100644, ino, 1, 1, 0, 0, 10, 0, 0, 0)),
+                      'old%d' % ino, time.time())
+        cache.write()
+        assert len(cache.entries) == 4, cache.entries
+
+        for run in range(1, cache.max_unused + 1):
+            cache = SCons.SConsign.StatCache(path)
+            assert cache.run == run, cache.run
+            assert cache.get(kept) == 'kept'
+            cache.write()
+        assert list(cache.entries) == [(kept.st_dev, kept.st_ino)], cache.entries
+        cache = SCons.SConsign.StatCache(path)
+        assert list(cache.entries) == [(kept.st_dev, kept.st_ino)], cache.entries
+
+        # Kept for max_unused - 1 runs without a lookup (this one is
+        # the first), dropped after.
+        for _ in range(cache.max_unused - 2):
+            cache.run += 1
+            cache.prune()
+        assert cache.entries
+        cache.run += 1
+        cache.prune()
+        assert cache.entries == {}, cache.entries
+        assert cache.dirty
+
+    def test_Get_StatCache(self) -> None:
+        """Test setting up the cache next to the signature database"""
+        test = self.test
+        top = DummyNode()
+        top.entry_abspath = lambda name: test.workpath(name)
+
+        save_DB_Name = SCons.SConsign.DB_Name
+        try:
+            SCons.SConsign.File('.mysconsign')
+            cache = SCons.SConsign.Get_StatCache(top)
+            assert cache.path == test.workpath('.mysconsign.csig'), cache.path
+            assert SCons.SConsign.Get_StatCache(top) is cache
+
+            SCons.SConsign.Reset()
+            SCons.SConsign.File(test.workpath('sub', 'db'))
+            cache = SCons.SConsign.Get_StatCache(top)
+            assert cache.path == test.workpath('sub', 'db.csig'), cache.path
+
+            # The cache is written along with the databases.
+            cache.set(os.stat(test.workpath()), 'csig', time.time() + 10)
+            test.subdir('sub')
+            SCons.SConsign.write()
+            assert os.path.exists(test.workpath('sub', 'db.csig'))
+        finally:
+            SCons.SConsign.DB_Name = save_DB_Name
+
 
 if __name__ == "__main__":
     unittest.main()
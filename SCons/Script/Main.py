@@ -62,7 +62,7 @@ import SCons.Util
 import SCons.Warnings
 import SCons.Script.Interactive
 from .SConsOptions import SConsOption
-from SCons.Util.stats import count_stats, memory_stats, time_stats, ENABLE_JSON, write_scons_stats_file, JSON_OUTPUT_FILE
+from SCons.Util.stats import count_stats, memory_stats, time_stats, cache_stats, ENABLE_JSON, write_scons_stats_file, JSON_OUTPUT_FILE
 
 from SCons import __version__ as SConsVersion
 
@@ -185,6 +185,17 @@ def Progress(*args, **kw) -> None:
     global ProgressObject
     ProgressObject = Progressor(*args, **kw)
 
+def Pool(name: str, depth: int) -> None:
+    """Declare a named resource pool - Public API.
+
+    At most *depth* tasks whose ``$POOL`` construction variable is
+    *name* will execute at the same time.
+    """
+    if not isinstance(depth, int) or depth < 1:
+        raise SCons.Errors.UserError(
+            "Pool depth must be a positive integer, not %r." % (depth,))
+    SCons.Taskmaster.Job.pools[name] = depth
+
 # Task control.
 #
 
@@ -282,6 +293,8 @@ class BuildTask(SCons.Taskmaster.OutOfDateTask):
                 SCons.Taskmaster.OutOfDateTask.executed(self)
         else:
             SCons.Taskmaster.OutOfDateTask.executed(self)
+        if SCons.SConsign.checkpointer is not None:
+            SCons.SConsign.checkpointer.update(len(self.targets))
 
     def failed(self) -> None:
         # Handle the failure of a build task.  The primary purpose here
@@ -772,6 +785,7 @@ def _set_debug_values(options) -> None:
         SCons.Node.print_duplicate = True
     if "json" in debug_values:
         ENABLE_JSON = True
+        cache_stats.enable(sys.stdout)
     if "sconscript" in debug_values:
         SCons.Debug.sconscript_trace = True
 
@@ -1360,7 +1374,14 @@ def _build_targets(fs, options, targets, target_top):
             """Leave the order of dependencies alone."""
             return dependencies
 
-    taskmaster = SCons.Taskmaster.Taskmaster(nodes, task_class, order, options.taskmastertrace_file)
+    if options.schedule == 'critical-path':
+        schedule = SCons.Taskmaster.CriticalPathSchedule()
+    else:
+        schedule = None
+
+    taskmaster = SCons.Taskmaster.Taskmaster(
+        nodes, task_class, order, options.taskmastertrace_file, schedule
+    )
 
     # Let the BuildTask objects get at the options to respond to the
     # various print_* settings, tree_printer list, etc.
@@ -1382,6 +1403,23 @@ def _build_targets(fs, options, targets, target_top):
         if msg:
             SCons.Warnings.warn(SCons.Warnings.NoParallelSupportWarning, msg)
 
+    function_action_pool = None
+    if 'process_pool' in (options.experimental or ()) and jobs.num_jobs > 1:
+        function_action_pool = SCons.Action.FunctionActionPool(jobs.num_jobs)
+        SCons.Action.function_action_pool = function_action_pool
+
+    if not options.no_exec and options.cache_push_jobs and not options.cache_readonly:
+        SCons.CacheDir.push_queue = SCons.CacheDir.PushQueue(options.cache_push_jobs)
+
+    cache_prefetcher = None
+    if not options.no_exec and options.cache_prefetch_jobs and not options.cache_disable:
+        cache_prefetcher = SCons.CacheDir.CachePrefetcher(options.cache_prefetch_jobs)
+
+    if not options.no_exec and (options.checkpoint_interval or options.checkpoint_nodes):
+        SCons.SConsign.checkpointer = SCons.SConsign.Checkpointer(
+            options.checkpoint_interval, options.checkpoint_nodes
+        )
+
     memory_stats.append('before building targets:')
     count_stats.append(('pre-', 'build'))
 
@@ -1399,6 +1437,10 @@ def _build_targets(fs, options, targets, target_top):
             exit_status = 2
             this_build_status = 2
 
+        if cache_prefetcher is not None:
+            cache_prefetcher.shutdown()
+        SCons.CacheDir.shutdown_push_queues(cancel=jobs.were_interrupted())
+
         if this_build_status:
             progress_display("scons: " + failure_message)
         else:
@@ -1407,9 +1449,21 @@ def _build_targets(fs, options, targets, target_top):
             if jobs.were_interrupted():
                 progress_display("scons: writing .sconsign file.")
             SCons.SConsign.write()
+            if not jobs.were_interrupted():
+                SCons.CacheDir.gc_caches()
 
     progress_display("scons: " + opening_message)
-    jobs.run(postfunc = jobs_postfunc)
+    try:
+        if cache_prefetcher is not None:
+            cache_prefetcher.start(nodes)
+        jobs.run(postfunc = jobs_postfunc)
+    finally:
+        if cache_prefetcher is not None:
+            cache_prefetcher.shutdown()
+        if function_action_pool is not None:
+            SCons.Action.function_action_pool = None
+            function_action_pool.shutdown()
+        SCons.CacheDir.shutdown_push_queues(cancel=True)
 
     memory_stats.append('after building targets:')
     count_stats.append(('post-', 'build'))
@@ -1580,7 +1634,13 @@ def main() -> None:
         print("Total SConscript file execution time: %f seconds"%sconscript_time)
         print("Total SCons execution time: %f seconds"%scons_time)
         print("Total command execution time: %f seconds"%ct)
+        hash_stats = SCons.Util.hash_stats
+        print("Total file hashing time: %f seconds"%hash_stats.seconds)
+        print("Total bytes hashed: %d in %d files (%.1f MB/s)"%(
+            hash_stats.bytes, hash_stats.files, hash_stats.throughput() / 1e6))
         time_stats.total_times(total_time, sconscript_time, scons_time, ct)
+        time_stats.hash_totals(hash_stats.files, hash_stats.bytes,
+                               hash_stats.seconds)
 
 
     if ENABLE_JSON:
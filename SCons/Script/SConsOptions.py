@@ -42,7 +42,9 @@ SUPPRESS_HELP = optparse.SUPPRESS_HELP
 
 diskcheck_all = SCons.Node.FS.diskcheck_types()
 
-experimental_features = {'warp_speed', 'transporter', 'ninja', 'legacy_sched'}
+experimental_features = {'warp_speed', 'transporter', 'ninja', 'legacy_sched', 'process_pool'}
+
+schedule_options = ['default', 'critical-path']
 
 
 def diskcheck_convert(value):
@@ -124,6 +126,10 @@ class SConsValues(optparse.Values):
     # keep this list in sync with the SetOption doc in SCons/Script/Main.xml
     # search for UPDATE_SETOPTION_DOCS there.
     settable = [
+        'cache_prefetch_jobs',
+        'cache_push_jobs',
+        'checkpoint_interval',
+        'checkpoint_nodes',
         'clean',
         'diskcheck',
         'duplicate',
@@ -134,12 +140,15 @@ class SConsValues(optparse.Values):
         'implicit_cache',
         'implicit_deps_changed',
         'implicit_deps_unchanged',
+        'load_average',
         'max_drift',
         'md5_chunksize',
+        'min_free_memory',
         'no_exec',
         'no_progress',
         'num_jobs',
         'random',
+        'schedule',
         'silent',
         'stack_size',
         'warn',
@@ -171,6 +180,31 @@ class SConsValues(optparse.Values):
                     raise ValueError
             except ValueError:
                 raise SCons.Errors.UserError("A positive integer is required: %s" % repr(value))
+        elif name == 'load_average':
+            try:
+                value = float(value)
+                if value < 0:
+                    raise ValueError
+            except ValueError:
+                raise SCons.Errors.UserError(
+                    "A non-negative number is required: %s" % repr(value))
+        elif name == 'checkpoint_interval':
+            try:
+                value = float(value)
+                if value < 0:
+                    raise ValueError
+            except ValueError:
+                raise SCons.Errors.UserError(
+                    "A non-negative number is required: %s" % repr(value))
+        elif name in ('cache_prefetch_jobs', 'cache_push_jobs', 'checkpoint_nodes',
+                      'min_free_memory'):
+            try:
+                value = int(value)
+                if value < 0:
+                    raise ValueError
+            except ValueError:
+                raise SCons.Errors.UserError(
+                    "A non-negative integer is required: %s" % repr(value))
         elif name == 'max_drift':
             try:
                 value = int(value)
@@ -225,6 +259,11 @@ class SConsValues(optparse.Values):
             if SCons.Util.is_String(value):
                 value = [value]
             value = self.__SConscript_settings__.get(name, []) + value
+        elif name == 'schedule':
+            if value not in schedule_options:
+                raise SCons.Errors.UserError(
+                    "Not a valid schedule type: %s" % value
+                )
         elif name in ('implicit_deps_changed', 'implicit_deps_unchanged'):
             if value:
                 self.__SConscript_settings__['implicit_cache'] = True
@@ -803,6 +842,21 @@ def Parser(version):
                   action="store_true",
                   help="Copy already-built targets into the CacheDir")
 
+    op.add_option('--cache-prefetch-jobs',
+                  nargs=1, type="int",
+                  dest="cache_prefetch_jobs", default=0,
+                  action="store",
+                  help="Retrieve targets built from sources only from "
+                       "CacheDir ahead of the build, on N threads",
+                  metavar="N")
+
+    op.add_option('--cache-push-jobs',
+                  nargs=1, type="int",
+                  dest="cache_push_jobs", default=0,
+                  action="store",
+                  help="Push built targets to CacheDir from N background threads",
+                  metavar="N")
+
     op.add_option('--cache-readonly',
                   dest='cache_readonly', default=False,
                   action="store_true",
@@ -813,6 +867,20 @@ def Parser(version):
                   action="store_true",
                   help="Print build actions for files from CacheDir")
 
+    op.add_option('--checkpoint-interval',
+                  nargs=1, type="float",
+                  dest="checkpoint_interval", default=0,
+                  action="store",
+                  help="Write signatures gathered so far every N seconds",
+                  metavar="N")
+
+    op.add_option('--checkpoint-nodes',
+                  nargs=1, type="int",
+                  dest="checkpoint_nodes", default=0,
+                  action="store",
+                  help="Write signatures gathered so far every N nodes",
+                  metavar="N")
+
     def opt_invalid(group, value, options):
         """report an invalid option from a group"""
         errmsg = "`%s' is not a valid %s option type, try:\n" % (value, group)
@@ -992,7 +1060,8 @@ def Parser(version):
     op.add_option('--hash-format',
                   dest='hash_format',
                   action='store',
-                  help='Hash format [md5, sha1, sha256, etc].')
+                  help='Hash format [md5, sha1, sha256, blake2b, blake2s, etc; '
+                       'add -tree to tree hash large files, e.g. blake2b-tree].')
 
     op.add_option('-i', '--ignore-errors',
                   dest='ignore_errors', default=False,
@@ -1047,6 +1116,13 @@ def Parser(version):
                   action="store_true",
                   help="Keep going when a target can't be made")
 
+    op.add_option('-l', '--load-average', '--max-load',
+                  nargs=1, type="float",
+                  dest="load_average", default=0,
+                  action="store",
+                  help="Don't start multiple jobs unless load is below N",
+                  metavar="N")
+
     op.add_option('--max-drift',
                   nargs=1, type="int",
                   dest='max_drift', default=SCons.Node.FS.default_max_drift,
@@ -1054,6 +1130,14 @@ def Parser(version):
                   help="Set maximum system clock drift to N seconds",
                   metavar="N")
 
+    op.add_option('--min-free-memory',
+                  nargs=1, type="int",
+                  dest="min_free_memory", default=0,
+                  action="store",
+                  help="Don't start multiple jobs unless N MiB of memory "
+                       "are available",
+                  metavar="N")
+
     op.add_option('-n', '--no-exec', '--just-print', '--dry-run', '--recon',
                   dest='no_exec', default=False,
                   action="store_true",
@@ -1091,6 +1175,12 @@ def Parser(version):
                   action="store_true",
                   help="Don't print commands")
 
+    op.add_option('--schedule',
+                  nargs=1, choices=schedule_options,
+                  dest="schedule", default='default',
+                  help="Order ready tasks by TYPE [%s]" % ", ".join(schedule_options),
+                  metavar="TYPE")
+
     op.add_option('--site-dir',
                   nargs=1,
                   dest='site_dir', default=None,
@@ -1188,14 +1278,6 @@ def Parser(version):
         msg = "Warning:  the %s option is not yet implemented\n" % opt
         sys.stderr.write(msg)
 
-    op.add_option('-l', '--load-average', '--max-load',
-                  nargs=1, type="float",
-                  dest="load_average", default=0,
-                  action="callback", callback=opt_not_yet,
-                  # action="store",
-                  # help="Don't start multiple jobs unless load is below "
-                  #      "LOAD-AVERAGE"
-                  help=SUPPRESS_HELP)
     op.add_option('--list-actions',
                   dest="list_actions",
                   action="callback", callback=opt_not_yet,
@@ -117,6 +117,7 @@ GetOption               = Main.GetOption
 SetOption               = Main.SetOption
 ValidateOptions         = Main.ValidateOptions
 Progress                = Main.Progress
+Pool                    = Main.Pool
 GetBuildFailures        = Main.GetBuildFailures
 DebugOptions            = Main.DebugOptions
 
@@ -35,6 +35,7 @@ import queue
 import signal
 import sys
 import threading
+import time
 
 from enum import Enum
 
@@ -55,6 +56,141 @@ default_stack_size = 256
 
 interrupt_msg = 'Build interrupted.'
 
+# Named resource pools declared with Pool(), mapping each pool name to
+# the maximum number of its tasks that may execute at the same time.
+# A task belongs to the pool named by $POOL in its build environment.
+pools = {}
+
+
+def get_task_pool(task):
+    """Return the name of the resource pool *task* executes in, or None.
+
+    Raises UserError if the task names a pool that was never declared.
+    """
+    try:
+        env = task.targets[0].get_build_env()
+    except AttributeError:
+        return None
+    name = env.get('POOL')
+    if not name:
+        return None
+    if name not in pools:
+        raise SCons.Errors.UserError("Unknown pool '%s' in $POOL." % name)
+    return name
+
+
+def get_load_average():
+    """Return the one minute system load average, or None if unknown."""
+    try:
+        return os.getloadavg()[0]
+    except (AttributeError, OSError):
+        return None
+
+
+def get_available_memory(meminfo: str = '/proc/meminfo'):
+    """Return the memory available for new work in bytes, or None if unknown.
+
+    Only systems with a Linux style :file:`/proc/meminfo` are supported.
+    """
+    try:
+        with open(meminfo, 'rb') as f:
+            for line in f:
+                if line.startswith(b'MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class Throttle:
+    """Decide whether the system is too busy to start another job.
+
+    Implements ``--load-average`` and ``--min-free-memory``.  Sampling
+    the system is cheap, but it happens every time a job is about to
+    be dispatched, so a sample is reused for :attr:`interval` seconds.
+    """
+
+    interval = 0.5
+
+    def __init__(self, max_load: float = 0, min_free_memory: int = 0) -> None:
+        self.max_load = max_load
+        self.min_free_memory = min_free_memory
+        self.sampled = None
+        self.reason = None
+
+    def overloaded(self):
+        """Return why no new job should start now, or None if one can."""
+        now = time.monotonic()
+        if self.sampled is None or now - self.sampled >= self.interval:
+            self.sampled = now
+            self.reason = self.sample()
+        return self.reason
+
+    def sample(self):
+        if self.max_load:
+            load = get_load_average()
+            if load is not None and load >= self.max_load:
+                return "load average %.2f, limit %.2f" % (load, self.max_load)
+        if self.min_free_memory:
+            available = get_available_memory()
+            if available is not None and available < self.min_free_memory:
+                return "%d MiB of memory available, limit %d MiB" % (
+                    available // 2**20, self.min_free_memory // 2**20)
+        return None
+
+
+class Prefetcher:
+    """Compute content signatures on helper threads during the search.
+
+    Walking the DAG, scanning and the up-to-date decisions mutate the
+    graph and stay serialized on the thread holding the taskmaster.
+    What can run beside it is stat()ing and hashing the source files
+    that decision is going to need: the sources known when the build
+    starts, then each batch of nodes the taskmaster discovers, are
+    handed to :meth:`submit`, which asks their ``prefetch_csig()``
+    method for the work the helper threads can do.  The queue is
+    last-in first-out because the taskmaster walks depth-first, so the
+    most recently discovered nodes are the next ones to be decided.
+    Nothing ever waits for the helpers: a signature they haven't got
+    to yet is computed by the taskmaster as usual.
+    """
+
+    def __init__(self, num_threads: int) -> None:
+        self.queue = queue.LifoQueue()
+        self.threads = []
+        for _ in range(num_threads):
+            thread = threading.Thread(target=self._run, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, nodes) -> None:
+        for node in nodes:
+            work = node.prefetch_csig()
+            if work is not None:
+                self.queue.put(work)
+
+    def _run(self) -> None:
+        while True:
+            work = self.queue.get()
+            if work is None:
+                break
+            try:
+                work()
+            except Exception:
+                # Anything that goes wrong will happen again when the
+                # taskmaster computes the signature, and is reported
+                # from there.
+                pass
+
+    def shutdown(self) -> None:
+        """Stop the helper threads, dropping whatever work is left."""
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+
 class InterruptState:
     def __init__(self) -> None:
         self.interrupted = False
@@ -87,6 +223,12 @@ class Jobs:
         if stack_size is None:
             stack_size = default_stack_size
 
+        throttle = None
+        load_average = GetOption('load_average') or 0
+        min_free_memory = GetOption('min_free_memory') or 0
+        if num > 1 and (load_average or min_free_memory):
+            throttle = Throttle(load_average, min_free_memory * 2**20)
+
         experimental_option = GetOption('experimental') or []
         if 'legacy_sched' in experimental_option:
             if num > 1:
@@ -94,7 +236,7 @@ class Jobs:
             else:
                 self.job = Serial(taskmaster)
         else:
-            self.job = NewParallel(taskmaster, num, stack_size)
+            self.job = NewParallel(taskmaster, num, stack_size, throttle)
 
         self.num_jobs = num
 
@@ -471,12 +613,13 @@ class NewParallel:
         def __exit__(self, *args):
             pass
 
-    def __init__(self, taskmaster, num, stack_size) -> None:
+    def __init__(self, taskmaster, num, stack_size, throttle=None) -> None:
         self.taskmaster = taskmaster
         self.max_workers = num
         self.stack_size = stack_size
         self.interrupted = InterruptState()
         self.workers = []
+        self.throttle = throttle
 
         # The `tm_lock` is what ensures that we only have one
         # thread interacting with the taskmaster at a time. It
@@ -499,6 +642,18 @@ class NewParallel:
         self.results_queue_lock = (threading.Lock if self.max_workers > 1 else NewParallel.FakeLock)()
         self.results_queue = []
 
+        # Resource pool bookkeeping, guarded under `tm_lock`: the
+        # number of executing tasks per pool, and the tasks that
+        # needed execution while their pool was full.
+        self.pool_running = {}
+        self.pool_waiting = {}
+
+        # A task held back by the throttle because the system was too
+        # busy, and whether the throttle is holding back tasks at the
+        # moment. Guarded under `tm_lock`.
+        self.throttled_task = None
+        self.throttling = False
+
         if self.taskmaster.trace:
             self.trace = self._setup_logging()
         else:
@@ -520,10 +675,23 @@ class NewParallel:
         if self.max_workers == 1:
             self._work()
         else:
+            # Only one thread at a time searches the taskmaster, so
+            # spare CPUs compute csigs for it meanwhile.  With no CPU
+            # to spare the helpers would just contend for the GIL.
+            helpers = min(self.max_workers, os.cpu_count() or 1) - 1
+            prefetcher = Prefetcher(helpers) if helpers > 0 else None
+            if prefetcher:
+                # Start on the sources known up front, the first needed
+                # on top, while the search hands over what it finds.
+                prefetcher.submit(reversed(self.taskmaster.known_sources()))
+                self.taskmaster.prefetch = prefetcher.submit
             self._start_worker()
             while len(self.workers) > 0:
                 self.workers[0].join()
                 self.workers.pop(0)
+            if prefetcher:
+                self.taskmaster.prefetch = None
+                prefetcher.shutdown()
         self.taskmaster.cleanup()
 
     def _maybe_start_worker(self) -> None:
@@ -559,6 +727,81 @@ class NewParallel:
         if prev_size is not None:
             threading.stack_size(prev_size)
 
+    def _admit(self, task) -> bool:
+        """Tell if *task* may execute now as far as its pool goes.
+
+        A task whose pool is full is queued on the pool, a task naming
+        an unknown pool is failed.  Either way it must not be
+        dispatched by the caller.  Called with `tm_lock` held.
+        """
+        try:
+            pool = get_task_pool(task)
+        except Exception:
+            task.exception_set()
+            task.failed()
+            task.postprocess()
+            return False
+        task.pool = pool
+        if pool is None:
+            return True
+        if self.pool_running.get(pool, 0) >= pools[pool]:
+            if self.trace:
+                self.trace_message(f"Pool {pool} is full, task has to wait")
+            self.pool_waiting.setdefault(pool, []).append(task)
+            return False
+        self.pool_running[pool] = self.pool_running.get(pool, 0) + 1
+        return True
+
+    def _next_waiting_task(self):
+        """Return a task that was held back by a pool which has room now.
+
+        Called with `tm_lock` held.
+        """
+        for pool, waiting in self.pool_waiting.items():
+            if waiting and self.pool_running[pool] < pools[pool]:
+                self.pool_running[pool] += 1
+                return waiting.pop(0)
+        return None
+
+    def _hold_back(self, task) -> bool:
+        """Hold back *task* if the throttle says the system is too busy.
+
+        There is always at least one job running when a task is held
+        back, and the thread which completes it dispatches the held
+        task (or holds it back again) before searching for more work.
+        Called with `tm_lock` held.
+        """
+        if self.throttle is None or not self.jobs:
+            # At least one job always runs, however busy the system is.
+            return False
+        reason = self.throttle.overloaded()
+        if reason is None:
+            if self.throttling:
+                self.throttling = False
+                if self.trace:
+                    self.trace_message("Throttle released, dispatching tasks again")
+            return False
+        if self.trace and not self.throttling:
+            self.trace_message(f"Throttling at {self.jobs} running jobs: {reason}")
+        self.throttling = True
+        self.throttled_task = task
+        self.state = NewParallel.State.STALLED
+        return True
+
+    def _dispatch(self, task) -> None:
+        """Claim *task* for execution by this thread.
+
+        Called with `tm_lock` held.
+        """
+        self.jobs += 1
+        self.state = NewParallel.State.READY
+        self.can_search_cv.notify()
+        # This thread will be busy taking care of
+        # `execute`ing this task. If we haven't
+        # reached the limit, spawn a new thread to
+        # turn the crank and find the next task.
+        self._maybe_start_worker()
+
     def _work(self):
 
         task = None
@@ -642,6 +885,9 @@ class NewParallel:
 
                     rtask.postprocess()
                     self.jobs -= 1
+                    pool = getattr(rtask, 'pool', None)
+                    if pool is not None:
+                        self.pool_running[pool] -= 1
 
                 # We are done with any task objects that were in
                 # the results queue.
@@ -653,6 +899,21 @@ class NewParallel:
                 # until results arrive if jobs are pending, or
                 # mark the walk as complete if not.
                 while self.state == NewParallel.State.SEARCHING:
+                    # A task held back by the throttle, or by a full
+                    # pool that has room again, takes precedence over
+                    # searching.
+                    task, self.throttled_task = self.throttled_task, None
+                    if not task:
+                        task = self._next_waiting_task()
+                        if task and self.trace:
+                            self.trace_message(f"Releasing task waiting for pool {task.pool}")
+                    if task:
+                        if self._hold_back(task):
+                            task = None
+                        else:
+                            self._dispatch(task)
+                        break
+
                     if self.trace:
                         self.trace_message("Searching for new tasks")
                     task = self.taskmaster.next_task()
@@ -678,17 +939,17 @@ class NewParallel:
                                     self.trace_message("Found internal task")
                                 task.executed()
                                 task.postprocess()
+                            elif pools and not self._admit(task):
+                                # Its pool is full (or the pool lookup
+                                # failed): keep turning the crank so the
+                                # rest of the DAG keeps the workers busy.
+                                task = None
+                            elif self._hold_back(task):
+                                task = None
                             else:
-                                self.jobs += 1
                                 if self.trace:
                                     self.trace_message("Found task requiring execution")
-                                self.state = NewParallel.State.READY
-                                self.can_search_cv.notify()
-                                # This thread will be busy taking care of
-                                # `execute`ing this task. If we haven't
-                                # reached the limit, spawn a new thread to
-                                # turn the crank and find the next task.
-                                self._maybe_start_worker()
+                                self._dispatch(task)
 
                     else:
                         # We failed to find a task, so this thread
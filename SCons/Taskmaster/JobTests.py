@@ -25,6 +25,10 @@ import unittest
 import random
 import math
 import os
+import threading
+from unittest import mock
+
+import TestCmd
 
 import SCons.Taskmaster.Job
 from SCons.Script.Main import OptionsParser
@@ -240,6 +244,9 @@ class Taskmaster:
     def exception_set(self) -> None:
         pass
 
+    def known_sources(self):
+        return []
+
     def cleanup(self) -> None:
         pass
 
@@ -387,6 +394,203 @@ class ParallelExceptionTestCase(JobTestCase):
         self.assertTrue(taskmaster.num_postprocessed >= 1,
                     "one or more tasks should have been postprocessed")
 
+class PoolTask(Task):
+    """A dummy task whose odd instances run in the 'link' pool."""
+
+    class Target:
+        def __init__(self, env) -> None:
+            self.env = env
+        def get_build_env(self):
+            return self.env
+
+    def __init__(self, i, taskmaster) -> None:
+        super().__init__(i, taskmaster)
+        self.pooled = i % 2
+        env = {'POOL': taskmaster.pool_name} if self.pooled else {}
+        self.targets = [PoolTask.Target(env)]
+
+    def _do_something(self) -> None:
+        tm = self.taskmaster
+        with tm.guard:
+            tm.running += 1
+            tm.max_running = max(tm.max_running, tm.running)
+            if self.pooled:
+                tm.pool_running += 1
+                tm.max_pool_running = max(tm.max_pool_running, tm.pool_running)
+        time.sleep(0.02)
+        with tm.guard:
+            tm.running -= 1
+            if self.pooled:
+                tm.pool_running -= 1
+
+
+class PoolTestCase(JobTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.save_pools = SCons.Taskmaster.Job.pools
+        SCons.Taskmaster.Job.pools = {'link': 2}
+
+    def tearDown(self) -> None:
+        SCons.Taskmaster.Job.pools = self.save_pools
+
+    def _taskmaster(self, pool_name):
+        taskmaster = Taskmaster(24, self, PoolTask)
+        taskmaster.pool_name = pool_name
+        taskmaster.running = taskmaster.max_running = 0
+        taskmaster.pool_running = taskmaster.max_pool_running = 0
+        return taskmaster
+
+    def test_depth(self) -> None:
+        """test that parallel jobs respect the depth of a pool"""
+        taskmaster = self._taskmaster('link')
+        jobs = SCons.Taskmaster.Job.Jobs(8, taskmaster)
+        jobs.run()
+
+        self.assertTrue(taskmaster.all_tasks_are_executed(),
+                        "all the tests were not executed")
+        self.assertTrue(taskmaster.all_tasks_are_postprocessed(),
+                        "all the tests were not postprocessed")
+        self.assertFalse(taskmaster.num_failed,
+                         "some task(s) failed to execute")
+        self.assertEqual(taskmaster.max_pool_running, 2)
+        # Tasks outside the pool kept running beside the pooled ones.
+        self.assertGreater(taskmaster.max_running, 2)
+
+    def test_unknown_pool(self) -> None:
+        """test that a task naming an undeclared pool fails"""
+        taskmaster = self._taskmaster('nosuch')
+        jobs = SCons.Taskmaster.Job.Jobs(8, taskmaster)
+        jobs.run()
+
+        self.assertTrue(taskmaster.num_failed >= 1,
+                        "one or more tasks should have failed")
+        self.assertFalse(taskmaster.max_pool_running,
+                         "a task in an unknown pool was executed")
+
+
+class ThrottleTestCase(JobTestCase):
+    def test_available_memory(self) -> None:
+        """test reading the available memory from a meminfo file"""
+        test = TestCmd.TestCmd(workdir='')
+        test.write('meminfo', "MemTotal:       16000000 kB\n"
+                              "MemFree:         1000000 kB\n"
+                              "MemAvailable:    4000000 kB\n")
+        available = SCons.Taskmaster.Job.get_available_memory(
+            test.workpath('meminfo'))
+        self.assertEqual(available, 4000000 * 1024)
+        test.write('meminfo', "MemTotal:       16000000 kB\n")
+        available = SCons.Taskmaster.Job.get_available_memory(
+            test.workpath('meminfo'))
+        self.assertIsNone(available)
+        available = SCons.Taskmaster.Job.get_available_memory(
+            test.workpath('nosuchfile'))
+        self.assertIsNone(available)
+
+    def test_overloaded(self) -> None:
+        """test the throttle decision and its sample caching"""
+        samples = []
+        def sample():
+            samples.append(1)
+            return "busy"
+        throttle = SCons.Taskmaster.Job.Throttle(max_load=1)
+        throttle.sample = sample
+        self.assertEqual(throttle.overloaded(), "busy")
+        self.assertEqual(throttle.overloaded(), "busy")
+        self.assertEqual(len(samples), 1)
+        throttle.sampled -= throttle.interval
+        throttle.overloaded()
+        self.assertEqual(len(samples), 2)
+
+        throttle = SCons.Taskmaster.Job.Throttle(min_free_memory=1)
+        with mock.patch('SCons.Taskmaster.Job.get_available_memory',
+                        return_value=0):
+            self.assertIsNotNone(throttle.overloaded())
+        throttle = SCons.Taskmaster.Job.Throttle(min_free_memory=1)
+        with mock.patch('SCons.Taskmaster.Job.get_available_memory',
+                        return_value=None):
+            self.assertIsNone(throttle.overloaded())
+
+    def test_parallel(self) -> None:
+        """test that an overloaded system gets only one job at a time"""
+        class BusyThrottle:
+            def overloaded(self) -> str:
+                return "busy"
+
+        class SleepTask(Task):
+            def _do_something(self) -> None:
+                time.sleep(0.01)
+
+        taskmaster = Taskmaster(8, self, SleepTask)
+        job = SCons.Taskmaster.Job.NewParallel(taskmaster, 4, 256,
+                                               BusyThrottle())
+        job.start()
+
+        self.assertTrue(taskmaster.all_tasks_are_executed(),
+                        "all the tests were not executed")
+        self.assertTrue(taskmaster.all_tasks_are_postprocessed(),
+                        "all the tests were not postprocessed")
+        self.assertTrue(taskmaster.tasks_were_serial(),
+                        "the tasks were executed in parallel")
+
+
+class PrefetcherTestCase(unittest.TestCase):
+    def test_prefetch(self) -> None:
+        """test computing csigs on the helper threads"""
+        class PrefetchNode:
+            def __init__(self) -> None:
+                self.thread = None
+
+            def prefetch_csig(self):
+                return self.prefetch
+
+            def prefetch(self) -> None:
+                self.thread = threading.current_thread()
+
+        class BadNode:
+            def prefetch_csig(self):
+                return self.prefetch
+
+            def prefetch(self) -> None:
+                raise OSError("unreadable")
+
+        class BuiltNode:
+            def prefetch_csig(self) -> None:
+                return None
+
+        nodes = [PrefetchNode() for _ in range(10)]
+        prefetcher = SCons.Taskmaster.Job.Prefetcher(2)
+        threads = prefetcher.threads[:]
+        prefetcher.submit(nodes + [BadNode(), BuiltNode()])
+        deadline = time.monotonic() + 10
+        while any(node.thread is None for node in nodes):
+            self.assertLess(time.monotonic(), deadline, "nodes were not prefetched")
+            time.sleep(0.01)
+        for node in nodes:
+            self.assertIn(node.thread, threads)
+        prefetcher.shutdown()
+        self.assertFalse(any(thread.is_alive() for thread in threads))
+
+    def test_parallel(self) -> None:
+        """test that parallel jobs only prefetch with CPUs to spare"""
+        taskmaster = Taskmaster(4, self, Task)
+        job = SCons.Taskmaster.Job.NewParallel(taskmaster, 4, 256)
+        with mock.patch('SCons.Taskmaster.Job.Prefetcher') as prefetcher, \
+                mock.patch('os.cpu_count', return_value=2):
+            job.start()
+        prefetcher.assert_called_once_with(1)
+        prefetcher.return_value.submit.assert_called_once()
+        prefetcher.return_value.shutdown.assert_called_once_with()
+        self.assertIsNone(taskmaster.prefetch)
+
+        taskmaster = Taskmaster(4, self, Task)
+        job = SCons.Taskmaster.Job.NewParallel(taskmaster, 4, 256)
+        with mock.patch('SCons.Taskmaster.Job.Prefetcher') as prefetcher, \
+                mock.patch('os.cpu_count', return_value=1):
+            job.start()
+        prefetcher.assert_not_called()
+        self.assertTrue(taskmaster.all_tasks_are_executed())
+
+
 #---------------------------------------------------------------------
 # Above tested Job object with contrived Task and Taskmaster objects.
 # Now test Job object with actual Task and Taskmaster objects.
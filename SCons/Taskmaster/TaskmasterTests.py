@@ -68,6 +68,7 @@ class Node:
         self._bsig_val = None
         self._current_val = 0
         self.always_build = None
+        self.build_duration = None
 
     def disambiguate(self):
         return self
@@ -133,6 +134,8 @@ class Node:
         global built_text
         if not self.cached:
             built_text = built_text + " really"
+        # Like the real built(), which resets the build info.
+        self.build_duration = None
 
         # Clear the implicit dependency caches of any Nodes
         # waiting for this Node to be built.
@@ -144,6 +147,12 @@ class Node:
     def release_target_info(self) -> None:
         pass
 
+    def set_build_duration(self, duration) -> None:
+        self.build_duration = duration
+
+    def get_build_duration(self):
+        return self.build_duration
+
     def has_builder(self) -> bool:
         return self.builder is not None
 
@@ -163,6 +172,9 @@ class Node:
             self.scanned = True
         return self.kids
 
+    def known_children(self):
+        return self.kids
+
     def scan(self) -> None:
         global scan_called
         scan_called = scan_called + 1
@@ -541,6 +553,126 @@ class TaskmasterTestCase(unittest.TestCase):
         s = n2.get_state()
         assert s == SCons.Node.executed, s
 
+    def test_critical_path_schedule(self) -> None:
+        """Test ordering candidates by their recorded critical path
+        """
+        # "top" depends on a cheap chain through n1 and on an expensive
+        # chain through n3, declared second.
+        n1 = Node("n1")
+        n2 = Node("n2", [n1])
+        n3 = Node("n3")
+        n4 = Node("n4", [n3])
+        top = Node("top", [n2, n4])
+        for n, d in [(n1, 1.0), (n2, 1.0), (n3, 10.0), (n4, 5.0), (top, 2.0)]:
+            n.build_duration = d
+
+        tm = SCons.Taskmaster.Taskmaster([top])
+        t = tm.next_task()
+        assert t.get_target() == n1, t.get_target()
+
+        schedule = SCons.Taskmaster.CriticalPathSchedule()
+        for n in [n1, n2, n3, n4, top]:
+            n.state = SCons.Node.no_state
+            n.waiting_parents = set()
+            n.ref_count = 0
+        tm = SCons.Taskmaster.Taskmaster([top], schedule=schedule)
+        t = tm.next_task()
+        assert t.get_target() == n3, t.get_target()
+        assert schedule.cost(top) == 2.0, schedule.cost(top)
+        assert schedule.cost(n4) == 7.0, schedule.cost(n4)
+        assert schedule.cost(n3) == 17.0, schedule.cost(n3)
+        assert schedule.cost(n2) == 3.0, schedule.cost(n2)
+
+        # Source nodes and nodes without history cost nothing.
+        n5 = Node("n5")
+        n5.builder = None
+        n5.build_duration = 3.0
+        n6 = Node("n6")
+        assert schedule.node_cost(n5) == 0.0
+        assert schedule.node_cost(n6) == 0.0
+        assert schedule.order(n4, [n5, n6]) == [n5, n6]
+
+    def test_prefetch(self) -> None:
+        """Test handing newly discovered nodes to the prefetch hook
+        """
+        n1 = Node("n1")
+        n2 = Node("n2")
+        n3 = Node("n3", [n1])
+        n4 = Node("n4", [n2, n3])
+
+        prefetched = []
+        tm = SCons.Taskmaster.Taskmaster([n4])
+        tm.prefetch = prefetched.append
+        t = tm.next_task()
+        assert t.get_target() == n2, t.get_target()
+        assert prefetched == [[n3, n2]], prefetched
+        t.executed()
+        t.postprocess()
+        t = tm.next_task()
+        assert t.get_target() == n1, t.get_target()
+        assert prefetched == [[n3, n2], [n1]], prefetched
+        t.executed()
+        t.postprocess()
+
+        # Nodes already visited are not handed over again.
+        t = tm.next_task()
+        assert t.get_target() == n3, t.get_target()
+        assert len(prefetched) == 2, prefetched
+
+    def test_known_sources(self) -> None:
+        """Test finding the sources known before the build
+        """
+        n1 = Node("n1")
+        n2 = Node("n2")
+        n3 = Node("n3", [n1, n2])
+        n4 = Node("n4")
+        n5 = Node("n5", [n3, n4, n1], scans=[Node("scanned")])
+        for n in [n1, n2, n4]:
+            n.builder = None
+
+        tm = SCons.Taskmaster.Taskmaster([n5, n4])
+        sources = tm.known_sources()
+        assert sources == [n1, n2, n4], [str(n) for n in sources]
+        assert not n5.scanned
+        assert tm.next_task().get_target() == n1
+
+    def test_build_duration(self) -> None:
+        """Test that the build time is recorded for built targets
+        """
+        global cache_text
+
+        n1 = Node("n1")
+        tm = SCons.Taskmaster.Taskmaster([n1])
+        t = tm.next_task()
+        t.prepare()
+        t.execute()
+        assert t.build_duration is not None
+        t.executed()
+        assert n1.build_duration == t.build_duration, n1.build_duration
+
+        n2 = Node("n2")
+        n2.cached = 1
+        tm = SCons.Taskmaster.Taskmaster([n2])
+        t = tm.next_task()
+        t.prepare()
+        t.execute()
+        t.executed()
+        assert t.build_duration is None
+        assert n2.build_duration is None, n2.build_duration
+
+        # A target retrieved from the cache keeps its recorded duration.
+        n3 = Node("n3")
+        n3.cached = 1
+        n3.build_duration = 4.0
+        tm = SCons.Taskmaster.Taskmaster([n3])
+        t = tm.next_task()
+        t.prepare()
+        t.execute()
+        t.executed()
+        assert t.build_duration is None
+        assert n3.build_duration == 4.0, n3.build_duration
+        cache_text = []
+
     def test_make_ready_out_of_date(self) -> None:
         """Test the Task.make_ready() method's list of out-of-date Nodes
         """
@@ -48,6 +48,7 @@ Task
 """
 import io
 import sys
+import time
 from abc import ABC, abstractmethod
 from itertools import chain
 import logging
@@ -137,6 +138,7 @@ class Task(ABC):
         self.targets = targets
         self.top = top
         self.node = node
+        self.build_duration = None
         self.exc_clear()
 
     def trace_message(self, node, description: str='node') -> None:
@@ -243,7 +245,9 @@ class Task(ABC):
                     except OSError as e:
                         SCons.Warnings.warn(SCons.Warnings.CacheCleanupErrorWarning,
                             "Failed copying all target files from cache, Error while attempting to remove file %s retrieved from cache: %s" % (t.get_internal_path(), e))
+                start_time = time.perf_counter()
                 self.targets[0].build()
+                self.build_duration = time.perf_counter() - start_time
                 for t in self.targets:
                     t.push_to_cache()
             else:
@@ -301,7 +305,16 @@ class Task(ABC):
                 for side_effect in t.side_effects:
                     side_effect.set_state(NODE_NO_STATE)
                 t.set_state(NODE_EXECUTED)
+                duration = self.build_duration
+                if duration is None and t.cached:
+                    # Retrieved from a CacheDir: keep the duration of
+                    # the build the cached copy stands for.
+                    duration = t.get_build_duration()
                 t.built()
+                if duration is not None:
+                    # built() has reset the build info, so this lands in
+                    # the info that visited() stores into .sconsign.
+                    t.set_build_duration(duration)
                 t.visited()
                 if (not print_prepare and
                     (not hasattr(self, 'options') or not self.options.debug_includes)):
@@ -587,6 +600,54 @@ class OutOfDateTask(Task):
         return self.targets[0].get_state() == SCons.Node.executing
 
 
+class CriticalPathSchedule:
+    """Rank candidate Nodes by the longest known path to a top target.
+
+    The cost of a path is the sum of the build times recorded in the
+    .sconsign file for the Nodes along it (see
+    :meth:`SCons.Node.Node.get_build_duration`).  Since the Taskmaster
+    walks the DAG from the top-level targets down, a parent's cost is
+    already known when its children are discovered, so each child's
+    cost is its own build time plus the largest cost of any parent seen
+    so far.  Children are pushed on to the candidate stack cheapest
+    first, so the one heading the longest chain is evaluated (and its
+    subtree dispatched) first.
+
+    Nodes with no recorded build time count as zero, so the first build
+    in a tree behaves exactly like the default order.
+    """
+
+    def __init__(self) -> None:
+        self.path_cost = {}
+
+    def node_cost(self, node) -> float:
+        if not node.has_builder():
+            return 0.0
+        return node.get_build_duration() or 0.0
+
+    def cost(self, node) -> float:
+        """Return the path cost for *node*, computing it for a root."""
+        try:
+            return self.path_cost[node]
+        except KeyError:
+            cost = self.path_cost[node] = self.node_cost(node)
+            return cost
+
+    def order(self, parent, children):
+        """Propagate *parent*'s cost to *children* and sort them.
+
+        The sort is stable, so children with the same cost keep the
+        order they were handed in.
+        """
+        base = self.cost(parent)
+        path_cost = self.path_cost
+        for child in children:
+            cost = base + self.node_cost(child)
+            if cost > path_cost.get(child, -1.0):
+                path_cost[child] = cost
+        return sorted(children, key=path_cost.__getitem__)
+
+
 def find_cycle(stack, visited):
     if stack[-1] in visited:
         return None
@@ -606,7 +667,7 @@ class Taskmaster:
     The Taskmaster for walking the dependency DAG.
     """
 
-    def __init__(self, targets=[], tasker=None, order=None, trace=None) -> None:
+    def __init__(self, targets=[], tasker=None, order=None, trace=None, schedule=None) -> None:
         self.original_top = targets
         self.top_targets_left = targets[:]
         self.top_targets_left.reverse()
@@ -617,6 +678,10 @@ class Taskmaster:
         if not order:
             order = lambda l: l
         self.order = order
+        self.schedule = schedule
+        # Optional callable handed each batch of newly discovered
+        # nodes, so their csigs can be computed off the search thread.
+        self.prefetch = None
         self.message = None
         self.next_candidate = self.find_next_candidate
         self.pending_children = set()
@@ -676,6 +741,29 @@ class Taskmaster:
             default_formatter=logging.Formatter('%(message)s')
         ))
 
+    def known_sources(self):
+        """
+        Returns the source Nodes the top-level targets are known to need.
+
+        Only the dependencies known before scanning are followed (see
+        Node.known_children()), depth first like the DAG walk itself,
+        so the sources come roughly in the order they will be needed.
+        Nothing is visited or scanned, which lets the result be used
+        to start hashing the sources before the build gets to them.
+        """
+        sources = []
+        seen = set()
+        stack = list(reversed(self.original_top))
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            if not node.has_builder():
+                sources.append(node)
+            stack.extend(reversed(node.known_children()))
+        return sources
+
     def find_next_candidate(self):
         """
         Returns the next candidate Node for (potential) evaluation.
@@ -926,7 +1014,16 @@ class Taskmaster:
             if children_not_visited:
                 if len(children_not_visited) > 1:
                     children_not_visited.reverse()
-                self.candidates.extend(self.order(children_not_visited))
+                children_not_visited = self.order(children_not_visited)
+                if self.schedule:
+                    children_not_visited = self.schedule.order(node, children_not_visited)
+                    if T:
+                        for child in children_not_visited:
+                            self.trace.debug('       critical path cost %.3f: %s' %
+                                             (self.schedule.cost(child), repr(str(child))))
+                self.candidates.extend(children_not_visited)
+                if self.prefetch is not None:
+                    self.prefetch(children_not_visited)
 
             # if T and children_not_visited:
             #    self.trace.debug('     adding to candidates: %s' % map(str, children_not_visited))
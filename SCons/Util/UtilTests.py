@@ -84,6 +84,10 @@ from SCons.Util.hashes import (
     _attempt_get_hash_function,
     _get_hash_object,
     _set_allowed_viable_default_hashes,
+    HashStats,
+    hash_file_signature,
+    get_current_hash_format_used,
+    is_tree_hashed,
 )
 
 try:
@@ -923,6 +927,72 @@ class HashTestCase(unittest.TestCase):
                 s = hash_signature('222', hash_format=algorithm)
                 assert expected[1] == s, s
 
+    def test_hash_file_signature(self) -> None:
+        """Test the buffered and memory mapped file hashing paths"""
+        test = TestCmd.TestCmd(workdir='')
+        contents = b'0123456789' * 1000
+        test.write('file', contents)
+        test.write('empty', b'')
+        fname = test.workpath('file')
+        expected = hashlib.md5(contents).hexdigest()
+
+        stats = HashStats()
+        with unittest.mock.patch('SCons.Util.hashes.hash_stats', stats):
+            for chunksize in (7, 4096, 65536):
+                s = hash_file_signature(fname, chunksize, hash_format='md5')
+                assert s == expected, (chunksize, s)
+            with unittest.mock.patch('SCons.Util.hashes.MMAP_MIN_SIZE', 1):
+                s = hash_file_signature(fname, hash_format='md5')
+                assert s == expected, s
+                s = hash_file_signature(test.workpath('empty'), hash_format='md5')
+                assert s == hashlib.md5(b'').hexdigest(), s
+        assert stats.files == 5, stats.files
+        assert stats.bytes == 4 * len(contents), stats.bytes
+
+    def test_tree_hash(self) -> None:
+        """Test tree hashing of large files"""
+        test = TestCmd.TestCmd(workdir='')
+        contents = bytes(range(256)) * 40
+        test.write('file', contents)
+        fname = test.workpath('file')
+        plain = hashlib.md5(contents).hexdigest()
+        root = hashlib.md5(b'tree:1024:')
+        for offset in range(0, len(contents), 1024):
+            root.update(hashlib.md5(contents[offset:offset + 1024]).digest())
+        expected = root.hexdigest()
+
+        try:
+            set_hash_format('md5-tree')
+            assert get_current_hash_format_used() == 'md5-tree'
+            with unittest.mock.patch('SCons.Util.hashes.TREE_SEGMENT_SIZE', 1024):
+                assert is_tree_hashed(len(contents))
+                assert not is_tree_hashed(1024)
+                assert not is_tree_hashed(len(contents), hash_format='md5')
+                s = hash_file_signature(fname, 100)
+                assert s == expected, s
+                with unittest.mock.patch('mmap.mmap', side_effect=OSError):
+                    s = hash_file_signature(fname, 100)
+                    assert s == expected, s
+                s = hash_file_signature(fname, hash_format='md5')
+                assert s == plain, s
+            # Smaller than a segment: same as the plain hash
+            s = hash_file_signature(fname)
+            assert s == plain, s
+        finally:
+            set_hash_format(None)
+        assert get_current_hash_format_used() == 'md5'
+        assert not is_tree_hashed(len(contents))
+
+    def test_HashStats(self) -> None:
+        """Test accumulating file hashing totals"""
+        stats = HashStats()
+        assert stats.throughput() == 0.0
+        stats.add(1000, 0.5)
+        stats.add(3000, 1.5)
+        assert stats.files == 2, stats.files
+        assert stats.bytes == 4000, stats.bytes
+        assert stats.throughput() == 2000.0, stats.throughput()
+
 # this uses mocking out, which is platform specific, however, the FIPS
 # behavior this is testing is also platform-specific, and only would be
 # visible in hosts running Linux with the fips_mode kernel flag along
@@ -944,20 +1014,29 @@ class FIPSHashTestCase(unittest.TestCase):
         md5Available = unittest.mock.Mock(md5=self.fake_md5)
         del md5Available.sha1
         del md5Available.sha256
+        del md5Available.blake2b
+        del md5Available.blake2s
         self.md5Available=md5Available
 
         md5Default = unittest.mock.Mock(md5=self.fake_md5, sha1=self.fake_sha1)
         del md5Default.sha256
+        del md5Default.blake2b
+        del md5Default.blake2s
         self.md5Default=md5Default
 
         sha1Default = unittest.mock.Mock(sha1=self.fake_sha1, sha256=self.fake_sha256)
         del sha1Default.md5
+        del sha1Default.blake2b
+        del sha1Default.blake2s
         self.sha1Default=sha1Default
 
         sha256Default = unittest.mock.Mock(sha256=self.fake_sha256, **{'md5.side_effect': ValueError, 'sha1.side_effect': ValueError})
+        del sha256Default.blake2b
+        del sha256Default.blake2s
         self.sha256Default=sha256Default
 
-        all_throw = unittest.mock.Mock(**{'md5.side_effect': ValueError, 'sha1.side_effect': ValueError, 'sha256.side_effect': ValueError})
+        all_throw = unittest.mock.Mock(**{'md5.side_effect': ValueError, 'sha1.side_effect': ValueError, 'sha256.side_effect': ValueError,
+                                          'blake2b.side_effect': ValueError, 'blake2s.side_effect': ValueError})
         self.all_throw=all_throw
 
         no_algorithms = unittest.mock.Mock()
@@ -965,6 +1044,8 @@ class FIPSHashTestCase(unittest.TestCase):
         del no_algorithms.sha1
         del no_algorithms.sha256
         del no_algorithms.nonexist
+        del no_algorithms.blake2b
+        del no_algorithms.blake2s
         self.no_algorithms=no_algorithms
 
         unsupported_algorithm = unittest.mock.Mock(unsupported=self.fake_sha256)
@@ -972,6 +1053,8 @@ class FIPSHashTestCase(unittest.TestCase):
         del unsupported_algorithm.sha1
         del unsupported_algorithm.sha256
         del unsupported_algorithm.unsupported
+        del unsupported_algorithm.blake2b
+        del unsupported_algorithm.blake2s
         self.unsupported_algorithm=unsupported_algorithm
         ###############################
 
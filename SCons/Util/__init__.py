@@ -96,9 +96,12 @@ from .hashes import (
     get_hash_format,
     set_hash_format,
     get_current_hash_algorithm_used,
+    get_current_hash_format_used,
     hash_signature,
     hash_file_signature,
+    is_tree_hashed,
     hash_collect,
+    hash_stats,
     MD5signature,
     MD5filesignature,
     MD5collect,
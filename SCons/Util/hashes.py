@@ -12,17 +12,27 @@ from __future__ import annotations
 
 import functools
 import hashlib
+import mmap
+import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from .sctypes import to_bytes
 
 
 # Default hash function and format. SCons-internal.
-DEFAULT_HASH_FORMATS = ['md5', 'sha1', 'sha256']
+DEFAULT_HASH_FORMATS = ['md5', 'sha1', 'sha256', 'blake2b', 'blake2s']
 ALLOWED_HASH_FORMATS = []
 _HASH_FUNCTION = None
 _HASH_FORMAT = None
 
+# Appended to a hash format to select tree hashing of large files,
+# e.g. "blake2b-tree".  See hash_file_signature().
+HASH_TREE_SUFFIX = '-tree'
+_HASH_TREE = False
+
 
 def _attempt_init_of_python_3_9_hash_object(hash_function_object, sys_used=sys):
     """Initialize hash function with non-security indicator.
@@ -155,13 +165,20 @@ def set_hash_format(hash_format, hashlib_used=hashlib, sys_used=sys):
     an empty string, the default is determined by this function.
 
     Currently the default behavior is to use the first available format of
-    the following options: MD5, SHA1, SHA256.
+    the following options: MD5, SHA1, SHA256, BLAKE2b, BLAKE2s.
+
+    Any of the formats can be followed by ``-tree`` (e.g. ``blake2b-tree``)
+    to select tree hashing of large files, see :func:`hash_file_signature`.
     """
-    global _HASH_FORMAT, _HASH_FUNCTION
+    global _HASH_FORMAT, _HASH_FUNCTION, _HASH_TREE
 
     _HASH_FORMAT = hash_format
+    _HASH_TREE = False
     if hash_format:
         hash_format_lower = hash_format.lower()
+        hash_tree = hash_format_lower.endswith(HASH_TREE_SUFFIX)
+        if hash_tree:
+            hash_format_lower = hash_format_lower[:-len(HASH_TREE_SUFFIX)]
         if hash_format_lower not in ALLOWED_HASH_FORMATS:
             from SCons.Errors import (  # pylint: disable=import-outside-toplevel
                 UserError,
@@ -220,6 +237,7 @@ def set_hash_format(hash_format, hashlib_used=hashlib, sys_used=sys):
                 'Python interpreter. Expected to be supported algorithm by '
                 'set_allowed_viable_default_hashes. Assertion error in SCons.'
             )
+        _HASH_TREE = hash_tree
     else:
         # Set the default hash format based on what is available, defaulting
         # to the first supported hash algorithm (usually md5) for backwards
@@ -263,6 +281,18 @@ def get_current_hash_algorithm_used():
     return _HASH_FUNCTION
 
 
+def get_current_hash_format_used():
+    """Returns the name of the current hash format.
+
+    This is the algorithm name from :func:`get_current_hash_algorithm_used`,
+    with ``-tree`` appended if large files are tree hashed, as the
+    file signatures then differ from those of the plain algorithm.
+    """
+    if _HASH_TREE:
+        return _HASH_FUNCTION + HASH_TREE_SUFFIX
+    return _HASH_FUNCTION
+
+
 def _get_hash_object(hash_format, hashlib_used=hashlib, sys_used=sys):
     """Allocates a hash object using the requested hash format.
 
@@ -318,9 +348,153 @@ def hash_signature(s, hash_format=None):
     return m.hexdigest()
 
 
+class HashStats:
+    """Totals of the file contents hashed, reported by ``--debug=time``.
+
+    Files are hashed from several threads, so updates take a lock.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.files = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def add(self, nbytes: int, seconds: float) -> None:
+        with self.lock:
+            self.files += 1
+            self.bytes += nbytes
+            self.seconds += seconds
+
+    def throughput(self) -> float:
+        """Return the bytes hashed per second."""
+        if not self.seconds:
+            return 0.0
+        return self.bytes / self.seconds
+
+
+hash_stats = HashStats()
+
+# Files at least this big are hashed straight from a memory map of the
+# file instead of being read into a buffer.  Below it, the cost of
+# setting up the mapping outweighs the copy saved.
+MMAP_MIN_SIZE = 16 * 1024 * 1024
+
+
+def _hash_mapped_file(m, f, size) -> bool:
+    """Feed the open file *f* to the hash object *m* from a memory map.
+
+    Returns False if the file can't be mapped, before *m* is touched.
+    """
+    try:
+        mapped = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+    except (OSError, ValueError, OverflowError):
+        return False
+    with mapped:
+        m.update(mapped)
+    return True
+
+
+def _hash_read_file(m, f, chunksize, length) -> int:
+    """Feed *length* bytes of the open file *f* to the hash object *m*.
+
+    The data is read *chunksize* bytes at a time into a single reused
+    buffer.  Stops early at end of file; returns the bytes hashed.
+    """
+    nbytes = 0
+    buf = bytearray(min(chunksize, length) or 1)
+    view = memoryview(buf)
+    while nbytes < length:
+        n = f.readinto(view[:length - nbytes])
+        if not n:
+            break
+        m.update(view[:n])
+        nbytes += n
+    return nbytes
+
+
+# In tree hashing mode, files larger than this are hashed in segments of
+# this size and the signature is the hash of the segment hashes.
+TREE_SEGMENT_SIZE = 4 * 1024 * 1024
+_tree_pool = None
+_tree_pool_lock = threading.Lock()
+
+
+def _get_tree_pool() -> ThreadPoolExecutor:
+    """Return the threads the segments of tree hashed files are hashed on."""
+    global _tree_pool
+    with _tree_pool_lock:
+        if _tree_pool is None:
+            _tree_pool = ThreadPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                thread_name_prefix='scons-hash',
+            )
+        return _tree_pool
+
+
+def is_tree_hashed(size: int, hash_format=None) -> bool:
+    """Return whether :func:`hash_file_signature` tree hashes *size* bytes.
+
+    Files that are not tree hashed get the same signature as from
+    :func:`hash_signature` of their contents.
+    """
+    return hash_format is None and _HASH_TREE and size > TREE_SEGMENT_SIZE
+
+
+def _hash_file_tree(f, size, chunksize) -> str:
+    """Return the tree hash signature of the open file *f*.
+
+    The segments are hashed independently on the tree hashing threads,
+    from a memory map of the file if possible.  The root hash covers
+    the segment size and the segment digests in file order.
+    """
+    offsets = range(0, size, TREE_SEGMENT_SIZE)
+    try:
+        mapped = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+    except (OSError, ValueError, OverflowError):
+        mapped = None
+
+    if mapped is not None:
+        def hash_segment(offset):
+            m = _get_hash_object(None)
+            end = offset + TREE_SEGMENT_SIZE
+            with memoryview(mapped) as view, view[offset:end] as segment:
+                m.update(segment)
+            return m.digest()
+
+        with mapped:
+            digests = list(_get_tree_pool().map(hash_segment, offsets))
+    else:
+        def hash_segment(offset):
+            m = _get_hash_object(None)
+            with open(f.name, "rb", buffering=0) as sf:
+                sf.seek(offset)
+                _hash_read_file(m, sf, chunksize, TREE_SEGMENT_SIZE)
+            return m.digest()
+
+        digests = list(_get_tree_pool().map(hash_segment, offsets))
+
+    m = _get_hash_object(None)
+    m.update(b'tree:%d:' % TREE_SEGMENT_SIZE)
+    for digest in digests:
+        m.update(digest)
+    return m.hexdigest()
+
+
 def hash_file_signature(fname, chunksize: int=65536, hash_format=None):
     """
-    Generate the md5 signature of a file
+    Generate the signature of a file's contents
+
+    Large files are hashed from a memory map, others are read
+    *chunksize* bytes at a time into a single reused buffer, so no
+    per-chunk bytes objects are created.  The hash functions release
+    the GIL while they work on the data.
+
+    If a ``-tree`` hash format is in use (see :func:`set_hash_format`)
+    and *hash_format* is not given, files larger than
+    :data:`TREE_SEGMENT_SIZE` are tree hashed instead: their segments
+    are hashed in parallel threads and the signature is the hash of
+    the segment hashes.
 
     Args:
         fname: file to hash
@@ -332,15 +506,18 @@ def hash_file_signature(fname, chunksize: int=65536, hash_format=None):
     """
 
     m = _get_hash_object(hash_format)
-    with open(fname, "rb") as f:
-        while True:
-            blck = f.read(chunksize)
-            if not blck:
-                break
-            m.update(to_bytes(blck))
-        # TODO: can use this when base is Python 3.8+
-        # while (blk := f.read(chunksize)) != b'':
-        #     m.update(to_bytes(blk))
+    start = time.perf_counter()
+    with open(fname, "rb", buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        if is_tree_hashed(size, hash_format):
+            csig = _hash_file_tree(f, size, chunksize)
+            hash_stats.add(size, time.perf_counter() - start)
+            return csig
+        if size >= MMAP_MIN_SIZE and _hash_mapped_file(m, f, size):
+            nbytes = size
+        else:
+            nbytes = _hash_read_file(m, f, min(chunksize, size), sys.maxsize)
+    hash_stats.add(nbytes, time.perf_counter() - start)
 
     return m.hexdigest()
 
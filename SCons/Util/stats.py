@@ -40,6 +40,8 @@ There are basically two types of stats:
 2. Counter. Counting the number of events and/or objects created. This
    would likely only be reported at the end of a given SCons run,
    though it might be useful to query during a run.
+
+3. Records. One per derived-file cache request, for the JSON file only.
 """
 
 from abc import ABC
@@ -91,35 +93,51 @@ class CountStats(Stats):
     def __init__(self):
         super().__init__()
         self.stats_table = {}
+        self.syscalls = []
+        self.syscalls_table = {}
 
     def do_append(self, label):
         self.labels.append(label)
         self.stats.append(SCons.Debug.fetchLoggedInstances())
+        self.syscalls.append(SCons.Debug.fetchSyscallCounts())
 
-    def do_print(self):
-        self.stats_table = {}
-        for s in self.stats:
+    @staticmethod
+    def _table(stats):
+        table = {}
+        for s in stats:
             for n in [t[0] for t in s]:
-                self.stats_table[n] = [0, 0, 0, 0]
+                table[n] = [0, 0, 0, 0]
         i = 0
-        for s in self.stats:
+        for s in stats:
             for n, c in s:
-                self.stats_table[n][i] = c
+                table[n][i] = c
             i = i + 1
-        self.outfp.write("Object counts:\n")
+        return table
+
+    def _print_table(self, title, table, column):
+        self.outfp.write(title)
         pre = ["   "]
         post = ["   %s\n"]
         l = len(self.stats)
         fmt1 = ''.join(pre + [' %7s'] * l + post)
         fmt2 = ''.join(pre + [' %7d'] * l + post)
         labels = self.labels[:l]
-        labels.append(("", "Class"))
+        labels.append(("", column))
         self.outfp.write(fmt1 % tuple(x[0] for x in labels))
         self.outfp.write(fmt1 % tuple(x[1] for x in labels))
-        for k in sorted(self.stats_table.keys()):
-            r = self.stats_table[k][:l] + [k]
+        for k in sorted(table.keys()):
+            r = table[k][:l] + [k]
             self.outfp.write(fmt2 % tuple(r))
 
+    def do_print(self):
+        self.stats_table = self._table(self.stats)
+        self._print_table("Object counts:\n", self.stats_table, "Class")
+        # The file system calls made for Nodes so far, and the stat
+        # calls directory listings made unneeded.
+        self.syscalls_table = self._table(self.syscalls)
+        if self.syscalls_table:
+            self._print_table("File system calls:\n", self.syscalls_table, "Call")
+
 
 class MemStats(Stats):
     def do_append(self, label):
@@ -136,6 +154,7 @@ class TimeStats(Stats):
     def __init__(self):
         super().__init__()
         self.totals = {}
+        self.hashing = {}
         self.commands = {}  # we get order from insertion order, and can address individual via dict
 
     def total_times(self, build_time, sconscript_time, scons_exec_time, command_exec_time):
@@ -146,6 +165,14 @@ class TimeStats(Stats):
             'command_exec_time': command_exec_time
         }
 
+    def hash_totals(self, files, nbytes, seconds):
+        self.hashing = {
+            'files': files,
+            'bytes': nbytes,
+            'seconds': seconds,
+            'bytes_per_second': nbytes / seconds if seconds else 0.0,
+        }
+
     def add_command(self, command, start_time, finish_time):
         if command in self.commands:
             print("Duplicate command %s" % command)
@@ -154,15 +181,82 @@ class TimeStats(Stats):
                                   'duration': finish_time - start_time}
 
 
+class CacheStats(Stats):
+    """Records of the requests to the derived-file cache.
+
+    One record per target looked up, added by :mod:`SCons.CacheDir`
+    from the build threads: the target and its build signature, the
+    cache, whether it was a hit, how the file was retrieved or why it
+    wasn't, the bytes copied and how long that took, and the build
+    time of the target - what a hit saved, or what a miss cost.
+    The records come with the target Node instead of the build time,
+    which :meth:`resolve` looks up once the build is done.
+    """
+
+    #: How many entries the rankings of the summary list.
+    top = 10
+
+    def do_append(self, record):
+        self.stats.append(record)
+
+    def resolve(self):
+        """Replace the target Nodes of the records with their build times.
+
+        Called from the main thread once the build is done, the only
+        one that reads in the signature database.
+        """
+        for r in self.stats:
+            node = r.pop('node', None)
+            if node is not None:
+                r['build_time'] = node.get_build_duration()
+
+    def summary(self):
+        """Return the totals of the records."""
+        self.resolve()
+        hits = [r for r in self.stats if r['hit']]
+        reasons = {}
+        for r in self.stats:
+            if not r['hit']:
+                reasons[r['how']] = reasons.get(r['how'], 0) + 1
+        return {
+            'requests': len(self.stats),
+            'hits': len(hits),
+            'misses': len(self.stats) - len(hits),
+            'bytes': sum(r['bytes'] for r in hits),
+            'seconds': sum(r['seconds'] for r in hits),
+            'time_saved': sum(r['build_time'] or 0.0 for r in hits),
+            'miss_reasons': reasons,
+        }
+
+    def ranked(self, hit):
+        """Return the hits, or the misses, that cost the most build time.
+
+        Misses are counted per target, so one missed by several caches
+        in a row ranks before one missed once.
+        """
+        self.resolve()
+        totals = {}
+        for r in self.stats:
+            if r['hit'] == hit:
+                entry = totals.setdefault(r['target'], {
+                    'target': r['target'], 'bsig': r['bsig'],
+                    'build_time': r['build_time'], 'count': 0})
+                entry['count'] += 1
+        key = lambda e: (e['count'] if not hit else 0, e['build_time'] or 0.0)
+        return sorted(totals.values(), key=key, reverse=True)[:self.top]
+
+
 count_stats = CountStats()
 memory_stats = MemStats()
 time_stats = TimeStats()
+cache_stats = CacheStats()
 
 
 def write_scons_stats_file():
     """
     Actually write the JSON file with debug information.
-    Depending which of : count, time, action-timestamps,memory their information will be written.
+    Depending which of : count, time, action-timestamps,memory their information will be written,
+    as well as the records of the derived-file cache requests.
     """
 
     # Have to import where used to avoid import loop
@@ -183,6 +277,14 @@ def write_scons_stats_file():
             for l, v in zip(count_stats.labels, count_stats.stats_table[c]):
                 oc[c][''.join(l)] = v
 
+        json_structure['File system calls'] = {}
+
+        fc = json_structure['File system calls']
+        for c in count_stats.syscalls_table:
+            fc[c] = {}
+            for l, v in zip(count_stats.labels, count_stats.syscalls_table[c]):
+                fc[c][''.join(l)] = v
+
     if memory_stats.enabled:
         json_structure['Memory'] = {}
 
@@ -192,7 +294,15 @@ def write_scons_stats_file():
 
     if time_stats.enabled:
         json_structure['Time'] = {'Commands': time_stats.commands,
-                                  'Totals': time_stats.totals}
+                                  'Totals': time_stats.totals,
+                                  'Hashing': time_stats.hashing}
+
+    if cache_stats.enabled:
+        cache_stats.resolve()
+        json_structure['Cache'] = {'Targets': cache_stats.stats,
+                                   'Summary': cache_stats.summary(),
+                                   'Most valuable': cache_stats.ranked(True),
+                                   'Most missed': cache_stats.ranked(False)}
 
     # Now add information about this build to the JSON file
     json_structure['Build_Info'] = {
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+#
+# MIT License
+#
+# Copyright The SCons Foundation
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Serve an SCons cache directory over HTTP.
+
+A reference server for :class:`SCons.CacheDirHTTP.HTTPCacheDir`:
+``GET`` and ``HEAD`` on ``/<signature>`` fetch a cached file,
+``PUT`` on it stores one.  The files are kept in an ordinary cache
+directory, so it can also be used as a local :func:`CacheDir`, and
+configured and cleaned up with ``scons-configure-cache``.
+
+This is meant for testing, and for small teams on a trusted network:
+there is no authentication.
+"""
+
+import argparse
+import os
+import re
+import shutil
+import stat
+import sys
+import uuid
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from SCons.CacheDir import CacheDir, mark_used, read_manifest
+from SCons.CacheDirHTTP import MODE_HEADER
+
+# Signatures are hex digests; anything else can't be a cache entry,
+# and mustn't be turned into a path.
+SIGNATURE = re.compile(r'[0-9A-Za-z]+')
+CHUNK = 1024 * 1024
+
+
+class CacheRequestHandler(BaseHTTPRequestHandler):
+    """Answer the requests of the cache protocol.
+
+    Uses ``HTTP/1.1`` so that clients can keep connections open.
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def entry(self):
+        """Return the path of the file asked for, or ``None`` if not valid."""
+        sig = self.path.rsplit('/', 1)[-1]
+        if self.path != '/' + sig or not SIGNATURE.fullmatch(sig):
+            return None
+        return self.server.cachepath(sig)
+
+    def reply(self, status, length=0, mode=None) -> None:
+        self.send_response(status)
+        self.send_header('Content-Length', str(length))
+        if mode is not None:
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header(MODE_HEADER, '%o' % mode)
+        self.end_headers()
+
+    def do_HEAD(self) -> None:
+        self.send_entry(body=False)
+
+    def do_GET(self) -> None:
+        self.send_entry(body=True)
+
+    def send_entry(self, body) -> None:
+        path = self.entry()
+        if path is None:
+            self.reply(HTTPStatus.BAD_REQUEST)
+            return
+        # With the dedup layout, send the file the manifest names.
+        used = [path]
+        mode = None
+        try:
+            manifest = read_manifest(path)
+            if manifest is not None:
+                csig, mode = manifest
+                path = self.server.cache.sigpath(csig)[1]
+                used.append(path)
+            f = open(path, 'rb')
+        except (OSError, ValueError):
+            self.reply(HTTPStatus.NOT_FOUND)
+            return
+        with f:
+            st = os.fstat(f.fileno())
+            if mode is None:
+                mode = stat.S_IMODE(st.st_mode)
+            self.reply(HTTPStatus.OK, st.st_size, mode)
+            if body:
+                shutil.copyfileobj(f, self.wfile, CHUNK)
+                for path in used:
+                    mark_used(path)
+
+    def do_PUT(self) -> None:
+        path = self.entry()
+        length = self.headers.get('Content-Length')
+        if path is None or length is None or not length.isdigit():
+            # Without a length we can't tell where the next request starts.
+            self.close_connection = True
+            self.reply(HTTPStatus.BAD_REQUEST if length else HTTPStatus.LENGTH_REQUIRED)
+            return
+        length = int(length)
+        mode = self.headers.get(MODE_HEADER)
+        try:
+            mode = int(mode, 8) & 0o777 | stat.S_IWUSR if mode else None
+        except ValueError:
+            mode = None
+        if self.server.readonly:
+            self.discard(length)
+            self.reply(HTTPStatus.FORBIDDEN)
+            return
+        if os.path.exists(path):
+            self.discard(length)
+            self.reply(HTTPStatus.OK)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tempfile = "%s.tmp%s" % (path, uuid.uuid4().hex)
+        try:
+            with open(tempfile, 'wb') as f:
+                while length:
+                    data = self.rfile.read(min(length, CHUNK))
+                    if not data:
+                        raise ConnectionError("request body ended early")
+                    f.write(data)
+                    length -= len(data)
+            if mode is not None:
+                os.chmod(tempfile, mode)
+            os.replace(tempfile, path)
+        except OSError:
+            self.close_connection = True
+            try:
+                os.unlink(tempfile)
+            except OSError:
+                pass
+            self.reply(HTTPStatus.INTERNAL_SERVER_ERROR)
+            return
+        mark_used(path)
+        self.reply(HTTPStatus.CREATED)
+
+    def discard(self, length) -> None:
+        while length:
+            data = self.rfile.read(min(length, CHUNK))
+            if not data:
+                break
+            length -= len(data)
+
+    def log_message(self, format, *args) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class CacheServer(ThreadingHTTPServer):
+    """Serve the cache directory *directory*, creating it if needed."""
+
+    daemon_threads = True
+
+    def __init__(self, directory, address=('', 0), readonly=False, verbose=False) -> None:
+        self.cache = CacheDir(directory)
+        self.readonly = readonly
+        self.verbose = verbose
+        super().__init__(address, CacheRequestHandler)
+
+    def cachepath(self, sig) -> str:
+        return self.cache.sigpath(sig)[1]
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return 'http://%s:%d' % (host, port)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Serve an scons cache directory over HTTP')
+    parser.add_argument('cache_dir', metavar='cache-dir',
+                        help='Path to scons cache directory')
+    parser.add_argument('--bind', default='',
+                        help='Address to listen on (default: all)')
+    parser.add_argument('--port', type=int, default=8000,
+                        help='Port to listen on, 0 for any (default: 8000)')
+    parser.add_argument('--readonly', action='store_true',
+                        help='Refuse to store files')
+    parser.add_argument('--verbose', action='store_true',
+                        help='Log each request')
+    args = parser.parse_args()
+
+    server = CacheServer(args.cache_dir, (args.bind, args.port),
+                         readonly=args.readonly, verbose=args.verbose)
+    print("Serving %s at %s" % (args.cache_dir, server.url), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
@@ -30,7 +30,9 @@
 A cache of derived files is stored by file signature.
 The files are split into directories named by the first few
 digits of the signature. The prefix length used for directory
-names can be changed by this script.
+names can be changed by this script, as can the maximum size of
+the cache, which it can also evict files down to, and the compression
+and layout of files added to it.
 """
 
 import argparse
@@ -38,6 +40,8 @@ import glob
 import json
 import os
 
+from SCons.CacheDir import COMPRESSIONS, LAYOUTS, collect_garbage
+
 def rearrange_cache_entries(current_prefix_len, new_prefix_len) -> None:
     """Move cache files if prefix length changed.
 
@@ -65,6 +69,18 @@ def rearrange_cache_entries(current_prefix_len, new_prefix_len) -> None:
         os.rmdir(dname)
 
 
+def parse_size(value) -> int:
+    """Convert a size in bytes, with an optional K, M, G or T suffix."""
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+    value = value.strip().upper().rstrip('B')
+    try:
+        if value and value[-1] in units:
+            return int(float(value[:-1]) * units[value[-1]])
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid size: %r" % value)
+
+
 # The configuration dictionary should have one entry per entry in the
 # cache config. The value of each entry should include the following:
 #   implicit - (optional) This is to allow adding a new config entry and also
@@ -86,6 +102,35 @@ config_entries = {
             'type': int
         },
         'converter': rearrange_cache_entries
+    },
+    'max_size': {
+        'default': 0,
+        'command-line': {
+            'help': 'Size in bytes (with an optional K, M, G or T suffix) '
+                    'to keep the cache within by evicting the least recently '
+                    'used files, or 0 for no limit',
+            'metavar': '<size>',
+            'type': parse_size
+        }
+    },
+    'compression': {
+        'default': 'none',
+        'command-line': {
+            'help': 'Codec to compress files added to the cache with; '
+                    'files already in it are read whatever their codec',
+            'choices': COMPRESSIONS
+        }
+    },
+    'layout': {
+        'default': 'plain',
+        'command-line': {
+            'help': 'How to store files added to the cache: plain, a copy '
+                    'for each build signature, dedup, one copy for each '
+                    'content, named by a manifest for each build signature, '
+                    'or bundle, the targets of a builder with several in one '
+                    'archive; files already in it are read whatever the layout',
+            'choices': LAYOUTS
+        }
     }
 }
 
@@ -108,9 +153,14 @@ def main():
     parser.add_argument('--show',
                         action="store_true",
                         help="show current configuration")
+    parser.add_argument('--gc',
+                        action="store_true",
+                        help="evict the least recently used files now "
+                             "if the cache is over its max-size")
 
     # Get the command line as a dict without any of the unspecified entries.
-    args = dict([x for x in vars(parser.parse_args()).items() if x[1]])
+    args = dict([x for x in vars(parser.parse_args()).items()
+                 if x[1] is not None and x[1] is not False])
 
     # It seems somewhat strange to me, but positional arguments don't get the -
     # in the name changed to _, whereas optional arguments do...
@@ -144,6 +194,7 @@ def main():
             file_count -= 1
         print("Cache contains %s files" % file_count)
         del args['show']
+    gc = args.pop('gc', False)
 
     # Find any keys that are not currently set but should be
     for key in config_entries:
@@ -167,5 +218,15 @@ def main():
     with open('config', 'w') as conf:
         json.dump(config, conf)
 
+    if gc:
+        if not config['max_size']:
+            print("Cache '%s' has no max-size to collect garbage to" % cache)
+            return
+        result = collect_garbage('.', config['max_size'])
+        if result is None:
+            print("Cache '%s' is already being collected" % cache)
+        else:
+            print("Removed %d files, %d bytes; cache holds %d bytes" % result)
+
 if __name__ == "__main__":
     main()
@@ -38,16 +38,28 @@ import pickle
 
 import SCons.compat
 import SCons.SConsign
+import SCons.SConsignCompact
+from SCons.compat import PICKLE_PROTOCOL
+
+
+# Suffixes of the SCons database modules' files.
+SCONS_DB_SUFFIXES = (
+    (".dblite", "SCons.dblite"),
+    (".dblog", "SCons.dblog"),
+    (".sqlite", "SCons.dbsqlite"),
+)
 
 
 def my_whichdb(filename):
-    if filename[-7:] == ".dblite":
-        return "SCons.dblite"
-    try:
-        with open(filename + ".dblite", "rb"):
-            return "SCons.dblite"
-    except OSError:
-        pass
+    for suffix, module in SCONS_DB_SUFFIXES:
+        if filename.endswith(suffix):
+            return module
+    for suffix, module in SCONS_DB_SUFFIXES:
+        try:
+            with open(filename + suffix, "rb"):
+                return module
+        except OSError:
+            pass
     return whichdb(filename)
 
 
@@ -68,6 +80,7 @@ Print_Entries = []
 Print_Flags = Flagger()
 Verbose = 0
 Readable = 0
+Convert = None
 Warns = 0
 
 
@@ -269,6 +282,11 @@ class Do_SConsignDB:
         self.dbm = dbm
 
     def __call__(self, fname):
+        if Convert and getattr(self.dbm, "PER_ENTRY", False):
+            sys.stderr.write("sconsign: can't convert `%s' file `%s'\n"
+                             % (self.dbm_name, fname))
+            return
+        flag = "w" if Convert else "r"
         # The *dbm modules stick their own file suffixes on the names
         # that are passed in.  This causes us to jump through some
         # hoops here.
@@ -278,7 +296,7 @@ class Do_SConsignDB:
             #   ---------                  -------------------------
             #   .sconsign               => .sconsign.dblite
             #   .sconsign.dblite        => .sconsign.dblite.dblite
-            db = self.dbm.open(fname, "r")
+            db = self.dbm.open(fname, flag)
         except OSError as e:
             print_e = e
             try:
@@ -286,7 +304,7 @@ class Do_SConsignDB:
                 # so that if they actually passed in 'sconsign.dblite'
                 # (for example), the dbm module will put the suffix back
                 # on for us and open it anyway.
-                db = self.dbm.open(os.path.splitext(fname)[0], "r")
+                db = self.dbm.open(os.path.splitext(fname)[0], flag)
             except OSError:
                 # That didn't work either.  See if the file name
                 # they specified even exists (independent of the dbm
@@ -314,7 +332,10 @@ class Do_SConsignDB:
                 sys.stderr.write("unrecognized pickle protocol.\n")
             return
 
-        if Print_Directories:
+        self.table = SCons.SConsignCompact.PathTable.read(db)
+        if Convert:
+            self.convert(db, fname)
+        elif Print_Directories:
             for dir in Print_Directories:
                 try:
                     val = db[dir]
@@ -324,19 +345,67 @@ class Do_SConsignDB:
                 else:
                     self.printentries(dir, val)
         else:
-            for dir in sorted(db.keys()):
+            for dir in sorted(self.dirs(db)):
                 self.printentries(dir, db[dir])
 
     @staticmethod
-    def printentries(dir, val) -> None:
+    def dirs(db) -> list:
+        """Return the directory keys of *db*, leaving out the path table."""
+        table_keys = (SCons.SConsignCompact.TABLE_KEY,
+                      SCons.SConsignCompact.TABLE_KEY.encode())
+        return [key for key in db.keys() if key not in table_keys]
+
+    def loads(self, val) -> dict:
+        if SCons.SConsignCompact.is_compact(val):
+            return SCons.SConsignCompact.loads(val, self.table)
+        return pickle.loads(val)
+
+    def printentries(self, dir, val) -> None:
         try:
             print('=== ' + dir + ':')
         except TypeError:
             print('=== ' + dir.decode() + ':')
-        printentries(pickle.loads(val), dir)
+        printentries(self.loads(val), dir)
+
+    def convert(self, db, fname) -> None:
+        """Rewrite every directory of *db* in the *Convert* encoding.
+
+        Converting to the compact encoding starts a new path table, so
+        it also drops paths no directory uses any more.
+        """
+        table = SCons.SConsignCompact.PathTable()
+        dirs = self.dirs(db)
+        before = after = 0
+        for dir in dirs:
+            val = db[dir]
+            before += len(val)
+            entries = self.loads(val)
+            if Convert == 'compact':
+                val = SCons.SConsignCompact.dumps(entries, table)
+            else:
+                val = pickle.dumps(entries, PICKLE_PROTOCOL)
+            after += len(val)
+            db[dir] = val
+        if SCons.SConsignCompact.TABLE_KEY in db:
+            before += len(db[SCons.SConsignCompact.TABLE_KEY])
+            if Convert != 'compact':
+                del db[SCons.SConsignCompact.TABLE_KEY]
+        if Convert == 'compact':
+            val = table.encode()
+            after += len(val)
+            db[SCons.SConsignCompact.TABLE_KEY] = val
+        try:
+            db.close()
+        except AttributeError:
+            pass
+        print("%s: converted %d directories to %s: %d bytes -> %d bytes"
+              % (fname, len(dirs), Convert, before, after))
 
 
 def Do_SConsignDir(name):
+    if Convert:
+        sys.stderr.write("sconsign: can't convert .sconsign file `%s'\n" % name)
+        return
     try:
         with open(name, 'rb') as fp:
             try:
@@ -364,6 +433,7 @@ def main() -> None:
     global args
     global Verbose
     global Readable
+    global Convert
 
     helpstr = """\
 Usage: sconsign [OPTIONS] [FILE ...]
@@ -371,6 +441,8 @@ Usage: sconsign [OPTIONS] [FILE ...]
 Options:
   -a, --act, --action         Print build action information.
   -c, --csig                  Print content signature information.
+  --convert=ENCODING          Rewrite the database FILE with its entries in
+                                ENCODING: compact or pickle.
   -d DIR, --dir=DIR           Print only info about DIR.
   -e ENTRY, --entry=ENTRY     Print only info about ENTRY.
   -f FORMAT, --format=FORMAT  FILE is in the specified FORMAT.
@@ -391,6 +463,7 @@ Options:
                 'act',
                 'action',
                 'csig',
+                'convert=',
                 'dir=',
                 'entry=',
                 'format=',
@@ -413,6 +486,12 @@ Options:
             Print_Flags['action'] = 1
         elif o in ('-c', '--csig'):
             Print_Flags['csig'] = 1
+        elif o in ('--convert',):
+            if a not in ('compact', 'pickle'):
+                sys.stderr.write("sconsign: illegal encoding `%s'\n" % a)
+                print(helpstr)
+                sys.exit(2)
+            Convert = a
         elif o in ('-d', '--dir'):
             Print_Directories.append(a)
         elif o in ('-e', '--entry'):
@@ -420,7 +499,8 @@ Options:
         elif o in ('-f', '--format'):
             # Try to map the given DB format to a known module
             # name, that we can then try to import...
-            Module_Map = {'dblite': 'SCons.dblite', 'sconsign': None}
+            Module_Map = {'dblite': 'SCons.dblite', 'dblog': 'SCons.dblog',
+                          'dbsqlite': 'SCons.dbsqlite', 'sconsign': None}
             dbm_name = Module_Map.get(a, a)
             if dbm_name:
                 try:
@@ -464,7 +544,8 @@ Options:
         for a in args:
             dbm_name = my_whichdb(a)
             if dbm_name:
-                Map_Module = {'SCons.dblite': 'dblite'}
+                Map_Module = {'SCons.dblite': 'dblite', 'SCons.dblog': 'dblog',
+                              'SCons.dbsqlite': 'dbsqlite'}
                 if dbm_name != "SCons.dblite":
                     dbm = importlib.import_module(dbm_name)
                 else:
@@ -105,6 +105,9 @@ class CacheWriteErrorWarning(SConsWarning):
 class CacheCleanupErrorWarning(SConsWarning):
     """Problems removing retrieved target prior to rebuilding."""
 
+class CacheConnectionWarning(WarningOnByDefault):
+    """The server of a remote derived-file cache can't be reached."""
+
 class CorruptSConsignWarning(WarningOnByDefault):
     """Problems decoding the contents of the sconsign database."""
 
@@ -34,12 +34,24 @@ import io
 import os
 import pickle
 import shutil
+import socket
+import threading
 import time
 
 from SCons.compat import PICKLE_PROTOCOL
+from SCons.Util.filelock import FileLock, SConsLockFailure
 
 KEEP_ALL_FILES = False
 IGNORE_CORRUPT_DBFILES = False
+# How long sync() waits for another process to finish writing the
+# database, in seconds.
+LOCK_TIMEOUT = 60
+# How old a lock file of a process that can't be checked on (on another
+# host, or on Windows) is before it is taken to be left behind.
+STALE_LOCK_AGE = 600
+# Tells SCons.SConsign that a handle can be read from one thread while
+# another one writes to it and syncs it.
+THREADSAFE = True
 
 
 def corruption_warning(filename) -> None:
@@ -51,6 +63,99 @@ def corruption_warning(filename) -> None:
     print("Warning: Discarding corrupt database:", filename)
 
 
+def lock_warning(filename) -> None:
+    """Local warning for a stale database lock.
+
+    Used for self-tests. SCons overwrites this with a
+    different warning function in SConsign.py.
+    """
+    print("Warning: Removing stale database lock:", filename)
+
+
+def busy_lock_warning(filename) -> None:
+    """Local warning for a database lock that couldn't be acquired.
+
+    Used for self-tests. SCons overwrites this with a
+    different warning function in SConsign.py.
+    """
+    print("Warning: Database locked, not written:", filename)
+
+
+def lock_owner() -> bytes:
+    """Return what is written into the lock file of a database."""
+    return ("%d %s" % (os.getpid(), socket.gethostname())).encode()
+
+
+def is_stale_lock(lockfile) -> bool:
+    """Tell if *lockfile* was left behind by a process that is gone.
+
+    It was if the process that wrote it ran on this host and no
+    longer exists, or failing a way to tell that, if the lock file is
+    older than :data:`STALE_LOCK_AGE`.
+    """
+    try:
+        with io.open(lockfile, "rb") as f:
+            owner = f.read().split()
+        age = time.time() - os.stat(lockfile).st_mtime
+    except OSError:
+        # Gone already.
+        return False
+    if len(owner) == 2 and owner[1].decode(errors="replace") == socket.gethostname() \
+            and owner[0].isdigit() and os.name != "nt":
+        # Signal 0 is CTRL_C_EVENT on Windows, so only checked elsewhere.
+        try:
+            os.kill(int(owner[0]), 0)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            # Exists, but isn't ours.
+            return False
+        return False
+    return age > STALE_LOCK_AGE
+
+
+def break_stale_lock(lockfile) -> bool:
+    """Remove *lockfile* if it is stale (see :func:`is_stale_lock`).
+
+    The lock file is moved aside before it is removed, and checked
+    again, so a lock that another process took in the meantime is not
+    lost.  Returns True if the lock may be free now.
+    """
+    if not is_stale_lock(lockfile):
+        return False
+    aside = "%s.%d" % (lockfile, os.getpid())
+    try:
+        os.replace(lockfile, aside)
+    except OSError:
+        # Somebody else removed it.
+        return True
+    if not is_stale_lock(aside):
+        # Taken by another process since: give it back.
+        os.replace(aside, lockfile)
+        return False
+    lock_warning(lockfile)
+    os.unlink(aside)
+    return True
+
+
+def merge_keys(stored, ours, original) -> dict:
+    """Merge the keys a database handle changed into what is stored.
+
+    The default merge for :meth:`_Dblite.sync`.  *stored* is what is in
+    the file now, *ours* what is in the handle, and *original* maps
+    each key the handle changed to its value before the change (or None
+    if it didn't exist).  The keys changed here win; everything else is
+    taken from the file.
+    """
+    result = dict(stored)
+    for key in original:
+        if key in ours:
+            result[key] = ours[key]
+        else:
+            result.pop(key, None)
+    return result
+
+
 DBLITE_SUFFIX = ".dblite"
 TMP_SUFFIX = ".tmp"
 
@@ -80,8 +185,21 @@ class _Dblite:
 
     The optional *mode* argument is the POSIX mode of the file, used only
     when the database has to be created.  It defaults to octal ``0o666``.
+
+    Several processes can share a database.  :meth:`sync` holds a
+    :class:`~SCons.Util.filelock.FileLock` while it writes, and if the
+    file was written by someone else since this handle read or wrote
+    it, merges the keys changed here into what is in the file, rather
+    than replacing it.  The merge is done by the :attr:`merge` function,
+    :func:`merge_keys` if that is None.
+
+    Changes and :meth:`sync` are serialized by a lock of the handle's
+    own; reads don't take it, so they don't wait for a sync.
     """
 
+    # Called as merge(stored, ours, original), see merge_keys().
+    merge = None
+
     # Because open() is defined at module level, overwriting builtin open
     # in the scope of this module, we use io.open to avoid ambiguity.
     _open = staticmethod(io.open)
@@ -100,6 +218,14 @@ class _Dblite:
     _os_chmod = staticmethod(os.chmod)
     _shutil_copyfile = staticmethod(shutil.copyfile)
     _time_time = staticmethod(time.time)
+    _os_stat = staticmethod(os.stat)
+    _os_unlink = staticmethod(os.unlink)
+    _os_write = staticmethod(os.write)
+    _file_lock = FileLock
+    _lock_failure = SConsLockFailure
+    _break_stale_lock = staticmethod(break_stale_lock)
+    _lock_owner = staticmethod(lock_owner)
+    _merge_keys = staticmethod(merge_keys)
 
     def __init__(self, file_base_name, flag='r', mode=0o666) -> None:
         assert flag in ("r", "w", "c", "n")
@@ -117,6 +243,12 @@ class _Dblite:
         self._mode = mode
         self._dict = {}
         self._needs_sync = False
+        # The value before the first change, of each key changed since
+        # the file was last read or written.
+        self._original = {}
+        self._stamp = None
+        self._lock = threading.Lock()
+        self._lock_busy = False
 
         if self._os_chown is not None and 0 in (os.geteuid(), os.getegid()):
             # running as root; chown back to current owner/group when done
@@ -135,37 +267,54 @@ class _Dblite:
 
         if self._flag == "n":
             with io.open(self._file_name, "wb", opener=self.opener):
-                return  # just make sure it exists
+                pass  # just make sure it exists
         else:
             # We only need the disk file to slurp in the data.  Updates are
             # handled on close, db is mainained only in memory until then.
             try:
                 with io.open(self._file_name, "rb") as f:
+                    self._stamp = self._get_stamp(f.fileno())
                     p = f.read()
             except OSError as e:
                 # an error for file not to exist, unless flag is create
                 if self._flag != "c":
                     raise e
                 with io.open(self._file_name, "wb", opener=self.opener):
-                    return  # just make sure it exists
-            if len(p) > 0:
-                try:
-                    self._dict = pickle.loads(p, encoding='bytes')
-                except (
-                    pickle.UnpicklingError,
-                    # Python3 docs:
-                    # Note that other exceptions may also be raised during
-                    # unpickling, including (but not necessarily limited to)
-                    # AttributeError, EOFError, ImportError, and IndexError.
-                    AttributeError,
-                    EOFError,
-                    ImportError,
-                    IndexError,
-                ):
-                    if IGNORE_CORRUPT_DBFILES:
-                        corruption_warning(self._file_name)
-                    else:
-                        raise
+                    pass  # just make sure it exists
+            else:
+                self._dict = self._loads(p)
+                return
+        self._stamp = self._get_stamp(self._file_name)
+
+    def _loads(self, p) -> dict:
+        if len(p) > 0:
+            try:
+                return pickle.loads(p, encoding='bytes')
+            except (
+                pickle.UnpicklingError,
+                # Python3 docs:
+                # Note that other exceptions may also be raised during
+                # unpickling, including (but not necessarily limited to)
+                # AttributeError, EOFError, ImportError, and IndexError.
+                AttributeError,
+                EOFError,
+                ImportError,
+                IndexError,
+            ):
+                if IGNORE_CORRUPT_DBFILES:
+                    corruption_warning(self._file_name)
+                else:
+                    raise
+        return {}
+
+    def _get_stamp(self, file):
+        """Return what tells whether the database file was replaced or
+        written, or None if there is no such file."""
+        try:
+            st = self._os_stat(file)
+        except OSError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
 
     def opener(self, path, flags):
         """Database open helper when creation may be needed.
@@ -177,7 +326,8 @@ class _Dblite:
         return os.open(path, flags, mode=self._mode)
 
     def close(self) -> None:
-        if self._needs_sync:
+        # Not again if the last sync couldn't get the lock.
+        if self._needs_sync and not self._lock_busy:
             self.sync()
 
     def __del__(self) -> None:
@@ -192,6 +342,53 @@ class _Dblite:
         temporary file and then move it over with some error handling.
         """
         self._check_writable()
+        with self._lock:
+            self._sync()
+
+    def _sync(self) -> None:
+        lock = self._file_lock(self._file_name, timeout=LOCK_TIMEOUT, writer=True)
+        try:
+            lock.acquire_lock()
+        except self._lock_failure:
+            acquired = False
+            if self._break_stale_lock(lock.lockfile):
+                try:
+                    lock.acquire_lock()
+                    acquired = True
+                except self._lock_failure:
+                    pass
+            if not acquired:
+                # Writing without the lock could lose what the holder
+                # writes; the changes stay, for the next sync.
+                busy_lock_warning(lock.lockfile)
+                self._lock_busy = True
+                return
+        self._lock_busy = False
+        try:
+            self._os_write(lock.lock, self._lock_owner())
+            self._merge_stored()
+            self._write()
+        finally:
+            lock.release_lock()
+
+    def _merge_stored(self) -> None:
+        """Merge what another process wrote since we read the file."""
+        if self._get_stamp(self._file_name) == self._stamp:
+            return
+        try:
+            with self._open(self._file_name, "rb") as f:
+                p = f.read()
+        except OSError:
+            return
+        try:
+            stored = self._loads(p)
+        except Exception:
+            # Corrupt, and not to be ignored: just replace it.
+            return
+        merge = self.merge if self.merge is not None else self._merge_keys
+        self._dict = merge(stored, self._dict, self._original)
+
+    def _write(self) -> None:
         with self._open(self._tmp_name, "wb", opener=self.opener) as f:
             self._pickle_dump(self._dict, f, self._pickle_protocol)
 
@@ -208,6 +405,8 @@ class _Dblite:
             except PermissionError:
                 pass
             self._os_replace(self._tmp_name, self._file_name)
+        self._original = {}
+        self._stamp = self._get_stamp(self._file_name)
 
         if (
             self._os_chown is not None and self._chown_to > 0
@@ -239,11 +438,18 @@ class _Dblite:
         if not isinstance(value, bytes):
             raise TypeError(f"value `{value}' must be bytes but is {type(value)}")
 
-        self._dict[key] = value
-        self._needs_sync = True
+        with self._lock:
+            if key not in self._original:
+                self._original[key] = self._dict.get(key)
+            self._dict[key] = value
+            self._needs_sync = True
 
     def __delitem__(self, key):
-        del self._dict[key]
+        with self._lock:
+            value = self._dict.pop(key)
+            if key not in self._original:
+                self._original[key] = value
+            self._needs_sync = True
 
     def keys(self):
         return self._dict.keys()
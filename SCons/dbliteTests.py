@@ -0,0 +1,152 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright The SCons Foundation
+
+import os
+import socket
+import subprocess
+import sys
+import time
+import unittest
+import unittest.mock
+
+import TestCmd
+
+import SCons.dblite
+
+
+class DbliteTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.test = TestCmd.TestCmd(workdir='')
+        self.base = self.test.workpath('db')
+        self.file = self.base + SCons.dblite.DBLITE_SUFFIX
+
+    def test_exercise(self) -> None:
+        """Test the module's own exercise of the database"""
+        save_cwd = os.getcwd()
+        os.chdir(self.test.workpath())
+        try:
+            with unittest.mock.patch('SCons.dblite.corruption_warning'), \
+                    unittest.mock.patch('SCons.dblite.IGNORE_CORRUPT_DBFILES', False):
+                SCons.dblite._exercise()
+        finally:
+            os.chdir(save_cwd)
+
+    def test_shared(self) -> None:
+        """Test two handles writing to the same file"""
+        db = SCons.dblite.open(self.base, "n")
+        db["a"] = b"1"
+        db["b"] = b"2"
+        db["c"] = b"3"
+        db.sync()
+
+        db1 = SCons.dblite.open(self.base, "w")
+        db2 = SCons.dblite.open(self.base, "w")
+        db1["a"] = b"db1"
+        db2["b"] = b"db2"
+        db2["d"] = b"new"
+        del db2["c"]
+        db1.sync()
+        db2.sync()
+        assert db2["a"] == b"db1"
+        db1["b"] = b"db1"
+        db1.sync()
+
+        db = SCons.dblite.open(self.base)
+        assert sorted(db.items()) == [("a", b"db1"), ("b", b"db1"), ("d", b"new")], db.items()
+        assert not os.path.exists(self.file + ".lock")
+
+    def test_merge(self) -> None:
+        """Test a merge function"""
+        db = SCons.dblite.open(self.base, "n")
+        db["a"] = b"1"
+        db.sync()
+
+        calls = []
+        def merge(stored, ours, original):
+            calls.append((dict(stored), dict(ours), dict(original)))
+            return {"merged": b"yes"}
+
+        db1 = SCons.dblite.open(self.base, "w")
+        db1.merge = merge
+        db1["a"] = b"db1"
+        # Not called while nobody else wrote the file.
+        db1.sync()
+        assert calls == [], calls
+
+        db2 = SCons.dblite.open(self.base, "w")
+        db2["b"] = b"db2"
+        db2.sync()
+        db1["c"] = b"db1"
+        db1.sync()
+        assert calls == [(
+            {"a": b"db1", "b": b"db2"}, {"a": b"db1", "c": b"db1"}, {"c": None}
+        )], calls
+        assert SCons.dblite.open(self.base).items() == {"merged": b"yes"}.items()
+
+    def sync_locked(self, owner, age=0):
+        """Sync a change with the lock file held by *owner*.
+
+        Returns the warnings given: (stale, busy).
+        """
+        db = SCons.dblite.open(self.base, "c")
+        db["a"] = b"1"
+        lockfile = self.file + ".lock"
+        self.test.write(lockfile, owner)
+        if age:
+            mtime = time.time() - age
+            os.utime(lockfile, (mtime, mtime))
+        stale, busy = [], []
+        with unittest.mock.patch('SCons.dblite.LOCK_TIMEOUT', 0.1), \
+                unittest.mock.patch('SCons.dblite.lock_warning', stale.append), \
+                unittest.mock.patch('SCons.dblite.busy_lock_warning', busy.append):
+            db.sync()
+            # Not tried again.
+            db.close()
+        return stale, busy
+
+    def test_stale_lock(self) -> None:
+        """Test that a lock left behind by a process that is gone is removed"""
+        with subprocess.Popen([sys.executable, '-c', 'pass']) as p:
+            p.wait()
+        owner = "%d %s" % (p.pid, socket.gethostname())
+        if sys.platform == 'win32':
+            # Can't tell if the process is gone, just how old the lock is.
+            stale, busy = self.sync_locked(owner, SCons.dblite.STALE_LOCK_AGE + 10)
+        else:
+            stale, busy = self.sync_locked(owner)
+        assert stale == [self.file + ".lock"], stale
+        assert busy == [], busy
+        assert not os.path.exists(self.file + ".lock")
+        assert SCons.dblite.open(self.base)["a"] == b"1"
+
+        # Of another host: only when it's old.
+        stale, busy = self.sync_locked("1 elsewhere", SCons.dblite.STALE_LOCK_AGE + 10)
+        assert stale == [self.file + ".lock"], stale
+        assert not os.path.exists(self.file + ".lock")
+
+    def test_busy_lock(self) -> None:
+        """Test that the lock of a live process is left alone"""
+        owner = "%d %s" % (os.getpid(), socket.gethostname())
+        stale, busy = self.sync_locked(owner)
+        assert stale == [], stale
+        assert busy == [self.file + ".lock"], busy
+        assert self.test.read(self.file + ".lock", mode='r') == owner
+        assert "a" not in SCons.dblite.open(self.base, "r")
+        self.test.unlink(self.file + ".lock")
+
+        # Nor is that of another host until it's old.
+        stale, busy = self.sync_locked("1 elsewhere")
+        assert stale == [], stale
+        assert busy == [self.file + ".lock"], busy
+        assert os.path.exists(self.file + ".lock")
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
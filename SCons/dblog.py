@@ -0,0 +1,368 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright The SCons Foundation
+
+"""
+A log-structured signature database.
+
+An alternative to :mod:`SCons.dblite` for large trees, selected with
+``SConsignFile(dbm_module=SCons.dblog)``.  Where dblite pickles and
+rewrites the whole database on every sync, this module appends the
+changed values to a log file and keeps a small index of where each
+key's current value lives in a second file:
+
+* ``<name>.dblog``: a header (magic and a generation id), then records
+  of key length, value length, key and value.  A record with a value
+  length of ``DELETED`` removes the key.
+* ``<name>.dblog.idx``: a pickle of the generation and size of the log
+  it describes, and for each key the offset, length and digest of its
+  value in the log.
+
+Opening the database only loads the index (and scans any records
+appended after it was written); values are read from the log when
+asked for.  Setting a key to the value it already has doesn't write
+anything.  Once the log is more than :data:`COMPACT_RATIO` times the
+size of the live records, and at least :data:`COMPACT_MIN_SIZE`, the
+next sync rewrites it with just the live records.
+
+The interface is modeled on the Python dbm database interface module.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import pickle
+import struct
+
+from SCons.compat import PICKLE_PROTOCOL
+
+IGNORE_CORRUPT_DBFILES = False
+
+
+def corruption_warning(filename) -> None:
+    """Local warning for corrupt db.
+
+    Used for self-tests. SCons overwrites this with a
+    different warning function in SConsign.py.
+    """
+    print("Warning: Discarding corrupt database:", filename)
+
+
+DBLOG_SUFFIX = ".dblog"
+INDEX_SUFFIX = ".idx"
+TMP_SUFFIX = ".tmp"
+
+MAGIC = b"SConsDBLog\x01\n"
+GENERATION_SIZE = 16
+HEADER_SIZE = len(MAGIC) + GENERATION_SIZE
+RECORD = struct.Struct("<II")
+DELETED = 0xFFFFFFFF
+
+# Compact once the log is this many times the size of its live records...
+COMPACT_RATIO = 2
+# ...and at least this big.
+COMPACT_MIN_SIZE = 1024 * 1024
+
+
+def _digest(value: bytes) -> bytes:
+    return hashlib.blake2b(value, digest_size=16).digest()
+
+
+class _Dblog:
+    """Log-structured signature database class.
+
+    Behaves like a dict, but only the index is kept in memory: values
+    are read from the log file on demand.  Changes are held in memory
+    until :meth:`sync`, which appends them to the log.
+
+    The *flag* and *mode* arguments are as for :class:`SCons.dblite._Dblite`.
+    """
+
+    # Because open() is defined at module level, overwriting builtin open
+    # in the scope of this module, we use io.open to avoid ambiguity.
+    _open = staticmethod(io.open)
+
+    # sync() may be called at Python teardown time (from our __del__),
+    # when module globals may already have been rebound to None.
+    _pickle_dump = staticmethod(pickle.dump)
+    _pickle_protocol = PICKLE_PROTOCOL
+    _os_replace = staticmethod(os.replace)
+    _os_urandom = staticmethod(os.urandom)
+    _record = RECORD
+    _digest = staticmethod(_digest)
+
+    def __init__(self, file_base_name, flag='r', mode=0o666) -> None:
+        assert flag in ("r", "w", "c", "n")
+
+        if os.path.splitext(file_base_name)[1] == DBLOG_SUFFIX:
+            # There's already a suffix on the file name, don't add one.
+            self._file_name = file_base_name
+        else:
+            self._file_name = file_base_name + DBLOG_SUFFIX
+        self._index_name = self._file_name + INDEX_SUFFIX
+        self._tmp_name = self._file_name + TMP_SUFFIX
+
+        self._flag = flag
+        self._mode = mode
+        # key -> (offset, length, digest) of the value in the log
+        self._index = {}
+        # key -> value (None if deleted) not yet written to the log
+        self._pending = {}
+        self._reader = None
+        self._generation = b""
+        self._log_size = 0
+        self._live_size = 0
+        self._index_stale = False
+
+        if flag == "n":
+            self._create()
+            return
+        try:
+            self._load()
+        except OSError:
+            # an error for file not to exist, unless flag is create
+            if flag != "c" or os.path.exists(self._file_name):
+                raise
+            self._create()
+
+    def opener(self, path, flags):
+        """Database open helper when creation may be needed."""
+        return os.open(path, flags, mode=self._mode)
+
+    def _create(self) -> None:
+        """Start a new, empty log."""
+        self._generation = self._os_urandom(GENERATION_SIZE)
+        with self._open(self._file_name, "wb", opener=self.opener) as f:
+            f.write(MAGIC + self._generation)
+        self._index = {}
+        self._log_size = HEADER_SIZE
+        self._live_size = 0
+        self._index_stale = True
+
+    def _load(self) -> None:
+        """Read the index, and any log records added after it was written."""
+        with io.open(self._file_name, "rb") as f:
+            header = f.read(HEADER_SIZE)
+            size = os.fstat(f.fileno()).st_size
+            if len(header) != HEADER_SIZE or not header.startswith(MAGIC):
+                if not IGNORE_CORRUPT_DBFILES:
+                    raise pickle.UnpicklingError(
+                        f"Not a dblog database: {self._file_name}"
+                    )
+                corruption_warning(self._file_name)
+                if self._flag != "r":
+                    self._create()
+                return
+            self._generation = header[len(MAGIC):]
+
+            start = HEADER_SIZE
+            try:
+                with io.open(self._index_name, "rb") as idx:
+                    data = pickle.load(idx)
+                if (
+                    data['generation'] == self._generation
+                    and HEADER_SIZE <= data['size'] <= size
+                ):
+                    self._index = data['index']
+                    start = data['size']
+            except Exception:
+                # Missing, stale or corrupt: rebuild from the log.
+                self._index = {}
+            self._index_stale = start != size
+            self._log_size = self._scan(f, start, size)
+
+        self._live_size = sum(
+            RECORD.size + len(key.encode('utf-8')) + length
+            for key, (_, length, _) in self._index.items()
+        )
+
+    def _scan(self, f, offset, size) -> int:
+        """Add the records from *offset* on in the log *f* to the index.
+
+        A record cut short at the end of the log, by an interrupted sync,
+        is ignored and will be overwritten by the next one.  Returns the
+        end of the last complete record.
+        """
+        f.seek(offset)
+        while offset + RECORD.size <= size:
+            key_len, value_len = RECORD.unpack(f.read(RECORD.size))
+            value_offset = offset + RECORD.size + key_len
+            end = value_offset + (0 if value_len == DELETED else value_len)
+            if end > size:
+                break
+            key = f.read(key_len).decode('utf-8')
+            if value_len == DELETED:
+                self._index.pop(key, None)
+            else:
+                value = f.read(value_len)
+                self._index[key] = (value_offset, value_len, _digest(value))
+            offset = end
+        return offset
+
+    def close(self) -> None:
+        if self._flag != "r" and (self._pending or self._index_stale):
+            self.sync()
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def __del__(self) -> None:
+        self.close()
+
+    def sync(self) -> None:
+        """Append the pending changes to the log and update the index."""
+        self._check_writable()
+        if self._pending:
+            self._append()
+        if (
+            self._log_size >= COMPACT_MIN_SIZE
+            and self._log_size > COMPACT_RATIO * self._live_size
+        ):
+            self._compact()
+        if self._index_stale:
+            self._write_index()
+
+    def _append(self) -> None:
+        record = self._record
+        with self._open(self._file_name, "r+b") as f:
+            # Drop what an interrupted sync may have left behind.
+            f.seek(self._log_size)
+            f.truncate()
+            offset = self._log_size
+            for key, value in self._pending.items():
+                k = key.encode('utf-8')
+                old = self._index.pop(key, None)
+                if old is not None:
+                    self._live_size -= record.size + len(k) + old[1]
+                if value is None:
+                    f.write(record.pack(len(k), DELETED) + k)
+                    offset += record.size + len(k)
+                    continue
+                f.write(record.pack(len(k), len(value)) + k)
+                f.write(value)
+                value_offset = offset + record.size + len(k)
+                self._index[key] = (value_offset, len(value), self._digest(value))
+                offset = value_offset + len(value)
+                self._live_size += record.size + len(k) + len(value)
+        self._log_size = offset
+        self._pending = {}
+        self._index_stale = True
+
+    def _compact(self) -> None:
+        """Rewrite the log with only the live records."""
+        record = self._record
+        generation = self._os_urandom(GENERATION_SIZE)
+        index = {}
+        with self._open(self._tmp_name, "wb", opener=self.opener) as f:
+            f.write(MAGIC + generation)
+            offset = HEADER_SIZE
+            for key, (_, length, digest) in self._index.items():
+                k = key.encode('utf-8')
+                f.write(record.pack(len(k), length) + k)
+                f.write(self._read(key))
+                value_offset = offset + record.size + len(k)
+                index[key] = (value_offset, length, digest)
+                offset = value_offset + length
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        self._os_replace(self._tmp_name, self._file_name)
+        self._generation = generation
+        self._index = index
+        self._log_size = offset
+        self._index_stale = True
+
+    def _write_index(self) -> None:
+        data = {
+            'generation': self._generation,
+            'size': self._log_size,
+            'index': self._index,
+        }
+        with self._open(self._tmp_name, "wb", opener=self.opener) as f:
+            self._pickle_dump(data, f, self._pickle_protocol)
+        self._os_replace(self._tmp_name, self._index_name)
+        self._index_stale = False
+
+    def _check_writable(self):
+        if self._flag == "r":
+            raise OSError(f"Read-only database: {self._file_name}")
+
+    def _read(self, key) -> bytes:
+        offset, length, _ = self._index[key]
+        if self._reader is None:
+            self._reader = self._open(self._file_name, "rb")
+        self._reader.seek(offset)
+        return self._reader.read(length)
+
+    def __getitem__(self, key):
+        try:
+            value = self._pending[key]
+        except KeyError:
+            return self._read(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._check_writable()
+
+        if not isinstance(key, str):
+            raise TypeError(f"key `{key}' must be a string but is {type(key)}")
+
+        if not isinstance(value, bytes):
+            raise TypeError(f"value `{value}' must be bytes but is {type(value)}")
+
+        current = self._index.get(key)
+        if (
+            current is not None
+            and current[1] == len(value)
+            and current[2] == _digest(value)
+        ):
+            # Unchanged from what's in the log.
+            self._pending.pop(key, None)
+        else:
+            self._pending[key] = value
+
+    def __delitem__(self, key):
+        self._check_writable()
+        if key not in self:
+            raise KeyError(key)
+        if key in self._index:
+            self._pending[key] = None
+        else:
+            del self._pending[key]
+
+    def keys(self):
+        keys = [k for k in self._index if k not in self._pending]
+        keys.extend(k for k, v in self._pending.items() if v is not None)
+        return keys
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __contains__(self, key) -> bool:
+        try:
+            return self._pending[key] is not None
+        except KeyError:
+            return key in self._index
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+
+def open(file, flag="r", mode: int = 0o666):  # pylint: disable=redefined-builtin
+    return _Dblog(file, flag, mode)
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
@@ -0,0 +1,179 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright The SCons Foundation
+
+import os
+import pickle
+import unittest
+import unittest.mock
+
+import TestCmd
+
+import SCons.dblog
+
+
+class DblogTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.test = TestCmd.TestCmd(workdir='')
+        self.base = self.test.workpath('db')
+        self.log = self.base + SCons.dblog.DBLOG_SUFFIX
+        self.index = self.log + SCons.dblog.INDEX_SUFFIX
+
+    def test_basic(self) -> None:
+        """Test storing, reading and deleting entries"""
+        db = SCons.dblog.open(self.base, "n")
+        assert len(db) == 0, len(db)
+        db["foo"] = b"bar"
+        db["sub/dir"] = b"x" * 1000
+        assert db["foo"] == b"bar"
+        db.sync()
+        assert os.path.exists(self.index)
+
+        db = SCons.dblog.open(self.base, "c")
+        assert sorted(db.keys()) == ["foo", "sub/dir"], db.keys()
+        assert db["sub/dir"] == b"x" * 1000
+        db["foo"] = b"baz"
+        del db["sub/dir"]
+        assert "sub/dir" not in db
+        assert db["foo"] == b"baz"
+        db.close()
+
+        db = SCons.dblog.open(self.log)
+        assert db.items() == [("foo", b"baz")], db.items()
+        with self.assertRaises(KeyError):
+            db["sub/dir"]
+        with self.assertRaises(OSError):
+            db["ping"] = b"pong"
+        with self.assertRaises(OSError):
+            db.sync()
+        db.close()
+
+        db = SCons.dblog.open(self.base, "w")
+        with self.assertRaises(TypeError):
+            db[(1, 2)] = b"tuple"
+        with self.assertRaises(TypeError):
+            db["list"] = [1, 2]
+        with self.assertRaises(KeyError):
+            del db["nonexistent"]
+        db.close()
+
+        os.unlink(self.log)
+        with self.assertRaises(OSError):
+            SCons.dblog.open(self.base, "w")
+        db = SCons.dblog.open(self.base, "c")
+        assert len(db) == 0, len(db)
+
+    def test_append(self) -> None:
+        """Test that only changed entries are written"""
+        db = SCons.dblog.open(self.base, "n")
+        db["a"] = b"1" * 100
+        db["b"] = b"2" * 100
+        db.close()
+        size = os.path.getsize(self.log)
+
+        db = SCons.dblog.open(self.base, "w")
+        db["a"] = b"1" * 100
+        db["b"] = b"2" * 100
+        db.close()
+        assert os.path.getsize(self.log) == size
+
+        db = SCons.dblog.open(self.base, "w")
+        db["b"] = b"3" * 100
+        db.close()
+        assert os.path.getsize(self.log) > size
+        db = SCons.dblog.open(self.base)
+        assert db["a"] == b"1" * 100
+        assert db["b"] == b"3" * 100
+
+    def test_index(self) -> None:
+        """Test recovering from a missing, stale or corrupt index"""
+        db = SCons.dblog.open(self.base, "n")
+        db["a"] = b"1"
+        db.sync()
+        with open(self.index, "rb") as f:
+            old_index = f.read()
+        db["b"] = b"2"
+        db.close()
+
+        # Records after those the index knows about are scanned.
+        with open(self.index, "wb") as f:
+            f.write(old_index)
+        db = SCons.dblog.open(self.base)
+        assert db["b"] == b"2"
+
+        os.unlink(self.index)
+        db = SCons.dblog.open(self.base)
+        assert sorted(db.items()) == [("a", b"1"), ("b", b"2")]
+
+        self.test.write(self.index, "garbage")
+        db = SCons.dblog.open(self.base)
+        assert sorted(db.items()) == [("a", b"1"), ("b", b"2")]
+
+        # An index for another log is not used.
+        db = SCons.dblog.open(self.test.workpath("other"), "n")
+        db["a"] = b"wrong"
+        db.close()
+        os.replace(self.test.workpath("other.dblog.idx"), self.index)
+        db = SCons.dblog.open(self.base)
+        assert db["a"] == b"1", db["a"]
+
+    def test_truncated(self) -> None:
+        """Test that a partly written record is ignored"""
+        db = SCons.dblog.open(self.base, "n")
+        db["a"] = b"1"
+        db.close()
+        os.unlink(self.index)
+        with open(self.log, "ab") as f:
+            f.write(SCons.dblog.RECORD.pack(1, 100) + b"b" + b"short")
+
+        db = SCons.dblog.open(self.base, "w")
+        assert db.keys() == ["a"], db.keys()
+        db["c"] = b"3"
+        db.close()
+        db = SCons.dblog.open(self.base)
+        assert sorted(db.items()) == [("a", b"1"), ("c", b"3")]
+
+    def test_compact(self) -> None:
+        """Test compacting a log full of replaced entries"""
+        with unittest.mock.patch('SCons.dblog.COMPACT_MIN_SIZE', 1000):
+            db = SCons.dblog.open(self.base, "n")
+            db["keep"] = b"k" * 100
+            for i in range(10):
+                db["a"] = b"%d" % i * 100
+                db.sync()
+            size = os.path.getsize(self.log)
+            assert size < 1000, size
+            db.close()
+
+        db = SCons.dblog.open(self.base)
+        assert db["keep"] == b"k" * 100
+        assert db["a"] == b"9" * 100
+
+    def test_corrupt(self) -> None:
+        """Test opening a file that is not a dblog database"""
+        self.test.write(self.log, "not a log")
+        with self.assertRaises(pickle.UnpicklingError):
+            SCons.dblog.open(self.base, "c")
+
+        warnings = []
+        with unittest.mock.patch('SCons.dblog.IGNORE_CORRUPT_DBFILES', True), \
+                unittest.mock.patch('SCons.dblog.corruption_warning',
+                                    warnings.append):
+            db = SCons.dblog.open(self.base, "c")
+        assert warnings == [self.log], warnings
+        assert len(db) == 0, len(db)
+        db["a"] = b"1"
+        db.close()
+        db = SCons.dblog.open(self.base)
+        assert db["a"] == b"1"
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
@@ -0,0 +1,271 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright The SCons Foundation
+
+"""
+An SQLite signature database with one row per entry.
+
+Selected with ``SConsignFile(dbm_module=SCons.dbsqlite)``.  The
+database (``<name>.sqlite``) has one row for each file, keyed on its
+directory and name, holding the pickled entry:
+
+.. code-block:: sql
+
+    CREATE TABLE entries (dir TEXT, name TEXT, value BLOB,
+                          PRIMARY KEY (dir, name)) WITHOUT ROWID
+
+Because :data:`PER_ENTRY` is set, :mod:`SCons.SConsign` uses an
+:class:`SCons.SConsign.EntryDB` for each directory, which fetches only
+the entries the build asks for with :meth:`_Dbsqlite.get_entry` and
+hands back just the changed ones with :meth:`_Dbsqlite.set_entry`.
+They are all written in one transaction when the database is synced,
+at the end of the build.
+
+For tools that expect a dbm-style database of pickled directory
+dictionaries (like the sconsign script), the database can also be
+used as a mapping of directories to their pickled entries.
+"""
+
+from __future__ import annotations
+
+import os
+import pickle
+import sqlite3
+import threading
+
+from SCons.compat import PICKLE_PROTOCOL
+
+IGNORE_CORRUPT_DBFILES = False
+
+# Tells SCons.SConsign to store entries one by one.
+PER_ENTRY = True
+# Tells SCons.SConsign that a handle can be used from several threads.
+THREADSAFE = True
+
+
+def corruption_warning(filename) -> None:
+    """Local warning for corrupt db.
+
+    Used for self-tests. SCons overwrites this with a
+    different warning function in SConsign.py.
+    """
+    print("Warning: Discarding corrupt database:", filename)
+
+
+SQLITE_SUFFIX = ".sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    dir TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (dir, name)
+) WITHOUT ROWID
+"""
+
+
+class _Dbsqlite:
+    """SQLite signature database class.
+
+    Reads go to the database as they are made.  Writes are kept in
+    memory until :meth:`sync`, which commits them in one transaction.
+    The connection may be used from any thread.
+
+    The *flag* argument is as for :class:`SCons.dblite._Dblite`.  The
+    *mode* argument is accepted for compatibility but not used: SQLite
+    creates the file according to the umask.
+    """
+
+    def __init__(self, file_base_name, flag='r', mode=0o666) -> None:
+        assert flag in ("r", "w", "c", "n")
+
+        if os.path.splitext(file_base_name)[1] == SQLITE_SUFFIX:
+            # There's already a suffix on the file name, don't add one.
+            self._file_name = file_base_name
+        else:
+            self._file_name = file_base_name + SQLITE_SUFFIX
+        self._flag = flag
+        self._lock = threading.Lock()
+        # (dir, name) -> pickled entry, or None to delete it
+        self._pending = {}
+        self._conn = None
+
+        if flag == "n":
+            try:
+                os.unlink(self._file_name)
+            except FileNotFoundError:
+                pass
+        elif flag != "c" and not os.path.exists(self._file_name):
+            raise FileNotFoundError(
+                f"No such database: {self._file_name}"
+            )
+        try:
+            self._connect()
+        except sqlite3.DatabaseError:
+            if not IGNORE_CORRUPT_DBFILES:
+                raise
+            corruption_warning(self._file_name)
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            if flag == "r":
+                self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+                self._conn.execute(_SCHEMA)
+            else:
+                os.unlink(self._file_name)
+                self._connect()
+
+    def _connect(self) -> None:
+        if self._flag == "r":
+            uri = "file:%s?mode=ro" % self._file_name.replace("?", "%3f")
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            # Fails here if it's not a database with our table.
+            self._conn.execute("SELECT 1 FROM entries LIMIT 1").fetchall()
+        else:
+            self._conn = sqlite3.connect(self._file_name, check_same_thread=False)
+            self._conn.execute(_SCHEMA)
+            self._conn.commit()
+
+    def _check_writable(self):
+        if self._flag == "r":
+            raise OSError(f"Read-only database: {self._file_name}")
+
+    def get_entry(self, dir, name) -> bytes:
+        """Return the pickled entry for *name* in directory *dir*.
+
+        Raises :exc:`KeyError` if there isn't one.
+        """
+        key = (dir, name)
+        with self._lock:
+            try:
+                value = self._pending[key]
+            except KeyError:
+                row = self._conn.execute(
+                    "SELECT value FROM entries WHERE dir = ? AND name = ?", key
+                ).fetchone()
+                value = row[0] if row else None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def set_entry(self, dir, name, value: bytes) -> None:
+        """Set the pickled entry for *name* in directory *dir*."""
+        self._check_writable()
+        if not isinstance(value, bytes):
+            raise TypeError(f"value `{value}' must be bytes but is {type(value)}")
+        with self._lock:
+            self._pending[(dir, name)] = value
+
+    def sync(self) -> None:
+        """Commit the pending changes in a single transaction."""
+        self._check_writable()
+        with self._lock:
+            if not self._pending:
+                return
+            replace = [
+                (d, n, v) for (d, n), v in self._pending.items() if v is not None
+            ]
+            delete = [k for k, v in self._pending.items() if v is None]
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO entries (dir, name, value) "
+                    "VALUES (?, ?, ?)",
+                    replace,
+                )
+                self._conn.executemany(
+                    "DELETE FROM entries WHERE dir = ? AND name = ?", delete
+                )
+            self._pending = {}
+
+    def close(self) -> None:
+        if self._conn is None:
+            return
+        if self._pending and self._flag != "r":
+            self.sync()
+        self._conn.close()
+        self._conn = None
+
+    def __del__(self) -> None:
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    # The dbm-style view: directory -> pickled {name: entry} dict.
+
+    def _dir_entries(self, dir) -> dict:
+        with self._lock:
+            rows = dict(
+                self._conn.execute(
+                    "SELECT name, value FROM entries WHERE dir = ?", (dir,)
+                ).fetchall()
+            )
+            for (d, name), value in self._pending.items():
+                if d == dir:
+                    rows[name] = value
+        return {name: value for name, value in rows.items() if value is not None}
+
+    def __getitem__(self, dir):
+        rows = self._dir_entries(dir)
+        if not rows:
+            raise KeyError(dir)
+        entries = {name: pickle.loads(value) for name, value in rows.items()}
+        return pickle.dumps(entries, PICKLE_PROTOCOL)
+
+    def __setitem__(self, dir, value):
+        self._check_writable()
+        if not isinstance(dir, str):
+            raise TypeError(f"key `{dir}' must be a string but is {type(dir)}")
+        if not isinstance(value, bytes):
+            raise TypeError(f"value `{value}' must be bytes but is {type(value)}")
+        entries = pickle.loads(value)
+        old = self._dir_entries(dir)
+        with self._lock:
+            for name in old:
+                if name not in entries:
+                    self._pending[(dir, name)] = None
+            for name, entry in entries.items():
+                self._pending[(dir, name)] = pickle.dumps(entry, PICKLE_PROTOCOL)
+
+    def __delitem__(self, dir):
+        self._check_writable()
+        names = list(self._dir_entries(dir))
+        if not names:
+            raise KeyError(dir)
+        with self._lock:
+            for name in names:
+                self._pending[(dir, name)] = None
+
+    def keys(self):
+        with self._lock:
+            dirs = {
+                row[0]
+                for row in self._conn.execute("SELECT DISTINCT dir FROM entries")
+            }
+            dirs.update(d for (d, _), v in self._pending.items() if v is not None)
+        return [d for d in sorted(dirs) if self._dir_entries(d)]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __contains__(self, dir) -> bool:
+        return bool(self._dir_entries(dir))
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+
+def open(file, flag="r", mode: int = 0o666):  # pylint: disable=redefined-builtin
+    return _Dbsqlite(file, flag, mode)
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
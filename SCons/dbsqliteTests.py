@@ -0,0 +1,121 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright The SCons Foundation
+
+import os
+import pickle
+import sqlite3
+import unittest
+import unittest.mock
+
+import TestCmd
+
+import SCons.dbsqlite
+
+
+class DbsqliteTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.test = TestCmd.TestCmd(workdir='')
+        self.base = self.test.workpath('db')
+        self.file = self.base + SCons.dbsqlite.SQLITE_SUFFIX
+
+    def test_entries(self) -> None:
+        """Test storing and fetching single entries"""
+        db = SCons.dbsqlite.open(self.base, "n")
+        db.set_entry("dir", "a", b"1")
+        db.set_entry("dir", "b", b"2")
+        assert db.get_entry("dir", "a") == b"1"
+        with self.assertRaises(TypeError):
+            db.set_entry("dir", "c", "not bytes")
+        db.close()
+
+        # Nothing is written before sync
+        db = SCons.dbsqlite.open(self.base, "w")
+        assert db.get_entry("dir", "b") == b"2"
+        db.set_entry("dir", "b", b"3")
+        db2 = SCons.dbsqlite.open(self.base)
+        assert db2.get_entry("dir", "b") == b"2"
+        db.sync()
+        assert db2.get_entry("dir", "b") == b"3"
+        with self.assertRaises(KeyError):
+            db2.get_entry("dir", "c")
+        with self.assertRaises(KeyError):
+            db2.get_entry("other", "a")
+        with self.assertRaises(OSError):
+            db2.set_entry("dir", "c", b"4")
+        db.close()
+        db2.close()
+
+        db = SCons.dbsqlite.open(self.base, "n")
+        with self.assertRaises(KeyError):
+            db.get_entry("dir", "a")
+        db.close()
+
+        os.unlink(self.file)
+        with self.assertRaises(OSError):
+            SCons.dbsqlite.open(self.base, "w")
+        with self.assertRaises(OSError):
+            SCons.dbsqlite.open(self.base)
+        db = SCons.dbsqlite.open(self.file, "c")
+        assert len(db) == 0, len(db)
+        db.close()
+
+    def test_mapping(self) -> None:
+        """Test the dbm-style view of directories"""
+        db = SCons.dbsqlite.open(self.base, "n")
+        db["dir"] = pickle.dumps({"a": 1, "b": 2})
+        db.set_entry("sub", "c", pickle.dumps(3))
+        assert pickle.loads(db["dir"]) == {"a": 1, "b": 2}
+        db.sync()
+
+        db["dir"] = pickle.dumps({"a": 10})
+        assert sorted(db.keys()) == ["dir", "sub"], db.keys()
+        assert "dir" in db
+        assert len(db) == 2
+        db.close()
+
+        db = SCons.dbsqlite.open(self.base, "w")
+        assert pickle.loads(db["dir"]) == {"a": 10}
+        assert pickle.loads(db.get_entry("sub", "c")) == 3
+        with self.assertRaises(KeyError):
+            db.get_entry("dir", "b")
+        del db["sub"]
+        assert "sub" not in db
+        with self.assertRaises(KeyError):
+            db["sub"]
+        with self.assertRaises(KeyError):
+            del db["nonexistent"]
+        assert db.items() == [("dir", db["dir"])]
+        db.close()
+
+    def test_corrupt(self) -> None:
+        """Test opening a file that is not a database"""
+        self.test.write(self.file, "not a database" * 100)
+        with self.assertRaises(sqlite3.DatabaseError):
+            SCons.dbsqlite.open(self.base, "c")
+
+        warnings = []
+        with unittest.mock.patch('SCons.dbsqlite.IGNORE_CORRUPT_DBFILES', True), \
+                unittest.mock.patch('SCons.dbsqlite.corruption_warning',
+                                    warnings.append):
+            db = SCons.dbsqlite.open(self.base)
+            assert len(db) == 0
+            db.close()
+            db = SCons.dbsqlite.open(self.base, "c")
+            db.set_entry("dir", "a", b"1")
+            db.close()
+        assert warnings == [self.file, self.file], warnings
+        db = SCons.dbsqlite.open(self.base)
+        assert db.get_entry("dir", "a") == b"1"
+        db.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
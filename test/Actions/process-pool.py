@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+#
+# MIT License
+#
+# Copyright The SCons Foundation
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Verify that the process_pool experimental feature runs the Python
+function actions that ask for it in worker processes, that the others
+and functions which cannot be pickled still run in the scons process,
+and that a function which needs more of its Nodes than the worker gets
+fails rather than being run a second time.
+"""
+
+import TestSCons
+
+test = TestSCons.TestSCons()
+
+test.subdir('site_scons')
+
+test.write(['site_scons', 'gen.py'], """\
+import os
+
+def generate(target, source, env):
+    with open(str(target[0]), 'w') as f:
+        f.write('%s %s %d\\n' % (source[0].get_text_contents(),
+                                 env.subst('$GREETING'), os.getpid()))
+    return 0
+
+def fail(target, source, env):
+    return 3
+
+def dirname(target, source, env):
+    # Nodes in a worker have no directory Node: fails there.
+    with open(str(target[0]), 'w') as f:
+        f.write('%s %d\\n' % (target[0].dir, os.getpid()))
+    return 0
+""")
+
+test.write('SConstruct', """\
+import os
+import gen
+
+DefaultEnvironment(tools=[])
+env = Environment(tools=[], GREETING='hello')
+with open('scons.pid', 'w') as f:
+    f.write('%d\\n' % os.getpid())
+
+def local(target, source, env):
+    with open(str(target[0]), 'w') as f:
+        f.write('%d\\n' % os.getpid())
+
+env.Command('pool.out', 'pool.in', Action(gen.generate, process_pool=True))
+env.Command('thread.out', 'pool.in', gen.generate)
+env.Command('local.out', 'local.in', Action(local, process_pool=True))
+env.Command('sub/dir.out', 'pool.in', Action(gen.dirname, process_pool=True))
+env.Command('fail.out', 'pool.in', Action(gen.fail, process_pool=True))
+
+# Stock builders and action factories run in scons.
+env.Install('inst', 'pool.in')
+env.Command('copy.out', 'local.in', Copy('$TARGET', '$SOURCE'))
+env.Command('made', [], Mkdir('$TARGET'))
+""")
+
+test.write('pool.in', "pool.in")
+test.write('local.in', "local.in")
+
+test.run(arguments='-j2 --experimental=process_pool '
+                   'pool.out thread.out local.out inst copy.out made')
+
+scons_pid = test.read('scons.pid', 'r').strip()
+source, greeting, pid = test.read('pool.out', 'r').split()
+test.fail_test(source != 'pool.in')
+test.fail_test(greeting != 'hello')
+test.fail_test(pid == scons_pid)
+test.must_match('thread.out', 'pool.in hello %s\n' % scons_pid)
+test.must_match('local.out', scons_pid + '\n')
+test.must_match(['inst', 'pool.in'], 'pool.in')
+test.must_match('copy.out', 'local.in')
+test.must_exist('made')
+
+test.run(arguments='-j2 --experimental=process_pool fail.out',
+         stderr="scons: *** [fail.out] Error 3\n",
+         status=2)
+
+test.run(arguments='-j2 --experimental=process_pool sub',
+         stderr=None,
+         status=2)
+test.must_contain_all(test.stderr(),
+                      "AttributeError : '_NodeSnapshot' object has no attribute 'dir'")
+test.must_not_contain(['sub', 'dir.out'], scons_pid, mode='r')
+
+test.pass_test()
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+#
+# MIT License
+#
+# Copyright The SCons Foundation
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Test the bundle cache layout: scons-configure-cache --layout=bundle
+stores the targets of a builder with several in one archive, which is
+retrieved all or none.
+"""
+
+import os
+
+import TestSCons
+
+_python_ = TestSCons._python_
+
+test = TestSCons.TestSCons(match=TestSCons.match_re_dotall)
+
+cache = test.workpath('cache')
+configure_cache = os.path.join(os.environ['SCONS_SCRIPT_DIR'], 'scons-configure-cache.py')
+
+def run_configure_cache(arguments, **kw):
+    test.run(program=configure_cache, interpreter=TestSCons.python,
+             arguments=arguments, **kw)
+
+def cache_files():
+    files = []
+    for dirpath, dirnames, filenames in os.walk(cache):
+        if dirpath != cache:
+            files.extend(os.path.join(dirpath, name) for name in filenames)
+    return sorted(files)
+
+test.write('gen.py', r"""
+import sys
+with open(sys.argv[1]) as ifp:
+    contents = ifp.read()
+for dst in sys.argv[2:]:
+    with open(dst, 'w') as ofp:
+        ofp.write(dst + ': ' + contents)
+""")
+
+test.write('SConstruct', """\
+DefaultEnvironment(tools=[])
+CacheDir(r'%(cache)s')
+env = Environment(tools=[])
+env.Command(['gen.h', 'gen.cc'], 'gen.in', r'%(_python_)s gen.py $SOURCE $TARGETS')
+env.Command('one.out', 'one.in', r'%(_python_)s gen.py $SOURCE $TARGET')
+""" % locals())
+
+test.write('gen.in', "gen.in\n")
+test.write('one.in', "one.in\n")
+
+# Create the cache, then switch the layout.
+test.run(arguments='-n .')
+run_configure_cache('--layout=bundle ' + cache)
+
+test.run(arguments='--cache-debug=- .')
+test.must_contain_all_lines(test.stdout(), [
+    "CachePush(gen.h):  pushing to bundle ",
+    ", 2 files",
+    "CachePush(one.out):  pushing to ",
+])
+test.must_not_contain_any_line(test.stdout(), ["CachePush(gen.cc)"])
+# One bundle for gen.h and gen.cc, one file for one.out.
+test.fail_test(len(cache_files()) != 2, message="cache holds %s" % cache_files())
+
+test.run(arguments='-c .')
+test.run(arguments='--cache-debug=- .')
+test.must_contain_all_lines(test.stdout(), [
+    "Retrieved `gen.h' from cache",
+    "Retrieved `gen.cc' from cache",
+    "Retrieved `one.out' from cache",
+    "CacheRetrieve(gen.h):  retrieving from bundle ",
+    "CacheRetrieve(gen.cc):  retrieved with bundle ",
+])
+test.must_not_contain_any_line(test.stdout(), ["gen.py"])
+test.must_match('gen.h', "gen.h: gen.in\n")
+test.must_match('gen.cc', "gen.cc: gen.in\n")
+test.must_match('one.out', "one.out: one.in\n")
+test.up_to_date(arguments='.')
+
+# Prefetched as a bundle too.
+test.run(arguments='-c .')
+test.run(arguments='--cache-prefetch-jobs=2 --cache-debug=- .')
+test.must_contain_all_lines(test.stdout(), [
+    "CachePrefetch:  targets of 2 of 2 builders in cache",
+    "CacheRetrieve(gen.h):  retrieving from bundle ",
+    "Retrieved `gen.h' from cache",
+    "Retrieved `gen.cc' from cache",
+])
+test.must_match('gen.cc', "gen.cc: gen.in\n")
+test.fail_test([f for f in os.listdir(test.workpath()) if '.prefetch' in f])
+
+# -n shows both as retrieved, without retrieving them.
+test.run(arguments='-c .')
+test.run(arguments='-n .')
+test.must_contain_all_lines(test.stdout(), [
+    "Retrieved `gen.h' from cache",
+    "Retrieved `gen.cc' from cache",
+])
+test.must_not_exist('gen.h')
+test.must_not_exist('gen.cc')
+
+# A corrupt bundle is a miss: both are built.
+test.run(arguments='.')
+bundle = [f for f in cache_files() if os.path.getsize(f) > 100][0]
+with open(bundle, 'wb') as f:
+    f.write(b"not a bundle")
+test.run(arguments='-c .')
+test.run(arguments='--cache-debug=- .')
+test.must_contain_all_lines(test.stdout(), [
+    " not retrieved: ",
+    "gen.py gen.in gen.h gen.cc",
+])
+test.must_match('gen.h', "gen.h: gen.in\n")
+test.must_match('gen.cc', "gen.cc: gen.in\n")
+os.unlink(bundle)
+
+# Compressed, and read whatever the layout.
+run_configure_cache('--compression=zlib ' + cache)
+test.write('gen.in', "gen.in 2\n")
+test.run(arguments='.')
+run_configure_cache('--layout=plain ' + cache)
+test.run(arguments='-c .')
+test.run(arguments='.')
+test.must_contain_all_lines(test.stdout(), [
+    "Retrieved `gen.h' from cache",
+    "Retrieved `gen.cc' from cache",
+])
+test.must_match('gen.h', "gen.h: gen.in 2\n")
+test.must_match('gen.cc', "gen.cc: gen.in 2\n")
+
+test.pass_test()
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
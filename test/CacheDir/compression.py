@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+#
+# MIT License
+#
+# Copyright The SCons Foundation
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+Test compressed cache entries: scons-configure-cache --compression, and
+a cache holding both compressed and plain files.
+"""
+
+import os
+import zlib
+
+import TestSCons
+
+test = TestSCons.TestSCons(match=TestSCons.match_re_dotall)
+
+cache = test.workpath('cache')
+configure_cache = os.path.join(os.environ['SCONS_SCRIPT_DIR'], 'scons-configure-cache.py')
+
+def run_configure_cache(arguments, **kw):
+    test.run(program=configure_cache, interpreter=TestSCons.python,
+             arguments=arguments, **kw)
+
+def stored(contents):
+    """How the given contents are stored in the cache."""
+    magic = b"\x89SCons cache\r\n\x1a\n"
+    for dirpath, dirnames, filenames in os.walk(cache):
+        for name in filenames:
+            with open(os.path.join(dirpath, name), 'rb') as f:
+                data = f.read()
+            if data == contents:
+                return 'plain'
+            if data.startswith(magic):
+                codec, _, data = data[len(magic):].partition(b"\n")
+                if codec == b'zlib' and zlib.decompress(data) == contents:
+                    return 'zlib'
+    return None
+
+test.write('SConstruct', """\
+DefaultEnvironment(tools=[])
+CacheDir(r'%(cache)s')
+env = Environment(tools=[])
+env.Command('aaa.out', 'aaa.in', Copy('$TARGET', '$SOURCE'))
+env.Command('bbb.out', 'bbb.in', Copy('$TARGET', '$SOURCE'))
+""" % locals())
+
+aaa = "aaa.in\n" * 10000
+bbb = "bbb.in\n" * 10000
+test.write('aaa.in', aaa)
+test.write('bbb.in', bbb)
+
+# Create the cache, then turn on compression.
+test.run(arguments='-n .')
+run_configure_cache('--compression=zlib ' + cache)
+run_configure_cache('--compression=zstd ' + cache, status=2, stdout=None,
+                    stderr=r".*invalid choice: 'zstd'.*")
+
+test.run(arguments='--cache-debug=- aaa.out',
+         stdout=r".*CachePush\(aaa.out\):  [0-9a-fA-F]+ compressed with zlib: "
+                r"70000 to \d+ bytes, ratio \d+\.\d\d, in [0-9.]+ ms\n.*")
+test.fail_test(stored(aaa.encode()) != 'zlib', message="aaa.out not stored compressed")
+
+# Mixed with plain files once compression is turned off.
+run_configure_cache('--compression=none ' + cache)
+test.run(arguments='bbb.out')
+test.fail_test(stored(bbb.encode()) != 'plain', message="bbb.out not stored plain")
+
+test.run(arguments='-c .')
+test.run(arguments='--cache-debug=- .',
+         stdout=r".*CacheRetrieve\(aaa.out\):  [0-9a-fA-F]+ retrieved by zlib: 70000 bytes in [0-9.]+ ms"
+                r".*CacheRetrieve\(aaa.out\):  [0-9a-fA-F]+ decompressed from \d+ bytes, ratio \d+\.\d\d\n"
+                r".*CacheRetrieve\(bbb.out\):  [0-9a-fA-F]+ retrieved by copy: 70000 bytes.*")
+test.must_match('aaa.out', aaa)
+test.must_match('bbb.out', bbb)
+test.up_to_date(arguments='.')
+
+test.pass_test()
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+#
+# MIT License
+#
+# Copyright The SCons Foundation
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Test that --debug=json records each request to the derived-file cache,
+with the bytes retrieved and the build time a hit saves, and ranks the
+hits and misses.
+"""
+
+import json
+
+import TestSCons
+
+_python_ = TestSCons._python_
+
+test = TestSCons.TestSCons()
+
+cache = test.workpath('cache')
+
+test.write('slow.py', r"""
+import sys
+import time
+time.sleep(float(sys.argv[3]))
+with open(sys.argv[1]) as ifp, open(sys.argv[2], 'w') as ofp:
+    ofp.write(ifp.read())
+""")
+
+test.write('SConstruct', """\
+DefaultEnvironment(tools=[])
+CacheDir(r'%(cache)s')
+env = Environment(tools=[])
+env.Command('fast.out', 'fast.in', r'%(_python_)s slow.py $SOURCE $TARGET 0')
+env.Command('slow.out', 'slow.in', r'%(_python_)s slow.py $SOURCE $TARGET 0.5')
+""" % locals())
+
+test.write('fast.in', "fast.in\n")
+test.write('slow.in', "slow.in\n")
+
+def cache_stats():
+    with open(test.workpath('scons_stats.json')) as f:
+        return json.load(f)['Cache']
+
+# Populate the cache: two misses, which cost their build time.
+test.run(arguments='--debug=json .')
+stats = cache_stats()
+records = {r['target']: r for r in stats['Targets']}
+test.fail_test(sorted(records) != ['fast.out', 'slow.out'], message=str(records))
+for r in records.values():
+    test.fail_test(r['hit'] or r['how'] != 'not in cache' or r['bytes'] != 0,
+                   message=str(r))
+    test.fail_test(r['build_time'] is None, message=str(r))
+    test.fail_test(r['cache'] != cache, message=str(r))
+test.fail_test(stats['Summary']['miss_reasons'] != {'not in cache': 2},
+               message=str(stats['Summary']))
+test.fail_test(records['slow.out']['build_time'] < 0.5, message=str(records))
+
+# Retrieve both: the build time saved is the one recorded.
+test.run(arguments='-c .')
+test.run(arguments='--debug=json .')
+stats = cache_stats()
+records = {r['target']: r for r in stats['Targets']}
+for name, r in records.items():
+    test.fail_test(not r['hit'] or r['how'] != 'copy', message=str(r))
+    test.fail_test(r['bytes'] != len(name.replace('.out', '.in\n')), message=str(r))
+    test.fail_test(r['build_time'] is None or r['seconds'] <= 0, message=str(r))
+test.fail_test(records['slow.out']['build_time'] < 0.5, message=str(records))
+summary = stats['Summary']
+test.fail_test((summary['requests'], summary['hits'], summary['misses']) != (2, 2, 0),
+               message=str(summary))
+test.fail_test(summary['bytes'] != 16, message=str(summary))
+test.fail_test(summary['time_saved'] < 0.5, message=str(summary))
+ranked = [e['target'] for e in stats['Most valuable']]
+test.fail_test(ranked != ['slow.out', 'fast.out'], message=str(ranked))
+test.fail_test(stats['Most missed'] != [], message=str(stats['Most missed']))
+
+# A change misses again.
+test.write('slow.in', "slow.in 2\n")
+test.run(arguments='--debug=json .')
+stats = cache_stats()
+missed = stats['Most missed']
+test.fail_test([e['target'] for e in missed] != ['slow.out'], message=str(missed))
+test.fail_test(missed[0]['count'] != 1 or missed[0]['build_time'] < 0.5, message=str(missed))
+
+# Without --debug=json, nothing is recorded.
+test.unlink('scons_stats.json')
+test.run(arguments='-c .')
+test.run(arguments='.')
+test.must_not_exist('scons_stats.json')
+
+test.pass_test()
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
@@ -180,12 +180,20 @@ test.run(chdir='src',
 expect = \
 r"""CacheRetrieve\(aaa.out\):  retrieving from [0-9a-fA-F]+
 requests: [0-9]+, hits: [0-9]+, misses: [0-9]+, hit rate: [0-9]+\.[0-9]{2,}%
+CacheRetrieve\(aaa.out\):  [0-9a-fA-F]+ retrieved by copy: 7 bytes in [0-9]+\.[0-9]{3} ms, [0-9]+\.[0-9]{2} MB/s overall
+requests: [0-9]+, hits: [0-9]+, misses: [0-9]+, hit rate: [0-9]+\.[0-9]{2,}%
 CacheRetrieve\(bbb.out\):  retrieving from [0-9a-fA-F]+
 requests: [0-9]+, hits: [0-9]+, misses: [0-9]+, hit rate: [0-9]+\.[0-9]{2,}%
+CacheRetrieve\(bbb.out\):  [0-9a-fA-F]+ retrieved by copy: 7 bytes in [0-9]+\.[0-9]{3} ms, [0-9]+\.[0-9]{2} MB/s overall
+requests: [0-9]+, hits: [0-9]+, misses: [0-9]+, hit rate: [0-9]+\.[0-9]{2,}%
 CacheRetrieve\(ccc.out\):  retrieving from [0-9a-fA-F]+
 requests: [0-9]+, hits: [0-9]+, misses: [0-9]+, hit rate: [0-9]+\.[0-9]{2,}%
+CacheRetrieve\(ccc.out\):  [0-9a-fA-F]+ retrieved by copy: 7 bytes in [0-9]+\.[0-9]{3} ms, [0-9]+\.[0-9]{2} MB/s overall
+requests: [0-9]+, hits: [0-9]+, misses: [0-9]+, hit rate: [0-9]+\.[0-9]{2,}%
 CacheRetrieve\(all\):  retrieving from [0-9a-fA-F]+
 requests: [0-9]+, hits: [0-9]+, misses: [0-9]+, hit rate: [0-9]+\.[0-9]{2,}%
+CacheRetrieve\(all\):  [0-9a-fA-F]+ retrieved by copy: 21 bytes in [0-9]+\.[0-9]{3} ms, [0-9]+\.[0-9]{2} MB/s overall
+requests: [0-9]+, hits: [0-9]+, misses: [0-9]+, hit rate: [0-9]+\.[0-9]{2,}%
 """
 
 test.must_match(debug_out, expect, mode='r')
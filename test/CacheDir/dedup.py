@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+#
+# MIT License
+#
+# Copyright The SCons Foundation
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Test the dedup cache layout: scons-configure-cache --layout=dedup stores
+a manifest for each build signature and one copy of each content, and
+a target already holding the content the cache has is left in place.
+"""
+
+import os
+
+import TestSCons
+
+_python_ = TestSCons._python_
+
+test = TestSCons.TestSCons(match=TestSCons.match_re_dotall)
+
+cache = test.workpath('cache')
+configure_cache = os.path.join(os.environ['SCONS_SCRIPT_DIR'], 'scons-configure-cache.py')
+
+def run_configure_cache(arguments, **kw):
+    test.run(program=configure_cache, interpreter=TestSCons.python,
+             arguments=arguments, **kw)
+
+def cache_files():
+    """The manifests and the other files in the cache."""
+    manifests, files = [], []
+    for dirpath, dirnames, filenames in os.walk(cache):
+        if dirpath == cache:
+            continue
+        for name in filenames:
+            with open(os.path.join(dirpath, name), 'rb') as f:
+                if f.read().startswith(b"\x89SCons manifest\r\n\x1a\n"):
+                    manifests.append(name)
+                else:
+                    files.append(name)
+    return len(manifests), len(files)
+
+test.write('squeeze.py', r"""
+import sys
+with open(sys.argv[1]) as ifp, open(sys.argv[2], 'w') as ofp:
+    ofp.write(' '.join(ifp.read().split()) + '\n')
+""")
+
+test.write('SConstruct', """\
+DefaultEnvironment(tools=[])
+CacheDir(r'%(cache)s')
+env = Environment(tools=[])
+env.Command('a.out', 'a.in', Copy('$TARGET', '$SOURCE'))
+env.Command('b.out', 'b.in', Copy('$TARGET', '$SOURCE'))
+env.Command('gen.out', 'gen.in', r'%(_python_)s squeeze.py $SOURCE $TARGET')
+""" % locals())
+
+test.write('a.in', "same\n")
+test.write('b.in', "same\n")
+test.write('gen.in', "int x;\n")
+
+# Create the cache, then switch the layout.
+test.run(arguments='-n .')
+run_configure_cache('--layout=dedup ' + cache)
+run_configure_cache('--layout=other ' + cache, status=2, stdout=None,
+                    stderr=r".*invalid choice: 'other'.*")
+
+test.run(arguments='--cache-debug=- .')
+test.must_contain_all_lines(test.stdout(), [
+    "CachePush(a.out):  ",
+    " stored as ",
+])
+# a.out and b.out are the same: stored once.
+test.fail_test(cache_files() != (3, 2), message="cache holds %s" % (cache_files(),))
+
+test.run(arguments='-c .')
+test.run(arguments='--cache-debug=- .')
+for name in ('a', 'b', 'gen'):
+    test.fail_test("Retrieved `%s.out' from cache" % name not in test.stdout())
+test.must_match('a.out', "same\n")
+test.must_match('b.out', "same\n")
+test.must_match('gen.out', "int x;\n")
+test.up_to_date(arguments='.')
+
+# A change that doesn't change the output: built, but not stored again.
+test.write('gen.in', "int   x;\n")
+test.run(arguments='--cache-debug=- gen.out')
+test.must_contain_all_lines(test.stdout(), [
+    "squeeze.py gen.in gen.out",
+    ", already in cache",
+])
+test.fail_test(cache_files() != (4, 2), message="cache holds %s" % (cache_files(),))
+
+# Changed back: gen.out already has what the cache has, so it is left alone.
+os.utime(test.workpath('gen.out'), (1000000000, 1000000000))
+test.write('gen.in', "int x;\n")
+test.run(arguments='--cache-debug=- gen.out')
+test.must_contain_all_lines(test.stdout(), [
+    "Retrieved `gen.out' from cache",
+    "CacheRetrieve(gen.out):  ",
+    " already in place",
+])
+test.must_not_contain_any_line(test.stdout(), ["squeeze.py"])
+test.fail_test(os.path.getmtime(test.workpath('gen.out')) != 1000000000,
+               message="gen.out was rewritten")
+test.must_match('gen.out', "int x;\n")
+test.up_to_date(arguments='.')
+
+# Read whatever the layout.
+run_configure_cache('--layout=plain ' + cache)
+test.run(arguments='-c .')
+test.run(arguments='.')
+test.fail_test("Retrieved `a.out' from cache" not in test.stdout())
+test.must_match('a.out', "same\n")
+test.must_match('gen.out', "int x;\n")
+
+test.pass_test()
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
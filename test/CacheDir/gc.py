@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+#
+# MIT License
+#
+# Copyright The SCons Foundation
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+Test a cache with a maximum size: scons-configure-cache --max-size and
+--gc, and evicting the least recently used files at the end of a build.
+"""
+
+import os
+
+import TestSCons
+
+test = TestSCons.TestSCons(match=TestSCons.match_re_dotall)
+
+cache = test.workpath('cache')
+configure_cache = os.path.join(os.environ['SCONS_SCRIPT_DIR'], 'scons-configure-cache.py')
+
+def run_configure_cache(arguments, **kw):
+    test.run(program=configure_cache, interpreter=TestSCons.python,
+             arguments=arguments, **kw)
+
+def cached():
+    """The sizes of the files in the cache."""
+    sizes = []
+    for name in os.listdir(cache):
+        subdir = os.path.join(cache, name)
+        if os.path.isdir(subdir):
+            sizes.extend(os.path.getsize(os.path.join(subdir, f)) for f in os.listdir(subdir))
+    return sizes
+
+test.write('SConstruct', """\
+DefaultEnvironment(tools=[])
+CacheDir(r'%(cache)s')
+env = Environment(tools=[])
+for name in ['aaa', 'bbb', 'ccc', 'ddd']:
+    env.Command(name + '.out', name + '.in', Copy('$TARGET', '$SOURCE'))
+""" % locals())
+
+for name in ['aaa', 'bbb', 'ccc', 'ddd']:
+    test.write(name + '.in', name * 333 + "\n")
+
+test.run(arguments='aaa.out bbb.out ccc.out ddd.out')
+test.fail_test(cached() != [1000] * 4, message="cache holds %s" % cached())
+
+# Retrieving aaa.out makes it the most recently used.
+test.run(arguments='-c aaa.out')
+test.run(arguments='aaa.out', stdout=r".*Retrieved `aaa.out' from cache.*")
+
+run_configure_cache('--max-size 2.5K --show ' + cache,
+                    stdout=r'.*"prefix_len": 2.*Cache contains \d+ files\n')
+run_configure_cache('--show ' + cache, stdout=r'.*"max_size": 2560,.*')
+run_configure_cache('--gc ' + cache,
+                    stdout=r"Removed 2 files, 2000 bytes; cache holds 2000 bytes\n")
+test.fail_test(cached() != [1000] * 2, message="cache holds %s" % cached())
+
+test.run(arguments='-c .')
+test.run(arguments='.')
+for name in ['aaa', 'ddd']:
+    test.fail_test("Retrieved `%s.out' from cache" % name not in test.stdout())
+for name in ['bbb', 'ccc']:
+    test.fail_test("Retrieved `%s.out' from cache" % name in test.stdout())
+    test.must_match(name + '.out', name * 333 + "\n")
+
+# The build pushed bbb.out and ccc.out, and evicted down to the limit.
+test.fail_test(cached() != [1000] * 2, message="cache holds %s" % cached())
+
+run_configure_cache('--max-size 0 --gc ' + cache,
+                    stdout="Cache '.*' has no max-size to collect garbage to\n")
+run_configure_cache('--max-size lots ' + cache, status=2, stdout=None,
+                    stderr=r".*invalid size: 'LOTS'.*")
+
+test.pass_test()
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
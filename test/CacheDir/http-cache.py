@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+#
+# MIT License
+#
+# Copyright The SCons Foundation
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Test a derived-file cache on an HTTP server, with the HTTPCacheDir
+class and the reference server in SCons.Utilities.CacheServer.
+"""
+
+import os
+import socket
+import threading
+
+import TestSCons
+from TestCmd import IS_WINDOWS
+
+from SCons.Utilities.CacheServer import CacheServer
+
+_python_ = TestSCons._python_
+
+test = TestSCons.TestSCons(match=TestSCons.match_re_dotall)
+
+cache = test.workpath('cache')
+server = CacheServer(cache, ('127.0.0.1', 0))
+threading.Thread(target=server.serve_forever, daemon=True).start()
+
+# A port nothing listens on.
+with socket.socket() as sock:
+    sock.bind(('127.0.0.1', 0))
+    dead = 'http://127.0.0.1:%d' % sock.getsockname()[1]
+
+test.write('build.py', r"""
+import sys
+for src, tgt in zip(sys.argv[1::2], sys.argv[2::2]):
+    with open(src) as ifp, open(tgt, 'w') as ofp:
+        ofp.write(ifp.read())
+""")
+
+test.write('SConstruct', """\
+from SCons.CacheDirHTTP import HTTPCacheDir
+DefaultEnvironment(tools=[])
+env = Environment(tools=[])
+env.CacheDir(ARGUMENTS.get('url', r'%s'), custom_class=HTTPCacheDir)
+env.Command('a.out', 'a.in', Copy('$TARGET', '$SOURCE'))
+env.Command(['b.out', 'c.out'], ['b.in', 'c.in'],
+            r'%s build.py ${SOURCES[0]} ${TARGETS[0]} ${SOURCES[1]} ${TARGETS[1]}')
+env.Command('script.out', 'script.in', [Copy('$TARGET', '$SOURCE'), Chmod('$TARGET', 0o755)])
+""" % (server.url, _python_))
+
+for name in ('a', 'b', 'c', 'script'):
+    test.write(name + '.in', name + "\n")
+
+def cache_files():
+    files = []
+    for dirpath, dirnames, filenames in os.walk(cache):
+        if dirpath != cache:
+            files.extend(filenames)
+    return files
+
+test.run(arguments='.')
+test.fail_test(len(cache_files()) != 4, message="cache holds %s" % cache_files())
+test.must_not_contain_any_line(test.stdout(), ["Retrieved"])
+
+test.run(arguments='-c .')
+test.run(arguments='--cache-debug=- .')
+for name in ('a', 'b', 'c', 'script'):
+    test.fail_test("Retrieved `%s.out' from cache" % name not in test.stdout())
+    test.must_match(name + '.out', name + "\n")
+test.must_contain_all_lines(test.stdout(), [
+    "CacheRetrieve(a.out):  retrieving from ",
+    " retrieved by ",
+    "requests: 4, hits: 4, misses: 0, hit rate: 100.00%",
+])
+if not IS_WINDOWS:
+    test.fail_test(not os.stat(test.workpath('script.out')).st_mode & 0o100,
+                   message="script.out is not executable")
+test.up_to_date(arguments='.')
+
+# -n only asks whether the server has them.
+test.run(arguments='-c .')
+test.run(arguments='-n .')
+test.fail_test("Retrieved `a.out' from cache" not in test.stdout())
+test.must_not_exist('a.out')
+
+# Pushed from background threads.
+test.write('a.in', "a 2\n")
+test.run(arguments='--cache-push-jobs=2 .')
+test.fail_test(len(cache_files()) != 5, message="cache holds %s" % cache_files())
+
+# Retrieved ahead of the build.
+test.run(arguments='-c .')
+test.run(arguments='--cache-prefetch-jobs=2 --cache-debug=- .')
+test.must_contain_all_lines(test.stdout(), [
+    "CachePrefetch:  fetching targets of 3 builders",
+    "requests: 4, hits: 4, misses: 0, hit rate: 100.00%",
+])
+for name in ('a', 'b', 'c', 'script'):
+    test.fail_test("Retrieved `%s.out' from cache" % name not in test.stdout())
+test.must_match('a.out', "a 2\n")
+test.fail_test([f for f in os.listdir(test.workpath()) if '.prefetch' in f])
+
+# Read-only: nothing is pushed.
+test.write('a.in', "a 3\n")
+test.run(arguments='--cache-readonly .')
+test.fail_test(len(cache_files()) != 5, message="cache holds %s" % cache_files())
+
+# A server that can't be reached: everything is built, with one warning.
+test.run(arguments='-c .')
+test.run(arguments='url=%s .' % dead, stderr=None)
+test.must_contain_all_lines(test.stderr(), ["Cannot reach cache server %s" % dead])
+test.fail_test(test.stderr().count("Cannot reach cache server") != 1, message=test.stderr())
+for name in ('b', 'c', 'script'):
+    test.must_match(name + '.out', name + "\n")
+test.must_match('a.out', "a 3\n")
+
+server.shutdown()
+server.server_close()
+test.pass_test()
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
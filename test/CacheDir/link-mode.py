@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+#
+# MIT License
+#
+# Copyright The SCons Foundation
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+Test the link_mode argument of CacheDir(): files retrieved from cache
+are hard linked to, or cloned from, the cache entry instead of copied.
+"""
+
+import os
+import stat
+
+import TestSCons
+from TestCmd import IS_WINDOWS
+
+test = TestSCons.TestSCons(match=TestSCons.match_re_dotall)
+
+cache = test.workpath('cache')
+
+test.write('SConstruct', """\
+DefaultEnvironment(tools=[])
+CacheDir(r'%(cache)s', link_mode=ARGUMENTS.get('mode'))
+env = Environment(tools=[])
+env.Command('aaa.out', 'aaa.in', Copy('$TARGET', '$SOURCE'))
+env.Command('bbb.out', 'bbb.in', Copy('$TARGET', '$SOURCE'))
+""" % locals())
+
+test.write('aaa.in', "aaa.in\n")
+test.write('bbb.in', "bbb.in\n")
+
+test.run(arguments='.')
+test.run(arguments='-c .')
+
+def cache_entry(target):
+    for dirpath, dirnames, filenames in os.walk(cache):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if os.path.samefile(path, test.workpath(target)):
+                return path
+    return None
+
+test.run(arguments='mode=hardlink --cache-debug=- .',
+         stdout=r".*CacheRetrieve\(aaa.out\):  [0-9a-fA-F]+ retrieved by (hardlink|copy): "
+                r"7 bytes in [0-9.]+ ms, [0-9.]+ MB/s overall\n.*")
+test.must_match('aaa.out', "aaa.in\n")
+test.must_match('bbb.out', "bbb.in\n")
+if not IS_WINDOWS:
+    test.fail_test(not cache_entry('aaa.out'), message="aaa.out not linked to the cache")
+    mode = os.stat(test.workpath('aaa.out')).st_mode
+    test.fail_test(mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH),
+                   message="hard linked aaa.out is writable")
+test.up_to_date(options='mode=hardlink', arguments='.')
+
+# A rebuild replaces the link rather than writing through it.
+test.write('aaa.in', "aaa.in 2\n")
+test.run(arguments='mode=hardlink aaa.out')
+test.must_match('aaa.out', "aaa.in 2\n")
+test.fail_test(cache_entry('aaa.out'), message="rebuilt aaa.out still linked to the cache")
+test.write('aaa.in', "aaa.in\n")
+test.run(arguments='-c .')
+test.run(arguments='mode=copy .', stdout=r".*Retrieved `aaa.out' from cache.*")
+test.must_match('aaa.out', "aaa.in\n")
+
+test.run(arguments='-c .')
+test.run(arguments='mode=reflink --cache-debug=- .',
+         stdout=r".*CacheRetrieve\(aaa.out\):  [0-9a-fA-F]+ retrieved by (reflink|copy): .*")
+test.must_match('aaa.out', "aaa.in\n")
+test.fail_test(cache_entry('aaa.out'), message="cloned aaa.out is the cache entry")
+test.fail_test(not os.access(test.workpath('aaa.out'), os.W_OK),
+               message="cloned aaa.out is not writable")
+
+test.run(arguments='mode=symlink .', status=2, stdout=None,
+         stderr=r".*Invalid CacheDir link_mode 'symlink'; must be one of copy, reflink, hardlink.*")
+
+test.pass_test()
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+#
+# MIT License
+#
+# Copyright The SCons Foundation
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Test retrieving the targets built from sources only from the cache
+ahead of the build with --cache-prefetch-jobs, or
+SetOption('cache_prefetch_jobs').
+"""
+
+import os
+
+import TestSCons
+
+_python_ = TestSCons._python_
+
+test = TestSCons.TestSCons(match=TestSCons.match_re_dotall)
+
+cache = test.workpath('cache')
+
+names = ['f%d' % i for i in range(10)]
+
+test.write('build.py', r"""
+import sys
+for src, tgt in zip(sys.argv[1::2], sys.argv[2::2]):
+    with open(src) as ifp, open(tgt, 'w') as ofp:
+        ofp.write(ifp.read())
+""")
+
+test.write('SConstruct', """\
+DefaultEnvironment(tools=[])
+SetOption('cache_prefetch_jobs', int(ARGUMENTS.get('prefetch_jobs', 0)))
+CacheDir(r'%(cache)s')
+env = Environment(tools=[])
+for name in %(names)r:
+    env.Command(name + '.out', name + '.in', Copy('$TARGET', '$SOURCE'))
+env.Command(['a.out', 'b.out'], ['a.in', 'b.in'],
+            r'%(_python_)s build.py ${SOURCES[0]} ${TARGETS[0]} ${SOURCES[1]} ${TARGETS[1]}')
+# Built from a target, so not retrieved ahead.
+env.Command('chain.out', 'f0.out', Copy('$TARGET', '$SOURCE'))
+""" % locals())
+
+for name in names + ['a', 'b']:
+    test.write(name + '.in', name + "\n")
+
+outputs = names + ['a', 'b', 'chain']
+
+def check():
+    for name in outputs:
+        test.fail_test("Retrieved `%s.out' from cache" % name not in test.stdout(),
+                       message="%s.out not retrieved" % name)
+    for name in names + ['a', 'b']:
+        test.must_match(name + '.out', name + "\n")
+    test.must_match('chain.out', "f0\n")
+    leftover = [f for f in os.listdir(test.workpath()) if '.prefetch' in f]
+    test.fail_test(leftover, message="left behind: %s" % leftover)
+
+test.run(arguments='.')
+
+test.run(arguments='-c .')
+test.run(arguments='-j 2 --cache-prefetch-jobs=4 --cache-debug=- .')
+check()
+test.must_contain_all_lines(test.stdout(), [
+    "CachePrefetch:  targets of 11 of 11 builders in cache",
+    "requests: 13, hits: 13, misses: 0, hit rate: 100.00%",
+])
+test.up_to_date(arguments='.')
+
+# Set from the SConstruct, with -j 1.
+test.run(arguments='-c .')
+test.run(arguments='prefetch_jobs=2 --cache-debug=- .')
+check()
+test.must_contain_all_lines(test.stdout(), ["CachePrefetch:  "])
+
+# Only the targets that don't exist are retrieved ahead.
+test.run(arguments='-c f1.out f2.out')
+test.run(arguments='prefetch_jobs=2 --cache-debug=- .')
+test.must_contain_all_lines(test.stdout(), [
+    "CachePrefetch:  targets of 2 of 2 builders in cache",
+    "Retrieved `f1.out' from cache",
+])
+
+# A builder one of whose targets isn't in the cache is built.
+test.run(arguments='-c .')
+for dirpath, dirnames, filenames in os.walk(cache):
+    for f in filenames:
+        with open(os.path.join(dirpath, f)) as fp:
+            if fp.read() == "b\n":
+                os.unlink(os.path.join(dirpath, f))
+test.run(arguments='prefetch_jobs=2 --cache-debug=- .')
+test.must_contain_all_lines(test.stdout(), [
+    "CachePrefetch:  targets of 10 of 11 builders in cache",
+    "build.py a.in a.out b.in b.out",
+])
+test.must_match('a.out', "a\n")
+test.must_match('b.out', "b\n")
+test.up_to_date(arguments='.')
+
+# Changed sources: looked for and not found.
+for name in names:
+    test.write(name + '.in', name + " 2\n")
+test.run(arguments='prefetch_jobs=2 --cache-debug=- .')
+test.must_contain_all_lines(test.stdout(), [
+    "Copy(\"f1.out\", \"f1.in\")",
+])
+test.must_match('f1.out', "f1 2\n")
+
+# Not with --cache-disable.
+test.run(arguments='-c .')
+test.run(arguments='prefetch_jobs=2 --cache-disable --cache-debug=- .')
+test.must_not_contain_any_line(test.stdout(), ["CachePrefetch:", "Retrieved"])
+
+test.run(arguments='prefetch_jobs=-1 .', status=2, stdout=None,
+         stderr=r".*A non-negative integer is required: -1.*")
+
+test.pass_test()
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+#
+# MIT License
+#
+# Copyright The SCons Foundation
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+Test pushing targets to the cache from background threads with
+--cache-push-jobs, or SetOption('cache_push_jobs').
+"""
+
+import os
+
+import TestSCons
+
+test = TestSCons.TestSCons(match=TestSCons.match_re_dotall)
+
+cache = test.workpath('cache')
+
+names = ['f%d' % i for i in range(10)]
+
+test.write('SConstruct', """\
+DefaultEnvironment(tools=[])
+SetOption('cache_push_jobs', int(ARGUMENTS.get('push_jobs', 0)))
+CacheDir(r'%(cache)s')
+def cat(target, source, env):
+    with open(str(target[0]), 'w') as ofp:
+        for src in source:
+            with open(str(src)) as ifp:
+                ofp.write(ifp.read())
+env = Environment(tools=[])
+for name in %(names)r:
+    env.Command(name + '.out', name + '.in', Copy('$TARGET', '$SOURCE'))
+env.Command('all.out', [name + '.out' for name in %(names)r], cat)
+""" % locals())
+
+for name in names:
+    test.write(name + '.in', name + "\n")
+
+def cache_files():
+    files = []
+    for dirpath, dirnames, filenames in os.walk(cache):
+        if dirpath != cache:
+            files.extend(filenames)
+    return files
+
+test.run(arguments='-j 4 --cache-push-jobs=2 .')
+test.must_match('all.out', "".join(name + "\n" for name in names))
+files = cache_files()
+test.fail_test(len(files) != len(names) + 1, message="cache holds %s" % files)
+test.fail_test([f for f in files if '.tmp' in f], message="temporary files left: %s" % files)
+
+test.run(arguments='-c .')
+test.run(arguments='.')
+for name in names + ['all']:
+    test.fail_test("Retrieved `%s.out' from cache" % name not in test.stdout())
+
+# Set from the SConstruct.
+for name in names:
+    test.write(name + '.in', name + " 2\n")
+test.run(arguments='push_jobs=3 .')
+test.must_match('all.out', "".join(name + " 2\n" for name in names))
+test.fail_test(len(cache_files()) != 2 * (len(names) + 1), message="cache holds %s" % cache_files())
+
+test.run(arguments='push_jobs=-1 .', status=2, stdout=None,
+         stderr=r".*A non-negative integer is required: -1.*")
+
+test.pass_test()
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+#
+# MIT License
+#
+# Copyright The SCons Foundation
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Test a local cache in front of a shared one, with TieredCacheDir.
+"""
+
+import os
+import shutil
+
+import TestSCons
+
+test = TestSCons.TestSCons(match=TestSCons.match_re_dotall)
+
+local = test.workpath('local')
+shared = test.workpath('shared')
+
+test.write('SConstruct', """\
+from SCons.CacheDirTiered import TieredCacheDir
+DefaultEnvironment(tools=[])
+env = Environment(tools=[])
+tiers = TieredCacheDir.with_shared(r'%(shared)s', readonly=ARGUMENTS.get('readonly') == '1')
+env.CacheDir(r'%(local)s', custom_class=tiers)
+env.Command('a.out', 'a.in', Copy('$TARGET', '$SOURCE'))
+env.Command('b.out', 'b.in', Copy('$TARGET', '$SOURCE'))
+""" % locals())
+
+test.write('a.in', "a\n")
+test.write('b.in', "b\n")
+
+def cache_files(cache):
+    files = []
+    for dirpath, dirnames, filenames in os.walk(cache):
+        if dirpath != cache:
+            files.extend(filenames)
+    return sorted(files)
+
+# Pushed to both.
+test.run(arguments='.')
+test.fail_test(len(cache_files(local)) != 2, message="local holds %s" % cache_files(local))
+test.fail_test(cache_files(shared) != cache_files(local),
+               message="shared holds %s" % cache_files(shared))
+
+# A new local cache: retrieved from the shared one, and copied to it.
+shutil.rmtree(local)
+test.run(arguments='-c .')
+test.run(arguments='--cache-debug=- .')
+test.must_contain_all_lines(test.stdout(), [
+    "Retrieved `a.out' from cache",
+    "Retrieved `b.out' from cache",
+    "looking in the shared cache for ",
+    "copying to the local cache as ",
+    "local requests: 2, hits: 0, misses: 2, hit rate: 0.00%",
+    "shared requests: 2, hits: 2, misses: 0, hit rate: 100.00%",
+])
+test.must_match('a.out', "a\n")
+test.fail_test(cache_files(local) != cache_files(shared),
+               message="local holds %s" % cache_files(local))
+test.up_to_date(arguments='.')
+
+# Now from the local one.
+test.run(arguments='-c .')
+test.run(arguments='--cache-debug=- .')
+test.must_contain_all_lines(test.stdout(), [
+    "Retrieved `a.out' from cache",
+    "local requests: 2, hits: 2, misses: 0, hit rate: 100.00%",
+    "shared requests: 0, hits: 0, misses: 0, hit rate: 100.00%",
+])
+test.must_not_contain_any_line(test.stdout(), ["looking in the shared cache"])
+
+# -n asks both.
+shutil.rmtree(local)
+test.run(arguments='-c .')
+test.run(arguments='-n .')
+test.fail_test("Retrieved `a.out' from cache" not in test.stdout())
+test.must_not_exist('a.out')
+
+# A read-only shared cache isn't pushed to; b.out is retrieved from it.
+test.write('a.in', "a 2\n")
+test.run(arguments='readonly=1 .')
+test.fail_test(len(cache_files(local)) != 2, message="local holds %s" % cache_files(local))
+test.fail_test(len(cache_files(shared)) != 2, message="shared holds %s" % cache_files(shared))
+
+# Neither is with --cache-readonly.
+test.write('a.in', "a 3\n")
+test.run(arguments='--cache-readonly .')
+test.fail_test(len(cache_files(local)) != 2, message="local holds %s" % cache_files(local))
+test.fail_test(len(cache_files(shared)) != 2, message="shared holds %s" % cache_files(shared))
+
+test.pass_test()
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
@@ -107,6 +107,8 @@ scons>>> Touch\("4"\)
 scons>>> Retrieved `foo.out' from cache
 CacheRetrieve\(foo.out\):  retrieving from [0-9A-za-z]+
 requests: [0-9]+, hits: [0-9]+, misses: [0-9]+, hit rate: [0-9]+\.[0-9]{2,}%
+CacheRetrieve\(foo.out\):  [0-9A-za-z]+ retrieved by copy: 7 bytes in [0-9]+\.[0-9]{3} ms, [0-9]+\.[0-9]{2} MB/s overall
+requests: [0-9]+, hits: [0-9]+, misses: [0-9]+, hit rate: [0-9]+\.[0-9]{2,}%
 scons>>> Touch\("5"\)
 scons>>> 
 """
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+#
+# __COPYRIGHT__
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Verify that the Pool() function limits how many tasks assigned to a
+pool through $POOL execute at the same time, while other tasks keep
+running in parallel.
+"""
+
+import TestSCons
+
+_python_ = TestSCons._python_
+
+test = TestSCons.TestSCons()
+
+test.write('build.py', r"""
+import sys
+import time
+with open(sys.argv[1], 'w') as f:
+    f.write(str(time.time()) + '\n')
+    time.sleep(1)
+    f.write(str(time.time()))
+""")
+
+test.write('SConstruct', """\
+DefaultEnvironment(tools=[])
+Pool('link', 1)
+env = Environment(tools=[])
+for t in ['link1', 'link2', 'link3']:
+    env.Command(t, [], r'%(_python_)s build.py $TARGET', POOL='link')
+env.Command('other', [], r'%(_python_)s build.py $TARGET')
+env.Command('bad', [], r'%(_python_)s build.py $TARGET', POOL='nosuch')
+""" % locals())
+
+def times(target):
+    return list(map(float, test.read(target, mode='r').split('\n')))
+
+test.run(arguments='-j4 link1 link2 link3 other')
+
+intervals = sorted(times(t) for t in ['link1', 'link2', 'link3'])
+for (start1, finish1), (start2, finish2) in zip(intervals, intervals[1:]):
+    test.fail_test(start2 < finish1)
+
+# The task outside the pool did not wait for the pooled ones.
+start, finish = times('other')
+test.fail_test(start > intervals[0][1])
+
+test.run(arguments='bad',
+         stderr="scons: *** [bad] Unknown pool 'nosuch' in $POOL.\n",
+         status=2)
+test.must_not_exist('bad')
+
+test.write('SConstruct', """\
+Pool('link', 0)
+""")
+
+test.run(arguments='.',
+         stderr=None,
+         status=2)
+test.must_contain_all_lines(test.stderr(),
+                            ["Pool depth must be a positive integer, not 0."])
+
+test.pass_test()
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
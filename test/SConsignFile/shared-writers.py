@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+#
+# MIT License
+#
+# Copyright The SCons Foundation
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+Verify that two SCons processes building different targets at the same
+time, with the same SConsignFile(), both keep their entries.
+"""
+
+import TestSCons
+
+_python_ = TestSCons._python_
+
+test = TestSCons.TestSCons()
+
+test.subdir('subdir')
+
+test.write('build.py', r"""
+import sys
+import time
+time.sleep(1)
+with open(sys.argv[1], 'wb') as ofp, open(sys.argv[2], 'rb') as ifp:
+    ofp.write(ifp.read())
+sys.exit(0)
+""")
+
+test.write('SConstruct', """
+SConsignFile(compact=int(ARGUMENTS.get('compact', 0)))
+DefaultEnvironment(tools=[])
+B = Builder(action=r'%(_python_)s build.py $TARGETS $SOURCES')
+env = Environment(BUILDERS={'B': B}, tools=[])
+for name in ['a1', 'a2', 'b1', 'b2', 'subdir/a3', 'subdir/b3']:
+    env.B(target=name + '.out', source=name + '.in')
+    env.Depends(name + '.out', name[-2] + '.h')
+""" % locals())
+
+for name in ['a1', 'a2', 'b1', 'b2', 'subdir/a3', 'subdir/b3']:
+    test.write(name + '.in', name + ".in\n")
+test.write('a.h', "a.h\n")
+test.write('b.h', "b.h\n")
+
+database_name = test.get_sconsignname() + ".dblite"
+
+for compact in ['compact=0', 'compact=1']:
+    test.unlink_files('.', [database_name])
+    for name in ['a', 'b']:
+        test.unlink_files('.', [name + '1.out', name + '2.out', 'subdir/' + name + '3.out'])
+
+    # The targets of each process go in the same directories.
+    a = test.start(arguments='%s a1.out a2.out subdir/a3.out' % compact)
+    b = test.start(arguments='%s b1.out b2.out subdir/b3.out' % compact)
+    test.finish(a)
+    test.finish(b)
+
+    test.must_match('a2.out', "a2.in\n")
+    test.must_match(['subdir', 'b3.out'], "subdir/b3.in\n")
+    test.up_to_date(options=compact, arguments='.')
+
+test.pass_test()
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
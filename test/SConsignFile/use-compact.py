@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+#
+# MIT License
+#
+# Copyright The SCons Foundation
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+Verify SConsignFile(compact=True), and converting the database with
+the sconsign script.
+"""
+
+import TestSCons
+import TestSConsign
+
+_python_ = TestSCons._python_
+
+test = TestSConsign.TestSConsign(match=TestSConsign.match_re)
+
+test.subdir('subdir')
+
+test.write('build.py', r"""
+import sys
+with open(sys.argv[1], 'wb') as ofp, open(sys.argv[2], 'rb') as ifp:
+    ofp.write(ifp.read())
+sys.exit(0)
+""")
+
+database_name = test.get_sconsignname()
+
+test.write('SConstruct', """
+SConsignFile(compact=True)
+DefaultEnvironment(tools=[])
+B = Builder(action=r'%(_python_)s build.py $TARGETS $SOURCES')
+env = Environment(BUILDERS={'B': B}, tools=[])
+env.B(target='f1.out', source='f1.in')
+env.B(target='f2.out', source='f2.in')
+env.B(target='subdir/f3.out', source='subdir/f3.in')
+env.B(target='subdir/f4.out', source='subdir/f4.in')
+env.Depends(['f1.out', 'f2.out', 'subdir/f3.out', 'subdir/f4.out'], 'common.h')
+""" % locals())
+
+test.write('common.h', "common.h\n")
+test.write('f1.in', "f1.in\n")
+test.write('f2.in', "f2.in\n")
+test.write(['subdir', 'f3.in'], "subdir/f3.in\n")
+test.write(['subdir', 'f4.in'], "subdir/f4.in\n")
+
+test.run()
+test.must_match(['subdir', 'f4.out'], "subdir/f4.in\n")
+test.up_to_date(arguments='.')
+
+dblite = "{}.dblite".format(database_name)
+with open(test.workpath(dblite), 'rb') as f:
+    contents = f.read()
+# Once in the path table, once as the name of its own entry.
+compact_count = contents.count(b'common.h')
+test.fail_test(compact_count != 2,
+               message="common.h stored %d times" % compact_count)
+
+expect = r"""=== subdir:
+f4.out: [0-9a-f]+ \d+ \d+
+        subdir/f4.in: [0-9a-f]+ \d+ \d+
+        common.h: [0-9a-f]+ \d+ \d+
+        .*: [0-9a-f]+ \d+ \d+
+        [0-9a-f]+ \[.*build.py \$TARGETS \$SOURCES\]
+"""
+test.run_sconsign(arguments="-d subdir -e f4.out " + dblite, stdout=expect)
+
+test.write(['subdir', 'f4.in'], "subdir/f4.in 2\n")
+test.not_up_to_date(arguments='subdir/f4.out')
+test.must_match(['subdir', 'f4.out'], "subdir/f4.in 2\n")
+test.up_to_date(arguments='.')
+
+# Converted to pickles and back, the entries are still used.
+test.run_sconsign(arguments="--convert=pickle " + dblite,
+                  stdout=r"%s: converted \d+ directories to pickle: \d+ bytes -> \d+ bytes" "\n"
+                  % dblite)
+with open(test.workpath(dblite), 'rb') as f:
+    contents = f.read()
+test.fail_test(contents.count(b'common.h') <= compact_count,
+               message="pickled entries don't repeat the path")
+test.run_sconsign(arguments="-d subdir -e f4.out " + dblite, stdout=expect)
+test.up_to_date(arguments='.')
+
+test.run_sconsign(arguments="--convert=compact " + dblite,
+                  stdout=r"%s: converted \d+ directories to compact: \d+ bytes -> \d+ bytes" "\n"
+                  % dblite)
+test.run_sconsign(arguments="-d subdir -e f4.out " + dblite, stdout=expect)
+test.up_to_date(arguments='.')
+
+test.run_sconsign(arguments="--convert=other " + dblite,
+                  stderr="sconsign: illegal encoding `other'\n",
+                  status=2, match=TestSConsign.match_exact, stdout=None)
+
+test.pass_test()
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
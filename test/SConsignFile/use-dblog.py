@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+#
+# MIT License
+#
+# Copyright The SCons Foundation
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+Verify SConsignFile() when used with the log-structured SCons.dblog module.
+"""
+
+import os
+
+import TestSCons
+import TestSConsign
+
+_python_ = TestSCons._python_
+
+test = TestSConsign.TestSConsign(match=TestSConsign.match_re)
+
+test.subdir('subdir')
+
+test.write('build.py', r"""
+import sys
+with open(sys.argv[1], 'wb') as ofp, open(sys.argv[2], 'rb') as ifp:
+    ofp.write(ifp.read())
+sys.exit(0)
+""")
+
+database_name = test.get_sconsignname()
+
+test.write('SConstruct', """
+import SCons.dblog
+SConsignFile('%(database_name)s', SCons.dblog)
+DefaultEnvironment(tools=[])
+B = Builder(action=r'%(_python_)s build.py $TARGETS $SOURCES')
+env = Environment(BUILDERS={'B': B}, tools=[])
+env.B(target='f1.out', source='f1.in')
+env.B(target='f2.out', source='f2.in')
+env.B(target='subdir/f3.out', source='subdir/f3.in')
+env.B(target='subdir/f4.out', source='subdir/f4.in')
+""" % locals())
+
+test.write('f1.in', "f1.in\n")
+test.write('f2.in', "f2.in\n")
+test.write(['subdir', 'f3.in'], "subdir/f3.in\n")
+test.write(['subdir', 'f4.in'], "subdir/f4.in\n")
+
+test.run()
+
+log = test.workpath('{}.dblog'.format(database_name))
+test.must_exist(log)
+test.must_exist(log + '.idx')
+test.must_not_exist(test.workpath('{}.dblite'.format(database_name)))
+test.must_not_exist(test.workpath('subdir', '{}.dblog'.format(database_name)))
+
+test.must_match('f1.out', "f1.in\n")
+test.must_match(['subdir', 'f4.out'], "subdir/f4.in\n")
+
+# Once the entries have been read back in, an up-to-date build has
+# nothing new to append (the first one may re-pickle them differently).
+test.up_to_date(arguments='.')
+size = os.path.getsize(log)
+test.up_to_date(arguments='.')
+test.fail_test(os.path.getsize(log) != size,
+               message="up-to-date build grew the log")
+
+test.write(['subdir', 'f4.in'], "subdir/f4.in 2\n")
+test.not_up_to_date(arguments='subdir/f4.out')
+test.must_match(['subdir', 'f4.out'], "subdir/f4.in 2\n")
+test.up_to_date(arguments='.')
+
+test.run_sconsign(arguments="-c -d subdir -e f4.out {}.dblog".format(database_name),
+                  stdout=r"""=== subdir:
+f4.out: [0-9a-f]+
+""")
+
+test.pass_test()
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
@@ -68,6 +68,28 @@ for args in ['-h --debug=count', '--debug=count']:
         print(stdout)
         test.fail_test(1)
 
+# The file system calls made for nodes, and the stat calls a directory
+# listing made unneeded: the targets not built yet in a directory
+# searched for headers.
+test.write('SConstruct.fs', """\
+DefaultEnvironment(tools=[])
+env = Environment(tools=[], CPPPATH=['#build'])
+from SCons.Scanner.C import CScanner
+for name in ('a', 'b'):
+    env.Command('build/%s.o' % name, '%s.c' % name, Copy('$TARGET', '$SOURCE'),
+                source_scanner=CScanner())
+""")
+test.write('a.c', '#include "a.h"\n')
+test.write('b.c', '#include "b.h"\n')
+test.run(arguments='-f SConstruct.fs --debug=count .')
+stdout = test.stdout()
+test.fail_test("File system calls:" not in stdout, message=stdout)
+calls = ['stat', 'scandir']
+if sys.platform not in ('win32', 'cygwin'):
+    calls.append('stat (from scandir)')
+missing = [c for c in calls if find_object_count(c, stdout) is None]
+test.fail_test(missing, message="Missing %s from output:\n%s" % (missing, stdout))
+
 expect_warning = """
 scons: warning: --debug=count is not supported when running SCons
 \twith the python -O option or optimized \\(.pyo\\) modules.
@@ -82,6 +82,15 @@ test.run(arguments='--debug=count,json  JSON=build/output/stats.json')
 test.must_exist('build/output/stats.json')
 check_json_file('build/output/stats.json')
 
+test.run(arguments='-c')
+test.run(arguments='--debug=time,json')
+with open(test.workpath('scons_stats.json')) as jf:
+    hashing = json.load(jf)['Time']['Hashing']
+test.fail_test(hashing['files'] < 1 or hashing['bytes'] < len("file.in\n"),
+               message=f"Time/Hashing totals incorrect: {hashing}")
+test.fail_test('bytes_per_second' not in hashing,
+               message="No hashing throughput in json")
+
 # TODO: Not sure how to do this in a reasonable way on windows, so just skip for now
 if not IS_WINDOWS:
     test.run(arguments='--debug=count,json  JSON=/cant/write/here/dumb.json', status=2, stderr=None)
@@ -164,6 +164,13 @@ but the actual measured build time was %(expected_total_time)s
 outside of the 15%% tolerance.
 """ % locals())
 
+# The sources (at least) were hashed, and the totals reported.
+hashed = re.search(r'Total bytes hashed: (\d+) in (\d+) files \((\d+\.\d) MB/s\)', stdout)
+if not hashed or int(hashed.group(2)) < 4 or int(hashed.group(1)) < 4 * len("f1.in\n"):
+    failures.append("SCons -j1 did not report the bytes hashed for the four sources.\n")
+if num(stdout, r'Total file hashing time: (\d+\.\d+) seconds') > scons_time:
+    failures.append("SCons -j1 reported more time hashing files than in total.\n")
+
 if failures or warnings:
     print('\n'.join([test.stdout()] + failures + warnings))
 if failures:
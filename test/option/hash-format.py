@@ -32,7 +32,7 @@ from SCons.Util import ALLOWED_HASH_FORMATS, DEFAULT_HASH_FORMATS
 # Test passing the hash format by command-line.
 INVALID_ALGORITHM = 'testfailure'
 
-for algorithm in [*DEFAULT_HASH_FORMATS, INVALID_ALGORITHM, None]:
+for algorithm in [*DEFAULT_HASH_FORMATS, 'md5-tree', INVALID_ALGORITHM, None]:
     test = TestSCons.TestSCons()
     test.dir_fixture('hash-format')
 
@@ -58,7 +58,7 @@ File "[^"]+", line \d+, in \S+
 """.format(algorithm, ', '.join(DEFAULT_HASH_FORMATS), ', '.join(ALLOWED_HASH_FORMATS)), status=2, match=TestSCons.match_re)
         continue
     elif algorithm is not None:
-        if algorithm in ALLOWED_HASH_FORMATS:
+        if algorithm.replace('-tree', '') in ALLOWED_HASH_FORMATS:
             expected_dblite = test.workpath('.sconsign_%s.dblite' % algorithm)
             test.run('--hash-format=%s .' % algorithm)
         else:
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+#
+# __COPYRIGHT__
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Test that --checkpoint-nodes and --checkpoint-interval save the
+signatures of the targets built so far, so a build that dies before it
+can write the signature database doesn't have to rebuild them.
+"""
+
+import TestSCons
+
+test = TestSCons.TestSCons()
+
+test.write('SConstruct', """\
+import os
+import SCons.SConsign
+
+def wait_for_checkpoint():
+    # Without this, a checkpoint that is due while the previous one is
+    # still being written is put off until the next target is built.
+    if SCons.SConsign.checkpointer is not None:
+        SCons.SConsign.checkpointer.wait()
+
+def copy(target, source, env):
+    wait_for_checkpoint()
+    with open(str(target[0]), 'w') as f:
+        f.write(source[0].get_text_contents())
+
+def die(target, source, env):
+    # Go away without writing the signature database, like a build
+    # that is killed.
+    wait_for_checkpoint()
+    os._exit(3)
+
+if ARGUMENTS.get('SETOPTION'):
+    SetOption('checkpoint_nodes', 1)
+DefaultEnvironment(tools=[])
+env = Environment(tools=[])
+env.Command('f1.out', 'f1.in', copy)
+env.Command('f2.out', ['f2.in', 'f1.out'], copy)
+if ARGUMENTS.get('DIE'):
+    env.Command('f3.out', ['f3.in', 'f2.out'], die)
+else:
+    env.Command('f3.out', ['f3.in', 'f2.out'], copy)
+""")
+
+test.write('f1.in', "f1.in\n")
+test.write('f2.in', "f2.in\n")
+test.write('f3.in', "f3.in\n")
+
+expect_rebuild = test.wrap_stdout("""\
+copy(["f1.out"], ["f1.in"])
+copy(["f2.out"], ["f2.in", "f1.out"])
+copy(["f3.out"], ["f3.in", "f2.out"])
+""")
+expect_f3 = test.wrap_stdout("""\
+copy(["f3.out"], ["f3.in", "f2.out"])
+""")
+
+# Without checkpoints, everything built before dying is lost.
+test.run(arguments='DIE=1 .', status=3, stdout=None)
+test.run(arguments='.', stdout=expect_rebuild)
+test.up_to_date(arguments='.')
+
+for options in ['--checkpoint-nodes=1', '--checkpoint-interval=0.001', 'SETOPTION=1']:
+    test.run(arguments='-c .', stdout=None)
+    test.run(arguments='DIE=1 %s .' % options, status=3, stdout=None)
+    test.run(arguments='.', stdout=expect_f3)
+    test.up_to_date(arguments='.')
+
+# Per-directory .sconsign files are checkpointed too.
+test.write('SConstruct', "SConsignFile(None)\n" + test.read('SConstruct', mode='r'))
+test.run(arguments='-c .', stdout=None)
+test.run(arguments='DIE=1 --checkpoint-nodes=1 .', status=3, stdout=None)
+test.run(arguments='.', stdout=expect_f3)
+test.up_to_date(arguments='.')
+
+test.run(arguments='--checkpoint-interval=x .', status=2, stdout=None,
+         stderr=None)
+
+test.pass_test()
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
@@ -37,12 +37,13 @@ tests = [
     ('.', []),
     ('--experimental=ninja', ['ninja']),
     ('--experimental=legacy_sched', ['legacy_sched']),
-    ('--experimental=all', ['legacy_sched', 'ninja', 'transporter', 'warp_speed']),
+    ('--experimental=process_pool', ['process_pool']),
+    ('--experimental=all', ['legacy_sched', 'ninja', 'process_pool', 'transporter', 'warp_speed']),
     ('--experimental=none', []),
 ]
 
 for args, exper in tests:
-    read_string = """All Features=legacy_sched,ninja,transporter,warp_speed
+    read_string = """All Features=legacy_sched,ninja,process_pool,transporter,warp_speed
 Experimental=%s
 """ % (exper)
     test.run(arguments=args,
@@ -51,7 +52,7 @@ Experimental=%s
 test.run(arguments='--experimental=warp_drive',
          stderr="""usage: scons [OPTIONS] [VARIABLES] [TARGETS]
 
-SCons Error: option --experimental: invalid choice: 'warp_drive' (choose from 'all','none','legacy_sched','ninja','transporter','warp_speed')
+SCons Error: option --experimental: invalid choice: 'warp_drive' (choose from 'all','none','legacy_sched','ninja','process_pool','transporter','warp_speed')
 """,
          status=2)
 
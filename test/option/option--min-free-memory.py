@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+#
+# __COPYRIGHT__
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Test that --min-free-memory keeps a parallel build to one job at a
+time when less memory than requested is available, and that the
+throttling shows up in the --taskmastertrace output.
+"""
+
+import os
+
+import TestSCons
+
+_python_ = TestSCons._python_
+
+test = TestSCons.TestSCons()
+
+if not os.path.exists('/proc/meminfo'):
+    test.skip_test("No /proc/meminfo on this platform, skipping test.\n")
+
+test.write('build.py', r"""
+import sys
+import time
+with open(sys.argv[1], 'w') as f:
+    f.write(str(time.time()) + '\n')
+    time.sleep(1)
+    f.write(str(time.time()))
+""")
+
+test.write('SConstruct', """\
+DefaultEnvironment(tools=[])
+env = Environment(tools=[])
+env.Command('f1', [], r'%(_python_)s build.py $TARGET')
+env.Command('f2', [], r'%(_python_)s build.py $TARGET')
+""" % locals())
+
+def times(target):
+    return list(map(float, test.read(target, mode='r').split('\n')))
+
+# No machine has this much memory, so the jobs have to run one by one.
+test.run(arguments='-j2 --min-free-memory=1000000000 '
+                   '--taskmastertrace=trace.out f1 f2')
+intervals = sorted([times('f1'), times('f2')])
+test.fail_test(intervals[1][0] < intervals[0][1])
+test.must_contain_all_lines(test.read('trace.out', mode='r'),
+                            ["Throttling at 1 running jobs:",
+                             "limit 1000000000 MiB"])
+
+test.run(arguments='-c .')
+
+test.run(arguments='-j2 --min-free-memory=1 f1 f2')
+start1, finish1 = times('f1')
+start2, finish2 = times('f2')
+test.fail_test(not (start2 < finish1 and start1 < finish2))
+
+test.pass_test()
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+#
+# MIT License
+#
+# Copyright The SCons Foundation
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Verify the --schedule option: critical-path scheduling starts the
+target with the longest recorded build time first.
+"""
+
+import TestSCons
+
+test = TestSCons.TestSCons()
+
+sconstruct = """\
+import time
+
+def build(target, source, env):
+    time.sleep(env['DELAY'])
+    with open(str(target[0]), 'w') as f:
+        f.write(source[0].get_text_contents())
+
+def show(target, source, env):
+    return 'building %s' % target[0]
+
+DefaultEnvironment(tools=[])
+env = Environment(tools=[])
+act = Action(build, show)
+env.Command('fast.out', 'fast.in', act, DELAY=0)
+env.Command('slow.out', 'slow.in', act, DELAY=1)
+env.Command('all', ['fast.out', 'slow.out'], act, DELAY=0)
+"""
+test.write('SConstruct', sconstruct)
+
+test.write('fast.in', "fast.in\n")
+test.write('slow.in', "slow.in\n")
+
+default_order = """\
+building fast.out
+building slow.out
+building all
+"""
+
+critical_order = """\
+building slow.out
+building fast.out
+building all
+"""
+
+# Nothing is recorded yet, so both orders are the same.
+test.run(arguments='-Q -n --schedule=critical-path all', stdout=default_order)
+test.run(arguments='-Q all', stdout=default_order)
+test.must_match('all', "fast.in\n")
+
+test.write('fast.in', "fast.in 2\n")
+test.write('slow.in', "slow.in 2\n")
+
+# With -n the children are not rebuilt, so "all" looks up to date.
+up_to_date = "scons: `all' is up to date.\n"
+test.run(arguments='-Q -n all',
+         stdout=default_order.replace("building all\n", up_to_date))
+test.run(arguments='-Q -n --schedule=critical-path all',
+         stdout=critical_order.replace("building all\n", up_to_date))
+
+test.write('SConstruct', sconstruct + """\
+SetOption('schedule', 'critical-path')
+""")
+test.run(arguments='-Q all', stdout=critical_order)
+test.must_match('slow.out', "slow.in 2\n")
+
+test.run(arguments='-Q --schedule=bogus all', status=2, stderr=None)
+test.must_contain_all_lines(test.stderr(), ["invalid choice: 'bogus'"])
+
+test.pass_test()
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
@@ -20,21 +20,63 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
-#
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
-__revision__ = "__FILE__ __REVISION__ __DATE__ __DEVELOPER__"
+"""
+Test the -l, --load-average and --max-load options, and the
+load_average SConscript settable option.
+"""
+
+import os
 
 import TestSCons
 
+_python_ = TestSCons._python_
+
 test = TestSCons.TestSCons()
 
-test.write('SConstruct', "")
+if not hasattr(os, 'getloadavg'):
+    test.skip_test("No os.getloadavg() on this platform, skipping test.\n")
+
+test.write('build.py', r"""
+import sys
+import time
+with open(sys.argv[1], 'w') as f:
+    f.write(str(time.time()) + '\n')
+    time.sleep(1)
+    f.write(str(time.time()))
+""")
+
+sconstruct = """\
+DefaultEnvironment(tools=[])
+env = Environment(tools=[])
+env.Command('f1', [], r'%(_python_)s build.py $TARGET')
+env.Command('f2', [], r'%(_python_)s build.py $TARGET')
+""" % locals()
+
+test.write('SConstruct', sconstruct)
+
+def times(target):
+    return list(map(float, test.read(target, mode='r').split('\n')))
 
-test.option_not_yet_implemented('-l', '1 .')
+# A load limit no machine reaches does not get in the way of -j.
+for option in ['-l 1000000', '--load-average=1000000', '--max-load=1000000']:
+    test.run(arguments='-j2 %s f1 f2' % option)
+    start1, finish1 = times('f1')
+    start2, finish2 = times('f2')
+    test.fail_test(not (start2 < finish1 and start1 < finish2))
+    test.run(arguments='-c .')
 
-test.option_not_yet_implemented('--load-average', '=1 .')
+test.write('SConstruct', "SetOption('load_average', 1000000)\n" + sconstruct)
+test.run(arguments='-j2 f1 f2')
+start1, finish1 = times('f1')
+start2, finish2 = times('f2')
+test.fail_test(not (start2 < finish1 and start1 < finish2))
 
-test.option_not_yet_implemented('--max-load', '=1 .')
+test.write('SConstruct', "SetOption('load_average', -1)\n")
+test.run(arguments='.', stderr=None, status=2)
+test.must_contain_all_lines(test.stderr(),
+                            ["A non-negative number is required: -1"])
 
 test.pass_test()
 
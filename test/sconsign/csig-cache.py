@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+#
+# MIT License
+#
+# Copyright The SCons Foundation
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Test the stat-keyed content signature cache kept next to the
+.sconsign database, for local and Repository sources.
+
+The cache is keyed on device, inode, mtime and size, so it is observed
+here by changing a file's contents while putting back its mtime and
+size: a build using the cache doesn't notice, one that hashes does.
+"""
+
+import os
+import time
+
+import TestSCons
+
+test = TestSCons.TestSCons()
+
+test.subdir('repository', 'work')
+
+database_name = test.get_sconsignname()
+csig_cache = test.workpath('work', database_name + '.csig')
+
+SConstruct = """\
+DefaultEnvironment(tools=[])
+env = Environment(tools=[])
+env.Command('local.out', 'local.in', Copy('$TARGET', '$SOURCE'))
+env.Command('repo.out', 'repo.in', Copy('$TARGET', '$SOURCE'))
+"""
+test.write(['work', 'SConstruct'], SConstruct)
+test.write(['work', 'local.in'], "local 1\n")
+test.write(['repository', 'repo.in'], "repo 1\n")
+
+opts = '-Y ' + test.workpath('repository')
+
+# Recent enough to be hashed every build under the default --max-drift,
+# old enough to be recorded in the cache.
+an_hour_ago = time.time() - 3600
+for f in [['work', 'local.in'], ['repository', 'repo.in']]:
+    os.utime(test.workpath(*f), (an_hour_ago, an_hour_ago))
+
+
+def sneaky_write(path, contents) -> None:
+    """Change a file, putting back its mtime (the size stays the same)."""
+    st = os.stat(path)
+    with open(path, 'w') as f:
+        f.write(contents)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+
+test.run(chdir='work', arguments=opts + ' .')
+test.must_exist(csig_cache)
+test.must_match(['work', 'local.out'], "local 1\n")
+test.must_match(['work', 'repo.out'], "repo 1\n")
+
+sneaky_write(test.workpath('work', 'local.in'), "local 2\n")
+sneaky_write(test.workpath('repository', 'repo.in'), "repo 2\n")
+test.up_to_date(chdir='work', options=opts, arguments='.')
+
+# A negative --max-drift means always hash, without the cache.
+test.run(chdir='work', arguments=opts + ' --max-drift=-1 .')
+test.must_match(['work', 'local.out'], "local 2\n")
+test.must_match(['work', 'repo.out'], "repo 2\n")
+
+# A real change, which updates the mtime, is seen.
+test.write(['work', 'local.in'], "local 3\n")
+os.utime(test.workpath('work', 'local.in'), (an_hour_ago + 10, an_hour_ago + 10))
+test.run(chdir='work', arguments=opts + ' .')
+test.must_match(['work', 'local.out'], "local 3\n")
+
+# Without the cache, a sneaky change is seen too.
+sneaky_write(test.workpath('work', 'local.in'), "local 4\n")
+os.unlink(csig_cache)
+test.run(chdir='work', arguments=opts + ' .')
+test.must_match(['work', 'local.out'], "local 4\n")
+
+# A file hashed less than two seconds after its mtime isn't recorded
+# (an mtime in the future keeps this independent of the test's speed).
+test.write(['work', 'local.in'], "local 5\n")
+an_hour_ahead = time.time() + 3600
+os.utime(test.workpath('work', 'local.in'), (an_hour_ahead, an_hour_ahead))
+test.run(chdir='work', arguments=opts + ' .')
+test.must_match(['work', 'local.out'], "local 5\n")
+sneaky_write(test.workpath('work', 'local.in'), "local 6\n")
+test.run(chdir='work', arguments=opts + ' .')
+test.must_match(['work', 'local.out'], "local 6\n")
+
+test.pass_test()
+
+# Local Variables:
+# tab-width:4
+# indent-tabs-mode:nil
+# End:
+# vim: set expandtab tabstop=4 shiftwidth=4:
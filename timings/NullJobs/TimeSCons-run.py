@@ -0,0 +1,52 @@
+#
+# __COPYRIGHT__
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+"""
+This configuration is for timing how an up-to-date build scales with -j.
+
+We create $SOURCE_COUNT source files of 40 kB each.  Each target is
+made from $SOURCES_PER_TARGET of them by a Touch() action, so nearly
+all of the null build goes into walking the DAG and computing the
+content signatures of the sources.  The sources were just written, so
+their stored signatures are too recent to be trusted (see --max-drift)
+and every null build hashes all of them again.
+
+Run the configuration with JOBS=1, JOBS=2, JOBS=4... in the environment
+to compare the null build times.
+"""
+
+import TestSCons
+
+test = TestSCons.TimeSCons(variables={
+    'SOURCE_COUNT': 20000,
+    'SOURCES_PER_TARGET': 10,
+    'JOBS': 1,
+}, calibrate=['SOURCE_COUNT'])
+
+contents = b'x' * 40000
+for s in range(test.variables['SOURCE_COUNT']):
+    test.write('source_%05d' % s, contents + b'%d\n' % s)
+
+test.main()
+
+test.pass_test()
@@ -0,0 +1,3 @@
+var Config = {
+  'title': "timings/NullJobs",
+};